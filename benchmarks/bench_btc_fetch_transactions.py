@@ -0,0 +1,102 @@
+"""Benchmark BtcService._fetch_transactions on a synthetic 5,000-tx block.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_btc_fetch_transactions.py [n_txs] [rpc_latency_ms]
+
+The RPC is faked in-process, each batch call sleeps `rpc_latency_ms` to mimic
+a round trip to the node, so both the regrouping cost and the effect of the
+concurrent batch fetch are visible.
+"""
+
+import sys
+import time
+
+from blockchainetl.enumeration.chain import Chain
+from bitcoinetl.domain.block import BtcBlock
+from bitcoinetl.service.btc_service import BtcService
+
+
+class FakeBitcoinRpc:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def batch(self, commands, skip_cache=False):
+        time.sleep(self.latency)
+        result = []
+        for command in commands:
+            method, txid = command[0], command[1]
+            assert method == "getrawtransaction"
+            result.append(make_raw_tx(txid))
+        return result
+
+
+def make_raw_tx(txid: str):
+    return {
+        "txid": txid,
+        "size": 225,
+        "version": 1,
+        "locktime": 0,
+        "vin": [{"txid": "00" * 32, "vout": 0, "sequence": 4294967295}],
+        "vout": [
+            {
+                "n": 0,
+                "value": 1,
+                "scriptPubKey": {
+                    "type": "pubkeyhash",
+                    "addresses": ["DFundmtrigzA6E25Swr2khtXgDBR8Z6Xz2"],
+                },
+            }
+        ],
+    }
+
+
+def make_block(number: int, n_txs: int) -> BtcBlock:
+    block = BtcBlock()
+    block.number = number
+    block.hash = "%064x" % number
+    block.timestamp = 1600000000 + number
+    block.transactions = ["%064x" % (number * 1_000_000 + i) for i in range(n_txs)]
+    return block
+
+
+def legacy_regroup(service: BtcService, blocks, raw_transactions):
+    for block in blocks:
+        raw_block_transactions = [
+            tx for tx in raw_transactions if tx.get("txid") in block.transactions
+        ]
+        block.transactions = [
+            service.transaction_mapper.json_dict_to_transaction(tx, block)
+            for tx in raw_block_transactions
+        ]
+
+
+def main(n_txs=5000, latency_ms=5):
+    rpc = FakeBitcoinRpc(latency_ms / 1000)
+
+    serial = BtcService(rpc, Chain.DOGECOIN, max_workers=1)
+    blocks = [make_block(1, n_txs)]
+    st = time.time()
+    raw_transactions = serial._get_raw_transactions_by_hashes_batched(
+        blocks[0].transactions
+    )
+    fetched = time.time()
+    legacy_regroup(serial, blocks, raw_transactions)
+    done = time.time()
+    print(
+        f"legacy:  fetch={fetched - st:.3f}s regroup={done - fetched:.3f}s "
+        f"total={done - st:.3f}s"
+    )
+
+    service = BtcService(rpc, Chain.DOGECOIN)
+    blocks = [make_block(1, n_txs)]
+    expected = list(blocks[0].transactions)
+    st = time.time()
+    service._fetch_transactions(blocks)
+    done = time.time()
+    assert [tx.hash for tx in blocks[0].transactions] == expected
+    print(f"current: total={done - st:.3f}s ({service.max_workers} workers)")
+
+
+if __name__ == "__main__":
+    args = [int(x) for x in sys.argv[1:3]]
+    main(*args)
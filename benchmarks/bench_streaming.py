@@ -0,0 +1,482 @@
+"""Offline benchmarks of the streaming pipeline, end to end and stage by stage.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_streaming.py [-o result.json]
+        [--fixtures DIR] [--repeat 5] [--only eth.] [--compare baseline.json]
+
+The RPC responses are replayed by a local mock node, from the fixtures in
+--fixtures(see record_fixtures.py), or synthesized with a fixed seed if not
+given, so no network is needed and the numbers are comparable between commits.
+The results are written as json, with --compare the medians are compared with
+a previous result, exits with 1 if any benchmark is slower than
+--max-regression.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from blockchainetl.enumeration.chain import Chain
+from blockchainetl.enumeration.entity_type import EntityType
+from blockchainetl.alert.full_items import FULL_ITEMS
+from blockchainetl.alert.rule_set import RuleSet
+from blockchainetl.jobs.exporters.file_item_exporter import FileItemExporter
+from ethereumetl.providers.rpc import BatchHTTPProvider
+from ethereumetl.mappers.block_mapper import EthBlockMapper
+from ethereumetl.mappers.transaction_mapper import EthTransactionMapper
+from ethereumetl.mappers.receipt_mapper import EthReceiptMapper
+from ethereumetl.mappers.log_mapper import EthLogMapper
+from ethereumetl.mappers.trace_mapper import EthTraceMapper
+from ethereumetl.mappers.geth_trace_mapper import EthGethTraceMapper
+from ethereumetl.service.trace_id_calculator import calculate_trace_ids
+from ethereumetl.streaming.eth_base_adapter import EthBaseAdapter
+from ethereumetl.streaming.eth_streamer_adapter import EthStreamerAdapter
+from ethereumetl.streaming.extractor import extract_token_transfers
+from ethereumetl.streaming.enrich import EnrichIndex, enrich_transactions
+from bitcoinetl.rpc.bitcoin_rpc import BitcoinRpc
+from bitcoinetl.mappers.block_mapper import BtcBlockMapper
+from bitcoinetl.mappers.transaction_mapper import BtcTransactionMapper
+from bitcoinetl.streaming.btc_streamer_adapter import BtcStreamerAdapter
+
+from fixtures import load_fixtures, synthesize_btc, synthesize_eth
+from mock_node import MockNode
+
+ETH_ENTITY_TYPES = [
+    EntityType.BLOCK,
+    EntityType.TRANSACTION,
+    EntityType.RECEIPT,
+    EntityType.LOG,
+    EntityType.TOKEN_TRANSFER,
+    EntityType.TRACE,
+]
+BTC_ENTITY_TYPES = [EntityType.BLOCK, EntityType.TRANSACTION, EntityType.TRACE]
+
+ALERT_RULES = [
+    {
+        "id": "large-eth-transfer",
+        "scope": "tx",
+        "where": "tx.value > 100000000000000000000",
+    },
+    {
+        "id": "watched-receiver",
+        "scope": "tx",
+        "where": "tx.to_address in ['0x37861ccddb1e36a9dc732eb12ea570438173f0b6', "
+        "'0xdac17f958d2ee523a2206206994597c13d831ec7']",
+    },
+    {"id": "erc20-transfer-call", "scope": "tx", "where": "tx.input =~ '^0xa9059cbb'"},
+    {
+        "id": "transfer-event",
+        "scope": "log",
+        "where": "log.topics[0] == "
+        "'0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'",
+    },
+    {
+        "id": "usdt-whale",
+        "scope": "token_xfer",
+        "where": "token_xfer.token_address == "
+        "'0xdac17f958d2ee523a2206206994597c13d831ec7' and token_xfer.value > 1000000",
+    },
+    {"id": "value-call", "scope": "trace", "where": "trace.value > 0"},
+    {
+        "id": "contract-creation",
+        "scope": "trace",
+        "where": "trace.trace_type == 'create'",
+    },
+]
+
+Bench = Tuple[str, Callable[[], int]]
+
+
+class CollectingItemExporter(object):
+    def __init__(self):
+        self.items: List[Dict] = []
+
+    def open(self):
+        pass
+
+    def export_items(self, items):
+        self.items.extend(items)
+
+    def export_item(self, item):
+        self.items.append(item)
+
+    def close(self):
+        pass
+
+
+def measure(fn: Callable[[], int], repeat: int) -> Dict:
+    # the first run warms up the caches and connections
+    items = fn()
+    elapsed = []
+    for _ in range(repeat):
+        st = time.perf_counter()
+        items = fn()
+        elapsed.append(time.perf_counter() - st)
+    median = statistics.median(elapsed)
+    return {
+        "items": items,
+        "repeat": repeat,
+        "min": min(elapsed),
+        "median": median,
+        "mean": statistics.mean(elapsed),
+        "stdev": statistics.stdev(elapsed) if repeat > 1 else 0.0,
+        "items_per_second": items / median if median > 0 else None,
+    }
+
+
+def eth_export_all(
+    uri: str, args, start_block: int, end_block: int, is_geth_provider: bool
+) -> List[Dict]:
+    exporter = CollectingItemExporter()
+    adapter = EthStreamerAdapter(
+        BatchHTTPProvider(uri),
+        item_exporter=exporter,
+        chain=Chain.ETHEREUM,
+        batch_size=args.batch_size,
+        max_workers=args.max_workers,
+        entity_types=ETH_ENTITY_TYPES,
+        is_geth_provider=is_geth_provider,
+    )
+    adapter.export_all(start_block, end_block)
+    return exporter.items
+
+
+def eth_export_filtered_logs(
+    uri: str, args, start_block: int, end_block: int, address: str, topic: str
+) -> int:
+    # the topic-filtered adapters' path: blocks first, then the logs of the
+    # blocks whose logsBloom may match
+    adapter = EthBaseAdapter(
+        Chain.ETHEREUM,
+        BatchHTTPProvider(uri),
+        batch_size=args.batch_size,
+        max_workers=args.max_workers,
+    )
+    blocks = adapter.export_blocks(start_block, end_block)
+    logs = adapter.export_logs(
+        start_block, end_block, [topic], address, bloom_blocks=blocks
+    )
+    return len(blocks) + len(logs)
+
+
+def eth_least_active_log_filter(logs: List[Dict]) -> Tuple[str, str]:
+    # filtered by the least active contract, as a token holder/balance job
+    counts: Dict[Tuple[str, str], int] = {}
+    for log in logs:
+        key = (log["address"], log["topics"][0])
+        counts[key] = counts.get(key, 0) + 1
+    return min(counts, key=lambda e: counts[e])
+
+
+def eth_map_blocks(fixtures: Dict) -> Tuple[List[Dict], List[Dict]]:
+    block_mapper, tx_mapper = EthBlockMapper(), EthTransactionMapper()
+    blocks, txs = [], []
+    for raw in fixtures["blocks"]:
+        block = block_mapper.json_dict_to_block(raw)
+        blocks.append(block_mapper.block_to_dict(block))
+        txs.extend(tx_mapper.transaction_to_dict(tx) for tx in block.transactions)
+    return blocks, txs
+
+
+def eth_map_receipts(
+    fixtures: Dict, numbers: List[int]
+) -> Tuple[List[Dict], List[Dict]]:
+    receipt_mapper, log_mapper = EthReceiptMapper(), EthLogMapper()
+    receipts, logs = [], []
+    for number in numbers:
+        for raw in fixtures["receipts"][str(number)]:
+            receipt = receipt_mapper.json_dict_to_receipt(raw)
+            receipts.append(receipt_mapper.receipt_to_dict(receipt))
+            logs.extend(log_mapper.log_to_dict(log) for log in receipt.logs)
+    return receipts, logs
+
+
+def eth_flatten_geth_traces(
+    fixtures: Dict, numbers: List[int], txs: List[Dict]
+) -> List[Dict]:
+    trace_mapper, geth_trace_mapper = EthTraceMapper(), EthGethTraceMapper()
+    tx_hashes: Dict[int, Dict[int, str]] = {}
+    for tx in txs:
+        tx_hashes.setdefault(tx["block_number"], {})[tx["transaction_index"]] = tx[
+            "hash"
+        ]
+    traces = []
+    for number in numbers:
+        geth_trace = geth_trace_mapper.json_dict_to_geth_trace(
+            {
+                "block_number": number,
+                "tx_traces": [
+                    e["result"] for e in fixtures["geth_traces"][str(number)]
+                ],
+                "tx_hashes": tx_hashes.get(number, {}),
+            }
+        )
+        traces.extend(trace_mapper.geth_trace_to_traces(geth_trace))
+    calculate_trace_ids([e for e in traces if not e.transaction_hash])
+    return [trace_mapper.trace_to_dict(e) for e in traces]
+
+
+def eth_extract_token_transfers(logs: List[Dict], args) -> List[Dict]:
+    return extract_token_transfers(
+        logs, args.batch_size, args.max_workers, chain=Chain.ETHEREUM
+    )
+
+
+def eth_enrich(blocks, txs, receipts, logs, xfers, traces) -> int:
+    index = EnrichIndex(blocks)
+    return (
+        len(enrich_transactions(txs, receipts))
+        + len(index.enrich_logs(logs))
+        + len(index.enrich_token_transfers(xfers))
+        + len(index.enrich_traces(traces))
+    )
+
+
+def eth_benches(fixtures: Dict, uri: str, args) -> List[Bench]:
+    numbers = [int(e["number"], 16) for e in fixtures["blocks"]]
+    start_block, end_block = min(numbers), max(numbers)
+    is_geth = "geth_traces" in fixtures
+
+    # the inputs of the isolated stages
+    blocks, txs = eth_map_blocks(fixtures)
+    receipts, logs = eth_map_receipts(fixtures, numbers)
+    xfers = eth_extract_token_transfers(logs, args)
+    traces = eth_flatten_geth_traces(fixtures, numbers, txs) if is_geth else []
+    all_items = eth_export_all(uri, args, start_block, end_block, is_geth)
+
+    def export_all(is_geth_provider: bool) -> Callable[[], int]:
+        return lambda: len(
+            eth_export_all(uri, args, start_block, end_block, is_geth_provider)
+        )
+
+    benches: List[Bench] = []
+    if "geth_traces" in fixtures:
+        benches.append(("eth.export_all.geth", export_all(True)))
+    if "parity_traces" in fixtures:
+        benches.append(("eth.export_all.parity", export_all(False)))
+    if len(logs) > 0:
+        address, topic = eth_least_active_log_filter(logs)
+        benches.append(
+            (
+                "eth.export_logs.filtered",
+                lambda: eth_export_filtered_logs(
+                    uri, args, start_block, end_block, address, topic
+                ),
+            )
+        )
+    benches += [
+        ("eth.map_blocks", lambda: sum(len(e) for e in eth_map_blocks(fixtures))),
+        (
+            "eth.map_receipts",
+            lambda: sum(len(e) for e in eth_map_receipts(fixtures, numbers)),
+        ),
+        (
+            "eth.extract_token_transfers",
+            lambda: len(eth_extract_token_transfers(logs, args)),
+        ),
+        (
+            "eth.enrich_joins",
+            lambda: eth_enrich(blocks, txs, receipts, logs, xfers, traces),
+        ),
+        ("eth.csv_encode", lambda: csv_encode(Chain.ETHEREUM, all_items)),
+    ]
+    if is_geth:
+        benches.append(
+            (
+                "eth.flatten_geth_traces",
+                lambda: len(eth_flatten_geth_traces(fixtures, numbers, txs)),
+            )
+        )
+    return benches
+
+
+def btc_benches(fixtures: Dict, uri: str, args) -> List[Bench]:
+    numbers = [e["height"] for e in fixtures["blocks"]]
+    start_block, end_block = min(numbers), max(numbers)
+    block_mapper, tx_mapper = BtcBlockMapper(), BtcTransactionMapper()
+
+    def export_all() -> int:
+        exporter = CollectingItemExporter()
+        # a new rpc per run, else the transactions are served from its cache
+        adapter = BtcStreamerAdapter(
+            BitcoinRpc(uri),
+            item_exporter=exporter,
+            chain=Chain.BITCOIN,
+            batch_size=args.batch_size,
+            max_workers=args.max_workers,
+            entity_types=BTC_ENTITY_TYPES,
+        )
+        adapter.export_all(start_block, end_block)
+        return len(exporter.items)
+
+    def map_blocks() -> int:
+        items = 0
+        for raw in fixtures["blocks"]:
+            block = block_mapper.json_dict_to_block(raw)
+            block_mapper.block_to_dict(block)
+            for tx in block.transactions:
+                tx_mapper.transaction_to_dict(tx)
+            items += 1 + len(block.transactions)
+        return items
+
+    collector = CollectingItemExporter()
+    BtcStreamerAdapter(
+        BitcoinRpc(uri),
+        item_exporter=collector,
+        chain=Chain.BITCOIN,
+        batch_size=args.batch_size,
+        max_workers=args.max_workers,
+        entity_types=BTC_ENTITY_TYPES,
+    ).export_all(start_block, end_block)
+    all_items = collector.items
+
+    return [
+        ("btc.export_all", export_all),
+        ("btc.map_blocks", map_blocks),
+        ("btc.csv_encode", lambda: csv_encode(Chain.BITCOIN, all_items)),
+    ]
+
+
+def alert_benches(args) -> List[Bench]:
+    rules = [dict(e, description=e["id"], receivers=["benchmark"]) for e in ALERT_RULES]
+    ruleset = RuleSet.load(Chain.ETHEREUM, None, rules)
+    items = {scope: values * args.alert_scale for scope, values in FULL_ITEMS.items()}
+
+    def evaluate() -> int:
+        for _ in ruleset.execute(ThreadPoolExecutor, items, args.max_workers):
+            pass
+        return sum(len(e) for e in items.values())
+
+    return [("alert.rules_full_items", evaluate)]
+
+
+def csv_encode(chain: str, items: List[Dict]) -> int:
+    output = tempfile.mkdtemp(prefix="bench-csv-")
+    try:
+        FileItemExporter(chain, output).export_items(items)
+    finally:
+        shutil.rmtree(output, ignore_errors=True)
+    return len(items)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+        dirty = subprocess.check_output(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("-dirty" if dirty != "" else "")
+
+
+def compare(results: Dict, baseline: Dict, max_regression: float) -> bool:
+    ok = True
+    print(f"{'benchmark':<32} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, result in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<32} {'-':>10} {result['median']:>10.4f} {'-':>7}")
+            continue
+        ratio = result["median"] / base["median"] if base["median"] > 0 else 1.0
+        mark = ""
+        if ratio > 1 + max_regression:
+            ok, mark = False, " REGRESSION"
+        print(
+            f"{name:<32} {base['median']:>10.4f} {result['median']:>10.4f} "
+            f"{ratio:>7.2f}{mark}"
+        )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixtures", help="recorded fixtures, synthesized if not set")
+    parser.add_argument("--eth-blocks", type=int, default=20)
+    parser.add_argument("--eth-txs", type=int, default=150, help="txs per eth block")
+    parser.add_argument("--btc-blocks", type=int, default=5)
+    parser.add_argument("--btc-txs", type=int, default=400, help="txs per btc block")
+    parser.add_argument("--alert-scale", type=int, default=20)
+    parser.add_argument("-b", "--batch-size", type=int, default=10)
+    parser.add_argument("-w", "--max-workers", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", help="run the benchmarks whose name contains it")
+    parser.add_argument("-o", "--output", help="write the results into this file")
+    parser.add_argument("--compare", help="compare with a previous result file")
+    parser.add_argument("--max-regression", type=float, default=0.1)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.fixtures is not None:
+        eth = load_fixtures(args.fixtures, "eth")
+        btc = load_fixtures(args.fixtures, "btc")
+    else:
+        eth = synthesize_eth(blocks=args.eth_blocks, txs=args.eth_txs)
+        btc = synthesize_btc(blocks=args.btc_blocks, txs=args.btc_txs)
+
+    results: Dict[str, Dict] = {}
+    with MockNode(eth, btc) as node:
+        benches = alert_benches(args)
+        if eth is not None and len(eth["blocks"]) > 0:
+            benches += eth_benches(eth, node.uri, args)
+        if btc is not None and len(btc["blocks"]) > 0:
+            benches += btc_benches(btc, node.uri, args)
+
+        for name, fn in benches:
+            if args.only is not None and args.only not in name:
+                continue
+            results[name] = measure(fn, args.repeat)
+            r = results[name]
+            print(
+                f"{name:<32} median={r['median']:.4f}s min={r['min']:.4f}s "
+                f"items=#{r['items']}",
+                file=sys.stderr,
+            )
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "fixtures": args.fixtures or "synthesized",
+            "eth_blocks": len(eth["blocks"]) if eth is not None else 0,
+            "btc_blocks": len(btc["blocks"]) if btc is not None else 0,
+            "batch_size": args.batch_size,
+            "max_workers": args.max_workers,
+        },
+        "results": results,
+    }
+    if args.output is not None:
+        with open(args.output, "w") as fw:
+            json.dump(report, fw, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare is not None:
+        with open(args.compare) as fr:
+            baseline = json.load(fr)
+        if not compare(results, baseline, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""RPC fixtures replayed by the mock node.
+
+A fixture directory holds up to two files, in the raw JSON RPC result format:
+
+    eth.json: {
+        "blocks": [eth_getBlockByNumber(number, true), ...],
+        "receipts": {number: eth_getBlockReceipts(number)},
+        "geth_traces": {number: debug_traceBlockByNumber(number, callTracer)},
+        "parity_traces": {number: trace_block(number)},
+    }
+    btc.json: {
+        "blocks": [getblock(hash, 2), ...],
+        "transactions": {txid: getrawtransaction(txid, 1)},
+    }
+
+They are either recorded from a live node(see record_fixtures.py), or
+synthesized here with a fixed seed, so the numbers are comparable between
+commits without any network.
+"""
+
+import os
+import json
+import random
+from typing import Dict, List, Optional
+
+from ethereumetl.service.logs_bloom import logs_bloom
+
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+SWAP_TOPIC = "0xd78ad95fa46c994b6551d0da85fc275fe613ce37657fb8d5e3d130840159d822"
+SYNC_TOPIC = "0x1c411e9a96e071241c2f21f7726b17ae89e3cab4c78be50e062b03a9fffbbad1"
+
+
+def load_fixtures(path: str, chain: str) -> Optional[Dict]:
+    file = os.path.join(path, f"{chain}.json")
+    if not os.path.exists(file):
+        return None
+    with open(file) as fr:
+        return json.load(fr)
+
+
+def save_fixtures(path: str, chain: str, fixtures: Dict):
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, f"{chain}.json"), "w") as fw:
+        json.dump(fixtures, fw)
+
+
+def _hash(rnd: random.Random, nbytes=32) -> str:
+    return "0x%0*x" % (nbytes * 2, rnd.getrandbits(nbytes * 8))
+
+
+def _word(value) -> str:
+    if isinstance(value, str):
+        return value[2:].rjust(64, "0")
+    return "%064x" % value
+
+
+def synthesize_eth(
+    start_block: int = 15_000_000, blocks: int = 20, txs: int = 150, seed: int = 42
+) -> Dict:
+    """Blocks of plain transfers, ERC20 transfers and swaps, with their
+    receipts and call traces in both the geth and the parity format"""
+    rnd = random.Random(seed)
+    accounts = [_hash(rnd, 20) for _ in range(500)]
+    tokens = [_hash(rnd, 20) for _ in range(40)]
+    pools = [_hash(rnd, 20) for _ in range(20)]
+
+    fixtures: Dict = {"blocks": [], "receipts": {}, "geth_traces": {}}
+    parent_hash = _hash(rnd)
+    for number in range(start_block, start_block + blocks):
+        block_hash = _hash(rnd)
+        timestamp = 1_660_000_000 + (number - start_block) * 12
+        transactions, receipts, traces = [], [], []
+        log_index = 0
+        gas_used = 0
+        for idx in range(txs):
+            kind = rnd.random()
+            sender = rnd.choice(accounts)
+            txhash = _hash(rnd)
+            logs = []
+            if kind < 0.3:
+                to, value, data = rnd.choice(accounts), rnd.getrandbits(60), "0x"
+                trace = {"type": "CALL", "from": sender, "to": to, "value": hex(value)}
+            elif kind < 0.8:
+                token, receiver = rnd.choice(tokens), rnd.choice(accounts)
+                amount = rnd.getrandbits(80)
+                to, value = token, 0
+                data = "0xa9059cbb" + _word(receiver) + _word(amount)
+                logs.append((token, [TRANSFER_TOPIC, sender, receiver], amount))
+                trace = {"type": "CALL", "from": sender, "to": to, "value": "0x0"}
+            else:
+                pool, token0, token1 = rnd.choice(pools), *rnd.sample(tokens, 2)
+                amount = rnd.getrandbits(70)
+                to, value = pool, 0
+                data = "0x022c0d9f" + _word(amount) + _word(0) + _word(sender)
+                logs.append((token0, [TRANSFER_TOPIC, pool, sender], amount))
+                logs.append((token1, [TRANSFER_TOPIC, sender, pool], amount // 3))
+                logs.append((pool, [SYNC_TOPIC], rnd.getrandbits(100)))
+                logs.append((pool, [SWAP_TOPIC, sender, sender], amount))
+                trace = {
+                    "type": "CALL",
+                    "from": sender,
+                    "to": pool,
+                    "value": "0x0",
+                    "calls": [
+                        {
+                            "type": "DELEGATECALL",
+                            "from": pool,
+                            "to": rnd.choice(pools),
+                            "input": data,
+                            "output": "0x",
+                            "gas": "0x186a0",
+                            "gasUsed": "0x7530",
+                            "calls": [
+                                {
+                                    "type": "CALL",
+                                    "from": pool,
+                                    "to": token0,
+                                    "value": "0x0",
+                                    "input": "0xa9059cbb" + _word(sender),
+                                    "output": "0x" + _word(1),
+                                    "gas": "0xc350",
+                                    "gasUsed": "0x3a98",
+                                },
+                                {
+                                    "type": "STATICCALL",
+                                    "from": pool,
+                                    "to": token1,
+                                    "input": "0x70a08231" + _word(pool),
+                                    "output": "0x" + _word(amount),
+                                    "gas": "0xc350",
+                                    "gasUsed": "0x9c4",
+                                },
+                            ],
+                        }
+                    ],
+                }
+
+            gas = 21_000 if data == "0x" else 60_000 + rnd.randrange(200_000)
+            gas_used += gas
+            trace.update(
+                input=data, output="0x", gas=hex(gas * 2), gasUsed=hex(gas - 21_000)
+            )
+            traces.append({"txHash": txhash, "result": trace})
+            transactions.append(
+                {
+                    "hash": txhash,
+                    "nonce": hex(rnd.randrange(10_000)),
+                    "blockHash": block_hash,
+                    "blockNumber": hex(number),
+                    "transactionIndex": hex(idx),
+                    "from": sender,
+                    "to": to,
+                    "value": hex(value),
+                    "gas": hex(gas * 2),
+                    "gasPrice": hex(20_000_000_000),
+                    "maxFeePerGas": hex(40_000_000_000),
+                    "maxPriorityFeePerGas": hex(1_000_000_000),
+                    "input": data,
+                    "type": "0x2",
+                    "v": "0x1",
+                    "r": _hash(rnd),
+                    "s": _hash(rnd),
+                }
+            )
+            receipt_logs = []
+            for address, topics, amount in logs:
+                receipt_logs.append(
+                    {
+                        "address": address,
+                        "topics": [topics[0]] + ["0x" + _word(e) for e in topics[1:]],
+                        "data": "0x" + _word(amount),
+                        "blockNumber": hex(number),
+                        "blockHash": block_hash,
+                        "transactionHash": txhash,
+                        "transactionIndex": hex(idx),
+                        "logIndex": hex(log_index),
+                        "removed": False,
+                    }
+                )
+                log_index += 1
+            receipts.append(
+                {
+                    "transactionHash": txhash,
+                    "transactionIndex": hex(idx),
+                    "blockHash": block_hash,
+                    "blockNumber": hex(number),
+                    "from": sender,
+                    "to": to,
+                    "cumulativeGasUsed": hex(gas_used),
+                    "gasUsed": hex(gas),
+                    "effectiveGasPrice": hex(20_000_000_000),
+                    "contractAddress": None,
+                    "logs": receipt_logs,
+                    "logsBloom": logs_bloom(receipt_logs),
+                    "status": "0x1",
+                    "type": "0x2",
+                }
+            )
+
+        fixtures["blocks"].append(
+            {
+                "number": hex(number),
+                "hash": block_hash,
+                "parentHash": parent_hash,
+                "nonce": "0x0000000000000000",
+                "sha3Uncles": _hash(rnd),
+                "logsBloom": logs_bloom(e for r in receipts for e in r["logs"]),
+                "transactionsRoot": _hash(rnd),
+                "stateRoot": _hash(rnd),
+                "receiptsRoot": _hash(rnd),
+                "miner": rnd.choice(accounts),
+                "difficulty": "0x0",
+                "totalDifficulty": hex(58_750_003_716_598_352_816_469),
+                "size": hex(100_000 + txs * 200),
+                "extraData": "0x",
+                "gasLimit": hex(30_000_000),
+                "gasUsed": hex(gas_used),
+                "timestamp": hex(timestamp),
+                "baseFeePerGas": hex(12_000_000_000),
+                "transactions": transactions,
+                "uncles": [],
+            }
+        )
+        fixtures["receipts"][str(number)] = receipts
+        fixtures["geth_traces"][str(number)] = traces
+        parent_hash = block_hash
+
+    fixtures["parity_traces"] = {
+        number: geth_traces_to_parity(int(number), fixtures, traces)
+        for number, traces in fixtures["geth_traces"].items()
+    }
+    return fixtures
+
+
+def geth_traces_to_parity(number: int, fixtures: Dict, tx_traces: List[Dict]):
+    block = next(e for e in fixtures["blocks"] if int(e["number"], 16) == number)
+    result = []
+
+    def walk(call: Dict, txpos: int, trace_address: List[int]):
+        calls = call.get("calls") or []
+        call_type = call["type"].lower()
+        action = {
+            "callType": call_type,
+            "from": call["from"],
+            "to": call["to"],
+            "gas": call.get("gas", "0x0"),
+            "input": call.get("input", "0x"),
+            "value": call.get("value", "0x0"),
+        }
+        result.append(
+            {
+                "action": action,
+                "blockHash": block["hash"],
+                "blockNumber": number,
+                "result": {
+                    "gasUsed": call.get("gasUsed", "0x0"),
+                    "output": call.get("output", "0x"),
+                },
+                "subtraces": len(calls),
+                "traceAddress": trace_address,
+                "transactionHash": block["transactions"][txpos]["hash"],
+                "transactionPosition": txpos,
+                "type": "call",
+            }
+        )
+        for idx, sub in enumerate(calls):
+            walk(sub, txpos, trace_address + [idx])
+
+    for txpos, tx_trace in enumerate(tx_traces):
+        walk(tx_trace["result"], txpos, [])
+    return result
+
+
+def synthesize_btc(
+    start_block: int = 750_000, blocks: int = 5, txs: int = 400, seed: int = 42
+) -> Dict:
+    """Blocks of 1-3 inputs and 2 outputs transactions, spending outputs of
+    transactions only known through getrawtransaction"""
+    rnd = random.Random(seed)
+    addresses = ["bc1q%038x" % rnd.getrandbits(152) for _ in range(500)]
+
+    def raw_tx(txid: str, vin: List[Dict], n_out: int) -> Dict:
+        return {
+            "txid": txid,
+            "hash": txid,
+            "version": 2,
+            "size": 225 + 148 * len(vin),
+            "vsize": 140 + 68 * len(vin),
+            "weight": 561 + 272 * len(vin),
+            "locktime": 0,
+            "vin": vin,
+            "vout": [
+                {
+                    "value": round(rnd.random() * 2, 8),
+                    "n": n,
+                    "scriptPubKey": {
+                        "asm": "0 %040x" % rnd.getrandbits(160),
+                        "hex": "0014%040x" % rnd.getrandbits(160),
+                        "reqSigs": 1,
+                        "type": "witness_v0_keyhash",
+                        "addresses": [rnd.choice(addresses)],
+                    },
+                }
+                for n in range(n_out)
+            ],
+            "hex": "02000000",
+        }
+
+    fixtures: Dict = {"blocks": [], "transactions": {}}
+    previous = _hash(rnd)[2:]
+    for number in range(start_block, start_block + blocks):
+        block_hash = _hash(rnd)[2:]
+        coinbase = raw_tx(
+            _hash(rnd)[2:],
+            [{"coinbase": "03%06x" % number, "sequence": 4294967295}],
+            2,
+        )
+        block_txs = [coinbase]
+        for _ in range(txs):
+            vin = []
+            for _ in range(rnd.randint(1, 3)):
+                funding = raw_tx(_hash(rnd)[2:], [], 2)
+                fixtures["transactions"][funding["txid"]] = funding
+                vin.append(
+                    {
+                        "txid": funding["txid"],
+                        "vout": rnd.randint(0, 1),
+                        "scriptSig": {"asm": "", "hex": ""},
+                        "txinwitness": ["30440220", "02a1"],
+                        "sequence": 4294967293,
+                    }
+                )
+            block_txs.append(raw_tx(_hash(rnd)[2:], vin, 2))
+
+        for tx in block_txs:
+            fixtures["transactions"][tx["txid"]] = tx
+        fixtures["blocks"].append(
+            {
+                "hash": block_hash,
+                "height": number,
+                "version": 536870912,
+                "merkleroot": _hash(rnd)[2:],
+                "time": 1_660_000_000 + (number - start_block) * 600,
+                "nonce": rnd.getrandbits(32),
+                "bits": "1709a7af",
+                "difficulty": 28351606743493.7,
+                "previousblockhash": previous,
+                "size": sum(e["size"] for e in block_txs),
+                "strippedsize": sum(e["vsize"] for e in block_txs),
+                "weight": sum(e["weight"] for e in block_txs),
+                "tx": block_txs,
+            }
+        )
+        previous = block_hash
+    return fixtures
@@ -0,0 +1,178 @@
+"""A local JSON RPC node replaying the recorded(or synthesized) fixtures.
+
+Both the ethereum and the bitcoin methods used by the streamer adapters are
+served, single and batch requests alike, an unknown method or parameter is
+answered with a JSON RPC error, as a real node would do.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class MockNode(object):
+    def __init__(self, eth: Optional[Dict] = None, btc: Optional[Dict] = None):
+        self.eth = eth or {"blocks": [], "receipts": {}}
+        self.btc = btc or {"blocks": [], "transactions": {}}
+        self.requests = 0
+
+        self._eth_blocks = {int(e["number"], 16): e for e in self.eth["blocks"]}
+        self._eth_receipts = {
+            r["transactionHash"]: r
+            for receipts in self.eth.get("receipts", {}).values()
+            for r in receipts
+        }
+        self._btc_blocks = {e["hash"]: e for e in self.btc["blocks"]}
+        self._btc_heights = {e["height"]: e["hash"] for e in self.btc["blocks"]}
+
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def uri(self) -> str:
+        assert self._server is not None, "mock node is not started"
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockNode":
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.dumps(node.handle(json.loads(self.rfile.read(length))))
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def handle(self, request):
+        if isinstance(request, list):
+            return [self._handle_one(e) for e in request]
+        return self._handle_one(request)
+
+    def _handle_one(self, request: Dict) -> Dict:
+        self.requests += 1
+        response: Dict[str, Any] = {"jsonrpc": "2.0", "id": request.get("id")}
+        try:
+            response["result"] = self.call(request["method"], request.get("params"))
+        except RpcError as e:
+            response["error"] = {"code": e.code, "message": e.message}
+        return response
+
+    def call(self, method: str, params):
+        params = params or []
+        handler = getattr(self, "_" + method, None)
+        if handler is None:
+            raise RpcError(-32601, f"the method {method} does not exist")
+        return handler(*params)
+
+    def _fixture(self, table: Dict, key, name: str):
+        if key not in table:
+            raise RpcError(-32000, f"{name} {key} not in the fixtures")
+        return table[key]
+
+    # ethereum
+    def _eth_chainId(self):
+        return "0x1"
+
+    def _eth_blockNumber(self):
+        return hex(max(self._eth_blocks, default=0))
+
+    def _eth_getBlockByNumber(self, number, full_transactions=False):
+        if number == "latest":
+            number = hex(max(self._eth_blocks))
+        block = self._fixture(self._eth_blocks, int(number, 16), "block")
+        if full_transactions:
+            return block
+        return dict(block, transactions=[e["hash"] for e in block["transactions"]])
+
+    def _eth_getBlockReceipts(self, number):
+        return self._fixture(self.eth["receipts"], str(int(number, 16)), "receipts")
+
+    def _eth_getTransactionReceipt(self, txhash):
+        return self._eth_receipts.get(txhash)
+
+    def _eth_getLogs(self, params: Dict):
+        start, end = int(params["fromBlock"], 16), int(params["toBlock"], 16)
+        addresses = params.get("address")
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        if addresses is not None:
+            addresses = [e.lower() for e in addresses]
+        topics = (params.get("topics") or [None])[0]
+        if isinstance(topics, str):
+            topics = [topics]
+
+        logs = []
+        for number in range(start, end + 1):
+            for receipt in self.eth["receipts"].get(str(number), []):
+                for log in receipt["logs"]:
+                    if (
+                        addresses is not None
+                        and log["address"].lower() not in addresses
+                    ):
+                        continue
+                    if topics is not None and log["topics"][:1] not in [
+                        [e] for e in topics
+                    ]:
+                        continue
+                    logs.append(log)
+        return logs
+
+    def _debug_traceBlockByNumber(self, number, config=None):
+        traces = self.eth.get("geth_traces", {})
+        return self._fixture(traces, str(int(number, 16)), "geth traces")
+
+    def _trace_block(self, number):
+        traces = self.eth.get("parity_traces", {})
+        return self._fixture(traces, str(int(number, 16)), "parity traces")
+
+    # bitcoin
+    def _getblockcount(self):
+        return max(self._btc_heights, default=0)
+
+    def _getblockhash(self, height):
+        return self._fixture(self._btc_heights, height, "block height")
+
+    def _getblock(self, block_hash, verbosity=1):
+        block = self._fixture(self._btc_blocks, block_hash, "block")
+        if verbosity == 2 or verbosity is True:
+            return block
+        return dict(block, tx=[e["txid"] for e in block["tx"]])
+
+    def _getrawtransaction(self, txid, verbose=0):
+        return self._fixture(self.btc["transactions"], txid, "transaction")
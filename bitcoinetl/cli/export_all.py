@@ -28,11 +28,14 @@ from blockchainetl.enumeration.chain import Chain
 from bitcoinetl.jobs.export_all import export_all as do_export_all
 from bitcoinetl.service.btc_block_range_service import BtcBlockRangeService
 from bitcoinetl.rpc.bitcoin_rpc import BitcoinRpc
+from blockchainetl.service.block_timestamp_index import open_block_timestamp_index
 from blockchainetl.thread_local_proxy import ThreadLocalProxy
 from blockchainetl.misc_utils import is_date_range, is_block_range
 
 
-def get_partitions(start, end, partition_batch_size, provider_uri):
+def get_partitions(
+    start, end, partition_batch_size, provider_uri, timestamp_index_path=None
+):
     """Yield partitions based on input data type."""
     if is_date_range(start, end):
         start_date = datetime.strptime(start, "%Y-%m-%d").date()
@@ -41,7 +44,8 @@ def get_partitions(start, end, partition_batch_size, provider_uri):
         day = timedelta(days=1)
 
         btc_service = BtcBlockRangeService(
-            bitcoin_rpc=ThreadLocalProxy(lambda: BitcoinRpc(provider_uri))
+            bitcoin_rpc=ThreadLocalProxy(lambda: BitcoinRpc(provider_uri)),
+            timestamp_index=open_block_timestamp_index(timestamp_index_path),
         )
 
         while start_date <= end_date:
@@ -122,6 +126,13 @@ def get_partitions(start, end, partition_batch_size, provider_uri):
     type=bool,
     help="Enable filling in transactions inputs fields.",
 )
+@click.option(
+    "--block-timestamp-index-path",
+    type=click.Path(exists=True, readable=True, dir_okay=False),
+    envvar="BLOCKCHAIN_ETL_BLOCK_TIMESTAMP_INDEX_PATH",
+    help="The file of the per block timestamps written by dump, "
+    "the blocks past it are searched by RPC",
+)
 def export_all(
     start,
     end,
@@ -132,11 +143,14 @@ def export_all(
     export_batch_size,
     chain,
     enrich,
+    block_timestamp_index_path,
 ):
     """Exports all data for a range of blocks."""
     do_export_all(
         chain,
-        get_partitions(start, end, partition_batch_size, provider_uri),
+        get_partitions(
+            start, end, partition_batch_size, provider_uri, block_timestamp_index_path
+        ),
         output_dir,
         provider_uri,
         max_workers,
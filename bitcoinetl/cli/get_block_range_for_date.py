@@ -28,6 +28,7 @@ from bitcoinetl.rpc.bitcoin_rpc import BitcoinRpc
 
 from bitcoinetl.service.btc_block_range_service import BtcBlockRangeService
 from blockchainetl.file_utils import smart_open
+from blockchainetl.service.block_timestamp_index import open_block_timestamp_index
 
 
 @click.command(context_settings=dict(help_option_names=["-h", "--help"]))
@@ -68,14 +69,25 @@ from blockchainetl.file_utils import smart_open
     type=str,
     help="The output file. If not specified stdout is used.",
 )
-def get_block_range_for_date(provider_uri, date, start_hour, end_hour, output):
+@click.option(
+    "--block-timestamp-index-path",
+    type=click.Path(exists=True, readable=True, dir_okay=False),
+    envvar="BLOCKCHAIN_ETL_BLOCK_TIMESTAMP_INDEX_PATH",
+    help="The file of the per block timestamps written by dump, "
+    "the blocks past it are searched by RPC",
+)
+def get_block_range_for_date(
+    provider_uri, date, start_hour, end_hour, output, block_timestamp_index_path
+):
     """Outputs start and end blocks for given date."""
 
     if start_hour > end_hour:
         raise ValueError("end_hour should be greater than or equal to start_hour")
 
     bitcoin_rpc = BitcoinRpc(provider_uri)
-    btc_service = BtcBlockRangeService(bitcoin_rpc)
+    btc_service = BtcBlockRangeService(
+        bitcoin_rpc, open_block_timestamp_index(block_timestamp_index_path)
+    )
 
     start_block, end_block = btc_service.get_block_range_for_date(
         date, start_hour, end_hour
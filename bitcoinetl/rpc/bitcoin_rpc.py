@@ -20,29 +20,33 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import os
 import logging
 import decimal
 import json
-import hashlib
-from copy import copy
-from typing import Optional, Dict, Any
-import diskcache as dc
+from time import time
+from typing import Optional, Dict, Hashable
 
+from blockchainetl.metrics import RPC_LATENCY, RPC_BATCH_SIZE
 from bitcoinetl.rpc.request import make_jsonrpc_request
-
+from bitcoinetl.rpc.rpc_cache import get_rpc_cache
 
 logger = logging.getLogger("bitcoin_rpc")
 
+# small results addressed by txid, repeated heavily by the prevout lookups,
+# they are kept in memory(if memory_cache_size > 0) even without a disk cache,
+# the other methods(eg: getblockhash by height) are only cached with a
+# cache_path, as before
+MEMORY_CACHED_METHODS = {"getrawtransaction"}
+
 
 class BitcoinRpc:
-    def __init__(self, provider_uri, timeout=60, cache_path=None):
+    def __init__(self, provider_uri, timeout=60, cache_path=None, memory_cache_size=0):
         self.provider_uri = provider_uri
         self.timeout = timeout
+        self.cache_path = cache_path
         self.cache = None
-        if cache_path is not None:
-            os.makedirs(cache_path, exist_ok=True)
-            self.cache = dc.Cache(cache_path)
+        if cache_path is not None or memory_cache_size > 0:
+            self.cache = get_rpc_cache(cache_path, memory_cache_size)
 
     def batch(self, commands, skip_cache=False):
         rpc_calls = []
@@ -52,24 +56,33 @@ class BitcoinRpc:
             m = command.pop(0)
             call = {"jsonrpc": "2.0", "method": m, "params": command, "id": id}
             cache_or_none = None
-            if skip_cache is True or self.cache is None:
+            cache_key = None if skip_cache is True else self._cache_key(m, command)
+            if cache_key is None:
                 rpc_calls.append(call)
             else:
-                cache_key = self._cache_key(call)
                 cached_val = self._get_cache(cache_key)
                 if cached_val is None:
-                    cache_keys.append(cache_key)
                     rpc_calls.append(call)
                 else:
                     cache_or_none = cached_val
+            cache_keys.append(cache_key)
 
             result.append(cache_or_none)
 
-        raw_response = make_jsonrpc_request(
-            self.provider_uri,
-            rpc_calls,
-            timeout=self.timeout,
-        )
+        if len(rpc_calls) == 0:
+            return result
+
+        method = rpc_calls[0]["method"]
+        st0 = time()
+        try:
+            raw_response = make_jsonrpc_request(
+                self.provider_uri,
+                rpc_calls,
+                timeout=self.timeout,
+            )
+        finally:
+            RPC_LATENCY.labels(method=method).observe(time() - st0)
+        RPC_BATCH_SIZE.labels(method=method).observe(len(rpc_calls))
 
         response = self._decode_rpc_response(raw_response)
 
@@ -85,9 +98,8 @@ class BitcoinRpc:
                     rpc_calls,
                 )
             result[id] = resp_result
-            if skip_cache is False and self.cache is not None:
-                cache_key = cache_keys.pop(0)
-                self._set_cache(cache_key, resp_result)
+            if cache_keys[id] is not None:
+                self._set_cache(cache_keys[id], resp_result)
         return result
 
     def getblockhash(self, param) -> Optional[Dict]:
@@ -106,29 +118,27 @@ class BitcoinRpc:
         response_text = response.decode("utf-8")
         return json.loads(response_text, parse_float=decimal.Decimal)
 
-    def _cache_key(self, req: Dict):
-        req1 = copy(req)
-        # don't cache with id
-        del req1["id"]
-        data = json.dumps(req1, skipkeys=True)
-        return hashlib.md5(data.encode()).hexdigest()
+    def _cache_key(self, method: str, params) -> Optional[Hashable]:
+        if self.cache is None:
+            return None
+        if self.cache_path is None and method not in MEMORY_CACHED_METHODS:
+            return None
+        key = (method, *params)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
 
-    def _get_cache(self, key: str):
+    def _get_cache(self, key: Hashable):
         if self.cache is None:
             return None
-        return self.cache.get(key)
+        return self.cache.get(key, memory=key[0] in MEMORY_CACHED_METHODS)
 
-    def _set_cache(self, key: str, val: Any):
+    def _set_cache(self, key: Hashable, val):
         if self.cache is None:
             return
-        logger.debug(f"cache {key}")
-        return self.cache.set(key, val)
-
-    def _print_cache_stat(self):
-        assert self.cache is not None
-        hits, miss = self.cache.hits, self.cache.misses
-        if hits + miss > 0:
-            hit_rate = hits * 100 / (hits + miss)
-        else:
-            hit_rate = 0
-        logger.info(f"cache stat: #H={hits} #M={miss} %hit={round(hit_rate, 2)}%")
+        return self.cache.set(key, val, memory=key[0] in MEMORY_CACHED_METHODS)
+
+    def cache_stats(self) -> Dict:
+        return self.cache.stats() if self.cache is not None else {}
@@ -1,19 +1,22 @@
-import hashlib
 import requests
+from threading import Lock
 
 from requests.sessions import HTTPAdapter
 
+# one keep-alive session per endpoint, shared by all the threads
 _session_cache = {}
+_session_lock = Lock()
 
 
 def _get_session(endpoint_uri):
-    cache_key = hashlib.md5(endpoint_uri.encode("utf-8")).hexdigest()
-    if cache_key not in _session_cache:
-        session = requests.Session()
-        session.mount("http://", HTTPAdapter(pool_connections=50, pool_maxsize=200))
-        session.mount("https://", HTTPAdapter(pool_connections=50, pool_maxsize=200))
-        _session_cache[cache_key] = session
-    return _session_cache[cache_key]
+    with _session_lock:
+        if endpoint_uri not in _session_cache:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=50, pool_maxsize=200)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session_cache[endpoint_uri] = session
+        return _session_cache[endpoint_uri]
 
 
 def make_jsonrpc_request(endpoint_uri, data, *args, **kwargs):
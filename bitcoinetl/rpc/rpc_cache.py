@@ -0,0 +1,106 @@
+import os
+import pickle
+import logging
+from threading import Lock
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import diskcache as dc
+from cachetools import LRUCache
+
+from blockchainetl.metrics import RPC_CACHE_REQUESTS
+
+logger = logging.getLogger("rpc_cache")
+
+_MISSING = object()
+
+
+class RpcCache:
+    """Two-tier RPC result cache: a bounded in-process LRU in front of an optional
+    disk cache. Keys are plain tuples like ("getrawtransaction", txhash, 1).
+
+    The results are mutable dicts, both tiers keep them serialized, every get
+    returns a fresh copy the caller is free to modify.
+    """
+
+    def __init__(self, cache_path: Optional[str] = None, maxsize: int = 100_000):
+        self._memory = LRUCache(maxsize=max(maxsize, 1))
+        self._memory_enabled = maxsize > 0
+        self._lock = Lock()
+        self._disk = None
+        if cache_path is not None:
+            os.makedirs(cache_path, exist_ok=True)
+            self._disk = dc.Cache(cache_path)
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, memory=True) -> Optional[Any]:
+        memory = memory and self._memory_enabled
+        if memory:
+            with self._lock:
+                data = self._memory.get(key, _MISSING)
+                if data is not _MISSING:
+                    self.memory_hits += 1
+                    RPC_CACHE_REQUESTS.labels(result="memory_hit").inc()
+            if data is not _MISSING:
+                return pickle.loads(data)
+
+        if self._disk is not None:
+            val = self._disk.get(key, _MISSING)
+            if val is not _MISSING:
+                data = pickle.dumps(val) if memory else None
+                with self._lock:
+                    self.disk_hits += 1
+                    RPC_CACHE_REQUESTS.labels(result="disk_hit").inc()
+                    if memory:
+                        self._memory[key] = data
+                return val
+
+        with self._lock:
+            self.misses += 1
+            RPC_CACHE_REQUESTS.labels(result="miss").inc()
+        return None
+
+    def set(self, key: Hashable, val: Any, memory=True):
+        if memory and self._memory_enabled:
+            data = pickle.dumps(val)
+            with self._lock:
+                self._memory[key] = data
+        if self._disk is not None:
+            self._disk.set(key, val)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_size": len(self._memory),
+                "hit_rate": round(hits * 100 / total, 2) if total > 0 else 0,
+            }
+
+    def log_stats(self):
+        st = self.stats()
+        logger.info(
+            f"cache stat: #MH={st['memory_hits']} #DH={st['disk_hits']} "
+            f"#M={st['misses']} #size={st['memory_size']} %hit={st['hit_rate']}%"
+        )
+
+
+_rpc_caches: Dict[Tuple[Optional[str], int], RpcCache] = {}
+_rpc_caches_lock = Lock()
+
+
+def get_rpc_cache(cache_path: Optional[str] = None, maxsize: int = 100_000):
+    """Return the process-wide cache of `cache_path`, BitcoinRpc is usually created
+    per thread(ThreadLocalProxy), so the memory tier has to be shared. The caches of
+    different sizes are different memory tiers over the same disk cache.
+    """
+    key = (cache_path, maxsize)
+    with _rpc_caches_lock:
+        if key not in _rpc_caches:
+            _rpc_caches[key] = RpcCache(cache_path, maxsize)
+        return _rpc_caches[key]
@@ -22,16 +22,31 @@
 
 
 from datetime import datetime, time, timezone
+from typing import Optional, Tuple
 
 from bitcoinetl.service.btc_block_timestamp_graph import BlockTimestampGraph
+from blockchainetl.service.block_timestamp_index import (
+    BlockTimestampIndex,
+    IndexedBlockTimestampGraph,
+)
 from blockchainetl.service.graph_operations import GraphOperations, OutOfBoundsError
 
 
 class BtcBlockRangeService(object):
-    def __init__(self, bitcoin_rpc):
+    def __init__(
+        self, bitcoin_rpc, timestamp_index: Optional[BlockTimestampIndex] = None
+    ):
         graph = BlockTimestampGraph(bitcoin_rpc)
         self._graph_operations = GraphOperations(graph)
 
+        # the blocks below the index's high-water mark are searched without RPC
+        self._timestamp_index = timestamp_index
+        self._indexed_graph_operations = None
+        if timestamp_index is not None:
+            self._indexed_graph_operations = GraphOperations(
+                IndexedBlockTimestampGraph(timestamp_index, first_block=0)
+            )
+
     def get_block_range_for_date(self, date, start_hour=0, end_hour=23):
         max_datetime = datetime(
             date.year, date.month, date.day, 23, 59, 59, tzinfo=timezone.utc
@@ -57,16 +72,12 @@ class BtcBlockRangeService(object):
             )
 
         try:
-            start_block_bounds = self._graph_operations.get_bounds_for_y_coordinate(
-                start_timestamp
-            )
+            start_block_bounds = self._get_bounds_for_timestamp(start_timestamp)
         except OutOfBoundsError:
             start_block_bounds = (0, 0)
 
         try:
-            end_block_bounds = self._graph_operations.get_bounds_for_y_coordinate(
-                end_timestamp
-            )
+            end_block_bounds = self._get_bounds_for_timestamp(end_timestamp)
         except OutOfBoundsError as e:
             raise OutOfBoundsError(
                 "The existing blocks do not completely cover the given time range"
@@ -82,3 +93,9 @@ class BtcBlockRangeService(object):
         end_block = end_block_bounds[0]
 
         return start_block, end_block
+
+    def _get_bounds_for_timestamp(self, timestamp: int) -> Tuple[int, int]:
+        index, operations = self._timestamp_index, self._indexed_graph_operations
+        if index is not None and operations is not None and index.covers(timestamp):
+            return operations.get_bounds_for_y_coordinate(timestamp)
+        return self._graph_operations.get_bounds_for_y_coordinate(timestamp)
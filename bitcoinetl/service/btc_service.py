@@ -21,6 +21,7 @@
 # SOFTWARE.
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, List, Iterable, Dict
 from blockchainetl.enumeration.chain import Chain
 from blockchainetl.utils import rpc_response_batch_to_results, dynamic_batch_iterator
@@ -41,11 +42,19 @@ from bitcoinetl.rpc.bitcoin_rpc import BitcoinRpc
 
 
 class BtcService(object):
-    def __init__(self, bitcoin_rpc: BitcoinRpc, chain=Chain.BITCOIN):
+    def __init__(
+        self,
+        bitcoin_rpc: BitcoinRpc,
+        chain=Chain.BITCOIN,
+        tx_batch_size=100,
+        max_workers=5,
+    ):
         self.bitcoin_rpc = bitcoin_rpc
         self.block_mapper = BtcBlockMapper()
         self.transaction_mapper = BtcTransactionMapper()
         self.chain = chain
+        self.tx_batch_size = tx_batch_size
+        self.max_workers = max_workers
 
     def get_block(
         self, block_number: int, with_transactions=False
@@ -132,37 +141,42 @@ class BtcService(object):
         return transactions
 
     def _fetch_transactions(self, blocks: List[BtcBlock]):
-        all_transaction_hashes = [block.transactions for block in blocks]
         flat_transaction_hashes = [
-            hash
-            for transaction_hashes in all_transaction_hashes
-            for hash in transaction_hashes
+            hash for block in blocks for hash in block.transactions
         ]
         raw_transactions = self._get_raw_transactions_by_hashes_batched(
             flat_transaction_hashes
         )
 
+        # index by txid in one pass, then rebuild each block in its own order,
+        # scanning the whole batch per block is quadratic on busy ranges
+        raw_transactions_by_hash = {tx.get("txid"): tx for tx in raw_transactions}
         for block in blocks:
             raw_block_transactions = [
-                tx for tx in raw_transactions if tx.get("txid") in block.transactions
+                raw_transactions_by_hash[hash]
+                for hash in block.transactions
+                if hash in raw_transactions_by_hash
             ]
             block.transactions = [
-                self.transaction_mapper.json_dict_to_transaction(tx, block)
-                for tx in raw_block_transactions
+                self.transaction_mapper.json_dict_to_transaction(tx, block, idx)
+                for idx, tx in enumerate(raw_block_transactions)
             ]
 
     def _get_raw_transactions_by_hashes_batched(
-        self, hashes: Optional[List[BtcTransaction]]
-    ):
+        self, hashes: Optional[List[str]]
+    ) -> List[Dict]:
         if hashes is None or len(hashes) == 0:
             return []
 
-        result = []
-        batch_size = 100
-        for batch in dynamic_batch_iterator(hashes, lambda: batch_size):
-            result.extend(self._get_raw_transactions_by_hashes(batch))
+        batches = list(dynamic_batch_iterator(hashes, lambda: self.tx_batch_size))
+        if len(batches) == 1 or self.max_workers <= 1:
+            results = map(self._get_raw_transactions_by_hashes, batches)
+            return [tx for result in results for tx in result]
 
-        return result
+        # executor.map keeps the batch order, so the result is in request order
+        with ThreadPoolExecutor(min(self.max_workers, len(batches))) as executor:
+            results = executor.map(self._get_raw_transactions_by_hashes, batches)
+            return [tx for result in results for tx in result]
 
     def _get_raw_transactions_by_hashes(
         self, hashes: Optional[List[str]]
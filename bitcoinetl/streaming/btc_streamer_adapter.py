@@ -23,10 +23,13 @@
 
 import logging
 from time import time
+from typing import Optional
 
 from blockchainetl.utils import time_elapsed
+from blockchainetl.metrics import StageTimer
 from blockchainetl.enumeration.chain import Chain
 from blockchainetl.enumeration.entity_type import EntityType
+from blockchainetl.service.block_timestamp_index import BlockTimestampIndex
 from bitcoinetl.rpc.bitcoin_rpc import BitcoinRpc
 from bitcoinetl.jobs.enrich_transactions_job import EnrichTransactionsJob
 from bitcoinetl.jobs.extract_traces_job import ExtractTracesJob
@@ -47,6 +50,7 @@ class BtcStreamerAdapter:
         max_workers=5,
         entity_types=tuple(EntityType.ALL_FOR_ETL),
         cache_path=None,
+        block_timestamp_index: Optional[BlockTimestampIndex] = None,
     ):
         self.bitcoin_rpc = bitcoin_rpc
         self.chain = chain
@@ -57,6 +61,8 @@ class BtcStreamerAdapter:
         self.entity_types = entity_types
         self.item_id_calculator = BtcItemIdCalculator()
         self.cache_path = cache_path
+        # feed the date/timestamp -> block range queries
+        self.block_timestamp_index = block_timestamp_index
 
     def open(self):
         self.item_exporter.open()
@@ -69,15 +75,21 @@ class BtcStreamerAdapter:
 
     def export_all(self, start_block: int, end_block: int):
         st0 = time()
+        timer = StageTimer()
         blocks, transactions = self._export_blocks(start_block, end_block)
+        timer.lap("blocks_and_transactions")
+        if self.block_timestamp_index is not None:
+            self.block_timestamp_index.add_blocks(blocks)
 
         st1 = time()
         if self.enable_enrich:
             transactions = self._enrich_transactions(transactions)
+            timer.lap("enrich_transactions")
 
         traces = []
         if self._should_export(EntityType.TRACE):
             traces = self._extract_traces(transactions)
+            timer.lap("traces")
 
         # keep empty if don't need to export
         if not self._should_export(EntityType.BLOCK):
@@ -91,12 +103,14 @@ class BtcStreamerAdapter:
         self.calculate_item_ids(all_items)
 
         self.item_exporter.export_items(all_items)
+        timer.lap("export")
         if len(all_items) > 1024:
             st3 = time()
             logging.info(
                 f"PERF export blocks=({start_block}, {end_block}) size={len(all_items)} "
                 f"total-elapsed={time_elapsed(st0, st3)} extract-elapsed={time_elapsed(st1, st2)} "
-                f"export-elapsed={time_elapsed(st2, st3)}"
+                f"export-elapsed={time_elapsed(st2, st3)} "
+                f"rpc-cache={self.bitcoin_rpc.cache_stats()}"
             )
 
     def _export_blocks(self, start_block: int, end_block: int):
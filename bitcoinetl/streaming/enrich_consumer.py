@@ -14,14 +14,15 @@ from blockchainetl.service.redis_stream_service import RED_UNIQUE_STREAM_SCRIPT
 
 SQL_TEMP = """
 SELECT
-    CONCAT(vout_cnt, '^', vout_type, '^', address, '^', value) AS _a
+    txhash AS pxhash, vout_idx, vout_cnt, vout_type, address, value
 FROM
     {tbl}
 WHERE
-    txhash = %(txhash)s
-    AND vout_idx = %(vout_idx)s
+    (txhash, vout_idx) IN ({keys})
 """
 
+PREVOUT_COLUMNS = ["vout_cnt", "vout_type", "address", "value"]
+
 
 class BitcoinTraceEnrichConsumer(object):
     def __init__(
@@ -33,11 +34,13 @@ class BitcoinTraceEnrichConsumer(object):
         src_result: str,
         dst_result: str,
         output_path: str,
+        chunk_size: int = 500,
     ):
         self._ti_engine = create_engine(ti_url)
         self._red = redis.from_url(redis_url)
         self._sha = self._red.script_load(RED_UNIQUE_STREAM_SCRIPT)
-        self._sql_temp = SQL_TEMP.format(tbl=ti_table)
+        self._ti_table = ti_table
+        self._chunk_size = chunk_size
         self._ct = BtcColumnType()
 
         self._dst_stream = dst_stream
@@ -45,20 +48,30 @@ class BitcoinTraceEnrichConsumer(object):
         self._dst_result = dst_result
         self._output_path = output_path
 
-    def fetch(self, row) -> str:
-        result = self._ti_engine.execute(
-            self._sql_temp,
-            txhash=row["pxhash"],
-            vout_idx=row["vout_idx"],
-        ).fetchone()
-
-        if result is None:
-            raise ValueError(
-                f"failed to read from tidb with blknum={row['blknum']} "
-                f"txhash={row['pxhash']} vout_idx={row['vout_idx']}"
-            )
-
-        return result[0]
+    def fetch(self, keys: pd.DataFrame) -> pd.DataFrame:
+        """Resolve the distinct (pxhash, vout_idx) pairs with chunked tuple `IN` queries"""
+        keys = keys.drop_duplicates()
+        rows = []
+        with self._ti_engine.connect() as conn:
+            for i in range(0, keys.shape[0], self._chunk_size):
+                chunk = keys.iloc[i : i + self._chunk_size]
+                params = {}
+                for j, (pxhash, vout_idx) in enumerate(chunk.itertuples(index=False)):
+                    params[f"h{j}"] = pxhash
+                    params[f"i{j}"] = int(vout_idx)
+                sql = SQL_TEMP.format(
+                    tbl=self._ti_table,
+                    keys=", ".join(
+                        f"(%(h{j})s, %(i{j})s)" for j in range(chunk.shape[0])
+                    ),
+                )
+                rows.extend(conn.execute(sql, **params).fetchall())
+
+        prevouts = pd.DataFrame(
+            [tuple(row) for row in rows],
+            columns=["pxhash", "vout_idx"] + PREVOUT_COLUMNS,
+        )
+        return prevouts.drop_duplicates(subset=["pxhash", "vout_idx"])
 
     def handler(self, inited, st: float, keyvals: Dict):
         inited = inited
@@ -93,25 +106,28 @@ class BitcoinTraceEnrichConsumer(object):
 
         st1 = time()
         if pxhash_len > 0:
-            df.loc[df["isin"] == True, "_out"] = df.loc[df["isin"] == True].apply(
-                self.fetch, axis=1
-            )
+            isin = df["isin"] == True
+            keys = df.loc[isin, ["pxhash", "vout_idx"]].astype({"vout_idx": int})
+            prevouts = self.fetch(keys)
 
             st2 = time()
-            df.loc[df["isin"] == True, "vout_cnt"] = df.loc[
-                df["isin"] == True, "_out"
-            ].apply(lambda xs: int(xs.split("^")[0]))
-            df.loc[df["isin"] == True, "vout_type"] = df.loc[
-                df["isin"] == True, "_out"
-            ].apply(lambda xs: xs.split("^")[1])
-            df.loc[df["isin"] == True, "address"] = df.loc[
-                df["isin"] == True, "_out"
-            ].apply(lambda xs: xs.split("^")[2])
-            df.loc[df["isin"] == True, "value"] = df.loc[
-                df["isin"] == True, "_out"
-            ].apply(lambda xs: int(xs.split("^")[3]))
-
-            df.drop(columns=["_out", "tx_in_value"], inplace=True)
+            # a left merge keeps the row order of the inputs
+            matched = keys.merge(prevouts, on=["pxhash", "vout_idx"], how="left")
+            matched.index = keys.index
+            missing = matched["vout_cnt"].isna()
+            if missing.any():
+                row = df.loc[missing[missing].index[0]]
+                raise ValueError(
+                    f"failed to read from tidb with blknum={row['blknum']} "
+                    f"txhash={row['pxhash']} vout_idx={row['vout_idx']}"
+                )
+
+            df.loc[isin, "vout_cnt"] = matched["vout_cnt"].astype(int)
+            df.loc[isin, "vout_type"] = matched["vout_type"]
+            df.loc[isin, "address"] = matched["address"]
+            df.loc[isin, "value"] = matched["value"].astype(int)
+
+            df.drop(columns=["tx_in_value"], inplace=True)
 
             logging.info(f"enrich {blknum} with file {file}")
 
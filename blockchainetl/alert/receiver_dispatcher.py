@@ -0,0 +1,210 @@
+import time
+import logging
+from queue import Queue, Empty, Full
+from threading import Lock, Thread
+from typing import Dict, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from .rule import Rule
+from .receivers import BaseReceiver
+
+RECEIVER_MESSAGES = Counter(
+    "blockchain_etl_alert_receiver_messages",
+    "Alert receiver messages, by status: sent, retried, failed or dropped",
+    ["receiver", "status"],
+)
+RECEIVER_LATENCY = Histogram(
+    "blockchain_etl_alert_receiver_latency_seconds",
+    "Seconds from the rule hit to its delivery",
+    ["receiver"],
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300),
+)
+RECEIVER_QUEUE_SIZE = Gauge(
+    "blockchain_etl_alert_receiver_queue_size",
+    "Rule hits waiting to be posted",
+    ["receiver"],
+)
+
+_CLOSE = object()
+
+
+class TokenBucket:
+    """Allow `rate` messages per second, with bursts of up to `burst` messages"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated_at) * self.rate
+                )
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def retry_after(e: Exception) -> Optional[float]:
+    # eg: slack responds 429 with Retry-After in seconds
+    response = getattr(e, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class ReceiverWorker(object):
+    """Post the rule hits of one receiver in a background thread"""
+
+    def __init__(
+        self,
+        name: str,
+        receiver: BaseReceiver,
+        queue_size: int = 1000,
+        batch_size: int = 20,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+    ):
+        self.name = name
+        self.receiver = receiver
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._queue: Queue = Queue(maxsize=queue_size)
+        self._bucket = None
+        if receiver.rate_limit is not None:
+            self._bucket = TokenBucket(*receiver.rate_limit)
+        self._thread = Thread(
+            target=self._run, name=f"alert-receiver-{name}", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def submit(self, rule: Rule, result: List[Dict]) -> bool:
+        try:
+            self._queue.put_nowait((time.time(), rule, result))
+        except Full:
+            RECEIVER_MESSAGES.labels(self.name, "dropped").inc()
+            logging.error(f"receiver {self.name} queue is full, drop {rule.id}")
+            return False
+        RECEIVER_QUEUE_SIZE.labels(self.name).set(self._queue.qsize())
+        return True
+
+    def close(self, timeout: Optional[float] = None):
+        if not self._thread.is_alive():
+            return
+        self._queue.put(_CLOSE)
+        self._thread.join(timeout)
+
+    def _next_batch(self) -> Tuple[List[Tuple[float, Rule, List[Dict]]], bool]:
+        # block for the first hit, then take what is already queued
+        hits, closed = [], False
+        item = self._queue.get()
+        while True:
+            if item is _CLOSE:
+                closed = True
+                break
+            hits.append(item)
+            if len(hits) >= self.batch_size:
+                break
+            try:
+                item = self._queue.get_nowait()
+            except Empty:
+                break
+        RECEIVER_QUEUE_SIZE.labels(self.name).set(self._queue.qsize())
+        return hits, closed
+
+    def _run(self):
+        closed = False
+        while not closed:
+            hits, closed = self._next_batch()
+            if len(hits) == 0:
+                continue
+            try:
+                messages = self.receiver.batch(
+                    [(rule, result) for _, rule, result in hits]
+                )
+            except Exception as e:
+                RECEIVER_MESSAGES.labels(self.name, "failed").inc(len(hits))
+                logging.exception(f"receiver {self.name} failed to build messages: {e}")
+                continue
+
+            delivered = True
+            for message in messages:
+                delivered = self._send(message) and delivered
+
+            if delivered:
+                now = time.time()
+                for st, _, _ in hits:
+                    RECEIVER_LATENCY.labels(self.name).observe(now - st)
+
+    def _send(self, message) -> bool:
+        for attempt in range(self.max_retries + 1):
+            if self._bucket is not None:
+                self._bucket.acquire()
+            try:
+                self.receiver.send(message)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    RECEIVER_MESSAGES.labels(self.name, "failed").inc()
+                    logging.error(
+                        f"receiver {self.name} failed after {attempt} retries: {e}"
+                    )
+                    return False
+
+                RECEIVER_MESSAGES.labels(self.name, "retried").inc()
+                wait = retry_after(e) or min(self.backoff * 2**attempt, 60)
+                logging.warning(f"receiver {self.name} failed: {e}, retry in {wait}s")
+                time.sleep(wait)
+            else:
+                RECEIVER_MESSAGES.labels(self.name, "sent").inc()
+                return True
+        return False
+
+
+class ReceiverDispatcher(object):
+    """Dispatch the rule hits to the receivers asynchronously, each receiver has
+    its own bounded queue and worker, so a slow webhook doesn't block the alert
+    detection nor the other receivers. The queued hits of one receiver are
+    coalesced into as few messages as the channel allows.
+    """
+
+    def __init__(
+        self,
+        receivers: Dict[str, BaseReceiver],
+        queue_size: int = 1000,
+        batch_size: int = 20,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+    ):
+        self._workers = {
+            name: ReceiverWorker(
+                name, receiver, queue_size, batch_size, max_retries, backoff
+            )
+            for name, receiver in receivers.items()
+        }
+
+    def open(self):
+        for worker in self._workers.values():
+            worker.start()
+
+    def post(self, receiver: str, rule: Rule, result: List[Dict]) -> bool:
+        return self._workers[receiver].submit(rule, result)
+
+    def close(self, timeout: Optional[float] = None):
+        # flush the queued hits before exiting
+        for worker in self._workers.values():
+            worker.close(timeout)
@@ -1,8 +1,11 @@
-from typing import List, Dict
+from typing import Any, List, Dict, Optional, Tuple
 from ..rule import Rule
 
 
 class BaseReceiver(object):
+    # the rate limit of the channel, (messages per second, burst), None if unlimited
+    rate_limit: Optional[Tuple[float, int]] = None
+
     def open(self):
         pass
 
@@ -10,5 +13,15 @@ class BaseReceiver(object):
         rule, result = rule, result
         raise NotImplementedError
 
+    def batch(self, results: List[Tuple[Rule, List[Dict]]]) -> List[Any]:
+        """Build the messages of many rule hits, one per rule by default,
+        the channels that allow can coalesce them into less messages
+        """
+        return results
+
+    def send(self, message: Any):
+        """Send one message built by batch, raise to retry"""
+        self.post(*message)
+
     def close(self):
         pass
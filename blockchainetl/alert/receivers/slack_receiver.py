@@ -1,11 +1,16 @@
+import logging
 import requests
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
 from . import BaseReceiver
 from ..rule import Rule
 
 
 class SlackReceiver(BaseReceiver):
+    # incoming webhooks allow 1 message per second, with short bursts
+    rate_limit = (1.0, 3)
+    MAX_ATTACHMENTS = 20
+
     def __init__(
         self,
         url: str,
@@ -21,11 +26,35 @@ class SlackReceiver(BaseReceiver):
         self._icon_url = icon_url
         super().__init__()
 
+    def open(self):
+        self._session = requests.Session()
+
     def post(
         self,
         rule: Rule,
         result: List[Dict],
     ):
+        # the synchronous path, log and go on, only the dispatcher retries
+        for payload in self.batch([(rule, result)]):
+            try:
+                self.send(payload)
+            except Exception as e:
+                logging.error(f"failed to push {rule.id} to slack: {e}")
+
+    def batch(self, results: List[Tuple[Rule, List[Dict]]]) -> List[Dict]:
+        # one attachment per rule, coalesced into one message
+        attachments = [self._attachment(rule, result) for rule, result in results]
+        return [
+            self._payload(attachments[i : i + self.MAX_ATTACHMENTS])
+            for i in range(0, len(attachments), self.MAX_ATTACHMENTS)
+        ]
+
+    def send(self, payload: Dict):
+        session = getattr(self, "_session", None) or requests
+        res = session.post(self._url, json=payload, timeout=30)
+        res.raise_for_status()
+
+    def _payload(self, attachments: List[Dict]) -> Dict:
         payload = dict()
         if self._username:
             payload["username"] = self._username
@@ -36,6 +65,10 @@ class SlackReceiver(BaseReceiver):
         if self._channel:
             payload["channel"] = self._channel
 
+        payload["attachments"] = attachments
+        return payload
+
+    def _attachment(self, rule: Rule, result: List[Dict]) -> Dict:
         pretext = f"Chain: `{rule.chain}` RuleID: `{rule.id}`"
 
         message = [f"Rule description: `{rule.description}`"]
@@ -47,13 +80,9 @@ class SlackReceiver(BaseReceiver):
             message.append(rule.output.format(item))
         msg = "\n".join(message)
 
-        payload["attachments"] = [
-            {
-                "color": "info",
-                "fields": [{"title": "Chain Alert", "value": msg, "short": False}],
-                "pretext": pretext,
-                "fallback": pretext,
-            }
-        ]
-
-        requests.post(self._url, json=payload)
+        return {
+            "color": "info",
+            "fields": [{"title": "Chain Alert", "value": msg, "short": False}],
+            "pretext": pretext,
+            "fallback": pretext,
+        }
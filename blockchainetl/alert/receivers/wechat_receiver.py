@@ -1,12 +1,17 @@
 import logging
 import requests
-from typing import List, Dict
+from typing import List, Dict, Tuple
 
 from . import BaseReceiver
 from ..rule import Rule
 
+# the content of markdown message is limited to 4096 bytes
+MAX_CONTENT_BYTES = 4096
+
 
 class WechatReceiver(BaseReceiver):
+    # the group robot allows 20 messages per minute
+    rate_limit = (20 / 60, 20)
 
     WECHAT_TITLE_COLORS = {
         "green": "info",
@@ -28,11 +33,60 @@ class WechatReceiver(BaseReceiver):
         logging.info(f"send notify to {webhook}?key={token}")
         super().__init__()
 
+    def open(self):
+        self._session = requests.Session()
+
     def post(
         self,
         rule: Rule,
         result: List[Dict],
     ):
+        # the synchronous path, log and go on, only the dispatcher retries
+        for payload in self.batch([(rule, result)]):
+            try:
+                self.send(payload)
+            except Exception as e:
+                logging.error(f"failed to push {rule.id} to wechat: {e}")
+
+    def batch(self, results: List[Tuple[Rule, List[Dict]]]) -> List[Dict]:
+        title = f"""
+# <font color="{self._color(self._title_color)}">{self._title}</font>
+"""
+        # coalesce the rules into as few messages as the content limit allows
+        contents, content = [], title
+        for rule, result in results:
+            section = self._section(rule, result)
+            if (
+                content != title
+                and len((content + section).encode()) > MAX_CONTENT_BYTES
+            ):
+                contents.append(content)
+                content = title
+            content += section
+        contents.append(content)
+
+        return [
+            {
+                "msgtype": "markdown",
+                "markdown": {"content": content},
+                "mentioned_list": [],
+            }
+            for content in contents
+        ]
+
+    def send(self, payload: Dict):
+        session = getattr(self, "_session", None) or requests
+        res = session.post(self._push_url(), json=payload, timeout=30)
+        if res.status_code // 100 != 2:
+            raise Exception(
+                f"failed to push payload: {payload} to wechat, status: {res.status_code}, text: {res.text}"
+            )
+        # eg: {"errcode":45009,"errmsg":"api freq out of limit"}
+        errcode = res.json().get("errcode", 0)
+        if errcode != 0:
+            raise Exception(f"failed to push payload to wechat, text: {res.text}")
+
+    def _section(self, rule: Rule, result: List[Dict]) -> str:
         message = [f"> chain: `{rule.chain}`"]
         for item in result:
             labels = [
@@ -42,26 +96,12 @@ class WechatReceiver(BaseReceiver):
             message.append(rule.output.format(item))
         body = "\n".join(message)
 
-        payload = {
-            "msgtype": "markdown",
-            "markdown": {
-                "content": f"""
-# <font color="{self._color(self._title_color)}">{self._title}</font>
-
+        return f"""
 ## Rule: `{rule.id}`
 ## Note: `{rule.description}`
 
 {body}
-""",
-            },
-            "mentioned_list": [],
-        }
-
-        res = requests.post(self._push_url(), json=payload)
-        if res.status_code // 100 != 2:
-            logging.error(
-                f"failed to push payload: {payload} to wechat, status: {res.status_code}, text: {res.text}\n"
-            )
+"""
 
     def _push_url(self):
         return f"{self._webhook}?key={self._token}"
@@ -37,13 +37,15 @@ class Rule(NamedTuple):
     @classmethod
     def load(cls, chain: str, provider: Optional[Dict], yaml_dict: Dict):
         context = rule_engine.Context(default_value=None)
-        rule = rule_engine.Rule(yaml_dict["where"], context=context)
+        rule = rule_engine.CompiledRule(yaml_dict["where"], context=context)
         output = RuleOutput(yaml_dict.get("output"))
         condition = None
         if "condition" in yaml_dict:
             if provider is None:
                 raise ValueError("condition is given but no provider")
-            condition = RuleCondition(condition, chain, provider.get("provider_uri"))
+            condition = RuleCondition(
+                yaml_dict["condition"], chain, provider.get("provider_uri")
+            )
 
         labels = RuleLabel(yaml_dict.get("labels", {}))
 
@@ -1,4 +1,5 @@
 from typing import Dict
+from functools import lru_cache
 from blockchainetl.thread_local_proxy import ThreadLocalProxy
 from blockchainetl.enumeration.chain import Chain
 
@@ -33,4 +34,10 @@ class RuleCondition(RuleOutput):
 
     def execute(self, s: Dict) -> bool:
         condition = self.format(s)
-        return eval(condition, self._builtins) is True
+        return eval(compile_condition(condition), self._builtins) is True
+
+
+@lru_cache(maxsize=10240)
+def compile_condition(condition: str):
+    # the rendered condition is usually repeated for the same address or token
+    return compile(condition, "<rule-condition>", "eval")
@@ -1,10 +1,18 @@
 from typing import Dict
-from .rule_output import RuleOutput
+from .rule_output import RuleOutput, obj_vars
 
 
 class RuleLabel(dict):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._outputs = {key: RuleOutput(val) for key, val in self.items()}
+
     def format(self, s: Dict) -> Dict:
         output = {}
+        kwargs = obj_vars(s)
         for key, val in self.items():
-            output[key] = RuleOutput(val).format(s)
+            if val is None:
+                output[key] = self._outputs[key].format(s)
+            else:
+                output[key] = self._outputs[key].fstr(**kwargs)
         return output
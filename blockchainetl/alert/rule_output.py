@@ -12,19 +12,45 @@ def EncodeDecimal(o):
 
 
 # ref https://stackoverflow.com/a/1305682/2298986
-# TODO: if attribute is not found, print useful messages
-class dict2obj(object):
+class lazyobj(object):
+    """Attribute view of a dict, the nested dicts(in lists too) are wrapped the
+    same way when they are accessed
+    """
+
+    __slots__ = ("_d",)
+
     def __init__(self, d: Dict):
-        for a, b in d.items():
-            if isinstance(b, (list, tuple)):
-                setattr(self, a, [dict2obj(x) if isinstance(x, dict) else x for x in b])
-            else:
-                setattr(self, a, dict2obj(b) if isinstance(b, dict) else b)
+        self._d = d
+
+    def __getattr__(self, name: str):
+        try:
+            return obj_value(self._d[name])
+        except KeyError:
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{name}'"
+            ) from None
+
+
+def obj_value(b):
+    if isinstance(b, (list, tuple)):
+        return [lazyobj(x) if isinstance(x, dict) else x for x in b]
+    return lazyobj(b) if isinstance(b, dict) else b
+
+
+def obj_vars(d: Dict) -> Dict:
+    # the attributes of the item, as the local variables of the output template
+    return {a: obj_value(b) for a, b in d.items()}
+
+
+def compile_fstr(template: str):
+    return compile(f"f'{template}'", "<rule-output>", "eval")
 
 
 class RuleOutput(object):
     def __init__(self, template: Optional[str] = None):
         self._template = template
+        # compile once, instead of parsing the f-string for every item
+        self._code = compile_fstr(template) if template is not None else None
 
     def __repr__(self):
         return self._template or "none"
@@ -33,8 +59,8 @@ class RuleOutput(object):
         if self._template is None:
             return json.dumps(s, default=EncodeDecimal)
 
-        return self.fstr(**dict2obj(s).__dict__)
+        return self.fstr(**obj_vars(s))
 
     def fstr(self, **kwargs):
         kwargs.update(ru.ALL)
-        return eval(f"f'{self._template}'", kwargs)
+        return eval(self._code, kwargs)
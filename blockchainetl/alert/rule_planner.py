@@ -0,0 +1,201 @@
+from collections import defaultdict
+from collections.abc import Mapping
+from decimal import Decimal
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+import rule_engine
+from rule_engine import ast
+from rule_engine.compiler import _ATTRIBUTE_NAMES
+from rule_engine.types import is_integer_number
+
+from .rule import Rule
+
+# a path step is ("attr", name, safe) or ("item", index, safe),
+# eg: tx.to_address -> (("attr", "tx", False), ("attr", "to_address", False))
+Step = Tuple[str, Hashable, bool]
+Path = Tuple[Step, ...]
+
+_UNRESOLVED = object()
+
+
+def _symbol_path(node) -> Optional[Path]:
+    """Convert a symbol/attribute/item access chain into a path, or None"""
+    if isinstance(node, ast.SymbolExpression):
+        if node.scope is not None or node.result_type != rule_engine.DataType.UNDEFINED:
+            return None
+        return (("attr", node.name, False),)
+
+    if isinstance(node, ast.GetAttributeExpression):
+        # typed attributes(eg: length) are computed, not looked up
+        if node.name in _ATTRIBUTE_NAMES:
+            return None
+        parent = _symbol_path(node.object)
+        if parent is None:
+            return None
+        return parent + (("attr", node.name, node.safe),)
+
+    if isinstance(node, ast.GetItemExpression):
+        if not isinstance(node.item, ast.FloatExpression):
+            return None
+        index = node.item.value
+        if not is_integer_number(index):
+            return None
+        parent = _symbol_path(node.container)
+        if parent is None:
+            return None
+        return parent + (("item", int(index), node.safe),)
+
+    return None
+
+
+def _literal_values(node) -> Optional[Set]:
+    if not isinstance(node, ast.LiteralExpressionBase) or not node.is_reduced:
+        return None
+    value = node.evaluate(None)
+    values = value if isinstance(value, (tuple, set)) else (value,)
+    for v in values:
+        if isinstance(v, bool) or not isinstance(v, (str, Decimal)):
+            return None
+        if isinstance(v, Decimal) and not v.is_finite():
+            return None
+    return set(values)
+
+
+def _extract_guard(node) -> Optional[Tuple[Path, Set]]:
+    """Return (path, values) if *node* can only be truthy when the value at path is
+    one of values, eg: `tx.to_address == '0x..'` or `log.topics[0] in [...]`
+    """
+    if type(node) is ast.ComparisonExpression:
+        if node.type != "eq":
+            return None
+        for lhs, rhs in ((node.left, node.right), (node.right, node.left)):
+            path, values = _symbol_path(lhs), _literal_values(rhs)
+            if path is not None and values is not None and len(values) == 1:
+                return path, values
+        return None
+
+    if isinstance(node, ast.ContainsExpression):
+        if not isinstance(node.container, (ast.ArrayExpression, ast.SetExpression)):
+            return None
+        path, values = _symbol_path(node.member), _literal_values(node.container)
+        if path is not None and values is not None:
+            return path, values
+        return None
+
+    # (a == x or a == y) is a guard if both sides guard the same path
+    if isinstance(node, ast.LogicExpression) and node.type == "or":
+        left, right = _extract_guard(node.left), _extract_guard(node.right)
+        if left is not None and right is not None and left[0] == right[0]:
+            return left[0], left[1] | right[1]
+
+    return None
+
+
+def _leftmost_conjunct(node):
+    # `a and b and c` is parsed as ((a and b) and c), `and` is short-circuit,
+    # so when `a` is false the others are never evaluated
+    while isinstance(node, ast.LogicExpression) and node.type == "and":
+        node = node.left
+    return node
+
+
+def extract_rule_guard(rule: Rule) -> Optional[Tuple[Path, Set]]:
+    """Extract the leading conjunctive guard of the rule's `where` expression.
+
+    Only the leftmost conjunct is used: skipping the items it rejects is the same as
+    evaluating them, because the rest of the expression is short-circuited.
+    """
+    if rule.rule is None:
+        return None
+    context = rule.rule.context
+    # missing attributes must resolve to null, as Rule.load does
+    if context.default_value is not None:
+        return None
+    if getattr(context, "_Context__resolver", None) is not rule_engine.resolve_item:
+        return None
+    return _extract_guard(_leftmost_conjunct(rule.rule.statement.expression))
+
+
+def resolve_path(item: Dict, path: Path):
+    """Resolve path on a raw item, returns _UNRESOLVED if the rule engine may behave
+    differently from a plain lookup(eg: raise an error) for this item
+    """
+    value = item
+    for kind, key, safe in path:
+        if value is None:
+            if safe:
+                return None
+            # attribute of null resolves to the default value(null)
+            if kind == "attr":
+                continue
+            return _UNRESOLVED
+
+        if kind == "attr":
+            if not isinstance(value, Mapping):
+                return _UNRESOLVED
+            value = value.get(key)
+        else:
+            if not isinstance(value, (list, tuple)) or not -len(value) <= key < len(
+                value
+            ):
+                return _UNRESOLVED
+            value = value[key]
+
+    # floats are coerced to Decimal by the rule engine, which may hash differently
+    if isinstance(value, float):
+        return _UNRESOLVED
+    try:
+        hash(value)
+    except TypeError:
+        return _UNRESOLVED
+    return value
+
+
+class RulePlanner:
+    """Index the rules of a rule set by their leading guards.
+
+    Each item is only evaluated against the rules whose guard it can satisfy,
+    found with one hash lookup per distinct guarded path, plus the rules without
+    an indexable guard.
+    """
+
+    def __init__(self, rules: Dict[str, Rule]):
+        index = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+        guarded = defaultdict(lambda: defaultdict(list))
+        self.unindexed: List[str] = []
+
+        for rule_id, rule in rules.items():
+            guard = extract_rule_guard(rule)
+            if guard is None:
+                self.unindexed.append(rule_id)
+                continue
+            path, values = guard
+            for value in values:
+                index[rule.scope][path][value].append(rule_id)
+            guarded[rule.scope][path].append(rule_id)
+
+        # scope -> path -> value -> [rule_id]
+        self.index: Dict[str, Dict[Path, Dict[Hashable, List[str]]]] = {
+            scope: {path: dict(values) for path, values in paths.items()}
+            for scope, paths in index.items()
+        }
+        # scope -> path -> [rule_id], rules to evaluate if the path is unresolved
+        self.guarded: Dict[str, Dict[Path, List[str]]] = {
+            scope: dict(paths) for scope, paths in guarded.items()
+        }
+
+    def indexed_rules(self, scope: str) -> List[str]:
+        return [
+            rule_id for rule_ids in self.guarded[scope].values() for rule_id in rule_ids
+        ]
+
+    def candidates(self, scope: str, item: Dict) -> List[str]:
+        """Return the guarded rules of scope that item may match"""
+        rule_ids = []
+        for path, values in self.index[scope].items():
+            value = resolve_path(item, path)
+            if value is _UNRESOLVED:
+                rule_ids.extend(self.guarded[scope][path])
+            else:
+                rule_ids.extend(values.get(value, ()))
+        return rule_ids
@@ -10,6 +10,7 @@ from rule_engine.errors import EvaluationError
 from jinja2 import Template
 
 from .rule import Rule
+from .rule_planner import RulePlanner
 from .receivers import BaseReceiver
 
 
@@ -41,6 +42,7 @@ def parse_jinja_rule(rule_file, rule_variable_dir):
 class RuleSet(NamedTuple):
     chain: str
     rules: Dict[str, Rule]
+    planner: Optional[RulePlanner] = None
 
     @classmethod
     def load(cls, chain: str, provider: Optional[Dict], rulesets: List[Dict]):
@@ -48,7 +50,7 @@ class RuleSet(NamedTuple):
         for yaml_dict in rulesets:
             rule = Rule.load(chain, provider, yaml_dict)
             rules[rule.id] = rule
-        return cls(chain, rules)
+        return cls(chain, rules, RulePlanner(rules))
 
     def execute(
         self,
@@ -56,12 +58,26 @@ class RuleSet(NamedTuple):
         items: Dict[str, List],
         max_workers: int = 10,
     ) -> Generator[Tuple[str, List[Dict]], None, None]:
+        if self.planner is None:
+            rule_ids, scopes = list(self.rules.keys()), []
+        else:
+            rule_ids, scopes = self.planner.unindexed, list(self.planner.guarded.keys())
+
         with executor(max_workers=max_workers) as exec:
             futures = {
-                exec.submit(rule.filter, items): rule.id for rule in self.rules.values()
+                exec.submit(self[rule_id].filter, items): rule_id
+                for rule_id in rule_ids
+            }
+            # the indexed rules are evaluated in one pass over the items of each scope
+            scope_futures = {
+                exec.submit(self.execute_scope, scope, items): scope for scope in scopes
             }
 
-            for future in as_completed(futures):
+            for future in as_completed([*futures, *scope_futures]):
+                if future in scope_futures:
+                    yield from future.result().items()
+                    continue
+
                 rule_id = futures[future]
                 try:
                     matched = list(future.result())
@@ -71,6 +87,33 @@ class RuleSet(NamedTuple):
 
                 yield (rule_id, matched)
 
+    def execute_scope(
+        self, scope: str, items: Dict[str, List]
+    ) -> Dict[str, Union[List[Dict], ValueError]]:
+        """Evaluate the items of scope only against the indexed rules whose guard
+        they may satisfy, same as calling filter of each indexed rule
+        """
+        results: Dict[str, Union[List[Dict], ValueError]] = {}
+        active = set()
+        for rule_id in self.planner.indexed_rules(scope):
+            rule = self[rule_id]
+            results[rule_id] = []
+            # if not enabled, or receiver is null, don't need to filter
+            if rule.enabled is not False and len(rule.receivers) > 0:
+                active.add(rule_id)
+
+        for item in items.get(scope) or []:
+            for rule_id in self.planner.candidates(scope, item):
+                if rule_id not in active:
+                    continue
+                try:
+                    if self[rule_id].rule.matches(item):
+                        results[rule_id].append(item)
+                except EvaluationError as e:
+                    results[rule_id] = ValueError(e)
+                    active.discard(rule_id)
+        return results
+
     def execute_rule(
         self, rule_id: str, items: Dict[str, List]
     ) -> Tuple[str, List[Dict]]:
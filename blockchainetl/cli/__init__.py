@@ -16,6 +16,7 @@ from blockchainetl.cli.easy_dump import easy_dump
 from blockchainetl.cli.dump_exporter import dump_exporter
 from blockchainetl.cli.extract_balance import extract_balance
 from blockchainetl.cli.export_balance import export_balance
+from blockchainetl.cli.block_timestamp_index import block_timestamp_index
 
 # extra tasks
 from blockchainetl.cli.enrich import enrich
@@ -33,6 +34,7 @@ from ethereumetl.cli.export_token_transfers import export_token_transfers
 from ethereumetl.cli.export_top_holders import export_top_holders
 
 # from ethereumetl.cli.export_nft_tokenids import export_nft_tokenids
+# from ethereumetl.cli.nft_tokenid_store import nft_tokenid_store
 # from ethereumetl.cli.export_nft_orderbooks import export_nft_orderbooks
 # from ethereumetl.cli.export_uncle_blocks import export_uncle_blocks
 from ethereumetl.cli.export_contracts import export_contracts
@@ -66,6 +68,7 @@ cli.add_command(easy_dump, "easy-dump")
 cli.add_command(dump_exporter, "dump-exporter")
 cli.add_command(extract_balance, "extract-balance")
 cli.add_command(export_balance, "export-balance")
+cli.add_command(block_timestamp_index, "block-timestamp-index")
 
 # GreenPlum tasks
 # cli.add_command(gp_autofix, "gp-autofix")
@@ -84,6 +87,7 @@ cli.add_command(export_token_holders, "eth.export-token-holder")
 cli.add_command(export_token_transfers, "eth.export-token-transfer")
 cli.add_command(export_top_holders, "eth.export-top-holder")
 # cli.add_command(export_nft_tokenids, "eth.export-nft-tokenid")
+# cli.add_command(nft_tokenid_store, "eth.nft-tokenid-store")
 # cli.add_command(export_nft_orderbooks, "eth.export-nft-orderbook")
 # cli.add_command(export_uncle_blocks, "eth.export-uncle-block")
 cli.add_command(get_block_range_for_date, "eth.block-range-for-date")
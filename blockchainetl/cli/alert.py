@@ -155,6 +155,14 @@ from ethereumetl.streaming.eth_streamer_adapter import EthStreamerAdapter
     envvar="BLOCKCHAIN_ETL_LABEL_SERVICE_URL",
     help="LabelService URL, used to fetch address labels",
 )
+@click.option(
+    "--async-receivers",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="Post to the receivers in background, with per receiver queues, "
+    "batching, rate limits and retries",
+)
 def alert(
     ctx,
     chain,
@@ -174,6 +182,7 @@ def alert(
     pid_file,
     token_cache_path,
     label_service_url,
+    async_receivers,
 ):
     """Alert the live stream with rules"""
     # rule udf hack.
@@ -214,6 +223,7 @@ def alert(
         rule_id=rule_id,
         token_service=token_service,
         price_service=price_service,
+        async_receivers=async_receivers,
     )
 
     if chain in Chain.ALL_ETHEREUM_FORKS:
@@ -258,6 +268,9 @@ def alert(
         block_batch_size=1,
         pid_file=pid_file,
     )
-    streamer.stream()
+    try:
+        streamer.stream()
+    finally:
+        price_service.close()
 
     RuleSets.close()
@@ -147,6 +147,14 @@ from blockchainetl.service.price_service import PriceService
     envvar="BLOCKCHAIN_ETL_LABEL_SERVICE_URL",
     help="LabelService URL, used to fetch address labels",
 )
+@click.option(
+    "--async-receivers",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    help="Post to the receivers in background, with per receiver queues, "
+    "batching, rate limits and retries",
+)
 def alert2(
     chain,
     last_synced_block_file,
@@ -165,6 +173,7 @@ def alert2(
     max_workers,
     pending_mode,
     label_service_url,
+    async_receivers,
 ):
     """Read items from PostgreSQL and alert with rules"""
     # rule udf hack.
@@ -214,6 +223,7 @@ def alert2(
         token_service=token_service,
         price_service=price_service,
         label_service=label_service,
+        async_receivers=async_receivers,
     )
 
     streamer_adapter = EthAlertAdapter(
@@ -238,6 +248,9 @@ def alert2(
         period_seconds=period_seconds,
         block_batch_size=1,
     )
-    streamer.stream()
+    try:
+        streamer.stream()
+    finally:
+        price_service.close()
 
     RuleSets.close()
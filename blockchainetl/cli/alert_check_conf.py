@@ -4,6 +4,7 @@ import logging
 from concurrent.futures import ThreadPoolExecutor
 
 import click
+import rule_engine
 
 from blockchainetl.alert import rule_udf
 from blockchainetl.alert.rule_set import RuleSets
@@ -23,6 +24,13 @@ class bcolors:
     UNDERLINE = "\033[4m"
 
 
+def _filter_or_error(filter, items):
+    try:
+        return list(filter(items))
+    except rule_engine.EngineError as e:
+        return type(e)
+
+
 @click.command(context_settings=dict(help_option_names=["-h", "--help"]))
 @evm_chain_options
 @click.option(
@@ -115,6 +123,30 @@ def alert_check_conf(
         bcolors.OKGREEN + "Rule rules.where check successfully." + bcolors.ENDC
     )
 
+    # the compiled rules must match exactly the same items as the AST interpreter
+    compile_errors = 0
+    for rid, rule in ruleset.rules.items():
+        if rule_id is not None and rid != rule_id:
+            continue
+        items = FULL_ITEMS.get(rule.scope, [])
+        compiled = _filter_or_error(rule.rule.filter, items)
+        # re-parsed from the source text, rule.rule is compiled already
+        interpreted_rule = rule_engine.Rule(rule.where, context=rule.rule.context)
+        interpreted = _filter_or_error(interpreted_rule.filter, items)
+        if compiled != interpreted:
+            compile_errors += 1
+            logging.error(
+                bcolors.FAIL
+                + f"Rule: {rid} compiled result differs from the interpreted one"
+                + bcolors.ENDC
+            )
+    if compile_errors == 0:
+        logging.info(
+            bcolors.OKGREEN
+            + "Rule rules.where compile check successfully."
+            + bcolors.ENDC
+        )
+
     single_items = {scope: FULL_ITEMS[scope][0] for scope in FULL_ITEMS}
     rule_errors = {}
     for rid, rule in ruleset.rules.items():
@@ -0,0 +1,163 @@
+import logging
+import time
+
+import click
+import pandas as pd
+from sqlalchemy import create_engine
+
+from blockchainetl.cli.utils import global_click_options, pick_random_provider_uri
+from blockchainetl.enumeration.chain import Chain
+from blockchainetl.service.block_timestamp_index import BlockTimestampIndex
+from blockchainetl.thread_local_proxy import ThreadLocalProxy
+from blockchainetl.utils import split_to_batches, time_elapsed
+from bitcoinetl.rpc.bitcoin_rpc import BitcoinRpc
+from bitcoinetl.service.btc_service import BtcService
+from ethereumetl.providers.auto import get_provider_from_uri
+from ethereumetl.streaming.eth_base_adapter import EthBaseAdapter
+
+READ_BLOCK_TIMESTAMPS_SQL = """
+SELECT
+    blknum AS number, _st AS timestamp
+FROM
+    {chain}.blocks
+WHERE
+    blknum >= {start_block} AND blknum <= {end_block}
+"""
+
+
+@click.command(context_settings=dict(help_option_names=["-h", "--help"]))
+@global_click_options
+@click.option(
+    "--block-timestamp-index-path",
+    required=True,
+    type=click.Path(exists=False, readable=True, dir_okay=False, writable=True),
+    envvar="BLOCKCHAIN_ETL_BLOCK_TIMESTAMP_INDEX_PATH",
+    help="The file of the per block timestamps",
+)
+@click.option(
+    "-s",
+    "--start-block",
+    default=0,
+    show_default=True,
+    type=int,
+    help="Start block, included",
+)
+@click.option(
+    "-e",
+    "--end-block",
+    default=None,
+    show_default=True,
+    type=int,
+    help="End block, included, default to the latest block",
+)
+@click.option(
+    "-p",
+    "--provider-uri",
+    type=str,
+    envvar="BLOCKCHAIN_ETL_PROVIDER_URI",
+    help="The URI of the JSON-RPC's provider, to read the blocks from",
+)
+@click.option(
+    "--source-db-url",
+    type=str,
+    envvar="BLOCKCHAIN_ETL_SOURCE_DB_URL",
+    help="The GreenPlum/PostgreSQL connection url, to read the blocks from "
+    "{chain}.blocks instead of the JSON-RPC",
+)
+@click.option(
+    "-b",
+    "--block-batch-size",
+    default=10000,
+    show_default=True,
+    type=int,
+    help="How many blocks to index in one batch",
+)
+@click.option(
+    "-B",
+    "--batch-size",
+    default=100,
+    show_default=True,
+    type=int,
+    help="How many blocks to request in one JSON-RPC batch",
+)
+@click.option(
+    "-w",
+    "--max-workers",
+    default=5,
+    show_default=True,
+    type=int,
+    help="The number of workers",
+)
+def block_timestamp_index(
+    chain,
+    block_timestamp_index_path,
+    start_block,
+    end_block,
+    provider_uri,
+    source_db_url,
+    block_batch_size,
+    batch_size,
+    max_workers,
+):
+    """Backfill the block timestamp index in bulk, from JSON-RPC or the database."""
+
+    if provider_uri is None and source_db_url is None:
+        raise click.BadParameter("-p/--provider-uri or --source-db-url is required")
+
+    index = BlockTimestampIndex(block_timestamp_index_path)
+
+    if source_db_url is not None:
+        engine = create_engine(source_db_url)
+        if end_block is None:
+            end_block = pd.read_sql(
+                f"SELECT MAX(blknum) AS blknum FROM {chain}.blocks", con=engine
+            )["blknum"][0]
+
+        def read_blocks(st: int, et: int):
+            sql = READ_BLOCK_TIMESTAMPS_SQL.format(
+                chain=chain, start_block=st, end_block=et
+            )
+            return pd.read_sql(sql, con=engine).to_dict("records")
+
+    elif chain in Chain.ALL_ETHEREUM_FORKS:
+        provider_uri = pick_random_provider_uri(provider_uri)
+        adapter = EthBaseAdapter(
+            chain,
+            ThreadLocalProxy(lambda: get_provider_from_uri(provider_uri, batch=True)),
+            batch_size=batch_size,
+            max_workers=max_workers,
+        )
+        if end_block is None:
+            end_block = adapter.web3.eth.block_number
+
+        def read_blocks(st: int, et: int):
+            return adapter.export_blocks(st, et)
+
+    elif chain in Chain.ALL_BITCOIN_FORKS:
+        provider_uri = pick_random_provider_uri(provider_uri)
+        bitcoin_rpc = BitcoinRpc(provider_uri)
+        btc_service = BtcService(bitcoin_rpc, chain)
+        if end_block is None:
+            end_block = bitcoin_rpc.getblockcount()
+
+        def read_blocks(st: int, et: int):
+            blocks = []
+            for s, e in split_to_batches(st, et, batch_size):
+                blocks.extend(
+                    {"number": b.number, "timestamp": b.timestamp}
+                    for b in btc_service.get_blocks(list(range(s, e + 1)))
+                )
+            return blocks
+
+    else:
+        raise click.BadParameter(f"--chain({chain}) is not supported")
+
+    st0 = time.time()
+    for st, et in split_to_batches(start_block, int(end_block), block_batch_size):
+        st1 = time.time()
+        index.add_blocks(read_blocks(st, et))
+        logging.info(
+            f"indexed block timestamps of {st, et} "
+            f"high-water-mark={index.high_water_mark} "
+            f"elapsed @batch={time_elapsed(st1)} @total={time_elapsed(st0)}"
+        )
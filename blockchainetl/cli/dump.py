@@ -20,9 +20,12 @@ from blockchainetl.jobs.exporters.file_item_exporter import FileItemExporter
 from bitcoinetl.rpc.bitcoin_rpc import BitcoinRpc
 from bitcoinetl.streaming.btc_streamer_adapter import BtcStreamerAdapter
 from blockchainetl.service.redis_stream_service import RedisStreamService
+from blockchainetl.service.block_timestamp_index import open_block_timestamp_index
 
 from ethereumetl.providers.auto import get_provider_from_uri
 from ethereumetl.streaming.eth_streamer_adapter import EthStreamerAdapter
+from ethereumetl.streaming.eth_block_ring import EthBlockRing
+from ethereumetl.streaming.eth_block_count_index import EthBlockCountIndex
 from ethereumetl.streaming.utils import build_erc20_token_reader
 
 
@@ -197,6 +200,43 @@ from ethereumetl.streaming.utils import build_erc20_token_reader
     show_default=True,
     help="The path to store token's attributes, used ONLY IN EVM chains",
 )
+@click.option(
+    "--block-ring-path",
+    type=click.Path(exists=False, readable=True, dir_okay=False, writable=True),
+    envvar="BLOCKCHAIN_ETL_BLOCK_RING_PATH",
+    help="The sqlite file of the exported block hashes, shared with the reorg watcher, "
+    "used ONLY IN EVM chains",
+)
+@click.option(
+    "--block-ring-size",
+    default=1024,
+    show_default=True,
+    type=int,
+    help="How many recent block hashes to keep in --block-ring-path",
+)
+@click.option(
+    "--block-count-index-path",
+    type=click.Path(exists=False, readable=True, dir_okay=False, writable=True),
+    envvar="BLOCKCHAIN_ETL_BLOCK_COUNT_INDEX_PATH",
+    help="The sqlite file of the per block tx/log counts, used by the gp_autofix "
+    "digest check, used ONLY IN EVM chains",
+)
+@click.option(
+    "--block-timestamp-index-path",
+    type=click.Path(exists=False, readable=True, dir_okay=False, writable=True),
+    envvar="BLOCKCHAIN_ETL_BLOCK_TIMESTAMP_INDEX_PATH",
+    help="The file of the per block timestamps, used by the date/timestamp to "
+    "block range queries",
+)
+@click.option(
+    "--rpc-memory-cache-size",
+    default=0,
+    show_default=True,
+    type=int,
+    envvar="BLOCKCHAIN_ETL_RPC_MEMORY_CACHE_SIZE",
+    help="How many getrawtransaction results to keep in memory for the prevout "
+    "lookups, 0 to disable, used ONLY IN Bitcoin chains",
+)
 def dump(
     ctx,
     chain,
@@ -222,6 +262,11 @@ def dump(
     target_db_url,
     print_sql,
     token_cache_path,
+    block_ring_path,
+    block_ring_size,
+    block_count_index_path,
+    block_timestamp_index_path,
+    rpc_memory_cache_size,
 ):
     """Dump all data from full-node's json-rpc to CSV file or PostgreSQL."""
 
@@ -254,6 +299,7 @@ def dump(
         )
         item_exporter = FileItemExporter(chain, output, redis_notify)
 
+    timestamp_index = open_block_timestamp_index(block_timestamp_index_path)
     if chain in Chain.ALL_ETHEREUM_FORKS:
         web3_provider = ThreadLocalProxy(
             lambda: get_provider_from_uri(provider_uri, batch=True)
@@ -283,16 +329,32 @@ def dump(
             enable_enrich=enable_enrich,
             token_cache_path=token_cache_path,
             trace_provider=trace_provider,
+            block_ring=(
+                EthBlockRing(block_ring_path, block_ring_size)
+                if block_ring_path is not None
+                else None
+            ),
+            block_count_index=(
+                EthBlockCountIndex(block_count_index_path)
+                if block_count_index_path is not None
+                else None
+            ),
+            block_timestamp_index=timestamp_index,
         )
     elif chain in Chain.ALL_BITCOIN_FORKS:
         streamer_adapter = BtcStreamerAdapter(
-            bitcoin_rpc=ThreadLocalProxy(lambda: BitcoinRpc(provider_uri)),
+            bitcoin_rpc=ThreadLocalProxy(
+                lambda: BitcoinRpc(
+                    provider_uri, memory_cache_size=rpc_memory_cache_size
+                )
+            ),
             item_exporter=item_exporter,
             chain=chain,
             enable_enrich=enable_enrich,
             batch_size=batch_size,
             max_workers=max_workers,
             entity_types=entity_types,
+            block_timestamp_index=timestamp_index,
         )
     else:
         raise NotImplementedError(
@@ -184,6 +184,15 @@ from ethereumetl.streaming.utils import build_erc20_token_reader
     show_default=True,
     help="Used as dicskcache,token's attributes for EVM, rawtransaction for Bitcoin",
 )
+@click.option(
+    "--rpc-memory-cache-size",
+    default=0,
+    show_default=True,
+    type=int,
+    envvar="BLOCKCHAIN_ETL_RPC_MEMORY_CACHE_SIZE",
+    help="How many getrawtransaction results to keep in memory for the prevout "
+    "lookups, 0 to disable, used ONLY IN Bitcoin chains",
+)
 def dump2(
     ctx,
     chain,
@@ -207,6 +216,7 @@ def dump2(
     target_db_workers,
     print_sql,
     cache_path,
+    rpc_memory_cache_size,
 ):
     """Dump all data from full-node's json-rpc to PostgreSQL(TimescaleDB)."""
 
@@ -271,7 +281,11 @@ def dump2(
     elif chain_type == "utxo":
         streamer_adapter = BtcStreamerAdapter(
             bitcoin_rpc=ThreadLocalProxy(
-                lambda: BitcoinRpc(provider_uri, cache_path=cache_path)
+                lambda: BitcoinRpc(
+                    provider_uri,
+                    cache_path=cache_path,
+                    memory_cache_size=rpc_memory_cache_size,
+                )
             ),
             item_exporter=item_exporter,
             chain=chain,
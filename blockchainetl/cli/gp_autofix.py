@@ -1,10 +1,8 @@
 import logging
 import click
 import pandas as pd
-from time import time
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Union
 from datetime import datetime, timedelta
-from blockchainetl.utils import time_elapsed
 from blockchainetl.cli.utils import (
     global_click_options,
     extract_cmdline_kwargs,
@@ -16,7 +14,9 @@ from blockchainetl.enumeration.entity_type import EntityType
 from blockchainetl.streaming.streamer import Streamer
 from ethereumetl.providers.auto import get_provider_from_uri, new_web3_provider
 from ethereumetl.service.eth_service import EthService
+from blockchainetl.service.block_timestamp_index import open_block_timestamp_index
 from ethereumetl.streaming.eth_check_autofix_adapter import EthCheckAutofixAdapter
+from ethereumetl.streaming.eth_block_count_index import EthBlockCountIndex
 from ethereumetl.jobs.checkers import Checker
 from ethereumetl.jobs.checkers.block_checker import EthBlockChecker
 from ethereumetl.jobs.checkers.transaction_checker import EthTransactionChecker
@@ -25,6 +25,8 @@ from ethereumetl.jobs.checkers.tx_receipt_checker import EthTxReceiptChecker
 from ethereumetl.jobs.checkers.trace_checker import EthTraceChecker
 from ethereumetl.jobs.checkers.token_transfer_checker import EthTokenTransferChecker
 from ethereumetl.jobs.checkers.erc721_transfer_checker import EthErc721TransferChecker
+from ethereumetl.jobs.checkers.digest_checker import DigestChecker, DIGEST_SPECS
+from ethereumetl.jobs.checkers.scheduler import AutofixPool, CheckScheduler
 
 CHECKERS = [
     EntityType.BLOCK,
@@ -193,6 +195,65 @@ CHECKER_CTORS: Dict[str, "Checker"] = {
     show_default=True,
     help="Print SQL or not",
 )
+@click.option(
+    "--block-count-index-path",
+    type=click.Path(exists=False, readable=True, dir_okay=False, writable=True),
+    envvar="BLOCKCHAIN_ETL_BLOCK_COUNT_INDEX_PATH",
+    help="The sqlite file of the expected per block tx/log counts, fed by the dump streamer, "
+    f"if specified, {','.join(DIGEST_SPECS)} are checked by bisecting range digests",
+)
+@click.option(
+    "--block-timestamp-index-path",
+    type=click.Path(exists=True, readable=True, dir_okay=False),
+    envvar="BLOCKCHAIN_ETL_BLOCK_TIMESTAMP_INDEX_PATH",
+    help="The file of the per block timestamps written by dump, "
+    "the blocks past it are searched by RPC",
+)
+@click.option(
+    "--digest-fanout",
+    default=16,
+    show_default=True,
+    type=int,
+    help="How many sub ranges to split a faulty range into in digest check",
+)
+@click.option(
+    "--autofix-workers",
+    default=1,
+    show_default=True,
+    type=int,
+    help="The number of parallel workers to re-ETL the faulty blocks",
+)
+@click.option(
+    "--concurrency",
+    default=1,
+    show_default=True,
+    type=int,
+    help="How many days to check and autofix concurrently, "
+    "the entity types of a day are checked concurrently, and checked again "
+    "after their parents are fixed",
+)
+@click.option(
+    "--db-concurrency",
+    default=2,
+    show_default=True,
+    type=int,
+    help="The max number of concurrent check queries",
+)
+@click.option(
+    "--load-concurrency",
+    default=1,
+    show_default=True,
+    type=int,
+    help="The max number of concurrent loads of the re-ETLed blocks",
+)
+@click.option(
+    "--checkpoint-file",
+    default=None,
+    show_default=True,
+    type=str,
+    help="The file to record the finished checks, rerun with it to resume, "
+    "(NOT used in stream mode)",
+)
 def gp_autofix(
     ctx,
     chain,
@@ -215,6 +276,14 @@ def gp_autofix(
     start_block,
     end_block,
     print_sql,
+    block_count_index_path,
+    block_timestamp_index_path,
+    digest_fanout,
+    autofix_workers,
+    concurrency,
+    db_concurrency,
+    load_concurrency,
+    checkpoint_file,
 ):
     """Run data consistency check and autofix in PostgreSQL/GreenPlum"""
 
@@ -229,35 +298,41 @@ def gp_autofix(
     kwargs = extract_cmdline_kwargs(ctx)
     is_geth_provider = str2bool(kwargs.get("provider_is_geth"))
     gp_schema = gp_schema or chain
-    checkers: List[Tuple[str, Checker]] = [
-        (
-            c,
-            CHECKER_CTORS[c](
-                chain,
-                provider_uri,
-                output,
-                db_rw_url,
-                db_ro_url,
-                gp_schema,
-                is_geth_provider,
-                batch_size,
-                max_workers,
-                by,
-                stream,
-                print_sql,
-                check_transaction_consistency=str2bool(
-                    kwargs.get("check_transaction_consistency")
-                ),
-                ignore_receipt_missing_error=str2bool(
-                    kwargs.get("ignore_receipt_missing_error")
-                ),
+    count_index = None
+    if block_count_index_path is not None:
+        count_index = EthBlockCountIndex(block_count_index_path)
+
+    def new_checker(c: str) -> Union[Checker, DigestChecker]:
+        checker = CHECKER_CTORS[c](
+            chain,
+            provider_uri,
+            output,
+            db_rw_url,
+            db_ro_url,
+            gp_schema,
+            is_geth_provider,
+            batch_size,
+            max_workers,
+            by,
+            stream,
+            print_sql,
+            check_transaction_consistency=str2bool(
+                kwargs.get("check_transaction_consistency")
+            ),
+            ignore_receipt_missing_error=str2bool(
+                kwargs.get("ignore_receipt_missing_error")
             ),
         )
-        for c in CHECKERS
-        if c in checker
-    ]
+        if count_index is not None and c in DIGEST_SPECS:
+            return DigestChecker(
+                checker, c, count_index, digest_fanout, autofix_workers
+            )
+        return checker
 
     if stream is True:
+        checkers: List[Tuple[str, Union[Checker, DigestChecker]]] = [
+            (c, new_checker(c)) for c in CHECKERS if c in checker
+        ]
         streamer_adapter = EthCheckAutofixAdapter(
             chain,
             checkers=checkers,
@@ -267,6 +342,7 @@ def gp_autofix(
             batch_size=batch_size,
             max_workers=max_workers,
             dryrun=dryrun,
+            block_count_index=count_index,
         )
         streamer = Streamer(
             blockchain_streamer_adapter=streamer_adapter,
@@ -283,25 +359,46 @@ def gp_autofix(
         logging.info(f"Run check in date-range: [{start_date}, {end_date})")
 
         web3 = new_web3_provider(provider_uri, chain)
-        eth_service = EthService(web3)
-
-        for day in list(pd.date_range(start_date, end_date, inclusive="left")):
-            st_day = day.date().strftime("%Y-%m-%d")
-            st_blk, et_blk = eth_service.get_block_range_for_date(day.date())
-            logging.info(f"block range on {st_day} is {st_blk, et_blk}")
-            st = int(day.timestamp())
-            et = st + 86400 - 1
+        eth_service = EthService(
+            web3, open_block_timestamp_index(block_timestamp_index_path)
+        )
 
-            for name, checker in checkers:
-                st0 = time()
-                success = checker.check(st_day, st_day, st, et, st_blk, et_blk)
-                st1 = time()
-                fixed = None
-                if not success and not dryrun:
-                    fixed = checker.autofix(
-                        st_day, st_day, st_blk=st_blk, et_blk=et_blk
-                    )
-                logging.info(
-                    f"check {name}@{st_day} need-autofix: {not success} "
-                    f"fixed: {fixed} (elapsed: {time_elapsed(st0, st1)}s, {time_elapsed(st1)}s)"
-                )
+        autofix_pool = None
+        if not dryrun:
+            autofix_pool = AutofixPool(
+                chain,
+                provider_uri,
+                output,
+                db_rw_url,
+                is_geth_provider=is_geth_provider,
+                batch_size=batch_size,
+                max_workers=max_workers,
+                workers=autofix_workers,
+                load_concurrency=load_concurrency,
+                check_transaction_consistency=str2bool(
+                    kwargs.get("check_transaction_consistency")
+                ),
+                ignore_receipt_missing_error=str2bool(
+                    kwargs.get("ignore_receipt_missing_error")
+                ),
+            )
+        scheduler = CheckScheduler(
+            new_checker,
+            [c for c in CHECKERS if c in checker],
+            eth_service.get_block_range_for_date,
+            autofix_pool,
+            concurrency=concurrency,
+            db_concurrency=db_concurrency,
+            checkpoint_file=checkpoint_file,
+            dryrun=dryrun,
+        )
+        try:
+            scheduler.run(
+                [
+                    day.date()
+                    for day in pd.date_range(start_date, end_date, inclusive="left")
+                ]
+            )
+        finally:
+            if autofix_pool is not None:
+                autofix_pool.close()
@@ -17,6 +17,7 @@ from psycopg2.extensions import connection
 
 
 from blockchainetl.utils import time_elapsed
+from blockchainetl.metrics import EXPORTER_SECONDS, EXPORTED_ITEMS
 from blockchainetl.cli.utils import (
     global_click_options,
     extract_cmdline_kwargs,
@@ -217,14 +218,16 @@ class Loader:
 
             self.check_and_autofix_block(entity_type, int(blk), file)
 
-            rowcount = save_file_into_table(
-                conn,
-                table,
-                entity_type,
-                file,
-                self.ct,
-                ignore_error=self.ignore_postgres_copy_error,
-            )
+            with EXPORTER_SECONDS.labels("psycopg", entity_type, "copy").time():
+                rowcount = save_file_into_table(
+                    conn,
+                    table,
+                    entity_type,
+                    file,
+                    self.ct,
+                    ignore_error=self.ignore_postgres_copy_error,
+                )
+            EXPORTED_ITEMS.labels("psycopg", entity_type).inc(max(rowcount, 0))
             logging.info(
                 f"handle save table={table} #row={rowcount} file={file} elapsed={time_elapsed(st)}"
             )
@@ -16,6 +16,7 @@ from blockchainetl.jobs.exporters.item_exporter_builder import create_tsdb_expor
 
 from ethereumetl.providers.auto import get_provider_from_uri
 from ethereumetl.streaming.eth_reorg_adapter import EthReorgAdapter
+from ethereumetl.streaming.eth_block_ring import EthBlockRing
 from ethereumetl.streaming.utils import build_erc20_token_reader
 
 
@@ -144,6 +145,20 @@ from ethereumetl.streaming.utils import build_erc20_token_reader
     show_default=True,
     help="Used as dicskcache,token's attributes for EVM, rawtransaction for Bitcoin",
 )
+@click.option(
+    "--block-ring-path",
+    type=click.Path(exists=False, readable=True, dir_okay=False, writable=True),
+    envvar="BLOCKCHAIN_ETL_BLOCK_RING_PATH",
+    help="The sqlite file of the exported block hashes, fed by the dump streamer, "
+    "if specified, only the new headers are checked against it",
+)
+@click.option(
+    "--block-ring-size",
+    default=1024,
+    show_default=True,
+    type=int,
+    help="How many recent block hashes to keep in --block-ring-path",
+)
 @click.option(
     "--dryrun",
     is_flag=True,
@@ -169,6 +184,8 @@ def reorg(
     target_db_workers,
     print_sql,
     cache_path,
+    block_ring_path,
+    block_ring_size,
     dryrun,
 ):
     """Check and apply ChainReorg data from PostgreSQL(TimescaleDB) with json-rpc block hash diff"""
@@ -222,6 +239,11 @@ def reorg(
         ),
         enable_enrich=enable_enrich,
         token_cache_path=cache_path,
+        block_ring=(
+            EthBlockRing(block_ring_path, block_ring_size)
+            if block_ring_path is not None
+            else None
+        ),
     )
 
     if dryrun is True:
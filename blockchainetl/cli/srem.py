@@ -10,6 +10,7 @@ from blockchainetl.enumeration.entity_type import EntityType, parse_entity_types
 from datetime import datetime, timedelta
 from ethereumetl.providers.auto import new_web3_provider
 from ethereumetl.service.eth_service import EthService
+from blockchainetl.service.block_timestamp_index import open_block_timestamp_index
 from blockchainetl.service.redis_stream_service import fmt_redis_key_name
 
 BATCH = 10000
@@ -94,6 +95,13 @@ def srem_entity(chain, redis_url, min_blknum, max_blknum, prefixes, entity_type)
     type=str,
     help="The URI of the web3 provider e.g. ",
 )
+@click.option(
+    "--block-timestamp-index-path",
+    type=click.Path(exists=True, readable=True, dir_okay=False),
+    envvar="BLOCKCHAIN_ETL_BLOCK_TIMESTAMP_INDEX_PATH",
+    help="The file of the per block timestamps written by dump, "
+    "the blocks past it are searched by RPC",
+)
 def srem(
     chain,
     entity_types,
@@ -104,6 +112,7 @@ def srem(
     start_date,
     end_date,
     provider_uri,
+    block_timestamp_index_path,
 ):
     """Evict old data stored in Redis SSET"""
     entity_types = parse_entity_types(entity_types)
@@ -112,7 +121,9 @@ def srem(
         min_block, max_block = start_block, end_block
     else:
         web3 = new_web3_provider(provider_uri, chain)
-        eth_service = EthService(web3)
+        eth_service = EthService(
+            web3, open_block_timestamp_index(block_timestamp_index_path)
+        )
         try:
             min_block, _ = eth_service.get_block_range_for_date(start_date)
         except Exception:
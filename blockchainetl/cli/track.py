@@ -100,6 +100,14 @@ from ethereumetl.service.eth_token_service import EthTokenService
     envvar="BLOCKCHAIN_ETL_TRACK_DB_SCHEMA",
     help="The track db schema",
 )
+@click.option(
+    "--track-db-reconcile-interval",
+    type=int,
+    default=None,
+    show_default=True,
+    envvar="BLOCKCHAIN_ETL_TRACK_DB_RECONCILE_INTERVAL",
+    help="Reload the in-memory tracking index from track db every N seconds",
+)
 @click.option(
     "-F",
     "--track-bootstrap-file",
@@ -172,6 +180,7 @@ def track(
     entity_types,
     track_db_url,
     track_db_schema,
+    track_db_reconcile_interval,
     track_bootstrap_file,
     track_oracle_url,
     period_seconds,
@@ -201,7 +210,7 @@ def track(
     TrackSets.open()
     if track_db_schema is None:
         track_db_schema = chain
-    track_db = TrackDB(track_db_url, track_db_schema)
+    track_db = TrackDB(track_db_url, track_db_schema, track_db_reconcile_interval)
     track_set = TrackSets()[chain]
     labeler = LabelService(track_oracle_url, "addr_labels", chain)
     profiler = None
@@ -94,6 +94,14 @@ from ethereumetl.streaming.eth_alert_adapter import EthAlertAdapter
     envvar="BLOCKCHAIN_ETL_TRACK_DB_SCHEMA",
     help="The track db schema",
 )
+@click.option(
+    "--track-db-reconcile-interval",
+    type=int,
+    default=None,
+    show_default=True,
+    envvar="BLOCKCHAIN_ETL_TRACK_DB_RECONCILE_INTERVAL",
+    help="Reload the in-memory tracking index from track db every N seconds",
+)
 @click.option(
     "-F",
     "--track-bootstrap-file",
@@ -177,6 +185,7 @@ def track2(
     data_db_url,
     track_db_url,
     track_db_schema,
+    track_db_reconcile_interval,
     track_bootstrap_file,
     track_oracle_url,
     period_seconds,
@@ -204,7 +213,7 @@ def track2(
     TrackSets.open()
     if track_db_schema is None:
         track_db_schema = chain
-    track_db = TrackDB(track_db_url, track_db_schema)
+    track_db = TrackDB(track_db_url, track_db_schema, track_db_reconcile_interval)
     track_set = TrackSets()[chain]
     labeler = LabelService(track_oracle_url, "addr_labels", chain)
     profiler = None
@@ -269,7 +278,11 @@ def track2(
         period_seconds=period_seconds,
         block_batch_size=1,
     )
-    streamer.stream()
+    try:
+        streamer.stream()
+    finally:
+        if price_service is not None:
+            price_service.close()
 
     TrackSets.close()
 
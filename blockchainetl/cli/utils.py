@@ -4,6 +4,32 @@ import functools
 from typing import Optional, Dict
 
 from blockchainetl.enumeration.chain import Chain
+from blockchainetl.metrics import start_metrics_server
+
+
+def metrics_click_options(func):
+    @click.option(
+        "--metrics-port",
+        default=None,
+        show_default=True,
+        type=int,
+        envvar="BLOCKCHAIN_ETL_METRICS_PORT",
+        help="Serve the Prometheus metrics on this port, disabled if not set",
+    )
+    @click.option(
+        "--metrics-address",
+        default="0.0.0.0",
+        show_default=True,
+        type=str,
+        envvar="BLOCKCHAIN_ETL_METRICS_ADDRESS",
+        help="The metrics server listen address",
+    )
+    @functools.wraps(func)
+    def wrapper(*args, metrics_port=None, metrics_address="0.0.0.0", **kwargs):
+        start_metrics_server(metrics_port, metrics_address)
+        return func(*args, **kwargs)
+
+    return wrapper
 
 
 # register global options
@@ -16,6 +42,7 @@ def global_click_options(func):
         type=click.Choice(Chain.ALL_FOR_ETL),
         help="The chain network to connect to.",
     )
+    @metrics_click_options
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         return func(*args, **kwargs)
@@ -32,6 +59,7 @@ def evm_chain_options(func):
         type=click.Choice(Chain.ALL_ETHEREUM_FORKS),
         help="The chain network to connect to.",
     )
+    @metrics_click_options
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         return func(*args, **kwargs)
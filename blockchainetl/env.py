@@ -44,3 +44,10 @@ SKIP_STREAM_IF_FAILED = os.getenv("BLOCKCHAIN_ETL_SKIP_STREAM_IF_FAILED") == "1"
 SKIP_STREAM_SAVE_PATH = os.getenv("BLOCKCHAIN_ETL_SKIP_STREAM_SAVE_PATH")
 
 SUPPORT_BLOCK_RECEIPTS = os.getenv("BLOCKCHAIN_ETL_SUPPORT_BLOCK_RECEIPTS") == "1"
+
+# persist the function sighashes of the contract bytecodes(memoized by hash)
+CONTRACT_CODE_CACHE_PATH = os.getenv("BLOCKCHAIN_ETL_CONTRACT_CODE_CACHE_PATH")
+
+# skip the eth_getLogs of the blocks whose logsBloom can't match the filter,
+# disable it for the chains which don't fill the logsBloom correctly
+DISABLE_LOGS_BLOOM = os.getenv("BLOCKCHAIN_ETL_DISABLE_LOGS_BLOOM") == "1"
@@ -26,6 +26,7 @@ from json import JSONDecodeError
 from requests.exceptions import Timeout as RequestsTimeout, HTTPError, TooManyRedirects
 from web3._utils.threads import Timeout as Web3Timeout
 
+from blockchainetl.metrics import RPC_RETRIES
 from blockchainetl.executors.bounded_executor import BoundedExecutor
 from blockchainetl.executors.fail_safe_executor import FailSafeExecutor
 from blockchainetl.misc.retriable_value_error import RetriableValueError
@@ -75,6 +76,7 @@ class BatchWorkExecutor:
             self._try_increase_batch_size(len(batch))
         except self.retry_exceptions:
             self.logger.exception("An exception occurred while executing work_handler.")
+            RPC_RETRIES.labels(kind="split").inc()
             self._try_decrease_batch_size(len(batch))
             self.logger.info(
                 "The batch of size {} will be retried one item at a time.".format(
@@ -129,6 +131,7 @@ def execute_with_retries(
                     i
                 )
             )
+            RPC_RETRIES.labels(kind="item").inc()
             if i < max_retries - 1:
                 logging.info(
                     "The request will be retried after {} seconds. Retry #{}".format(
@@ -7,6 +7,7 @@ from typing import Dict, List, Optional
 import pypeln as pl
 
 from blockchainetl.alert.receivers import BaseReceiver
+from blockchainetl.alert.receiver_dispatcher import ReceiverDispatcher
 from blockchainetl.alert.rule_set import RuleSet
 from blockchainetl.enumeration.chain import Chain
 from blockchainetl.enumeration.entity_type import EntityType
@@ -28,6 +29,7 @@ class AlertExporter:
         token_service: Optional[TokenService] = None,
         price_service: Optional[PriceService] = None,
         label_service: Optional[LabelService] = None,
+        async_receivers: bool = False,
     ):
         self._chain = chain
         self._receivers = receivers
@@ -41,9 +43,14 @@ class AlertExporter:
         self._token_service = token_service
         self._price_service = price_service
         self._label_service = label_service
+        # post to the receivers in background, don't wait for the webhooks
+        self._dispatcher = None
+        if async_receivers:
+            self._dispatcher = ReceiverDispatcher(receivers)
 
     def open(self):
-        pass
+        if self._dispatcher is not None:
+            self._dispatcher.open()
 
     def remap_entity_type(self, entity_type: str) -> str:
         return {
@@ -123,15 +130,56 @@ class AlertExporter:
             if len(result) == 0:
                 continue
 
-            # TODO: in async and safe mode
             rule = self._ruleset[rule_id]
             for rec, receiver in self._receivers.items():
-                if rec in rule.receivers:
+                if rec not in rule.receivers:
+                    continue
+                if self._dispatcher is not None:
+                    self._dispatcher.post(rec, rule, result)
+                else:
                     receiver.post(rule, result)
 
     def enrich_items(self, items: List[Dict]):
+        self.prefetch(items)
         pl.thread.each(self.enrich_item, items, workers=10, run=True)
 
+    def prefetch(self, items: List[Dict]):
+        """Resolve the labels, tokens and prices of all the items in one batch, so
+        that enrich_item reads them from the shared service cache
+        """
+        lb = self._label_service
+        ps = self._price_service
+        ts = self._token_service
+
+        addresses = set()
+        erc20s = set()
+        tokens: Dict[Optional[int], set] = {}
+        for item in items:
+            typo = item["type"]
+            if typo not in ("tx", "token_xfer", "trace"):
+                continue
+            addresses.add(item.get("from_address"))
+            addresses.add(item.get("to_address"))
+
+            if typo == "token_xfer" and ts is None:
+                continue
+            if (
+                typo == "token_xfer"
+                and item.get("name") is None
+                and item.get("decimals") is None
+            ):
+                erc20s.add(item["token_address"])
+            token_address = item.get("token_address") if typo == "token_xfer" else None
+            tokens.setdefault(item.get("block_timestamp"), set()).add(token_address)
+
+        if lb is not None:
+            lb.labels_of(addresses)
+        if ts is not None and len(erc20s) > 0:
+            ts.get_tokens(erc20s)
+        if ps is not None:
+            for timestamp, token_addresses in tokens.items():
+                ps.get_prices(self._chain, token_addresses, time=timestamp)
+
     def enrich_item(self, item: Dict):
         ts = self._token_service
         ps = self._price_service
@@ -185,4 +233,5 @@ class AlertExporter:
             item["value_usd"] = item["value_amount"] * price if price else None
 
     def close(self):
-        pass
+        if self._dispatcher is not None:
+            self._dispatcher.close()
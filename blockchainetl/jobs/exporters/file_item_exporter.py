@@ -12,6 +12,7 @@ from blockchainetl.enumeration.entity_type import EntityType
 from blockchainetl.enumeration.column_type import ColumnType
 from blockchainetl.misc.pd_write_file import save_df_into_file
 from blockchainetl.utils import time_elapsed
+from blockchainetl.metrics import EXPORTER_SECONDS, EXPORTED_ITEMS
 from bitcoinetl.enumeration.column_type import ColumnType as BtcColumnType
 from ethereumetl.enumeration.column_type import ColumnType as EthColumnType
 
@@ -131,6 +132,9 @@ class FileItemExporter:
         )
 
         st2 = time()
+        EXPORTER_SECONDS.labels("file", entity_type, "to_df").observe(st1 - st0)
+        EXPORTER_SECONDS.labels("file", entity_type, "to_file").observe(st2 - st1)
+        EXPORTED_ITEMS.labels("file", entity_type).inc(len(df))
         if len(df) > 1024:
             logging.info(
                 f"PERF save file={output} lines=#{len(df)} "
@@ -138,7 +142,8 @@ class FileItemExporter:
             )
 
         if self._df_saver is not None:
-            self._df_saver(df, block_num, entity_type)
+            with EXPORTER_SECONDS.labels("file", entity_type, "df_saver").time():
+                self._df_saver(df, block_num, entity_type)
 
         return output
 
@@ -4,10 +4,11 @@ from functools import lru_cache
 from multiprocessing.pool import Pool
 from typing import List, Dict
 
-from sqlalchemy.engine.base import Engine
+from sqlalchemy.engine.base import Connection, Engine
 from sqlalchemy.dialects.postgresql.dml import Insert
 
 from blockchainetl.utils import dynamic_batch_iterator
+from blockchainetl.metrics import EXPORTER_SECONDS, EXPORTED_ITEMS
 from blockchainetl.misc.sqlalchemy_extra import sqlalchemy_engine_builder
 from .converters.composite_item_converter import CompositeItemConverter
 from ._utils import group_by_item_type
@@ -50,10 +51,14 @@ class PostgresItemExporter:
             return 0
 
         items_grouped_by_type = group_by_item_type(items)
-        if self.process_mode is True:
-            return self._export_items_in_processpool(items_grouped_by_type)
-        else:
-            return self._export_items_in_threadpool(items_grouped_by_type)
+        with EXPORTER_SECONDS.labels("postgres", "all", "insert").time():
+            if self.process_mode is True:
+                rowcount = self._export_items_in_processpool(items_grouped_by_type)
+            else:
+                rowcount = self._export_items_in_threadpool(items_grouped_by_type)
+        for item_type, item_group in items_grouped_by_type.items():
+            EXPORTED_ITEMS.labels("postgres", item_type).inc(len(item_group))
+        return rowcount
 
     def _export_items_in_threadpool(self, items_grouped_by_type):
         rowcount = 0
@@ -108,6 +113,22 @@ class PostgresItemExporter:
             rowcount += result
         return rowcount
 
+    def export_items_in(self, conn: Connection, items: List[Dict]) -> int:
+        """Export items with the given connection, eg: in the caller's transaction"""
+        rowcount = 0
+        items_grouped_by_type = group_by_item_type(items)
+        for item_type, insert_stmt in self.item_type_to_insert_stmt_mapping.items():
+            item_group = items_grouped_by_type.get(item_type)
+            if item_group is None:
+                continue
+
+            converted_items = self.convert_items(item_group)
+            for chunk in dynamic_batch_iterator(
+                converted_items, lambda: self.batch_size
+            ):
+                rowcount += conn.execute(insert_stmt, chunk).rowcount
+        return rowcount
+
     def export_item(self, item: Dict) -> int:
         item = self.converter.convert_item(item)
         insert_stmt = self.item_type_to_insert_stmt_mapping[item["type"]]
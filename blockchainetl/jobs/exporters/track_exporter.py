@@ -1,7 +1,6 @@
 import logging
 import math
 import pandas as pd
-import pypeln as pl
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from typing import List, Dict, Optional
 
@@ -74,6 +73,7 @@ class TrackExporter:
             token = track.get("token_address")
             if token:
                 self._keep_tokens.add(token)
+        self._track_db.open()
         self._track_db.bootstrap(dataset)
 
     def export_items(self, items: List[Dict]):
@@ -109,8 +109,7 @@ class TrackExporter:
         for item in items:
             item["type"] = remap_entity_type(item["type"])
 
-        track_df = self._track_db.all_items_df()
-        if track_df.empty is True:
+        if self._track_db.is_empty():
             logging.warning("No tracking address found")
             return None
 
@@ -128,6 +127,8 @@ class TrackExporter:
         # TODO: if status is error, filter or not?
         df: pd.DataFrame = df[df.from_address != df.to_address]
 
+        # probe the tracking index with the senders of this batch
+        track_df = self._track_db.items_df_of(df.from_address)
         tracked = df.merge(
             track_df, how="inner", left_on="from_address", right_on="address"
         )
@@ -157,10 +158,11 @@ class TrackExporter:
             tracked["token_name"] = None
 
         # stop if address is known address or pattern
-        tracked["stop"] = tracked.apply(self._oracle.shold_stop, axis=1)
-        tracked.loc[tracked.stop == True, "label"] = tracked.loc[
-            tracked.stop == True, "address"
-        ].apply(self._oracle.stop_of)
+        stops = self._oracle.stops_of(tracked)
+        tracked["stop"] = stops["stop"]
+        tracked.loc[tracked.stop == True, "label"] = stops.loc[
+            tracked.stop == True, "reason"
+        ]
 
         return tracked
 
@@ -280,10 +282,8 @@ class TrackExporter:
         df_tokens = set(df.token_address)
         ps = self._price_service
         if ps is not None:
-            stage = pl.thread.map(
-                lambda t: (t, ps.get_price(self._chain, t)), df_tokens, workers=10
-            )
-            tokens = tokens.union(set(t[0] for t in stage if t[1] is not None))
+            prices = ps.get_prices(self._chain, df_tokens)
+            tokens = tokens.union(set(t for t, p in prices.items() if p is not None))
 
         logging.info(f"filter with #{len(tokens)}/{len(df_tokens)} tokens")
         df = df[df.token_address.isin(tokens)]
@@ -298,6 +298,7 @@ class TrackExporter:
             )
         elif self._token_service is not None:
             ts: EthTokenService = self._token_service
+            ts.get_tokens(df.token_address.unique(), self._chain)
 
             def apply_decimals(token_address, val):
                 token: EthToken = ts.get_token(token_address, self._chain)
@@ -317,4 +318,4 @@ class TrackExporter:
         return df
 
     def close(self):
-        pass
+        self._track_db.close()
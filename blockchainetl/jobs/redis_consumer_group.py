@@ -8,6 +8,8 @@ from threading import Thread
 from multiprocessing import Process
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
+from blockchainetl.metrics import QUEUE_SIZE
+
 
 class RedisConsumerGroupWorkerMode(Enum):
     Thread = "thread"
@@ -257,7 +259,12 @@ class RedisConsumerGroup(object):
     ):
         stream = self._stream_name
         cgroup = self._consumer_group
+        reported_at = 0.0
         while True:
+            if leader is True and time() - reported_at >= self._period_seconds:
+                self._report_queue_size()
+                reported_at = time()
+
             reply = self._red.xreadgroup(
                 cgroup,
                 consumer,
@@ -287,6 +294,17 @@ class RedisConsumerGroup(object):
             for message in reply[0][1]:
                 handle(*message)
 
+    def _report_queue_size(self):
+        # lag(the undelivered messages) is only reported since redis 7.0
+        try:
+            stats = self._red.xinfo_groups(self._stream_name)
+        except redis.ResponseError:
+            return
+        for e in stats:
+            if e["name"].decode() == self._consumer_group:
+                size = (e.get("lag") or 0) + e["pending"]
+                QUEUE_SIZE.labels(queue=self._stream_name).set(size)
+
     # backport from https://github.com/andymccurdy/redis-py/blob/e9837c1d6360d27fac0d8fed6384fd9b2b568b5c/redis/commands.py#L1791-L1829 # noqa
     def xautoclaim(
         self,
@@ -0,0 +1,97 @@
+import logging
+from time import time
+from typing import Optional
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+RPC_LATENCY = Histogram(
+    "blockchain_etl_rpc_latency_seconds",
+    "Seconds of a JSON RPC request(or batch), by the (first) method",
+    ["method"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60),
+)
+RPC_BATCH_SIZE = Histogram(
+    "blockchain_etl_rpc_batch_size",
+    "Requests in a JSON RPC batch, by the (first) method",
+    ["method"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+RPC_RETRIES = Counter(
+    "blockchain_etl_rpc_retries",
+    "Retried work, by kind: split(the batch is retried one item at a time) or item",
+    ["kind"],
+)
+RPC_CACHE_REQUESTS = Counter(
+    "blockchain_etl_rpc_cache_requests",
+    "RPC cache lookups, by result: memory_hit, disk_hit or miss",
+    ["result"],
+)
+LOGS_BLOOM_BLOCKS = Counter(
+    "blockchain_etl_logs_bloom_blocks",
+    "Blocks checked by the logsBloom prefilter, by result: candidate or skipped",
+    ["result"],
+)
+TXPOOL_CHANGES = Counter(
+    "blockchain_etl_txpool_changes",
+    "Txpool transactions exported, by change: added, replaced, moved or dropped",
+    ["change"],
+)
+STAGE_SECONDS = Histogram(
+    "blockchain_etl_stage_seconds",
+    "Seconds spent in a stage of the streaming pipeline",
+    ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300),
+)
+EXPORTER_SECONDS = Histogram(
+    "blockchain_etl_exporter_seconds",
+    "Seconds spent in an exporter(sink) step, by entity type",
+    ["exporter", "entity_type", "step"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 120),
+)
+EXPORTED_ITEMS = Counter(
+    "blockchain_etl_exported_items",
+    "Items written by an exporter(sink), by entity type",
+    ["exporter", "entity_type"],
+)
+HEAD_LAG_BLOCKS = Gauge(
+    "blockchain_etl_head_lag_blocks",
+    "Blocks between the chain head and the last synced block",
+    ["task"],
+)
+HEAD_LAG_SECONDS = Gauge(
+    "blockchain_etl_head_lag_seconds",
+    "Lag in blocks times the observed block interval",
+    ["task"],
+)
+LAST_SYNCED_BLOCK = Gauge(
+    "blockchain_etl_last_synced_block",
+    "The last synced block",
+    ["task"],
+)
+QUEUE_SIZE = Gauge(
+    "blockchain_etl_queue_size",
+    "Tasks waiting in a queue, eg: the undelivered and unacked redis stream messages",
+    ["queue"],
+)
+
+
+class StageTimer:
+    """Observe the seconds between two laps as the duration of the stage"""
+
+    def __init__(self):
+        self._last = time()
+
+    def lap(self, stage: str) -> float:
+        now = time()
+        elapsed = now - self._last
+        STAGE_SECONDS.labels(stage=stage).observe(elapsed)
+        self._last = now
+        return elapsed
+
+
+def start_metrics_server(port: Optional[int], address: str = "0.0.0.0"):
+    """Serve the metrics in Prometheus text format, disabled if port is None"""
+    if port is None:
+        return
+    logging.info(f"Metrics server start listening on http://{address}:{port}")
+    start_http_server(port, address)
@@ -0,0 +1,163 @@
+import os
+import fcntl
+import logging
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from blockchainetl.service.graph_operations import Point
+
+TIMESTAMP_DTYPE = np.dtype("<u4")
+# the timestamp of a height not indexed yet
+MISSING_TIMESTAMP = np.iinfo(TIMESTAMP_DTYPE).max
+
+
+class BlockTimestampIndex(object):
+    """The block timestamps by height, persisted in a flat file of little-endian
+    uint32(4 bytes per block, ~70MB for 18M blocks), memory-mapped for reading.
+
+    The file only grows, a height not indexed yet holds MISSING_TIMESTAMP.
+    The dump streamer writes the blocks it exports, a range can be backfilled in
+    bulk; the high-water mark is the last height of the contiguous indexed
+    prefix, the queries past it fall back to RPC. The writers of several
+    processes are serialized by an exclusive flock on the file.
+    """
+
+    def __init__(self, path: str):
+        if os.path.dirname(path) != "":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not os.path.exists(path):
+            open(path, "ab").close()
+        self.path = path
+        self._lock = Lock()
+        self._timestamps: np.ndarray = np.empty(0, dtype=TIMESTAMP_DTYPE)
+        self._high_water_mark = -1
+        self.refresh()
+
+    def __len__(self) -> int:
+        return len(self._timestamps)
+
+    @property
+    def high_water_mark(self) -> int:
+        return self._high_water_mark
+
+    def refresh(self):
+        """Map the file again, to see the blocks written by the other processes"""
+        with self._lock:
+            self._remap()
+            self._high_water_mark = -1
+            self._advance_high_water_mark()
+
+    def get(self, height: int) -> Optional[int]:
+        if height < 0 or height >= len(self._timestamps):
+            return None
+        timestamp = int(self._timestamps[height])
+        return None if timestamp == MISSING_TIMESTAMP else timestamp
+
+    def covers(self, timestamp: int, margin: int = 100) -> bool:
+        """Whether the blocks around timestamp are all indexed, margin blocks
+        are kept below the high-water mark for the non-monotonic timestamps"""
+        height = self._high_water_mark - margin
+        return height >= 0 and timestamp < self._timestamps[height]
+
+    def update(self, points: Iterable[Tuple[int, int]]):
+        """Write the (height, timestamp)s, the known ones are overwritten"""
+        points = sorted(points)
+        if len(points) == 0:
+            return
+        with self._lock, open(self.path, "r+b") as fw:
+            # the size is read under the lock, else another process may grow
+            # the file in between and its timestamps be overwritten as missing
+            fcntl.flock(fw, fcntl.LOCK_EX)
+            try:
+                size = os.fstat(fw.fileno()).st_size // TIMESTAMP_DTYPE.itemsize
+                last_height = points[-1][0]
+                if last_height >= size:
+                    fw.seek(size * TIMESTAMP_DTYPE.itemsize)
+                    fw.write(
+                        np.full(
+                            last_height + 1 - size, MISSING_TIMESTAMP, TIMESTAMP_DTYPE
+                        ).tobytes()
+                    )
+                for start, timestamps in _contiguous_runs(points):
+                    fw.seek(start * TIMESTAMP_DTYPE.itemsize)
+                    fw.write(np.array(timestamps, dtype=TIMESTAMP_DTYPE).tobytes())
+                fw.flush()
+            finally:
+                fcntl.flock(fw, fcntl.LOCK_UN)
+            self._remap()
+            self._advance_high_water_mark()
+
+    def add_blocks(self, blocks: List[Dict]):
+        """Index the exported blocks"""
+        self.update(
+            (e["number"], e["timestamp"])
+            for e in blocks
+            if e.get("number") is not None and e.get("timestamp") is not None
+        )
+
+    def _remap(self):
+        size = os.path.getsize(self.path) // TIMESTAMP_DTYPE.itemsize
+        if size == 0:
+            self._timestamps = np.empty(0, dtype=TIMESTAMP_DTYPE)
+        else:
+            self._timestamps = np.memmap(
+                self.path, dtype=TIMESTAMP_DTYPE, mode="r", shape=(size,)
+            )
+
+    def _advance_high_water_mark(self):
+        rest = self._timestamps[self._high_water_mark + 1 :]
+        missing = np.flatnonzero(rest == MISSING_TIMESTAMP)
+        if len(missing) > 0:
+            self._high_water_mark += int(missing[0])
+        else:
+            self._high_water_mark += len(rest)
+
+
+def _contiguous_runs(points: List[Tuple[int, int]]) -> List[Tuple[int, List[int]]]:
+    runs: List[Tuple[int, List[int]]] = []
+    for height, timestamp in points:
+        if len(runs) > 0 and runs[-1][0] + len(runs[-1][1]) == height:
+            runs[-1][1].append(timestamp)
+        elif len(runs) > 0 and runs[-1][0] + len(runs[-1][1]) - 1 == height:
+            # the same height twice, the later one wins
+            runs[-1][1][-1] = timestamp
+        else:
+            runs.append((height, [timestamp]))
+    return runs
+
+
+class IndexedBlockTimestampGraph(object):
+    """The block timestamp graph of the GraphOperations, read from the index up
+    to its high-water mark, without any RPC"""
+
+    def __init__(self, index: BlockTimestampIndex, first_block: int = 0):
+        self._index = index
+        self._first_block = first_block
+
+    def get_first_point(self):
+        return self.get_point(self._first_block)
+
+    def get_last_point(self):
+        return self.get_point(self._index.high_water_mark)
+
+    def get_point(self, x):
+        timestamp = self._index.get(x)
+        if timestamp is None:
+            raise ValueError(f"block {x} is not in the timestamp index")
+        return Point(x, timestamp)
+
+    def get_points(self, block_numbers):
+        return [self.get_point(x) for x in block_numbers]
+
+
+def open_block_timestamp_index(path: Optional[str]) -> Optional[BlockTimestampIndex]:
+    if path is None:
+        return None
+    index = BlockTimestampIndex(path)
+    logging.info(
+        f"opened block timestamp index {path} "
+        f"#blocks={len(index)} high-water-mark={index.high_water_mark}"
+    )
+    return index
@@ -50,6 +50,7 @@ class GraphOperations(object):
 
         self._graph = graph
         self._cached_points = []
+        self._cached_points_by_x = {}
         self._max_not_monotonic_points = max_not_monotonic_points
         self._prefetch_size = prefetch_size
 
@@ -198,10 +199,12 @@ class GraphOperations(object):
         return best_point.x
 
     def _find_point_in_cache(self, x: int) -> Optional[Point]:
-        for point in self._cached_points:
-            if point.x == x:
-                return point
-        return None
+        return self._cached_points_by_x.get(x)
+
+    def _cache_point(self, point: Point):
+        if point.x not in self._cached_points_by_x:
+            self._cached_points.append(point)
+            self._cached_points_by_x[point.x] = point
 
     def _get_point(self, x: int, prefetch_left=0, prefetch_right=0) -> Point:
         prefetch_left = max(prefetch_left, 0)
@@ -212,7 +215,7 @@ class GraphOperations(object):
         else:
             if prefetch_left == 0 and prefetch_right == 0:
                 point = self._graph.get_point(x)
-                self._cached_points.append(point)
+                self._cache_point(point)
                 return point
             else:
                 xs = [x]
@@ -222,18 +225,18 @@ class GraphOperations(object):
                     xs.append(i)
                 points = self._graph.get_points(xs)
                 for point in points:
-                    self._cached_points.append(point)
+                    self._cache_point(point)
                 point = [p for p in points if p.x == x][0]
                 return point
 
     def _get_first_point(self) -> Point:
         point = self._graph.get_first_point()
-        self._cached_points.append(point)
+        self._cache_point(point)
         return point
 
     def _get_last_point(self) -> Point:
         point = self._graph.get_last_point()
-        self._cached_points.append(point)
+        self._cache_point(point)
         return point
 
 
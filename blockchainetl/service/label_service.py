@@ -1,34 +1,82 @@
-from typing import Optional, Set
-from threading import Lock
+from typing import Dict, Iterable, Optional, Set
 from sqlalchemy import create_engine
-from cachetools import cached, TTLCache
+
+from .service_cache import ServiceCache, SERVICE_CACHE, MISSING
 
 
 class LabelService:
-    def __init__(self, db_url: str, db_table: str, db_schema: Optional[str]):
+    def __init__(
+        self,
+        db_url: str,
+        db_table: str,
+        db_schema: Optional[str],
+        cache: ServiceCache = SERVICE_CACHE,
+    ):
         self._engine = create_engine(db_url)
         if db_schema is None:
             self._db_table = db_table
         else:
             self._db_table = db_schema + "." + db_table
+        # cache for 1hour
+        self._cache = cache
 
-    # cache for 1hour
-    @cached(cache=TTLCache(maxsize=10000, ttl=3600), lock=Lock())
     def label_of(self, address: str) -> Optional[Set[str]]:
         address = address.lower()
+        labels = self._cache.get("label", (self._db_table, address))
+        if labels is not MISSING:
+            return _copy(labels)
+
         result = self._engine.execute(
             f"SELECT address, label FROM {self._db_table} WHERE address = %s LIMIT 10",
             address,
         )
-        if result is None:
-            return None
-        rows = result.fetchall()
-        if len(rows) == 0:
-            return None
-        return set(row["label"] for row in rows)
+        labels = None
+        if result is not None:
+            rows = result.fetchall()
+            if len(rows) > 0:
+                labels = set(row["label"] for row in rows)
+        self._cache.set("label", (self._db_table, address), labels)
+        return _copy(labels)
+
+    def labels_of(
+        self, addresses: Iterable[str], chunk_size: int = 5000
+    ) -> Dict[str, Optional[Set[str]]]:
+        """Resolve the labels of many addresses, with one query per chunk of
+        the uncached addresses
+        """
+        keys = set((self._db_table, e.lower()) for e in addresses if e is not None)
+        found, missing = self._cache.get_many("label", keys)
+
+        fetched = {}
+        for i in range(0, len(missing), chunk_size):
+            chunk = [address for _, address in missing[i : i + chunk_size]]
+            fetched.update({address: None for address in chunk})
+            result = self._engine.execute(
+                f"SELECT address, label FROM {self._db_table} WHERE address = ANY(%s)",
+                (chunk,),
+            )
+            for row in result.fetchall() if result is not None else []:
+                labels = fetched[row["address"]]
+                if labels is None:
+                    labels = fetched[row["address"]] = set()
+                # same as LIMIT 10 in label_of
+                if len(labels) < 10:
+                    labels.add(row["label"])
+        self._cache.set_many(
+            "label", {(self._db_table, k): v for k, v in fetched.items()}
+        )
+
+        labels = {address: _copy(v) for (_, address), v in found.items()}
+        labels.update({k: _copy(v) for k, v in fetched.items()})
+        return labels
 
     def category_of(self, address: str) -> Set[str]:
         labels = self.label_of(address)
         if labels is None:
             return set()
         return set(e.split(",")[0] for e in labels)
+
+
+def _copy(labels: Optional[Set[str]]) -> Optional[Set[str]]:
+    # the cached sets are shared by all the callers, which may change theirs
+    return None if labels is None else set(labels)
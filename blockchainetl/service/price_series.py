@@ -0,0 +1,205 @@
+import time
+import logging
+from bisect import bisect_right
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from cachetools import LRUCache, TTLCache
+
+from .service_cache import MISSING
+
+# (chain, token_address)
+SeriesKey = Tuple[str, str]
+# (chain, token_address, start, end) -> [(timestamp, price)]
+SeriesLoader = Callable[[str, str, int, int], List[Tuple[int, float]]]
+
+
+class PriceSeries:
+    """Prices of one token over the loaded time range [start, end], sorted by time"""
+
+    __slots__ = ("start", "end", "times", "prices", "used_at")
+
+    def __init__(self, start: int, end: int, points: List[Tuple[int, float]]):
+        points = sorted(e for e in points if e[1] is not None)
+        self.start = start
+        self.end = end
+        self.times = [e[0] for e in points]
+        self.prices = [e[1] for e in points]
+        self.used_at = time.monotonic()
+
+    def covers(self, ts: int) -> bool:
+        return self.start <= ts <= self.end
+
+    def lookup(self, ts: int, tolerance: int):
+        """Return the price at ts, interpolated between the two surrounding
+        points, or the nearest point within tolerance, else MISSING
+        """
+        self.used_at = time.monotonic()
+        times, prices = self.times, self.prices
+        # the feed has no price of this token in the range, query it instead
+        if len(times) == 0:
+            return MISSING
+
+        i = bisect_right(times, ts)
+        before = i - 1 if i > 0 else None
+        after = i if i < len(times) else None
+
+        if before is not None and times[before] == ts:
+            return prices[before]
+        if (
+            before is not None
+            and after is not None
+            and times[after] - times[before] <= 2 * tolerance
+        ):
+            t0, t1 = times[before], times[after]
+            p0, p1 = prices[before], prices[after]
+            return p0 + (p1 - p0) * (ts - t0) / (t1 - t0)
+        if before is not None and ts - times[before] <= tolerance:
+            return prices[before]
+        if after is not None and times[after] - ts <= tolerance:
+            return prices[after]
+        return MISSING
+
+
+class PriceSeriesCache:
+    """Per token price series preloaded over a sliding window.
+
+    A lookup outside of the loaded range loads the window starting from it, so
+    a backfill walking forward in time loads each token once per window. The
+    series that reach the current time are reloaded in background every
+    refresh_interval seconds. A failed load is not retried within failure_ttl
+    seconds, the lookups in its range are MISSING meanwhile.
+    """
+
+    def __init__(
+        self,
+        loader: SeriesLoader,
+        resolution: int = 3600,
+        window: int = 7 * 86400,
+        refresh_interval: int = 300,
+        maxsize: int = 10000,
+        failure_ttl: int = 60,
+    ):
+        self._loader = loader
+        self.resolution = resolution
+        self.window = window
+        self.refresh_interval = refresh_interval
+        self._series: LRUCache = LRUCache(maxsize=maxsize)
+        self._lock = Lock()
+        # key -> [lock, #threads using it], dropped once no thread uses it
+        self._key_locks: Dict[Hashable, list] = {}
+        # key -> the (start, end) failed to load
+        self._failures: Optional[TTLCache] = None
+        if failure_ttl > 0:
+            self._failures = TTLCache(maxsize=maxsize, ttl=failure_ttl)
+        self._stop = Event()
+        self._refresher: Optional[Thread] = None
+
+    def bucket(self, ts: int) -> int:
+        return ts - ts % self.resolution
+
+    def get(self, chain: str, token_address: str, ts: int):
+        """Return the price from memory, or MISSING if the series has no data
+        close to ts after (re)loading it
+        """
+        key = (chain, token_address)
+        with self._lock:
+            series = self._series.get(key)
+        if series is None or not series.covers(ts):
+            series = self._load(key, ts)
+        if series is None:
+            return MISSING
+        return series.lookup(ts, self.resolution)
+
+    def peek(self, chain: str, token_address: str, ts: int):
+        """The same as get, but never loads the series"""
+        with self._lock:
+            series = self._series.get((chain, token_address))
+        if series is None or not series.covers(ts):
+            return MISSING
+        return series.lookup(ts, self.resolution)
+
+    def _load(self, key: SeriesKey, ts: int) -> Optional[PriceSeries]:
+        """Load the series around ts, None if it failed recently"""
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, [Lock(), 0])
+            key_lock[1] += 1
+
+        try:
+            # only one thread loads the series of a token
+            with key_lock[0]:
+                return self._load_locked(key, ts)
+        finally:
+            with self._lock:
+                key_lock[1] -= 1
+                if key_lock[1] == 0:
+                    del self._key_locks[key]
+
+    def _load_locked(self, key: SeriesKey, ts: int) -> Optional[PriceSeries]:
+        with self._lock:
+            series = self._series.get(key)
+            failed = self._failures.get(key) if self._failures is not None else None
+        if series is not None and series.covers(ts):
+            return series
+        if failed is not None and failed[0] <= ts <= failed[1]:
+            return None
+
+        now = int(time.time())
+        start = self.bucket(ts) - self.resolution
+        end = min(start + self.window, self.bucket(now) + self.resolution)
+        end = max(end, ts)
+        try:
+            points = self._loader(key[0], key[1], start, end)
+        except Exception:
+            if self._failures is not None:
+                with self._lock:
+                    self._failures[key] = (start, end)
+            raise
+        series = PriceSeries(start, end, points)
+        with self._lock:
+            self._series[key] = series
+        self._start_refresher()
+        return series
+
+    def _start_refresher(self):
+        if self._refresher is not None or self.refresh_interval <= 0:
+            return
+        with self._lock:
+            if self._refresher is not None:
+                return
+            self._refresher = Thread(
+                target=self._refresh_loop, name="price-series-refresher", daemon=True
+            )
+        self._refresher.start()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            now = int(time.time())
+            used_after = time.monotonic() - self.window
+            with self._lock:
+                # the series reaching now, and still in use
+                live = [
+                    (k, v.used_at)
+                    for k, v in self._series.items()
+                    if v.end >= now - self.refresh_interval - self.resolution
+                    and v.used_at >= used_after
+                ]
+            end = self.bucket(now) + self.resolution
+            start = end - self.window
+            for (chain, token_address), used_at in live:
+                try:
+                    points = self._loader(chain, token_address, start, end)
+                except Exception as e:
+                    logging.warning(
+                        f"failed to refresh price of {chain} {token_address}: {e}"
+                    )
+                    continue
+                series = PriceSeries(start, end, points)
+                series.used_at = used_at
+                with self._lock:
+                    self._series[(chain, token_address)] = series
+
+    def close(self, timeout: Optional[float] = 10):
+        self._stop.set()
+        if self._refresher is not None:
+            self._refresher.join(timeout)
@@ -1,22 +1,48 @@
 import os
 import re
-from typing import Optional, Union, List, Dict
+import logging
+from typing import Optional, Union, List, Dict, Iterable, Tuple
 from requests import Session
 from datetime import datetime, timedelta, date, timezone
+from concurrent.futures import ThreadPoolExecutor
 from cachetools import cached, TTLCache
 from threading import Lock
 
+from .service_cache import ServiceCache, SERVICE_CACHE, MISSING
+from .price_series import PriceSeriesCache
+
 PRICE_SERVICE_API_KEY_ENV = "BLOCKCHAIN_ETL_PRICE_SERVICE_API_KEY"
+NATIVE_TOKEN_ADDRESS = "0x0000000000000000000000000000000000000000"
 
 
 class PriceService:
-    def __init__(self, endpoint: str, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        endpoint: str,
+        api_key: Optional[str] = None,
+        cache: ServiceCache = SERVICE_CACHE,
+        max_workers: int = 10,
+        resolution: int = 3600,
+        interval: str = "1h",
+        preload_window: int = 7 * 86400,
+        refresh_interval: int = 300,
+    ):
         self.endpoint = endpoint
         self.session = Session()
         self.api_key = api_key or os.getenv(PRICE_SERVICE_API_KEY_ENV)
+        # cache for 1min
+        self._cache = cache
+        self._max_workers = max_workers
+
+        # historical prices of the used tokens, with `interval` points every
+        # `resolution` seconds, set resolution to 0 to query every price
+        self._interval = interval
+        self._series = None
+        if resolution > 0:
+            self._series = PriceSeriesCache(
+                self._load_series, resolution, preload_window, refresh_interval
+            )
 
-    # cache for 1min
-    @cached(cache=TTLCache(maxsize=10000, ttl=60), lock=Lock())
     def get_price(
         self,
         chain: str,
@@ -24,13 +50,105 @@ class PriceService:
         time: Optional[Union[str, int, datetime]] = None,
     ) -> Optional[float]:
         chain = chain.lower()
-        token_address = token_address or "0x0000000000000000000000000000000000000000"
+        token_address = token_address or NATIVE_TOKEN_ADDRESS
+
+        if time is not None and self._series is not None:
+            ts = int(datetime.timestamp(self._parse_time(time)))
+            try:
+                price = self._series.get(chain, token_address, ts)
+            except Exception as e:
+                logging.warning(f"failed to load prices of {token_address}: {e}")
+                price = MISSING
+            if price is not MISSING:
+                return price
+            # no historical price around ts, query the price of the bucket
+            time = self._series.bucket(ts)
+
+        key = (self.endpoint, chain, token_address, time)
+        price = self._cache.get("price", key)
+        if price is not MISSING:
+            return price
+        return self._fetch_price(chain, token_address, time)
+
+    def _peek_price(
+        self,
+        chain: str,
+        token_address: str,
+        time: Optional[Union[str, int, datetime]] = None,
+    ):
+        """Return the price if it's in memory, else MISSING"""
+        if time is not None and self._series is not None:
+            ts = int(datetime.timestamp(self._parse_time(time)))
+            price = self._series.peek(chain, token_address, ts)
+            if price is not MISSING:
+                return price
+            time = self._series.bucket(ts)
+        return self._cache.get("price", (self.endpoint, chain, token_address, time))
+
+    def _fetch_price(
+        self,
+        chain: str,
+        token_address: str,
+        time: Optional[Union[str, int, datetime]] = None,
+    ) -> Optional[float]:
         url = self.endpoint + f"/api/v2/tokens/{token_address}/prices"
 
         end_time = int(datetime.timestamp(self._parse_time(time)))
         price = self._get(url, chain, end_time)
         assert isinstance(price, dict)
-        return price.get("price")
+        price = price.get("price")
+        self._cache.set("price", (self.endpoint, chain, token_address, time), price)
+        return price
+
+    def _load_series(
+        self, chain: str, token_address: str, start: int, end: int
+    ) -> List[Tuple[int, float]]:
+        prices = self.get_historical_prices(
+            chain, token_address, start, end, interval=self._interval
+        )
+        points, skipped = [], []
+        for e in prices:
+            if not isinstance(e, dict) or "timestamp" not in e or "price" not in e:
+                skipped.append(e)
+                continue
+            points.append((int(e["timestamp"]), e["price"]))
+        if len(skipped) > 0:
+            logging.warning(
+                f"skip #{len(skipped)} unexpected historical prices of {chain} "
+                f"{token_address}, eg: {skipped[0]}"
+            )
+        return points
+
+    def get_prices(
+        self,
+        chain: str,
+        token_addresses: Iterable[Optional[str]],
+        time: Optional[Union[str, int, datetime]] = None,
+    ) -> Dict[Optional[str], Optional[float]]:
+        """Resolve the prices of many tokens at the same time, the ones not in
+        memory are requested concurrently on the shared session
+        """
+        chain = chain.lower()
+        prices, missing = {}, []
+        for token in set(token_addresses):
+            price = self._peek_price(chain, token or NATIVE_TOKEN_ADDRESS, time)
+            if price is MISSING:
+                missing.append(token)
+            else:
+                prices[token] = price
+
+        if len(missing) > 0:
+            with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+                fetched = executor.map(
+                    lambda t: self.get_price(chain, t, time), missing
+                )
+                prices.update(zip(missing, fetched))
+        return prices
+
+    def close(self):
+        if self._series is not None:
+            self._series.close()
+        self.session.close()
 
     # cache for 1min
     @cached(cache=TTLCache(maxsize=10000, ttl=60), lock=Lock())
@@ -1,19 +1,32 @@
-from typing import Dict, List, Union
+from typing import Dict, Iterable, List, Union
 from decimal import Decimal
-from threading import Lock
 from sqlalchemy import create_engine
-from cachetools import cached, TTLCache
+
+from .service_cache import ServiceCache, SERVICE_CACHE, MISSING
+
+PROFILE_COLUMNS = (
+    "vin_txs",
+    "out_txs",
+    "vin_xfers",
+    "out_xfers",
+    "vin_value",
+    "out_value",
+)
 
 
 class ProfileService:
-    def __init__(self, chain: str, db_url: str):
+    def __init__(self, chain: str, db_url: str, cache: ServiceCache = SERVICE_CACHE):
         self.chain = chain
         self.engine = create_engine(db_url, pool_size=10)
+        # cache for 1m
+        self._cache = cache
 
-    # cache for 1m
-    @cached(cache=TTLCache(maxsize=2000, ttl=60), lock=Lock())
     def get_profile(self, address: str) -> List[Dict[str, Union[str, int]]]:
         address = address.lower()
+        profile = self._cache.get("profile", (self.chain, address))
+        if profile is not MISSING:
+            return profile
+
         sql = f"""
 SELECT
     'erc20' AS typo,
@@ -45,11 +58,74 @@ WHERE
 """
         result = self.engine.execute(sql, (address, address))
         rows = result.fetchall()
-        rows = [e._asdict() for e in rows]
-        for row in rows:
-            for k, v in row.items():
-                if isinstance(v, Decimal):
-                    row[k] = int(v)
-                elif v is None:
-                    row[k] = 0
+        rows = [self._normalize(e._asdict()) for e in rows]
+        self._cache.set("profile", (self.chain, address), rows)
         return rows
+
+    def get_profiles(
+        self, addresses: Iterable[str], chunk_size: int = 5000
+    ) -> Dict[str, List[Dict[str, Union[str, int]]]]:
+        """Resolve the profiles of many addresses, with one query per chunk of
+        the uncached addresses
+        """
+        keys = set((self.chain, e.lower()) for e in addresses if e is not None)
+        found, missing = self._cache.get_many("profile", keys)
+
+        sums = ",\n    ".join(f"sum({c}) AS {c}" for c in PROFILE_COLUMNS)
+        sql = f"""
+SELECT
+    address,
+    'erc20' AS typo,
+    count(*) AS count,
+    {sums}
+FROM
+    {self.chain}.token_latest_balances
+WHERE
+    address = ANY(%s)
+GROUP BY address
+UNION ALL
+SELECT
+    address,
+    'ether' AS typo,
+    count(*) AS count,
+    {sums}
+FROM
+    {self.chain}.latest_balances
+WHERE
+    address = ANY(%s)
+GROUP BY address
+"""
+        fetched = {}
+        for i in range(0, len(missing), chunk_size):
+            chunk = [address for _, address in missing[i : i + chunk_size]]
+            # the address without balances still has a zero row per typo,
+            # the same as the aggregation without GROUP BY in get_profile
+            for address in chunk:
+                fetched[address] = {
+                    typo: dict(typo=typo, count=0, **{c: 0 for c in PROFILE_COLUMNS})
+                    for typo in ("erc20", "ether")
+                }
+
+            result = self.engine.execute(sql, (chunk, chunk))
+            for row in result.fetchall():
+                row = self._normalize(row._asdict())
+                address = row.pop("address")
+                fetched[address][row["typo"]] = row
+
+        fetched = {k: list(v.values()) for k, v in fetched.items()}
+        self._cache.set_many(
+            "profile", {(self.chain, k): v for k, v in fetched.items()}
+        )
+
+        profiles = {address: v for (_, address), v in found.items()}
+        profiles.update(fetched)
+        return profiles
+
+    @staticmethod
+    def _normalize(row: Dict) -> Dict[str, Union[str, int]]:
+        for k, v in row.items():
+            if isinstance(v, Decimal):
+                row[k] = int(v)
+            elif v is None:
+                row[k] = 0
+        return row
@@ -0,0 +1,86 @@
+import time
+from threading import Lock
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from cachetools import TLRUCache
+from prometheus_client import Counter, Gauge
+
+CACHE_REQUESTS = Counter(
+    "blockchain_etl_service_cache_requests",
+    "Service cache lookups",
+    ["namespace", "result"],
+)
+CACHE_SIZE = Gauge("blockchain_etl_service_cache_size", "Service cache entries")
+
+MISSING = object()
+
+
+class ServiceCache:
+    """A size-bounded cache shared by the label, profile and price services.
+
+    Keys are namespaced, eg: ("label", table, address), each namespace has its
+    own time-to-live, so one cache can hold labels for an hour and prices for a
+    minute. None is a valid value(eg: an address without label).
+    """
+
+    def __init__(self, maxsize: int = 200_000, ttls: Optional[Dict[str, float]] = None):
+        self._ttls = {"label": 3600, "profile": 60, "price": 60}
+        self._ttls.update(ttls or {})
+        self._cache = TLRUCache(maxsize=maxsize, ttu=self._ttu, timer=time.monotonic)
+        self._lock = Lock()
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def _ttu(self, key: Tuple, value: Any, now: float) -> float:
+        return now + self._ttls.get(key[0], 60)
+
+    def _count(self, namespace: str, hits: int, misses: int):
+        self.hits[namespace] = self.hits.get(namespace, 0) + hits
+        self.misses[namespace] = self.misses.get(namespace, 0) + misses
+        if hits > 0:
+            CACHE_REQUESTS.labels(namespace, "hit").inc(hits)
+        if misses > 0:
+            CACHE_REQUESTS.labels(namespace, "miss").inc(misses)
+
+    def get(self, namespace: str, key: Hashable, default=MISSING) -> Any:
+        with self._lock:
+            value = self._cache.get((namespace, key), MISSING)
+            self._count(namespace, int(value is not MISSING), int(value is MISSING))
+        return default if value is MISSING else value
+
+    def set(self, namespace: str, key: Hashable, value: Any):
+        with self._lock:
+            self._cache[(namespace, key)] = value
+            CACHE_SIZE.set(len(self._cache))
+
+    def get_many(
+        self, namespace: str, keys: Iterable[Hashable]
+    ) -> Tuple[Dict[Hashable, Any], List[Hashable]]:
+        """Return the cached values and the missing keys"""
+        found, missing = {}, []
+        with self._lock:
+            for key in keys:
+                value = self._cache.get((namespace, key), MISSING)
+                if value is MISSING:
+                    missing.append(key)
+                else:
+                    found[key] = value
+            self._count(namespace, len(found), len(missing))
+        return found, missing
+
+    def set_many(self, namespace: str, values: Dict[Hashable, Any]):
+        with self._lock:
+            for key, value in values.items():
+                self._cache[(namespace, key)] = value
+            CACHE_SIZE.set(len(self._cache))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {
+                namespace: {"hits": hits, "misses": self.misses.get(namespace, 0)}
+                for namespace, hits in self.hits.items()
+            }
+
+
+# shared by all the services in this process
+SERVICE_CACHE = ServiceCache()
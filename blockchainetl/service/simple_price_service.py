@@ -1,5 +1,5 @@
 import requests
-from typing import Optional
+from typing import Dict, Iterable, Optional
 from cachetools import cached, TTLCache
 from threading import Lock
 
@@ -20,6 +20,11 @@ class SimplePriceService:
             return self.get_native(chain)
         return self.get_token(chain, token_address)
 
+    def get_prices(
+        self, chain: str, token_addresses: Iterable[Optional[str]], **kwargs
+    ) -> Dict[Optional[str], Optional[float]]:
+        return {e: self.get_price(chain, e) for e in set(token_addresses)}
+
     # cache for 5min
     @cached(cache=TTLCache(maxsize=10000, ttl=300), lock=Lock())
     def get_native(self, chain):
@@ -61,3 +66,6 @@ class SimplePriceService:
         if token in rs:
             return rs[token]["usd"]
         return None
+
+    def close(self):
+        self.session.close()
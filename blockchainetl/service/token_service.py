@@ -1,3 +1,16 @@
+from typing import Dict, Iterable, Optional
+
+
 class TokenService(object):
-    def get_token(self, token_address: str):
+    def get_token(
+        self, token_address: str, chain: Optional[str] = None, block_number="latest"
+    ):
         raise NotImplementedError
+
+    def get_tokens(
+        self,
+        token_addresses: Iterable[str],
+        chain: Optional[str] = None,
+        block_number="latest",
+    ) -> Dict:
+        return {e: self.get_token(e, chain, block_number) for e in token_addresses}
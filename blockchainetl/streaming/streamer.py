@@ -29,6 +29,12 @@ from datetime import datetime
 from blockchainetl.streaming.streamer_adapter_stub import StreamerAdapterStub
 from blockchainetl.file_utils import smart_open
 from blockchainetl import env
+from blockchainetl.metrics import (
+    STAGE_SECONDS,
+    HEAD_LAG_BLOCKS,
+    HEAD_LAG_SECONDS,
+    LAST_SYNCED_BLOCK,
+)
 from blockchainetl.streaming.streamer_jsonl_skiper import StreamerJsonlSkiper
 
 
@@ -78,6 +84,11 @@ class Streamer:
             self.skiper = StreamerJsonlSkiper(env.SKIP_STREAM_SAVE_PATH)
         self.block_range = (None, None)
 
+        # the metrics are labeled by the last synced block file
+        self.task = os.path.splitext(self.last_synced_block_file)[0]
+        self._head_sample = None
+        self._block_interval = None
+
     def stream(self):
         try:
             if self.pid_file is not None:
@@ -141,13 +152,35 @@ class Streamer:
             f"lag #{current_block-last_synced}"
         )
 
+        self._observe_lag(current_block, current_timestamp, last_synced)
+
         self.block_range = (last_synced + 1, target_block)
         if blocks_to_sync != 0:
-            self.blockchain_streamer_adapter.export_all(*self.block_range)
+            with STAGE_SECONDS.labels(stage="export_all").time():
+                self.blockchain_streamer_adapter.export_all(*self.block_range)
             self._write_last_synced_block(target_block)
 
         return blocks_to_sync
 
+    def _observe_lag(self, current_block, current_timestamp, last_synced):
+        # the block interval is estimated from the head moves between two cycles,
+        # with the head timestamp if the adapter returns it, or the wall clock
+        now = current_timestamp if current_timestamp is not None else time.time()
+        prev = self._head_sample
+        if prev is None or current_block > prev[0]:
+            if prev is not None and now > prev[1]:
+                interval = (now - prev[1]) / (current_block - prev[0])
+                if self._block_interval is None:
+                    self._block_interval = interval
+                else:
+                    self._block_interval = 0.8 * self._block_interval + 0.2 * interval
+            self._head_sample = (current_block, now)
+
+        lag = max(current_block - last_synced, 0)
+        HEAD_LAG_BLOCKS.labels(task=self.task).set(lag)
+        if self._block_interval is not None:
+            HEAD_LAG_SECONDS.labels(task=self.task).set(lag * self._block_interval)
+
     def _calculate_target_block(self, current_block: int, last_synced: int) -> int:
         target_block = current_block - self.lag
         target_block = min(target_block, last_synced + self.block_batch_size)
@@ -161,6 +194,7 @@ class Streamer:
         logging.debug("Writing last synced block {}".format(target_block))
         write_last_synced_block(self.last_synced_block_file, target_block)
         self.last_synced_block = target_block
+        LAST_SYNCED_BLOCK.labels(task=self.task).set(target_block)
 
 
 def delete_file(file):
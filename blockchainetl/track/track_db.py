@@ -1,16 +1,34 @@
 import logging
 import numpy as np
 import pandas as pd
-from typing import Dict, List
+from threading import Event, Lock, Thread
+from typing import Dict, Iterable, List, Optional, Tuple
 from sqlalchemy import create_engine
+from blockchainetl.utils import dynamic_batch_iterator
 from blockchainetl.jobs.exporters import PostgresItemExporter
 from blockchainetl.streaming.postgres_utils import create_insert_statement_for_table
 from blockchainetl.jobs.exporters.converters import UnixTimestampItemConverter
 from ethereumetl.streaming.postgres_tables import TRACKS
 
+TRACK_INDEX_COLUMNS = ["address", "original", "label", "track_id", "hop"]
+TRACK_KEY_COLUMNS = [e.name for e in TRACKS.primary_key]
+
+# address -> (label, track_id) -> (original, hop)
+TrackIndex = Dict[str, Dict[Tuple, Tuple[str, int]]]
+
+
+def _none_if_nan(v):
+    return None if isinstance(v, float) and np.isnan(v) else v
+
+
+def _track_key(row: Dict) -> Tuple:
+    return tuple(_none_if_nan(row.get(e)) for e in TRACK_KEY_COLUMNS)
+
 
 class TrackDB:
-    def __init__(self, db_url: str, track_schema: str):
+    def __init__(
+        self, db_url: str, track_schema: str, reconcile_interval: Optional[int] = None
+    ):
         self._track_schema = track_schema
         logging.info(f"Open track db on {db_url} with schema: {track_schema}")
 
@@ -32,6 +50,87 @@ class TrackDB:
         )
         self._exporter.open()
 
+        # in-memory index of the active(not stopped) tracked addresses,
+        # the same as all_items_df, but updated by upsert instead of re-read
+        self._index: Optional[TrackIndex] = None
+        self._index_lock = Lock()
+        # rows upserted while reconciling, to apply on the reloaded index
+        self._pending: Optional[List[Dict]] = None
+        self._reconcile_interval = reconcile_interval
+        self._stop = Event()
+        self._reconciler: Optional[Thread] = None
+
+    def open(self):
+        self.reconcile()
+        if self._reconcile_interval and self._reconciler is None:
+            self._reconciler = Thread(
+                target=self._reconcile_loop, name="track-db-reconciler", daemon=True
+            )
+            self._reconciler.start()
+
+    def close(self):
+        self._stop.set()
+
+    def reconcile(self):
+        """(Re)load the index from the tracks table"""
+        with self._index_lock:
+            self._pending = []
+        try:
+            df = self.all_items_df()
+        except Exception:
+            with self._index_lock:
+                self._pending = None
+            raise
+
+        index: TrackIndex = {}
+        self._index_rows(index, df.to_dict("records"))
+        with self._index_lock:
+            self._index_rows(index, self._pending)
+            self._index, self._pending = index, None
+        logging.info(f"Loaded #{len(index)} tracking address into index")
+
+    def _reconcile_loop(self):
+        while not self._stop.wait(self._reconcile_interval):
+            try:
+                self.reconcile()
+            except Exception as e:
+                logging.error(f"failed to reconcile track index: {e}")
+
+    @staticmethod
+    def _index_rows(index: TrackIndex, rows: Iterable[Dict]):
+        for row in rows:
+            if row.get("stop") is True:
+                continue
+            hop = _none_if_nan(row.get("hop"))
+            hop = 0 if hop is None else int(hop)
+            key = (_none_if_nan(row.get("label")), _none_if_nan(row.get("track_id")))
+            tracks = index.setdefault(row["address"], {})
+            # keep the lowest hop, the earlier one if equals
+            if key not in tracks or hop < tracks[key][1]:
+                tracks[key] = (_none_if_nan(row.get("original")), hop)
+
+    def items_df_of(self, addresses: Iterable[str]) -> pd.DataFrame:
+        """Return the active tracking items of the addresses, with the same
+        columns as all_items_df, probed from the in-memory index
+        """
+        if self._index is None:
+            self.reconcile()
+
+        rows = []
+        with self._index_lock:
+            for address in set(addresses):
+                tracks = self._index.get(address)
+                if tracks is None:
+                    continue
+                for (label, track_id), (original, hop) in tracks.items():
+                    rows.append((address, original, label, track_id, hop))
+        return pd.DataFrame(rows, columns=TRACK_INDEX_COLUMNS)
+
+    def is_empty(self) -> bool:
+        if self._index is None:
+            self.reconcile()
+        return len(self._index) == 0
+
     def all_items_df(self) -> pd.DataFrame:
         table = "{}.{}".format(self._track_schema, "tracks")
         return pd.read_sql(
@@ -70,7 +169,36 @@ GROUP BY
         # hard coded into track
         df["type"] = "track"
         df.replace({"logpos": {np.nan: 0}}, inplace=True)
-        self._exporter.export_items(df.to_dict("records"))
+        items = self._insert(df.to_dict("records"))
+
+        with self._index_lock:
+            if self._index is not None:
+                self._index_rows(self._index, items)
+            if self._pending is not None:
+                self._pending.extend(items)
+
+    def _insert(self, items: List[Dict]) -> List[Dict]:
+        """Insert the items, and return the ones inserted, the ones conflicting
+        with the existing rows(or an earlier item) are ignored by the table"""
+        exporter = self._exporter
+        insert_stmt = exporter.item_type_to_insert_stmt_mapping["track"]
+        columns = {e.name for e in insert_stmt.table.columns}
+        keys = [insert_stmt.table.columns[e] for e in TRACK_KEY_COLUMNS]
+
+        # the first writer wins, as ON CONFLICT DO NOTHING
+        unique: Dict[Tuple, Dict] = {}
+        for e in items:
+            unique.setdefault(_track_key(e), e)
+        items = list(unique.values())
+        inserted = set()
+        with exporter.engine.begin() as conn:
+            for chunk in dynamic_batch_iterator(
+                exporter.convert_items(items), lambda: exporter.batch_size
+            ):
+                rows = [{k: v for k, v in e.items() if k in columns} for e in chunk]
+                result = conn.execute(insert_stmt.values(rows).returning(*keys))
+                inserted.update(tuple(e) for e in result)
+        return [e for e in items if _track_key(e) in inserted]
 
     def bootstrap(self, dataset: List[Dict]):
         logging.info(f"Bootstrap tracking #{len(dataset)} address")
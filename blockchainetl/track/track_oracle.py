@@ -1,6 +1,6 @@
 import os
 import pandas as pd
-from typing import Optional
+from typing import Optional, Set
 from blockchainetl.enumeration.chain import Chain
 from blockchainetl.service.label_service import LabelService
 from blockchainetl.service.profile_service import ProfileService
@@ -22,47 +22,51 @@ class TrackOracle:
         self.labeler = labeler
         self.profiler = profiler
 
-    def shold_stop(self, row: pd.Series) -> bool:
-        address = row["address"]
+    def stops_of(self, tracked: pd.DataFrame) -> pd.DataFrame:
+        """Tell whether to stop tracking each row, returns the columns `stop` and
+        `reason`(None if not stop) with the index of tracked
+        """
+        # labels and profiles are keyed by the lower address, see LabelService
+        keys = tracked["address"].str.lower()
+        addresses = keys.dropna().unique()
+        labels = self.labeler.labels_of(addresses)
 
-        # let's check label first
-        categories = self.labeler.category_of(address)
-        # check if address is Exchange or Service(Mixer)
-        for category in STOP_CATEGORIES:
-            if category in categories:
-                return True
+        def is_stop_category(e: Optional[Set[str]]) -> bool:
+            categories = set() if e is None else set(x.split(",")[0] for x in e)
+            return any(category in categories for category in STOP_CATEGORIES)
 
-        # check is coinjoin or peeling chain
-        if self.chain in Chain.ALL_BITCOIN_FORKS:
-            return self.is_bitcoin_coinjoin(row)
-
-        # check profile second
-        if self.profiler is not None:
-            profile = self.profiler.get_profile(address)
-            vin_txs = sum(e["vin_txs"] for e in profile)
-            out_txs = sum(e["out_txs"] for e in profile)
+        stop_labels = {k: is_stop_category(v) for k, v in labels.items()}
+        stop = keys.map(stop_labels).fillna(False).astype(bool)
 
+        profiles = {}
+        if self.chain in Chain.ALL_BITCOIN_FORKS:
+            # check is coinjoin or peeling chain
+            stop |= (tracked["n_tx_in_addr"] >= 5) & (tracked["n_tx_out_addr"] >= 5)
+        elif self.profiler is not None:
+            profiles = self.profiler.get_profiles(addresses)
+            vin_txs = {k: sum(e["vin_txs"] for e in v) for k, v in profiles.items()}
+            out_txs = {k: sum(e["out_txs"] for e in v) for k, v in profiles.items()}
             # We think a hacker will not use an address more than threshold
-            return vin_txs > VIN_TXS and out_txs > OUT_TXS
-
-        return False
-
-    # if address is stop of label, return the label
-    # else return the stop reason
-    def stop_of(self, address: str) -> str:
-        labels = self.labeler.label_of(address)
-        if labels is not None:
-            return ";".join(labels)
-
-        if self.profiler is not None:
-            profile = self.profiler.get_profile(address)
-            return "Profile,HighInOutTxs;" + ";".join(
-                f"{e['typo']}:vin-{e['vin_txs']},out-{e['out_txs']}" for e in profile
-            )
+            stop |= (keys.map(vin_txs) > VIN_TXS) & (keys.map(out_txs) > OUT_TXS)
 
-        # TODO: found the stop reason
-        return "Coinjoin"
+        reason = pd.Series(None, index=tracked.index, dtype=object)
+        stop_keys = keys[stop]
+        if not stop_keys.empty:
+            reasons = {}
+            unlabeled = [k for k in stop_keys.unique() if labels.get(k) is None]
+            if self.profiler is not None and len(unlabeled) > 0:
+                profiles.update(self.profiler.get_profiles(unlabeled))
+            for k in stop_keys.unique():
+                if labels.get(k) is not None:
+                    reasons[k] = ";".join(labels[k])
+                elif self.profiler is not None:
+                    reasons[k] = "Profile,HighInOutTxs;" + ";".join(
+                        f"{e['typo']}:vin-{e['vin_txs']},out-{e['out_txs']}"
+                        for e in profiles[k]
+                    )
+                else:
+                    # TODO: found the stop reason
+                    reasons[k] = "Coinjoin"
+            reason = keys.map(reasons).astype(object).where(stop, None)
 
-    # TODO: migrate this algorithm from BlockSCI
-    def is_bitcoin_coinjoin(self, row: pd.Series) -> bool:
-        return row["n_tx_in_addr"] >= 5 and row["n_tx_out_addr"] >= 5
+        return pd.DataFrame({"stop": stop, "reason": reason}, index=tracked.index)
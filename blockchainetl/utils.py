@@ -112,7 +112,8 @@ def rpc_response_to_result(
     else:
         result = response.get("result")
 
-    id = response.get("id")
+    # the bitcoin results may be a plain value, eg: the hash of getblockhash
+    id = response.get("id") if isinstance(response, dict) else None
 
     if result is None:
         error_message = "result is None in response {}".format(response)
@@ -167,6 +168,18 @@ def split_to_batches(start_incl, end_incl, batch_size):
         yield batch_start, batch_end
 
 
+def to_contiguous_ranges(numbers: Iterable[int]) -> List[Tuple[int, int]]:
+    """Group the sorted numbers into the maximal inclusive ranges, eg:
+    [1, 2, 3, 5, 7, 8] -> [(1, 3), (5, 5), (7, 8)]"""
+    ranges: List[Tuple[int, int]] = []
+    for number in numbers:
+        if len(ranges) > 0 and ranges[-1][1] + 1 == number:
+            ranges[-1] = (ranges[-1][0], number)
+        else:
+            ranges.append((number, number))
+    return ranges
+
+
 T = TypeVar("T")
 
 
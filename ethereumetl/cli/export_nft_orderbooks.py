@@ -214,4 +214,7 @@ def export_nft_orderbooks(
         period_seconds=period_seconds,
         block_batch_size=block_batch_size,
     )
-    streamer.stream()
+    try:
+        streamer.stream()
+    finally:
+        price_service.close()
@@ -28,7 +28,9 @@ from ethereumetl.streaming.postgres_hooks import (
     cond_upsert_erc721_token_ids,
     upsert_erc1155_token_ids,
     cond_upsert_erc1155_token_ids,
+    upsert_token_id_states,
 )
+from ethereumetl.streaming.nft_tokenid_store import EthNftTokenidStore
 from ethereumetl.cli.utils import validate_and_read_tokens
 from ethereumetl.providers.auto import new_web3_provider
 from ethereumetl.streaming.utils import build_erc20_token_reader
@@ -36,8 +38,29 @@ from ethereumetl.service.eth_token_service import EthTokenService
 
 
 def build_postgres_exporter(
-    pg_url, pg_schema, print_sql, threads=2, pool_size=2, pool_overflow=5
+    pg_url,
+    pg_schema,
+    print_sql,
+    threads=2,
+    pool_size=2,
+    pool_overflow=5,
+    with_tokenid_store=False,
 ):
+    # the whole states from the tokenid store overwrite the rows(rolled back ones
+    # included), else the changes of the batch are accumulated
+    if with_tokenid_store is True:
+        erc721_hooks = dict(upsert_callback=upsert_token_id_states)
+        erc1155_hooks = dict(upsert_callback=upsert_token_id_states)
+    else:
+        erc721_hooks = dict(
+            upsert_callback=upsert_erc721_token_ids,
+            where_callback=cond_upsert_erc721_token_ids,
+        )
+        erc1155_hooks = dict(
+            upsert_callback=upsert_erc1155_token_ids,
+            where_callback=cond_upsert_erc1155_token_ids,
+        )
+
     return PostgresItemExporter(
         pg_url,
         pg_schema,
@@ -45,16 +68,14 @@ def build_postgres_exporter(
             EntityType.ERC721_TOKENID: create_insert_statement_for_table(
                 ERC721_TOKENIDS,
                 on_conflict_do_update=True,
-                upsert_callback=upsert_erc721_token_ids,
-                where_callback=cond_upsert_erc721_token_ids,
                 schema=pg_schema,
+                **erc721_hooks,
             ),
             EntityType.ERC1155_TOKENID: create_insert_statement_for_table(
                 ERC1155_TOKENIDS,
                 on_conflict_do_update=True,
-                upsert_callback=upsert_erc1155_token_ids,
-                where_callback=cond_upsert_erc1155_token_ids,
                 schema=pg_schema,
+                **erc1155_hooks,
             ),
         },
         print_sql=print_sql,
@@ -83,6 +104,7 @@ def build_nft_tokenid_streamer(
     smooth_erc20_token_reader: Optional[Callable] = None,
     smooth_exclude_tokens: Optional[Set[str]] = None,
     token_service: Optional[EthTokenService] = None,
+    tokenid_store: Optional[EthNftTokenidStore] = None,
 ) -> Streamer:
     streamer_adapter = EthNftTokenidAdapter(
         batch_web3_provider=ThreadLocalProxy(
@@ -100,6 +122,7 @@ def build_nft_tokenid_streamer(
         erc20_token_reader=smooth_erc20_token_reader,
         smooth_exclude_tokens=smooth_exclude_tokens,
         token_service=token_service,
+        tokenid_store=tokenid_store,
     )
     streamer = Streamer(
         blockchain_streamer_adapter=streamer_adapter,
@@ -240,6 +263,15 @@ def build_nft_tokenid_streamer(
     show_default=True,
     help="Run with smooth mode(run with all ERC721/1155 tokens except the known batches)",
 )
+@click.option(
+    "--tokenid-store-dir",
+    type=click.Path(exists=False, readable=True, dir_okay=True, writable=True),
+    envvar="BLOCKCHAIN_ETL_NFT_TOKENID_STORE_DIR",
+    show_default=True,
+    help="The directory of the tokenid stores(one per last synchronized block file), "
+    "to export the whole states of the changed token ids instead of the changes, "
+    "bootstrap it by eth.nft-tokenid-store if the tokens are synchronized already",
+)
 @click.option(
     "--smooth-token-cache-path",
     type=click.Path(exists=True, readable=True, dir_okay=True, writable=True),
@@ -265,6 +297,7 @@ def export_nft_tokenids(
     max_workers,
     print_sql,
     smooth_mode,
+    tokenid_store_dir,
     smooth_token_cache_path,
 ):
     """Export NFT(ERC721/ERC1155) token-id's changelog."""
@@ -301,12 +334,19 @@ def export_nft_tokenids(
             if smooth_mode
             else None
         )
+        tokenid_store = None
+        if tokenid_store_dir is not None:
+            name = os.path.splitext(os.path.basename(last_synced_block_file))[0]
+            tokenid_store = EthNftTokenidStore(
+                os.path.join(tokenid_store_dir, name + ".db")
+            )
         item_exporter = build_postgres_exporter(
             pg_url,
             gp_schema,
             print_sql,
             threads=pg_threads,
             pool_size=pg_threads + 2,
+            with_tokenid_store=tokenid_store is not None,
         )
         streamer = build_nft_tokenid_streamer(
             chain,
@@ -327,8 +367,13 @@ def export_nft_tokenids(
             smooth_erc20_token_reader=token_reader,
             smooth_exclude_tokens=smooth_exclude_tokens,
             token_service=token_service,
+            tokenid_store=tokenid_store,
         )
-        streamer.stream()
+        try:
+            streamer.stream()
+        finally:
+            if tokenid_store is not None:
+                tokenid_store.close()
 
     if token_file is not None and os.path.exists(token_file):
         tokens = validate_and_read_tokens(token_file)
@@ -54,6 +54,29 @@ from ethereumetl.streaming.eth_txpool_adapter import EthTxpoolAdapter
     type=int,
     help="How many seconds to sleep between syncs",
 )
+@click.option(
+    "--pending-filter",
+    is_flag=True,
+    show_default=True,
+    help="Poll the new pending transactions by eth_newPendingTransactionFilter, "
+    "instead of the whole txpool_content every period",
+)
+@click.option(
+    "--full-sync-every",
+    default=30,
+    show_default=True,
+    type=int,
+    help="With --pending-filter, diff the whole txpool_content every N polls, "
+    "to find the dropped transactions",
+)
+@click.option(
+    "-B",
+    "--batch-size",
+    default=100,
+    show_default=True,
+    type=int,
+    help="How many transactions to request in one JSON-RPC batch",
+)
 @click.option(
     "-w",
     "--max-workers",
@@ -75,10 +98,13 @@ def export_txpool(
     db_url,
     db_threads,
     period_seconds,
+    pending_filter,
+    full_sync_every,
+    batch_size,
     max_workers,
     print_sql,
 ):
-    """Export Txpool's info to DataBase."""
+    """Export Txpool's changes(added, replaced and dropped) to DataBase."""
 
     provider_uri = pick_random_provider_uri(provider_uri)
     logging.info("Using provider: " + provider_uri)
@@ -107,6 +133,9 @@ def export_txpool(
         ),
         chain=chain,
         max_workers=max_workers,
+        batch_size=batch_size,
+        pending_filter=pending_filter,
+        full_sync_every=full_sync_every,
     )
 
     streamer = Streamer(
@@ -9,7 +9,10 @@ from blockchainetl.thread_local_proxy import ThreadLocalProxy
 from ethereumetl.jobs.exporters.tokens_item_exporter import tokens_item_exporter
 from ethereumetl.jobs.extract_tokens_job import ExtractTokensJob
 from ethereumetl.providers.auto import get_provider_from_uri
-from ethereumetl.service.eth_contract_service import EthContractService
+from ethereumetl.service.eth_contract_service import (
+    EthContractService,
+    ContractWrapper,
+)
 
 
 @click.command(context_settings=dict(help_option_names=["-h", "--help"]))
@@ -119,8 +122,9 @@ ORDER BY
                 function_sighashes = [e for e in function_sighashes if len(e) > 0]
             if len(function_sighashes or []) == 0:
                 function_sighashes = contract_service.get_function_sighashes(bytecode)
-            is_erc20 = contract_service.is_erc20_contract(function_sighashes)
-            is_erc721 = contract_service.is_erc721_contract(function_sighashes)
+            wrapper = ContractWrapper(function_sighashes)
+            is_erc20 = contract_service.is_erc20_contract(wrapper)
+            is_erc721 = contract_service.is_erc721_contract(wrapper)
             contracts.append(
                 {
                     "type": "contract",
@@ -28,6 +28,7 @@ from datetime import datetime
 from blockchainetl.file_utils import smart_open
 from ethereumetl.providers.auto import new_web3_provider
 from ethereumetl.service.eth_service import EthService
+from blockchainetl.service.block_timestamp_index import open_block_timestamp_index
 from ethereumetl.utils import check_classic_provider_uri
 
 
@@ -65,11 +66,22 @@ from ethereumetl.utils import check_classic_provider_uri
     type=str,
     help="The chain network to connect to.",
 )
-def get_block_range_for_date(provider_uri, date, output, chain="ethereum"):
+@click.option(
+    "--block-timestamp-index-path",
+    type=click.Path(exists=True, readable=True, dir_okay=False),
+    envvar="BLOCKCHAIN_ETL_BLOCK_TIMESTAMP_INDEX_PATH",
+    help="The file of the per block timestamps written by dump, "
+    "the blocks past it are searched by RPC",
+)
+def get_block_range_for_date(
+    provider_uri, date, output, chain="ethereum", block_timestamp_index_path=None
+):
     """Outputs start and end blocks for given date."""
     provider_uri = check_classic_provider_uri(chain, provider_uri)
     web3 = new_web3_provider(provider_uri, chain)
-    eth_service = EthService(web3)
+    eth_service = EthService(
+        web3, open_block_timestamp_index(block_timestamp_index_path)
+    )
 
     start_block, end_block = eth_service.get_block_range_for_date(date)
 
@@ -28,6 +28,7 @@ from web3 import Web3
 from blockchainetl.file_utils import smart_open
 from ethereumetl.providers.auto import get_provider_from_uri
 from ethereumetl.service.eth_service import EthService
+from blockchainetl.service.block_timestamp_index import open_block_timestamp_index
 from ethereumetl.utils import check_classic_provider_uri
 
 
@@ -71,14 +72,28 @@ from ethereumetl.utils import check_classic_provider_uri
     type=str,
     help="The chain network to connect to.",
 )
+@click.option(
+    "--block-timestamp-index-path",
+    type=click.Path(exists=True, readable=True, dir_okay=False),
+    envvar="BLOCKCHAIN_ETL_BLOCK_TIMESTAMP_INDEX_PATH",
+    help="The file of the per block timestamps written by dump, "
+    "the blocks past it are searched by RPC",
+)
 def get_block_range_for_timestamps(
-    provider_uri, start_timestamp, end_timestamp, output, chain="ethereum"
+    provider_uri,
+    start_timestamp,
+    end_timestamp,
+    output,
+    chain="ethereum",
+    block_timestamp_index_path=None,
 ):
     """Outputs start and end blocks for given timestamps."""
     provider_uri = check_classic_provider_uri(chain, provider_uri)
     provider = get_provider_from_uri(provider_uri)
     web3 = Web3(provider)
-    eth_service = EthService(web3)
+    eth_service = EthService(
+        web3, open_block_timestamp_index(block_timestamp_index_path)
+    )
 
     start_block, end_block = eth_service.get_block_range_for_timestamps(
         start_timestamp, end_timestamp
@@ -1,6 +1,8 @@
 import logging
 import psycopg2
 from time import time
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any, Iterable, Optional
 from datetime import datetime, timezone
 
@@ -17,6 +19,10 @@ from ethereumetl.enumeration.column_type import ColumnType as EthColumnType
 
 class Checker(object):
     diff_rows = None
+    # set by the CheckScheduler, to limit the concurrent queries,
+    # and to re-ETL the faulty blocks along with the other entity types
+    db_semaphore = None
+    autofix_pool = None
 
     def __init__(
         self,
@@ -116,12 +122,21 @@ class Checker(object):
             logging.info(sql)
 
         engine = self.ro_engine if is_readonly else self.rw_engine
-        return engine.execute(sql)
+        if self.db_semaphore is None:
+            return engine.execute(sql)
+        with self.db_semaphore:
+            return engine.execute(sql)
 
     def easyetl(
-        self, st_day: str, entity_type: EntityType, blocks: Iterable[int]
+        self,
+        st_day: str,
+        entity_type: EntityType,
+        blocks: Iterable[int],
+        workers: int = 1,
     ) -> int:
         blocks = set(list(blocks))
+        if self.autofix_pool is not None:
+            return self.autofix_pool.submit(st_day, entity_type, blocks)
         if len(blocks) == 0:
             return 0
 
@@ -140,8 +155,15 @@ class Checker(object):
             gp_table=entity_type,
             load_into_db=True,
         )
+        # the workers share one connection, load into it one at a time
+        saver_lock = Lock()
+
+        def locked_df_saver(*args):
+            with saver_lock:
+                return df_saver(*args)
 
         def etl(start_block, end_block):
+            st = time()
             easy_etl(
                 self.chain,
                 self.provider_uri,
@@ -150,26 +172,37 @@ class Checker(object):
                 self.output,
                 batch_size=self.batch_size,
                 max_workers=self.max_workers,
-                df_saver=df_saver,
+                df_saver=locked_df_saver,
                 is_geth_provider=self.is_geth_provider,
                 check_transaction_consistency=self.check_transaction_consistency,
                 ignore_receipt_missing_error=self.ignore_receipt_missing_error,
             )
+            return time_elapsed(st)
 
         finished = 0
-        for block_range in block_ranges:
-            start_block, end_block = block_range[0], block_range[-1]
-            st = time()
-            etl(start_block, end_block)
-            finished += len(block_range)
-            logging.info(
-                f"finish easyetl @{st_day} {start_block, end_block} "
-                f"stat: #{finished}/#{len(blocks)} "
-                f"for entity type: {entity_type} elapsed: {time_elapsed(st)}"
-            )
+        with ThreadPoolExecutor(max(workers, 1)) as executor:
+            futures = {
+                executor.submit(etl, block_range[0], block_range[-1]): block_range
+                for block_range in block_ranges
+            }
+            for future in as_completed(futures):
+                block_range = futures[future]
+                start_block, end_block = block_range[0], block_range[-1]
+                elapsed = future.result()
+                finished += len(block_range)
+                logging.info(
+                    f"finish easyetl @{st_day} {start_block, end_block} "
+                    f"stat: #{finished}/#{len(blocks)} "
+                    f"for entity type: {entity_type} elapsed: {elapsed}"
+                )
 
         return len(blocks)
 
+    def close(self):
+        self.gp_conn.close()
+        self.rw_engine.dispose()
+        self.ro_engine.dispose()
+
     def _check(
         self,
         st_day: str,
@@ -0,0 +1,240 @@
+import logging
+from time import time
+from typing import Dict, List, Optional, Tuple
+
+from blockchainetl.utils import time_elapsed
+from blockchainetl.enumeration.entity_type import EntityType
+from ethereumetl.streaming.eth_block_count_index import EthBlockCountIndex
+from . import Checker
+
+# the txs with traces, plus the duplicated traces(as the EthTraceChecker's
+# trace_count <> trace_distinct_count), so a duplicated trace fails the digest
+TRACE_COUNT_EXPR = (
+    "count(DISTINCT txhash) + count(*) - count(DISTINCT (txhash, trace_address))"
+)
+
+# entity type -> (table, per block count, extra condition, expected count column)
+DIGEST_SPECS: Dict[str, Tuple[str, str, Optional[str], Optional[str]]] = {
+    EntityType.BLOCK: ("blocks", "count(*)", None, None),
+    EntityType.TRANSACTION: ("txs", "count(*)", "txhash is not null", "tx_count"),
+    EntityType.LOG: ("logs", "count(*)", None, "log_count"),
+    EntityType.TRACE: (
+        "traces",
+        TRACE_COUNT_EXPR,
+        "txhash is not null "
+        "AND txhash <> '0x0000000000000000000000000000000000000000000000000000000000000000'",
+        "tx_count",
+    ),
+}
+
+# the digest of a range is (sum(cnt), sum(blknum * cnt), sum(blknum^2 * cnt)),
+# a missing row and a duplicated one in another block won't cancel out
+SQL_RANGE_DIGEST = r"""
+WITH counts AS (
+    SELECT
+        blknum,
+        {{count_expr}} AS cnt
+    FROM
+        "{{gp_schema}}".{{table}}
+    WHERE
+{% if check_by_date %}
+        _st_day >= '{{st_day}}' AND _st_day <= '{{et_day}}'
+{% else %}
+        _st >= {{st}} AND _st <= {{et}}
+{% endif %}
+        AND blknum >= {{st_blk}} AND blknum <= {{et_blk}}
+{% if parents %}
+        AND blknum / {{parent_width}} IN ({{parents | join(',')}})
+{% endif %}
+{% if condition %}
+        AND {{condition}}
+{% endif %}
+    GROUP BY
+        blknum
+)
+SELECT
+    blknum / {{width}} AS bucket,
+    sum(cnt) AS cnt,
+    sum(blknum * cnt) AS s1,
+    sum(blknum::numeric * blknum * cnt) AS s2
+FROM
+    counts
+GROUP BY
+    1
+"""
+
+Digest = Tuple[int, int, int]
+
+
+class DigestChecker(object):
+    """Check an entity type against the expected per block counts.
+
+    The block range is split into `fanout` aligned buckets, only the buckets
+    whose digest differs from the expected one are split again, so the faulty
+    blocks are found in O(log(n)) queries, each one returning at most `fanout`
+    digests per faulty bucket. Falls back to the wrapped checker if the count
+    index doesn't cover the block range.
+    """
+
+    def __init__(
+        self,
+        checker: Checker,
+        entity_type: str,
+        count_index: Optional[EthBlockCountIndex],
+        fanout: int = 16,
+        autofix_workers: int = 1,
+    ):
+        if entity_type not in DIGEST_SPECS:
+            raise ValueError(f"digest check is not supported for {entity_type}")
+        if fanout < 2:
+            raise ValueError("fanout should be greater than 1")
+
+        self.checker = checker
+        self.entity_type = entity_type
+        self.count_index = count_index
+        self.fanout = fanout
+        self.autofix_workers = autofix_workers
+        self.faulty_blocks: List[int] = []
+
+    def check(
+        self,
+        st_day: str,
+        et_day: str,
+        st: Optional[int] = None,
+        et: Optional[int] = None,
+        st_blk: Optional[int] = None,
+        et_blk: Optional[int] = None,
+    ) -> bool:
+        expected = self._expected_counts(st_blk, et_blk)
+        if expected is None:
+            return self.checker.check(st_day, et_day, st, et, st_blk, et_blk)
+
+        self.faulty_blocks = self._bisect(
+            expected, st_day, et_day, st, et, st_blk, et_blk
+        )
+        return len(self.faulty_blocks) == 0
+
+    def autofix(
+        self,
+        st_day: str,
+        et_day: str,
+        st: Optional[int] = None,
+        et: Optional[int] = None,
+        st_blk: Optional[int] = None,
+        et_blk: Optional[int] = None,
+    ):
+        expected = self._expected_counts(st_blk, et_blk)
+        if expected is None:
+            return self.checker.autofix(st_day, et_day, st, et, st_blk, et_blk)
+
+        deleted = self.checker._delete_duplicated(
+            st_day, et_day, st, et, st_blk, et_blk
+        )
+        # delete it first, refetch the faulty blocks
+        self.faulty_blocks = self._bisect(
+            expected, st_day, et_day, st, et, st_blk, et_blk
+        )
+        inserted = self.checker.easyetl(
+            st_day, self.entity_type, self.faulty_blocks, workers=self.autofix_workers
+        )
+        deleted += self.checker._delete_duplicated(
+            st_day, et_day, st, et, st_blk, et_blk
+        )
+        return {"deleted": deleted, "inserted": inserted}
+
+    def close(self):
+        self.checker.close()
+
+    def _expected_counts(
+        self, st_blk: Optional[int], et_blk: Optional[int]
+    ) -> Optional[Dict[int, int]]:
+        if st_blk is None or et_blk is None:
+            return None
+
+        column = DIGEST_SPECS[self.entity_type][3]
+        if column is None:
+            return {blknum: 1 for blknum in range(st_blk, et_blk + 1)}
+        if self.count_index is None:
+            return None
+
+        counts = self.count_index.counts(column, st_blk, et_blk)
+        if len(counts) != et_blk - st_blk + 1:
+            logging.info(
+                f"count index has #{len(counts)} of #{et_blk - st_blk + 1} blocks "
+                f"in {st_blk, et_blk}, fallback to {self.entity_type} full check"
+            )
+            return None
+        return counts
+
+    def _bisect(
+        self,
+        expected: Dict[int, int],
+        st_day: str,
+        et_day: str,
+        st: Optional[int],
+        et: Optional[int],
+        st_blk: int,
+        et_blk: int,
+    ) -> List[int]:
+        st0 = time()
+        table, count_expr, condition, _ = DIGEST_SPECS[self.entity_type]
+
+        width = 1
+        while width * self.fanout < et_blk - st_blk + 1:
+            width *= self.fanout
+
+        queries = 0
+        parents: Optional[List[int]] = None
+        while True:
+            rows = self.checker.execute(
+                SQL_RANGE_DIGEST,
+                st_day,
+                et_day,
+                st,
+                et,
+                st_blk,
+                et_blk,
+                table=table,
+                count_expr=count_expr,
+                condition=condition,
+                width=width,
+                parent_width=width * self.fanout,
+                parents=parents,
+            ).fetchall()
+            queries += 1
+
+            actual = {
+                row["bucket"]: (int(row["cnt"]), int(row["s1"]), int(row["s2"]))
+                for row in rows
+            }
+            wanted = self._digests(expected, width, parents)
+            faulty = sorted(
+                bucket
+                for bucket in set(actual) | set(wanted)
+                if actual.get(bucket, (0, 0, 0)) != wanted.get(bucket, (0, 0, 0))
+            )
+            if width == 1 or len(faulty) == 0:
+                break
+            parents = faulty
+            width //= self.fanout
+
+        logging.info(
+            f"PERF digest check {self.entity_type} blocks={st_blk, et_blk} "
+            f"queries={queries} faulty=#{len(faulty)} elapsed={time_elapsed(st0)}"
+        )
+        return faulty
+
+    def _digests(
+        self, expected: Dict[int, int], width: int, parents: Optional[List[int]]
+    ) -> Dict[int, Digest]:
+        parent_width = width * self.fanout
+        parent_set = set(parents) if parents is not None else None
+        digests: Dict[int, List[int]] = {}
+        for blknum, cnt in expected.items():
+            if parent_set is not None and blknum // parent_width not in parent_set:
+                continue
+            digest = digests.setdefault(blknum // width, [0, 0, 0])
+            digest[0] += cnt
+            digest[1] += blknum * cnt
+            digest[2] += blknum * blknum * cnt
+        return {k: tuple(v) for k, v in digests.items() if v[0] != 0}
@@ -0,0 +1,407 @@
+import os
+import json
+import logging
+import threading
+from time import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+
+import psycopg2
+
+from blockchainetl.utils import chunkify, time_elapsed
+from blockchainetl.enumeration.chain import Chain
+from blockchainetl.misc.easy_etl import easy_df_saver
+from ethereumetl.misc.easy_etl import easy_etl
+from ethereumetl.enumeration.column_type import ColumnType as EthColumnType
+from . import Checker
+from .digest_checker import DigestChecker
+
+AnyChecker = Union[Checker, DigestChecker]
+
+
+class CheckCheckpoint(object):
+    """The finished (day, entity type) checks, persisted in a json file"""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._lock = threading.Lock()
+        self._done: Dict[str, Any] = {}
+        if path is not None and os.path.exists(path):
+            with open(path) as fr:
+                self._done = json.load(fr)
+
+    @staticmethod
+    def _key(st_day: str, entity_type: str) -> str:
+        return f"{st_day}/{entity_type}"
+
+    def done(self, st_day: str, entity_type: str) -> bool:
+        with self._lock:
+            return self._key(st_day, entity_type) in self._done
+
+    def mark(self, st_day: str, entity_type: str, result: Any):
+        with self._lock:
+            self._done[self._key(st_day, entity_type)] = result
+            if self.path is None:
+                return
+            # write then rename, an interrupted write won't corrupt the checkpoint
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as fw:
+                json.dump(self._done, fw, default=str)
+            os.replace(tmp, self.path)
+
+
+class _Round(object):
+    def __init__(self, participants: Set[str]):
+        self.participants = participants
+        self.requests: Dict[str, Set[int]] = {}
+        self.results: Dict[str, int] = {}
+        self.error: Optional[BaseException] = None
+        self.finished = False
+
+
+class AutofixPool(object):
+    """Re-ETL the faulty blocks of the checkers in a shared pool of workers.
+
+    The checkers fixing the same day join the pool first, Checker.easyetl then
+    submits its blocks and waits until every other participant has submitted
+    or left. A block needed by several entity types of a round is fetched only
+    once, with all of them, and the block ranges of all the days are run in the
+    same pool of workers.
+    """
+
+    def __init__(
+        self,
+        chain: Chain,
+        provider_uri: str,
+        output: str,
+        db_rw_url: str,
+        is_geth_provider: bool = True,
+        batch_size: int = 10,
+        max_workers: int = 2,
+        workers: int = 4,
+        load_concurrency: int = 1,
+        check_transaction_consistency=False,
+        ignore_receipt_missing_error=False,
+    ):
+        self.chain = chain
+        self.provider_uri = provider_uri
+        self.output = output
+        self.db_rw_url = db_rw_url
+        self.is_geth_provider = is_geth_provider
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.check_transaction_consistency = check_transaction_consistency
+        self.ignore_receipt_missing_error = ignore_receipt_missing_error
+        self._executor = ThreadPoolExecutor(max(workers, 1))
+        # GreenPlum doesn't like concurrent loads
+        self._load_semaphore = threading.Semaphore(max(load_concurrency, 1))
+        self._local = threading.local()
+        self._conns: List[Any] = []
+        self._cond = threading.Condition()
+        self._rounds: Dict[str, _Round] = {}
+
+    def join(self, st_day: str, entity_type: str):
+        with self._cond:
+            self._rounds.setdefault(st_day, _Round(set())).participants.add(entity_type)
+
+    def leave(self, st_day: str, entity_type: str):
+        with self._cond:
+            r = self._rounds.get(st_day)
+            if r is None:
+                return
+            r.participants.discard(entity_type)
+            ready = self._pop_if_ready(st_day, r)
+        if ready is not None:
+            self._dispatch(st_day, ready)
+
+    def submit(self, st_day: str, entity_type: str, blocks: Set[int]) -> int:
+        with self._cond:
+            r = self._rounds.setdefault(st_day, _Round({entity_type}))
+            r.participants.add(entity_type)
+            r.requests[entity_type] = set(blocks)
+            ready = self._pop_if_ready(st_day, r)
+        if ready is not None:
+            self._dispatch(st_day, ready)
+
+        with self._cond:
+            self._cond.wait_for(lambda: r.finished)
+        if r.error is not None:
+            raise Exception(r.error)
+        return r.results.get(entity_type, 0)
+
+    def _pop_if_ready(self, st_day: str, r: _Round) -> Optional[_Round]:
+        if not r.participants.issubset(r.requests.keys()):
+            return None
+        del self._rounds[st_day]
+        if len(r.requests) == 0:
+            return None
+        # the participants still fixing may submit again in the next round
+        self._rounds[st_day] = _Round(set(r.participants))
+        return r
+
+    def _dispatch(self, st_day: str, r: _Round):
+        try:
+            r.results = self._run(st_day, r.requests)
+        except BaseException as e:
+            r.error = e
+        with self._cond:
+            r.finished = True
+            self._cond.notify_all()
+
+    def _run(self, st_day: str, requests: Dict[str, Set[int]]) -> Dict[str, int]:
+        st0 = time()
+        entity_types_of: Dict[int, Set[str]] = defaultdict(set)
+        for entity_type, blocks in requests.items():
+            for blknum in blocks:
+                entity_types_of[blknum].add(entity_type)
+        if len(entity_types_of) == 0:
+            return {entity_type: 0 for entity_type in requests}
+
+        # only the blocks needing the same entity types are fetched together
+        groups: Dict[Tuple[str, ...], List[int]] = defaultdict(list)
+        for blknum, entity_types in entity_types_of.items():
+            groups[tuple(sorted(entity_types))].append(blknum)
+
+        futures = {}
+        for entity_types, blocks in groups.items():
+            for block_range in chunkify(blocks, self.batch_size):
+                f = self._executor.submit(
+                    self._etl, entity_types, block_range[0], block_range[-1]
+                )
+                futures[f] = (entity_types, block_range)
+
+        finished = 0
+        for f in as_completed(futures):
+            entity_types, block_range = futures[f]
+            f.result()
+            finished += len(block_range)
+            logging.info(
+                f"finish easyetl @{st_day} {block_range[0], block_range[-1]} "
+                f"stat: #{finished}/#{len(entity_types_of)} "
+                f"for entity types: {entity_types}"
+            )
+
+        requested = sum(len(e) for e in requests.values())
+        logging.info(
+            f"PERF autofix @{st_day} requested=#{requested} "
+            f"fetched=#{len(entity_types_of)} groups={list(groups)} "
+            f"elapsed={time_elapsed(st0)}"
+        )
+        return {entity_type: len(blocks) for entity_type, blocks in requests.items()}
+
+    def _etl(self, entity_types: Tuple[str, ...], start_block: int, end_block: int):
+        easy_etl(
+            self.chain,
+            self.provider_uri,
+            (start_block, end_block),
+            list(entity_types),
+            self.output,
+            batch_size=self.batch_size,
+            max_workers=self.max_workers,
+            df_saver=self._save,
+            is_geth_provider=self.is_geth_provider,
+            check_transaction_consistency=self.check_transaction_consistency,
+            ignore_receipt_missing_error=self.ignore_receipt_missing_error,
+        )
+
+    def _save(self, df, block_num: int, entity_type: str) -> int:
+        # one connection per worker thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = psycopg2.connect(self.db_rw_url)
+            self._conns.append(conn)
+
+        df_saver = easy_df_saver(
+            self.chain,
+            entity_type,
+            EthColumnType(),
+            gp_conn=conn,
+            gp_schema=self.chain,
+            gp_table=entity_type,
+            load_into_db=True,
+        )
+        with self._load_semaphore:
+            return df_saver(df, block_num, entity_type)
+
+    def close(self):
+        self._executor.shutdown()
+        for conn in self._conns:
+            conn.close()
+
+
+class CheckScheduler(object):
+    """Check and autofix multiple days concurrently.
+
+    `concurrency` days are run at the same time, while the queries of all the
+    checkers are limited by `db_concurrency`. The entity types of a day are
+    checked concurrently, the failed ones are fixed together in the
+    AutofixPool(a block needed by several of them is fetched once), then all
+    the ones after the first fixed entity type in the dependency order(as given
+    by entity_types) are checked again, at most `max_rounds` rounds a day. The
+    finished (day, entity type) are checkpointed, so an interrupted run resumes
+    from the unfinished ones.
+    """
+
+    def __init__(
+        self,
+        checker_factory: Callable[[str], AnyChecker],
+        entity_types: List[str],
+        block_range_of: Callable[[date], Tuple[int, int]],
+        autofix_pool: Optional[AutofixPool],
+        concurrency: int = 1,
+        db_concurrency: int = 2,
+        checkpoint_file: Optional[str] = None,
+        dryrun: bool = False,
+        max_rounds: int = 5,
+    ):
+        self.checker_factory = checker_factory
+        self.entity_types = entity_types
+        self.block_range_of = block_range_of
+        self.autofix_pool = autofix_pool
+        self.concurrency = concurrency
+        self.db_semaphore = threading.Semaphore(max(db_concurrency, 1))
+        self.checkpoint = CheckCheckpoint(checkpoint_file)
+        self.dryrun = dryrun
+        self.max_rounds = max(max_rounds, 1)
+        self._rpc_lock = threading.Lock()
+
+    def run(self, days: List[date]):
+        with ThreadPoolExecutor(max(self.concurrency, 1)) as executor:
+            futures = {executor.submit(self._run_day, day): day for day in days}
+            for f in as_completed(futures):
+                f.result()
+
+    def _new_checker(self, entity_type: str) -> AnyChecker:
+        checker = self.checker_factory(entity_type)
+        base = checker.checker if isinstance(checker, DigestChecker) else checker
+        base.db_semaphore = self.db_semaphore
+        base.autofix_pool = self.autofix_pool
+        return checker
+
+    def _run_day(self, day: date):
+        st_day = day.strftime("%Y-%m-%d")
+        pending = [e for e in self.entity_types if not self.checkpoint.done(st_day, e)]
+        if len(pending) == 0:
+            logging.info(f"skip checked {st_day}, all finished in the checkpoint")
+            return
+
+        with self._rpc_lock:
+            st_blk, et_blk = self.block_range_of(day)
+        logging.info(f"block range on {st_day} is {st_blk, et_blk}")
+        st = int(datetime.combine(day, datetime.min.time(), timezone.utc).timestamp())
+        et = st + 86400 - 1
+
+        fixed: Dict[str, Any] = {}
+        with ThreadPoolExecutor(len(pending)) as executor:
+            for i in range(self.max_rounds):
+                if len(pending) == 0:
+                    break
+                checkers = {e: self._new_checker(e) for e in pending}
+                try:
+                    pending = self._check_and_fix(
+                        executor,
+                        checkers,
+                        fixed,
+                        i == self.max_rounds - 1,
+                        st_day,
+                        st,
+                        et,
+                        st_blk,
+                        et_blk,
+                    )
+                finally:
+                    for checker in checkers.values():
+                        checker.close()
+
+    def _check_and_fix(
+        self,
+        executor: ThreadPoolExecutor,
+        checkers: Dict[str, AnyChecker],
+        fixed: Dict[str, Any],
+        last_round: bool,
+        st_day: str,
+        st: int,
+        et: int,
+        st_blk: int,
+        et_blk: int,
+    ) -> List[str]:
+        """Check the entity types concurrently and fix the failed ones together,
+        return the entity types to be checked again, the latest fix of each
+        entity type is kept in `fixed`"""
+        st0 = time()
+        passed = dict(
+            zip(
+                checkers,
+                executor.map(
+                    lambda c: c.check(st_day, st_day, st, et, st_blk, et_blk),
+                    checkers.values(),
+                ),
+            )
+        )
+        st1 = time()
+        failed = [e for e, success in passed.items() if not success]
+        fixed_now: Dict[str, Any] = {}
+        if len(failed) > 0 and not self.dryrun:
+            # all of them join before any submits, to share the round of the pool
+            if self.autofix_pool is not None:
+                for entity_type in failed:
+                    self.autofix_pool.join(st_day, entity_type)
+            fixed_now = dict(
+                zip(
+                    failed,
+                    executor.map(
+                        lambda e: self._autofix(checkers[e], e, st_day, st_blk, et_blk),
+                        failed,
+                    ),
+                )
+            )
+            fixed.update(fixed_now)
+
+        # a child entity(eg: transactions) is joined with its parents(eg: blocks),
+        # it may pass against the gaps of the parents, or be fixed from a missing
+        # list computed while the parents' rows were still absent(eg: the
+        # transactions of a missing block), so check all of them again
+        again: List[str] = []
+        if len(fixed_now) > 0:
+            first = min(self.entity_types.index(e) for e in fixed_now)
+            again = [e for e in passed if self.entity_types.index(e) > first]
+            if last_round and len(again) > 0:
+                logging.warning(
+                    f"check {again}@{st_day} not checked again after fixed: "
+                    f"{list(fixed_now)}, reached the max rounds: {self.max_rounds}"
+                )
+                again = []
+
+        for entity_type, success in passed.items():
+            if entity_type in again:
+                continue
+            logging.info(
+                f"check {entity_type}@{st_day} need-autofix: {not success} "
+                f"fixed: {fixed.get(entity_type)} (elapsed: "
+                f"{time_elapsed(st0, st1)}s, {time_elapsed(st1)}s)"
+            )
+            if not self.dryrun:
+                self.checkpoint.mark(
+                    st_day,
+                    entity_type,
+                    {"passed": success, "fixed": fixed.get(entity_type)},
+                )
+        if len(again) > 0:
+            logging.info(f"check {again}@{st_day} again after fixed: {list(fixed_now)}")
+        return again
+
+    def _autofix(
+        self,
+        checker: AnyChecker,
+        entity_type: str,
+        st_day: str,
+        st_blk: int,
+        et_blk: int,
+    ):
+        try:
+            return checker.autofix(st_day, st_day, st_blk=st_blk, et_blk=et_blk)
+        finally:
+            if self.autofix_pool is not None:
+                self.autofix_pool.leave(st_day, entity_type)
@@ -28,7 +28,10 @@ from blockchainetl.jobs.base_job import BaseJob
 from ethereumetl.json_rpc_requests import generate_get_code_json_rpc
 from ethereumetl.mappers.contract_mapper import EthContractMapper
 
-from ethereumetl.service.eth_contract_service import EthContractService
+from ethereumetl.service.eth_contract_service import (
+    EthContractService,
+    ContractWrapper,
+)
 from blockchainetl.utils import rpc_response_to_result
 
 
@@ -88,10 +91,9 @@ class ExportContractsJob(BaseJob):
         function_sighashes = self.contract_service.get_function_sighashes(bytecode)
 
         contract.function_sighashes = function_sighashes
-        contract.is_erc20 = self.contract_service.is_erc20_contract(function_sighashes)
-        contract.is_erc721 = self.contract_service.is_erc721_contract(
-            function_sighashes
-        )
+        wrapper = ContractWrapper(function_sighashes)
+        contract.is_erc20 = self.contract_service.is_erc20_contract(wrapper)
+        contract.is_erc721 = self.contract_service.is_erc721_contract(wrapper)
 
         return contract
 
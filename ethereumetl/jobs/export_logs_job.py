@@ -2,7 +2,11 @@ import json
 from typing import Optional, List, Union
 
 from blockchainetl.executors.batch_work_executor import BatchWorkExecutor
-from blockchainetl.utils import rpc_response_to_result, validate_range
+from blockchainetl.utils import (
+    rpc_response_batch_to_results,
+    to_contiguous_ranges,
+    validate_range,
+)
 from blockchainetl.jobs.base_job import BaseJob
 from ethereumetl.json_rpc_requests import generate_get_log_by_number_json_rpc
 from ethereumetl.providers.rpc import BatchHTTPProvider
@@ -43,13 +47,24 @@ class ExportLogsJob(BaseJob):
         self.batch_work_executor.execute(self.blocks, self._export_batch)
 
     def _export_batch(self, block_number_batch):
-        from_block, to_block = block_number_batch[0], block_number_batch[-1]
-        logs_rpc = generate_get_log_by_number_json_rpc(
-            from_block, to_block, self.topics, self.address
-        )
+        # the blocks may be not contiguous(eg: prefiltered by the logsBloom),
+        # request each contiguous range of them, in one batch request
+        logs_rpc = [
+            generate_get_log_by_number_json_rpc(
+                from_block, to_block, self.topics, self.address
+            )
+            for from_block, to_block in to_contiguous_ranges(block_number_batch)
+        ]
+        if len(logs_rpc) == 1:
+            logs_rpc = logs_rpc[0]
         response = self.batch_web3_provider.make_batch_request(json.dumps(logs_rpc))
-        results = rpc_response_to_result(response)
-        logs = [self.log_mapper.json_dict_to_log(result) for result in results]
+        if isinstance(response, list):
+            response = sorted(response, key=lambda e: e.get("id") or 0)
+        logs = [
+            self.log_mapper.json_dict_to_log(result)
+            for results in rpc_response_batch_to_results(response, requests=logs_rpc)
+            for result in results
+        ]
 
         for log in logs:
             self.item_exporter.export_item(self.log_mapper.log_to_dict(log))
@@ -30,11 +30,16 @@ from ethereumetl.service.eth_token_service import EthTokenService
 
 class ExportTokensJob(BaseJob):
     def __init__(
-        self, web3: Web3, item_exporter, token_addresses_iterable, max_workers
+        self,
+        web3: Web3,
+        item_exporter,
+        token_addresses_iterable,
+        max_workers,
+        batch_size=100,
     ):
         self.item_exporter = item_exporter
         self.token_addresses_iterable = token_addresses_iterable
-        self.batch_work_executor = BatchWorkExecutor(1, max_workers)
+        self.batch_work_executor = BatchWorkExecutor(batch_size, max_workers)
 
         self.token_service = EthTokenService(web3, clean_user_provided_content)
         self.token_mapper = EthTokenMapper()
@@ -48,6 +53,8 @@ class ExportTokensJob(BaseJob):
         )
 
     def _export_tokens(self, token_addresses):
+        # resolve the batch together, _export_token reads them from the cache
+        self.token_service.get_tokens(token_addresses, block_number=None)
         for token_address in token_addresses:
             self._export_token(token_address)
 
@@ -117,19 +117,30 @@ class ExportTracesJob(BaseJob):
             daofork_traces = self.special_trace_service.get_daofork_traces()
             all_traces.extend(daofork_traces)
 
+        flattened = False
         if env.IS_FLATCALL_TRACE is True:
             traces = self._export_batch_flatcall(block_number_batch)
         elif env.IS_ARBITRUM_TRACE is True:
             traces = self._export_batch_arbitrum(block_number_batch)
         elif self.is_geth_provider is True:
             traces = self._export_batch_geth(block_number_batch)
+            flattened = True
         else:
             traces = self._export_batch_parity(block_number_batch)
 
-        all_traces.extend(traces)
-
-        calculate_trace_statuses(all_traces)
-        calculate_trace_ids(all_traces)
+        if flattened is True:
+            # the statuses and the transaction scoped ids of the call trees are
+            # calculated while flattening, left the genesis/daofork ones(with
+            # their own transaction hashes) and the block scoped ids
+            calculate_trace_statuses(all_traces)
+            calculate_trace_ids(
+                all_traces + [e for e in traces if not e.transaction_hash]
+            )
+            all_traces.extend(traces)
+        else:
+            all_traces.extend(traces)
+            calculate_trace_statuses(all_traces)
+            calculate_trace_ids(all_traces)
 
         for trace in all_traces:
             self.item_exporter.export_item(self.trace_mapper.trace_to_dict(trace))
@@ -26,7 +26,10 @@ from blockchainetl.executors.batch_work_executor import BatchWorkExecutor
 from blockchainetl.jobs.base_job import BaseJob
 from ethereumetl.mappers.contract_mapper import EthContractMapper
 
-from ethereumetl.service.eth_contract_service import EthContractService
+from ethereumetl.service.eth_contract_service import (
+    EthContractService,
+    ContractWrapper,
+)
 from blockchainetl.utils import to_int_or_none
 
 
@@ -79,12 +82,9 @@ class ExtractContractsJob(BaseJob):
             function_sighashes = self.contract_service.get_function_sighashes(bytecode)
 
             contract.function_sighashes = function_sighashes
-            contract.is_erc20 = self.contract_service.is_erc20_contract(
-                function_sighashes
-            )
-            contract.is_erc721 = self.contract_service.is_erc721_contract(
-                function_sighashes
-            )
+            wrapper = ContractWrapper(function_sighashes)
+            contract.is_erc20 = self.contract_service.is_erc20_contract(wrapper)
+            contract.is_erc721 = self.contract_service.is_erc721_contract(wrapper)
 
             # extracted from GreenPlum
             contract._st = trace.get("_st")
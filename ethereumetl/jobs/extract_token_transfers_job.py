@@ -59,26 +59,31 @@ class ExtractTokenTransfersJob(BaseJob):
         self.batch_work_executor.execute(self.logs_iterable, self._extract_transfers)
 
     def _extract_transfers(self, logs: List[Union[Dict, EthLog]]):
+        token_transfers = []
         for log in logs:
             if isinstance(log, dict):
                 log = self.log_mapper.dict_to_log(log)
-            self._extract_transfer(log)
+            token_transfer = self.token_transfer_extractor.extract_transfer_from_log(
+                log
+            )
+            if token_transfer is not None:
+                token_transfers.append(token_transfer)
 
-    def _extract_transfer(self, log: EthLog):
-        token_transfer = self.token_transfer_extractor.extract_transfer_from_log(log)
-        if token_transfer is None:
-            return
-        if self.token_service is not None:
-            token = self.token_service.get_token(
-                token_transfer.token_address, self.chain
+        if self.token_service is not None and len(token_transfers) > 0:
+            # the unknown tokens of the batch are resolved in one round trip
+            tokens = self.token_service.get_tokens(
+                [e.token_address for e in token_transfers], self.chain
             )
-            token_transfer.name = token.name
-            token_transfer.symbol = token.symbol
-            token_transfer.decimals = token.decimals
+            for token_transfer in token_transfers:
+                token = tokens[token_transfer.token_address]
+                token_transfer.name = token.name
+                token_transfer.symbol = token.symbol
+                token_transfer.decimals = token.decimals
 
-        self.item_exporter.export_item(
-            self.token_transfer_mapper.token_transfer_to_dict(token_transfer)
-        )
+        for token_transfer in token_transfers:
+            self.item_exporter.export_item(
+                self.token_transfer_mapper.token_transfer_to_dict(token_transfer)
+            )
 
     def _end(self):
         self.batch_work_executor.shutdown()
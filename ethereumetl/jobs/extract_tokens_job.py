@@ -21,7 +21,8 @@
 # SOFTWARE.
 
 
-from typing import List, Dict
+from collections import defaultdict
+from typing import List, Dict, Optional
 from blockchainetl.utils import to_int_or_none
 from ethereumetl.jobs.export_tokens_job import ExportTokensJob
 
@@ -49,6 +50,15 @@ class ExtractTokensJob(ExportTokensJob):
             if contract.get("is_erc20") or contract.get("is_erc721")
         ]
 
+        # resolve the tokens created in the same block together,
+        # _export_token reads them from the cache
+        grouped: Dict[Optional[int], List[str]] = defaultdict(list)
+        for contract in contracts:
+            block_number = to_int_or_none(contract["block_number"])
+            grouped[block_number].append(contract["address"])
+        for block_number, token_addresses in grouped.items():
+            self.token_service.get_tokens(token_addresses, block_number=block_number)
+
         for contract in contracts:
             self._export_token(
                 token_address=contract["address"],
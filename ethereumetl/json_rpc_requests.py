@@ -33,6 +33,31 @@ def generate_get_txpool_content_json_rpc() -> Dict[str, str]:
     )
 
 
+def generate_new_pending_transaction_filter_json_rpc() -> Dict[str, str]:
+    return generate_json_rpc(
+        method="eth_newPendingTransactionFilter",
+        params=[],
+    )
+
+
+def generate_get_filter_changes_json_rpc(filter_id: str) -> Dict[str, str]:
+    return generate_json_rpc(
+        method="eth_getFilterChanges",
+        params=[filter_id],
+    )
+
+
+def generate_get_transaction_by_hash_json_rpc(
+    transaction_hashes: List[str],
+) -> Generator[Dict[str, Union[str, int]], None, None]:
+    for idx, transaction_hash in enumerate(transaction_hashes):
+        yield generate_json_rpc(
+            method="eth_getTransactionByHash",
+            params=[transaction_hash],
+            request_id=idx,
+        )
+
+
 def generate_get_block_by_number_json_rpc(
     block_numbers: List[int],
     include_transactions: bool,
@@ -30,6 +30,7 @@ from ethereumetl.domain.geth_trace import EthGethTrace
 from ethereumetl.mainnet_daofork_state_changes import DAOFORK_BLOCK_NUMBER
 from ethereumetl.misc.geth_error_convert import geth_error_to_parity
 from ethereumetl.misc.geth_precompiled_contract import GETH_PRECOMPILED_CONTRACT_RANGE
+from ethereumetl.service.trace_id_calculator import transaction_scoped_trace_id
 
 
 class EthTraceMapper(object):
@@ -151,15 +152,72 @@ class EthTraceMapper(object):
         block_number: Optional[int],
         tx_index: int,
         tx_trace: Dict[str, Any],
-        trace_address: List[int] = [],
-        parent_trace: Optional[EthTrace] = None,
         retain_precompiled_calls: bool = True,
         tx_hashes: Dict[int, str] = dict(),
     ) -> List[EthTrace]:
+        """Flatten the call tree in DFS order with an explicit stack, no matter how
+        deep it is. The status(failed if itself or any ancestor failed) and the
+        transaction scoped trace id are calculated along the way."""
+        transaction_hash = tx_hashes.get(tx_index)
+
+        result = []
+        stack: List[Tuple[Dict[str, Any], List[int], Optional[EthTrace]]] = [
+            (tx_trace, [], None)
+        ]
+        while len(stack) > 0:
+            call, trace_address, parent_trace = stack.pop()
+            trace = self._geth_call_to_trace(
+                block_number, tx_index, transaction_hash, call, parent_trace
+            )
+
+            calls = call.get("calls", [])
+            if retain_precompiled_calls is False and len(calls) > 0:
+                calls = [
+                    sub
+                    for sub in calls
+                    if not (
+                        sub.get("type", "").lower()
+                        in ("call", "callcode", "delegatecall", "staticcall")
+                        and int(sub.get("to", "0x0"), 16)
+                        in GETH_PRECOMPILED_CONTRACT_RANGE
+                    )
+                ]
+
+            trace.subtraces = len(calls)
+            trace.trace_address = trace_address
+            trace.logs = call.get("logs")
+
+            if (trace.error is not None and len(trace.error) > 0) or (
+                parent_trace is not None and parent_trace.status == 0
+            ):
+                trace.status = 0
+            else:
+                trace.status = 1
+
+            # the block scoped ones are indexed later, see calculate_trace_ids
+            if trace.transaction_hash:
+                trace.trace_id = transaction_scoped_trace_id(trace)
+
+            result.append(trace)
+
+            # pushed in reverse, so that the first call is popped first
+            for call_index in range(len(calls) - 1, -1, -1):
+                stack.append((calls[call_index], trace_address + [call_index], trace))
+
+        return result
+
+    def _geth_call_to_trace(
+        self,
+        block_number: Optional[int],
+        tx_index: int,
+        transaction_hash: Optional[str],
+        tx_trace: Dict[str, Any],
+        parent_trace: Optional[EthTrace],
+    ) -> EthTrace:
         trace = EthTrace()
 
         trace.block_number = block_number
-        trace.transaction_hash = tx_hashes.get(tx_index)
+        trace.transaction_hash = transaction_hash
         trace.transaction_index = tx_index
 
         trace.from_address = to_normalized_address(tx_trace.get("from"))
@@ -267,38 +325,7 @@ class EthTraceMapper(object):
         else:
             trace.value = hex_to_dec(tx_trace.get("value"))
 
-        result = [trace]
-
-        calls = tx_trace.get("calls", [])
-        if retain_precompiled_calls is False and len(calls) > 0:
-            calls = [
-                sub
-                for sub in calls
-                if not (
-                    sub.get("type", "").lower()
-                    in ("call", "callcode", "delegatecall", "staticcall")
-                    and int(sub.get("to", "0x0"), 16) in GETH_PRECOMPILED_CONTRACT_RANGE
-                )
-            ]
-
-        trace.subtraces = len(calls)
-        trace.trace_address = trace_address
-        trace.logs = tx_trace.get("logs")
-
-        for call_index, call_trace in enumerate(calls):
-            result.extend(
-                self._iterate_geth_trace(
-                    block_number,
-                    tx_index,
-                    call_trace,
-                    trace_address + [call_index],
-                    trace,
-                    retain_precompiled_calls=retain_precompiled_calls,
-                    tx_hashes=tx_hashes,
-                )
-            )
-
-        return result
+        return trace
 
     def trace_to_dict(self, trace: EthTrace) -> Dict[str, Union[str, int, None, List]]:
         return {
@@ -14,6 +14,9 @@ class EthTxpoolMapper(object):
             txpools.extend(results)
         return txpools
 
+    def json_dict_to_txpool(self, tx: Dict[str, Any], pool_type: str) -> EthTxpool:
+        return self._extract_tx(tx, pool_type)
+
     def _extract_tx(self, tx: Dict[str, Any], pool_type) -> EthTxpool:
         txpool = EthTxpool()
         txpool.hash = tx.get("hash")
@@ -1,4 +1,4 @@
-from typing import Optional, Union, Tuple
+from typing import List, Optional, Union, Tuple
 from blockchainetl.thread_local_proxy import ThreadLocalProxy
 from blockchainetl.enumeration.chain import Chain
 from blockchainetl.enumeration.entity_type import EntityType
@@ -11,7 +11,7 @@ def easy_etl(
     chain: Chain,
     provider_uri: str,
     blknum: Union[int, Tuple[int, int]],
-    entity_type: EntityType,
+    entity_type: Union[EntityType, List[EntityType]],
     output: Optional[str] = None,
     batch_size=10,
     max_workers=1,
@@ -33,7 +33,7 @@ def easy_etl(
         chain=chain,
         batch_size=batch_size,
         max_workers=max_workers,
-        entity_types=[entity_type],
+        entity_types=entity_type if isinstance(entity_type, list) else [entity_type],
         is_geth_provider=is_geth_provider,
         retain_precompiled_calls=retain_precompiled_calls,
         check_transaction_consistency=check_transaction_consistency,
@@ -21,9 +21,14 @@
 # SOFTWARE.
 
 import sys
+import json
+from time import time
+
 from web3 import HTTPProvider
 from web3._utils.request import make_post_request
 
+from blockchainetl.metrics import RPC_LATENCY, RPC_BATCH_SIZE
+
 # This Polygon block's trace raised exception:
 #   RecursionError: blockmaximum recursion depth exceeded while decoding a JSON array from a unicode string
 # {
@@ -39,14 +44,27 @@ sys.setrecursionlimit(3000)
 # Will be removed once batch feature is added to web3.py
 # https://github.com/ethereum/web3.py/issues/832
 class BatchHTTPProvider(HTTPProvider):
+    def make_request(self, method, params):
+        st0 = time()
+        try:
+            return super().make_request(method, params)
+        finally:
+            RPC_LATENCY.labels(method=method).observe(time() - st0)
+
     def make_batch_request(self, text):
         self.logger.debug(
             "Making request HTTP. URI: %s, Request: %s", self.endpoint_uri, text
         )
+        method, size = batch_method_and_size(text)
         request_data = text.encode("utf-8")
-        raw_response = make_post_request(
-            self.endpoint_uri, request_data, **self.get_request_kwargs()
-        )
+        st0 = time()
+        try:
+            raw_response = make_post_request(
+                self.endpoint_uri, request_data, **self.get_request_kwargs()
+            )
+        finally:
+            RPC_LATENCY.labels(method=method).observe(time() - st0)
+        RPC_BATCH_SIZE.labels(method=method).observe(size)
         response = self.decode_rpc_response(raw_response)
         self.logger.debug(
             "Getting response HTTP. URI: %s, " "Request: %s, Response: %s",
@@ -55,3 +73,15 @@ class BatchHTTPProvider(HTTPProvider):
             response,
         )
         return response
+
+
+def batch_method_and_size(text: str):
+    try:
+        request = json.loads(text)
+    except ValueError:
+        return "unknown", 1
+    if isinstance(request, dict):
+        return request.get("method", "unknown"), 1
+    if len(request) == 0:
+        return "unknown", 0
+    return request[0].get("method", "unknown"), len(request)
@@ -19,25 +19,38 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
-from typing import Optional, List, Union
-
+import os
+import hashlib
 import logging
+from functools import lru_cache
+from threading import Lock
+from typing import Dict, Optional, List, Tuple, Union
 
+import diskcache as dc
+from cachetools import LRUCache
 from hexbytes.main import HexBytes
 from eth_utils.address import to_checksum_address
 from eth_utils.abi import function_signature_to_4byte_selector
-from ethereum_dasm.evmdasm import EvmCode, Contract
 from ethereumetl.domain.contract import EthContract
 from web3 import Web3
 
-# ref https://github.com/blockchain-etl/ethereum-etl/pull/267
-logging.getLogger("ethereum_dasm.evmdasm").setLevel(logging.ERROR)
-logging.getLogger("evmdasm.disassembler").setLevel(logging.FATAL)
+from blockchainetl import env
+
+PUSH1 = 0x60
+PUSH4 = 0x63
+PUSH32 = 0x7F
+
+# https://eips.ethereum.org/EIPS/eip-1167
+EIP1167_PREFIX = "363d3d373d3d3d363d73"
+EIP1167_SUFFIX = "5af43d82803e903d91602b57fd5bf3"
 
 
 class EthContractService:
-    def __init__(self, web3: Optional[Web3] = None):
+    def __init__(
+        self, web3: Optional[Web3] = None, cache_path=env.CONTRACT_CODE_CACHE_PATH
+    ):
         self.web3 = web3
+        self.cache = get_code_cache(cache_path)
 
     def get_function_sighashes(
         self, bytecode: Optional[Union[str, HexBytes]]
@@ -46,25 +59,21 @@ class EthContractService:
         if bytecode is None:
             return []
 
-        evm_code = EvmCode(
-            contract=Contract(bytecode=bytecode),
-            static_analysis=False,
-            dynamic_analysis=False,
-        )
-        evm_code.disassemble(bytecode)
-        basic_blocks = evm_code.basicblocks
-
-        push4_instructions = set()
-        for block in basic_blocks:
-            for inst in block.instructions:
-                if inst.name == "PUSH4":
-                    push4_instructions.add("0x" + inst.operand)
-        return sorted(push4_instructions)
+        # most of the contracts are deployed by factories(clones of the same code),
+        # so the selectors are memoized by the hash of the bytecode
+        key = hashlib.blake2b(bytecode.lower().encode(), digest_size=16).digest()
+        sighashes = self.cache.get(key)
+        if sighashes is None:
+            sighashes = scan_function_sighashes(bytecode)
+            self.cache.set(key, sighashes)
+        return list(sighashes)
 
     # https://github.com/ethereum/EIPs/blob/master/EIPS/eip-20.md
     # https://github.com/OpenZeppelin/openzeppelin-solidity/blob/master/contracts/token/ERC20/ERC20.sol
-    def is_erc20_contract(self, function_sighashes: List[str]):
-        c = ContractWrapper(function_sighashes)
+    def is_erc20_contract(
+        self, function_sighashes: Union[List[str], "ContractWrapper"]
+    ):
+        c = ContractWrapper.of(function_sighashes)
         return (
             c.implements("totalSupply()")
             and c.implements("decimals()")
@@ -85,8 +94,10 @@ class EthContractService:
     # transferFrom(address,address,uint256)
     # safeTransferFrom(address,address,uint256)
     # safeTransferFrom(address,address,uint256,bytes)
-    def is_erc721_contract(self, function_sighashes: List[str]):
-        c = ContractWrapper(function_sighashes)
+    def is_erc721_contract(
+        self, function_sighashes: Union[List[str], "ContractWrapper"]
+    ):
+        c = ContractWrapper.of(function_sighashes)
         return (
             c.implements("balanceOf(address)")
             and c.implements("ownerOf(uint256)")
@@ -114,8 +125,9 @@ class EthContractService:
         function_sighashes = self.get_function_sighashes(contract.bytecode)
 
         contract.function_sighashes = function_sighashes
-        contract.is_erc20 = self.is_erc20_contract(function_sighashes)
-        contract.is_erc721 = self.is_erc721_contract(function_sighashes)
+        wrapper = ContractWrapper(function_sighashes)
+        contract.is_erc20 = self.is_erc20_contract(wrapper)
+        contract.is_erc721 = self.is_erc721_contract(wrapper)
 
         return contract
 
@@ -132,13 +144,98 @@ def clean_bytecode(bytecode: Optional[Union[str, HexBytes]]) -> Optional[str]:
         return bytecode
 
 
+def scan_function_sighashes(bytecode: str) -> Tuple[str, ...]:
+    """Collect the PUSH4 operands in one linear pass, the push data is skipped,
+    the same as the instructions disassembled by evmdasm(a truncated PUSH4 at
+    the end is invalid and ignored)."""
+    if eip1167_implementation(bytecode) is not None:
+        return ()
+
+    try:
+        code = bytes.fromhex(bytecode)
+    except ValueError:
+        # odd length or non hex digits
+        logging.warning(f"ignore the malformed bytecode: {bytecode[:64]}...")
+        return ()
+    size = len(code)
+    sighashes = set()
+    pc = 0
+    while pc < size:
+        opcode = code[pc]
+        if PUSH1 <= opcode <= PUSH32:
+            if opcode == PUSH4 and pc + 5 <= size:
+                sighashes.add("0x" + code[pc + 1 : pc + 5].hex())
+            pc += opcode - PUSH1 + 2
+        else:
+            pc += 1
+    return tuple(sorted(sighashes))
+
+
+def eip1167_implementation(bytecode: str) -> Optional[str]:
+    bytecode = bytecode.lower()
+    if (
+        len(bytecode) == len(EIP1167_PREFIX) + 40 + len(EIP1167_SUFFIX)
+        and bytecode.startswith(EIP1167_PREFIX)
+        and bytecode.endswith(EIP1167_SUFFIX)
+    ):
+        return "0x" + bytecode[len(EIP1167_PREFIX) : len(EIP1167_PREFIX) + 40]
+    return None
+
+
+class CodeCache:
+    """Bytecode hash to the function sighashes, a bounded in-process LRU in front
+    of an optional disk cache, shared by the processes and the runs."""
+
+    def __init__(self, cache_path: Optional[str] = None, maxsize: int = 100_000):
+        self._memory = LRUCache(maxsize=maxsize)
+        self._lock = Lock()
+        self._disk = None
+        if cache_path is not None:
+            os.makedirs(cache_path, exist_ok=True)
+            self._disk = dc.Cache(cache_path)
+
+    def get(self, key: bytes) -> Optional[Tuple[str, ...]]:
+        with self._lock:
+            val = self._memory.get(key)
+        if val is None and self._disk is not None:
+            val = self._disk.get(key)
+            if val is not None:
+                with self._lock:
+                    self._memory[key] = val
+        return val
+
+    def set(self, key: bytes, val: Tuple[str, ...]):
+        with self._lock:
+            self._memory[key] = val
+        if self._disk is not None:
+            self._disk.set(key, val)
+
+
+_code_caches: Dict[Optional[str], CodeCache] = {}
+_code_caches_lock = Lock()
+
+
+def get_code_cache(cache_path: Optional[str] = None) -> CodeCache:
+    with _code_caches_lock:
+        if cache_path not in _code_caches:
+            _code_caches[cache_path] = CodeCache(cache_path)
+        return _code_caches[cache_path]
+
+
+@lru_cache(maxsize=None)
 def get_function_sighash(signature: str) -> str:
     return "0x" + function_signature_to_4byte_selector(signature).hex()
 
 
 class ContractWrapper:
     def __init__(self, sighashes):
-        self.sighashes = sighashes
+        self.sighashes = frozenset(sighashes)
+
+    @classmethod
+    def of(cls, sighashes) -> "ContractWrapper":
+        if isinstance(sighashes, ContractWrapper):
+            return sighashes
+        return cls(sighashes)
 
     def implements(self, function_signature: str) -> bool:
         sighash = get_function_sighash(function_signature)
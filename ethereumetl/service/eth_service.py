@@ -22,6 +22,7 @@
 
 
 from datetime import datetime, timezone, timedelta
+from typing import Optional, Tuple
 
 from web3 import Web3
 
@@ -31,14 +32,27 @@ from blockchainetl.service.graph_operations import (
     OutOfBoundsError,
     Point,
 )
+from blockchainetl.service.block_timestamp_index import (
+    BlockTimestampIndex,
+    IndexedBlockTimestampGraph,
+    open_block_timestamp_index,
+)
 from blockchainetl.misc_utils import is_block_range, is_date_range, is_unix_time_range
 
 
 class EthService(object):
-    def __init__(self, web3):
+    def __init__(self, web3, timestamp_index: Optional[BlockTimestampIndex] = None):
         graph = BlockTimestampGraph(web3)
         self._graph_operations = GraphOperations(graph)
 
+        # the blocks below the index's high-water mark are searched without RPC
+        self._timestamp_index = timestamp_index
+        self._indexed_graph_operations = None
+        if timestamp_index is not None:
+            self._indexed_graph_operations = GraphOperations(
+                IndexedBlockTimestampGraph(timestamp_index, first_block=1)
+            )
+
     def get_block_range_for_date(self, date):
         start_datetime = datetime.combine(
             date, datetime.min.time().replace(tzinfo=timezone.utc)
@@ -59,16 +73,12 @@ class EthService(object):
             )
 
         try:
-            start_block_bounds = self._graph_operations.get_bounds_for_y_coordinate(
-                start_timestamp
-            )
+            start_block_bounds = self._get_bounds_for_timestamp(start_timestamp)
         except OutOfBoundsError:
             start_block_bounds = (0, 0)
 
         try:
-            end_block_bounds = self._graph_operations.get_bounds_for_y_coordinate(
-                end_timestamp
-            )
+            end_block_bounds = self._get_bounds_for_timestamp(end_timestamp)
         except OutOfBoundsError as e:
             raise OutOfBoundsError(
                 "The existing blocks do not completely cover the given time range"
@@ -89,6 +99,12 @@ class EthService(object):
 
         return start_block, end_block
 
+    def _get_bounds_for_timestamp(self, timestamp: int) -> Tuple[int, int]:
+        index, operations = self._timestamp_index, self._indexed_graph_operations
+        if index is not None and operations is not None and index.covers(timestamp):
+            return operations.get_bounds_for_y_coordinate(timestamp)
+        return self._graph_operations.get_bounds_for_y_coordinate(timestamp)
+
 
 class BlockTimestampGraph(object):
     def __init__(self, web3: Web3):
@@ -112,7 +128,13 @@ def block_to_point(block):
     return Point(block.number, block.timestamp)
 
 
-def get_partitions(start, end, partition_batch_size, provider_uri):
+def get_partitions(
+    start,
+    end,
+    partition_batch_size,
+    provider_uri,
+    timestamp_index_path: Optional[str] = None,
+):
     """Yield partitions based on input data type."""
     if is_date_range(start, end) or is_unix_time_range(start, end):
         start_date, end_date = None, None
@@ -136,7 +158,7 @@ def get_partitions(start, end, partition_batch_size, provider_uri):
 
         provider = get_provider_from_uri(provider_uri)
         web3 = Web3(provider)
-        eth_service = EthService(web3)
+        eth_service = EthService(web3, open_block_timestamp_index(timestamp_index_path))
 
         while start_date <= end_date:
             batch_start_block, batch_end_block = eth_service.get_block_range_for_date(
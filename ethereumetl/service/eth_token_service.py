@@ -20,16 +20,19 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 import os
+import json
 import logging
 
-from typing import Dict, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import diskcache as dc
+from eth_abi.exceptions import DecodingError
+from eth_utils.abi import function_signature_to_4byte_selector
 from eth_utils.address import to_checksum_address
 from web3 import Web3
 from web3.exceptions import BadFunctionCallOutput, ContractLogicError
 from web3.contract.contract import Contract
-from cachetools import cached, LRUCache
+from cachetools import LRUCache
 from threading import Lock
 
 from blockchainetl.service.token_service import TokenService
@@ -41,42 +44,120 @@ from ethereumetl.misc.constant import DEFAULT_TOKEN_ETH
 logger = logging.getLogger("eth_token_service")
 
 
+def _abi_function(abi: List[Dict], fn_name: str) -> Tuple[str, List[str]]:
+    for e in abi:
+        if e.get("type") == "function" and e.get("name") == fn_name:
+            selector = function_signature_to_4byte_selector(fn_name + "()")
+            return "0x" + selector.hex(), [o["type"] for o in e["outputs"]]
+    raise ValueError(f"function {fn_name} is not in the abi")
+
+
+# the (selector, output types) of each field, tried in order until one succeeds,
+# the same fallbacks as the sequential calls in get_token
+TOKEN_FIELD_FUNCTIONS: Dict[str, List[Tuple[str, List[str]]]] = {
+    "symbol": [
+        _abi_function(ERC20_ABI, "symbol"),
+        _abi_function(ERC20_ABI, "SYMBOL"),
+        _abi_function(ERC20_ABI_ALTERNATIVE_1, "symbol"),
+        _abi_function(ERC20_ABI_ALTERNATIVE_1, "SYMBOL"),
+    ],
+    "name": [
+        _abi_function(ERC20_ABI, "name"),
+        _abi_function(ERC20_ABI, "NAME"),
+        _abi_function(ERC20_ABI_ALTERNATIVE_1, "name"),
+        _abi_function(ERC20_ABI_ALTERNATIVE_1, "NAME"),
+    ],
+    "decimals": [
+        _abi_function(ERC20_ABI, "decimals"),
+        _abi_function(ERC20_ABI, "DECIMALS"),
+    ],
+    "total_supply": [_abi_function(ERC20_ABI, "totalSupply")],
+}
+CALLS_PER_TOKEN = sum(len(e) for e in TOKEN_FIELD_FUNCTIONS.values())
+
+
 class EthTokenService(TokenService):
     def __init__(
-        self, web3: Web3, function_call_result_transformer=None, cache_path=None
+        self,
+        web3: Web3,
+        function_call_result_transformer=None,
+        cache_path=None,
+        max_batch_calls=100,
     ):
         self._web3 = web3
         self._function_call_result_transformer = function_call_result_transformer
+        self._memory = LRUCache(maxsize=102400)
+        self._lock = Lock()
         self._cache = None
         if cache_path is not None:
             os.makedirs(cache_path, exist_ok=True)
             self._cache = dc.Cache(cache_path)
+        # tokens resolved in one JSON RPC batch of at most max_batch_calls eth_call
+        self._batch_size = max(max_batch_calls // CALLS_PER_TOKEN, 1)
 
     def token_contract(self, token_address: str, abi: Dict = ERC20_ABI) -> Contract:
         checksum_address = to_checksum_address(token_address)
         return self._web3.eth.contract(address=checksum_address, abi=abi)
 
-    @cached(cache=LRUCache(maxsize=102400), lock=Lock())
     def get_token(
         self,
         token_address: str,
         chain: str = Chain.ETHEREUM,
         block_number="latest",
     ) -> EthToken:
-        if self._cache is not None:
-            token = self._cache.get(token_address)
-            if token is not None:
-                return token
+        return self.get_tokens([token_address], chain, block_number)[token_address]
 
-        block_number = block_number or "latest"
+    def get_tokens(
+        self,
+        token_addresses: Iterable[str],
+        chain: str = Chain.ETHEREUM,
+        block_number="latest",
+    ) -> Dict[str, EthToken]:
+        """Return the tokens by address, the ones not cached are resolved together,
+        in JSON RPC batches of at most max_batch_calls eth_call if the provider
+        supports"""
+        tokens: Dict[str, EthToken] = {}
+        missing = []
+        for token_address in dict.fromkeys(token_addresses):
+            with self._lock:
+                token = self._memory.get((token_address, chain, block_number))
+            if token is None and self._cache is not None:
+                token = self._cache.get(token_address)
+            if token is None and token_address == DEFAULT_TOKEN_ETH:
+                token = EthToken()
+                token.address = token_address
+                token.symbol = Chain.symbol(chain)
+                token.name = "Ether"
+                token.decimals = 18
+            if token is None:
+                missing.append(token_address)
+            else:
+                tokens[token_address] = token
 
-        token = EthToken()
-        if token_address == DEFAULT_TOKEN_ETH:
-            token.address = token_address
-            token.symbol = Chain.symbol(chain)
-            token.name = "Ether"
-            token.decimals = 18
-            return token
+        if len(missing) > 0:
+            if hasattr(self._web3.provider, "make_batch_request"):
+                resolved = []
+                for idx in range(0, len(missing), self._batch_size):
+                    resolved.extend(
+                        self._resolve_tokens_batched(
+                            missing[idx : idx + self._batch_size], block_number
+                        )
+                    )
+            else:
+                resolved = [self._resolve_token(e, block_number) for e in missing]
+
+            for token in resolved:
+                tokens[token.address] = token
+                if self._cache is not None:
+                    self._cache.set(token.address, token)
+
+        with self._lock:
+            for token_address, token in tokens.items():
+                self._memory[(token_address, chain, block_number)] = token
+        return tokens
+
+    def _resolve_token(self, token_address: str, block_number="latest") -> EthToken:
+        block_number = block_number or "latest"
 
         contract = self.token_contract(token_address)
         alternative = self.token_contract(token_address, ERC20_ABI_ALTERNATIVE_1)
@@ -88,9 +169,6 @@ class EthTokenService(TokenService):
             alternative.functions.SYMBOL(),
             block_number=block_number,
         )
-        if isinstance(symbol, bytes):
-            symbol = self._bytes_to_string(symbol)
-
         name = self._get_first_result(
             contract.functions.name(),
             contract.functions.NAME(),
@@ -98,9 +176,6 @@ class EthTokenService(TokenService):
             alternative.functions.NAME(),
             block_number=block_number,
         )
-        if isinstance(name, bytes):
-            name = self._bytes_to_string(name)
-
         decimals = self._get_first_result(
             contract.functions.decimals(),
             contract.functions.DECIMALS(),
@@ -110,16 +185,88 @@ class EthTokenService(TokenService):
             contract.functions.totalSupply(),
             block_number=block_number,
         )
+        return self._build_token(token_address, symbol, name, decimals, total_supply)
 
+    def _resolve_tokens_batched(
+        self, token_addresses: List[str], block_number="latest"
+    ) -> List[EthToken]:
+        block_number = block_number or "latest"
+        block_tag = hex(block_number) if isinstance(block_number, int) else block_number
+
+        calls, rpc = [], []
+        for token_address in token_addresses:
+            checksum_address = to_checksum_address(token_address)
+            for field, functions in TOKEN_FIELD_FUNCTIONS.items():
+                for selector, output_types in functions:
+                    rpc.append(
+                        {
+                            "jsonrpc": "2.0",
+                            "method": "eth_call",
+                            "params": [
+                                {"to": checksum_address, "data": selector},
+                                block_tag,
+                            ],
+                            "id": len(calls),
+                        }
+                    )
+                    calls.append((token_address, field, output_types))
+
+        response = self._web3.provider.make_batch_request(json.dumps(rpc))
+        if not isinstance(response, list):
+            # eg: the batch is too large for the provider, one call at a time
+            logger.warning(
+                f"batch eth_call of #{len(token_addresses)} tokens failed, "
+                f"resolve them one by one, response: {response}"
+            )
+            return [self._resolve_token(e, block_number) for e in token_addresses]
+
+        results: Dict[int, Optional[str]] = {
+            e.get("id"): e.get("result") for e in response
+        }
+        fields: Dict[str, Dict] = {e: {} for e in token_addresses}
+        for idx, (token_address, field, output_types) in enumerate(calls):
+            if fields[token_address].get(field) is not None:
+                continue
+            result = self._decode_call_result(results.get(idx), output_types)
+            if self._function_call_result_transformer is not None:
+                result = self._function_call_result_transformer(result)
+            fields[token_address][field] = result
+
+        return [
+            self._build_token(
+                token_address,
+                fields[token_address].get("symbol"),
+                fields[token_address].get("name"),
+                fields[token_address].get("decimals"),
+                fields[token_address].get("total_supply"),
+            )
+            for token_address in token_addresses
+        ]
+
+    def _decode_call_result(self, result: Optional[str], output_types: List[str]):
+        # the same results ignored by _call_contract_function: the reverted(or any
+        # failed) calls, empty return data and the undecodable ones
+        if result is None or result in ("0x", ""):
+            return None
+        try:
+            return self._web3.codec.decode(output_types, bytes.fromhex(result[2:]))[0]
+        except (DecodingError, OverflowError, ValueError, UnicodeDecodeError):
+            return None
+
+    def _build_token(
+        self, token_address: str, symbol, name, decimals, total_supply
+    ) -> EthToken:
+        if isinstance(symbol, bytes):
+            symbol = self._bytes_to_string(symbol)
+        if isinstance(name, bytes):
+            name = self._bytes_to_string(name)
+
+        token = EthToken()
         token.address = token_address
         token.symbol = self._clean_string(symbol)
         token.name = self._clean_string(name)
         token.decimals = decimals
         token.total_supply = total_supply
-
-        if self._cache is not None:
-            self._cache.set(token_address, token)
-
         return token
 
     def _get_first_result(self, *funcs, block_number="latest"):
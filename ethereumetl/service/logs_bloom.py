@@ -0,0 +1,92 @@
+import logging
+from typing import Dict, Iterable, List, Optional, Union
+
+from eth_utils.crypto import keccak
+
+from blockchainetl.metrics import LOGS_BLOOM_BLOCKS
+
+# https://ethereum.github.io/yellowpaper/paper.pdf (4.4.1 Transaction Receipt)
+# each address and topic sets 3 bits of the 2048 bits bloom, taken from the low
+# 11 bits of the first 3 byte pairs of its keccak256 hash
+BLOOM_BYTE_PAIRS = (0, 2, 4)
+
+
+def _to_bytes(value: str) -> bytes:
+    return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+
+
+def bloom_mask(value: str) -> int:
+    """The bits set in the bloom by the address or topic"""
+    h = keccak(_to_bytes(value))
+    mask = 0
+    for i in BLOOM_BYTE_PAIRS:
+        mask |= 1 << (((h[i] << 8) | h[i + 1]) & 0x7FF)
+    return mask
+
+
+def logs_bloom(logs: Iterable[Dict]) -> str:
+    """The logsBloom of the logs, as the node does for the receipt and block"""
+    bloom = 0
+    for log in logs:
+        bloom |= bloom_mask(log["address"])
+        for topic in log["topics"]:
+            bloom |= bloom_mask(topic)
+    return "0x" + format(bloom, "0512x")
+
+
+class LogsBloomFilter(object):
+    """Tell the blocks which may have logs matching the eth_getLogs filter by its
+    logsBloom, without false negatives.
+
+    The filter follows the ExportLogsJob's, any of the addresses and any of the
+    topics(as the topic0); a block without any log(zero bloom) never matches,
+    a block without the logsBloom always matches.
+    """
+
+    def __init__(
+        self,
+        topics: Optional[List[str]] = None,
+        address: Optional[Union[str, List[str]]] = None,
+    ):
+        if isinstance(address, str):
+            address = [address]
+        self.address_masks = [bloom_mask(e) for e in address or []]
+        self.topic_masks = [bloom_mask(e) for e in topics or []]
+
+    def may_match(self, bloom_hex: Optional[str]) -> bool:
+        if bloom_hex is None or len(bloom_hex) <= 2:
+            return True
+        bloom = int(bloom_hex, 16)
+        if bloom == 0:
+            return False
+        if len(self.address_masks) > 0 and not any(
+            bloom & mask == mask for mask in self.address_masks
+        ):
+            return False
+        if len(self.topic_masks) > 0 and not any(
+            bloom & mask == mask for mask in self.topic_masks
+        ):
+            return False
+        return True
+
+    def candidate_blocks(
+        self, start_block: int, end_block: int, blocks: Iterable[Dict]
+    ) -> List[int]:
+        """The block numbers in range which may match, the ones not in blocks are
+        always kept"""
+        blooms = {e["number"]: e.get("logs_bloom") for e in blocks}
+        candidates = [
+            number
+            for number in range(start_block, end_block + 1)
+            if number not in blooms or self.may_match(blooms[number])
+        ]
+
+        total = end_block - start_block + 1
+        skipped = total - len(candidates)
+        LOGS_BLOOM_BLOCKS.labels(result="candidate").inc(len(candidates))
+        LOGS_BLOOM_BLOCKS.labels(result="skipped").inc(skipped)
+        logging.debug(
+            f"logsBloom {start_block, end_block} #candidates={len(candidates)} "
+            f"#skipped={skipped} ({skipped / total:.0%})"
+        )
+        return candidates
@@ -48,11 +48,15 @@ def calculate_trace_ids(traces: List[EthTrace]):
 
 def calculate_transaction_scoped_trace_ids(traces: List[EthTrace]):
     for trace in traces:
-        trace.trace_id = concat(
-            trace.trace_type,
-            trace.transaction_hash,
-            trace_address_to_str(trace.trace_address),
-        )
+        trace.trace_id = transaction_scoped_trace_id(trace)
+
+
+def transaction_scoped_trace_id(trace: EthTrace) -> str:
+    return concat(
+        trace.trace_type,
+        trace.transaction_hash,
+        trace_address_to_str(trace.trace_address),
+    )
 
 
 def calculate_block_scoped_trace_ids(traces: List[EthTrace]):
@@ -25,11 +25,10 @@ import os
 import json
 import logging
 import itertools
-from typing import Union, Dict, Tuple, Any, List, Iterable
+from typing import Union, Dict, Tuple, Any, List, Iterable, Hashable, Callable, Set
 from collections import defaultdict
 from blockchainetl import env
 
-
 need_store_error = (
     env.STORE_ERROR_IF_ENRICH_NOT_MATCHED_PATH is not None
     and os.path.isdir(env.STORE_ERROR_IF_ENRICH_NOT_MATCHED_PATH)
@@ -39,6 +38,14 @@ need_store_error = (
 logger = logging.getLogger(__name__)
 
 
+def _store_not_matched(*named_items: Tuple[str, List]):
+    d = env.STORE_ERROR_IF_ENRICH_NOT_MATCHED_PATH
+    logger.warning(f"store mismatched {named_items[1][0]} into {d}")
+    for name, items in named_items:
+        with open(os.path.join(d, name) + ".json", "w") as fw:
+            json.dump(items, fw, indent=2, default=str)
+
+
 def _handle_not_matched_error(
     left: Tuple[str, List],
     right: Tuple[str, List],
@@ -47,14 +54,7 @@ def _handle_not_matched_error(
     right_on: List[str],
 ):
     if need_store_error is True:
-        d = env.STORE_ERROR_IF_ENRICH_NOT_MATCHED_PATH
-        logger.warning(f"store mismatched {right[0]} into {d}")
-        with open(os.path.join(d, left[0]) + ".json", "w") as fw:
-            json.dump(left[1], fw, indent=2)
-        with open(os.path.join(d, right[0]) + ".json", "w") as fw:
-            json.dump(right[1], fw, indent=2)
-        with open(os.path.join(d, result[0]) + ".json", "w") as fw:
-            json.dump(result[1], fw, indent=2)
+        _store_not_matched(left, right, result)
 
     if env.IGNORE_ENRICH_NOT_MATCHED_ERROR is False:
         left_items = set(tuple([e[x] for x in left_on]) for e in left[1])
@@ -119,260 +119,164 @@ def join(
             yield result_item
 
 
-def enrich_transactions(transactions, receipts):
-    result = list(
-        join(
-            transactions,
-            receipts,
-            (
-                ("block_number", "hash"),
-                ("block_number", "transaction_hash"),
-            ),
-            left_fields=[
-                "type",
-                "hash",
-                "nonce",
-                "transaction_index",
-                "from_address",
-                "to_address",
-                "value",
-                "gas",
-                "gas_price",
-                "input",
-                "block_timestamp",
-                "block_number",
-                "block_hash",
-                "max_fee_per_gas",
-                "max_priority_fee_per_gas",
-                "transaction_type",
-            ],
-            right_fields=[
-                ("cumulative_gas_used", "receipt_cumulative_gas_used"),
-                ("gas_used", "receipt_gas_used"),
-                ("contract_address", "receipt_contract_address"),
-                ("root", "receipt_root"),
-                ("status", "receipt_status"),
-                ("effective_gas_price", "receipt_effective_gas_price"),
-                ("log_count", "receipt_log_count"),
-            ],
+def _handle_not_matched_items(
+    left: Tuple[str, List],
+    right: Tuple[str, List],
+    result: List,
+    not_matched: List,
+    right_on: Callable[[Dict], Hashable],
+):
+    """The mismatches are collected by the enrichment pass itself, no rejoin"""
+    if need_store_error is True:
+        _store_not_matched(
+            left, right, ("result", result), ("not_matched", not_matched)
         )
-    )
 
-    actual, expected = len(result), len(transactions)
-    if actual != expected:
-        _handle_not_matched_error(
-            ("tx", transactions),
-            ("receipt", receipts),
-            ("result", result),
-            left_on=["block_number", "hash"],
-            right_on=["block_number", "transaction_hash"],
+    if env.IGNORE_ENRICH_NOT_MATCHED_ERROR is False:
+        raise ValueError(
+            f"The number of {right[0]} is wrong "
+            f"actual: {len(result)} <> expected: {len(right[1])} "
+            f"not matched {left[0]}: {set(right_on(e) for e in not_matched)}"
         )
 
-    return result
 
+def _index_by(
+    items: Iterable[Dict], key: Callable[[Dict], Hashable]
+) -> Tuple[Dict[Hashable, Dict], Set[Hashable]]:
+    """Index the items by key, the duplicated keys are returned to be treated as
+    mismatches, as the join did(one item joined more than once)"""
+    index: Dict[Hashable, Dict] = {}
+    duplicated: Set[Hashable] = set()
+    for item in items:
+        k = key(item)
+        if k in index:
+            duplicated.add(k)
+        index[k] = item
+    return index, duplicated
+
+
+def _block_number(item: Dict) -> int:
+    return item["block_number"]
+
+
+class EnrichIndex(object):
+    """The blocks of an export_all call, indexed by number once and shared by the
+    enrichment of every entity type.
+
+    The block hash/timestamp are set on the items in place, the items are not
+    copied; the ones without a matched block are reported by the same pass.
+    """
+
+    def __init__(self, blocks: List[Dict]):
+        self.blocks = blocks
+        self._blocks, self._duplicated = _index_by(blocks, lambda e: e["number"])
+
+    def enrich(
+        self, name: str, items: List[Dict], drop_fields: Tuple[str, ...] = ()
+    ) -> List[Dict]:
+        index, duplicated = self._blocks, self._duplicated
+        result, not_matched = [], []
+        for item in items:
+            number = item["block_number"]
+            block = index.get(number)
+            if block is None or number in duplicated:
+                not_matched.append(item)
+                continue
+            item["block_timestamp"] = block.get("timestamp")
+            item["block_hash"] = block.get("hash")
+            for field in drop_fields:
+                item.pop(field, None)
+            result.append(item)
+
+        if len(not_matched) > 0:
+            _handle_not_matched_items(
+                ("block", self.blocks),
+                (name, items),
+                result,
+                not_matched,
+                _block_number,
+            )
+        return result
+
+    def enrich_logs(self, logs: List[Dict]) -> List[Dict]:
+        return self.enrich("log", logs)
+
+    def enrich_token_transfers(self, token_transfers: List[Dict]) -> List[Dict]:
+        return self.enrich("token_xfer", token_transfers)
+
+    def enrich_erc721_transfers(self, erc721_transfers: List[Dict]) -> List[Dict]:
+        return self.enrich("erc721_xfer", erc721_transfers)
+
+    def enrich_erc1155_transfers(self, erc1155_transfers: List[Dict]) -> List[Dict]:
+        return self.enrich("erc1155_xfer", erc1155_transfers)
+
+    def enrich_traces(self, traces: List[Dict]) -> List[Dict]:
+        # the logs of geth's callTracer(withLog) are not a trace field
+        return self.enrich("trace", traces, drop_fields=("logs",))
+
+    def enrich_contracts(self, contracts: List[Dict]) -> List[Dict]:
+        return self.enrich("contract", contracts)
+
+    def enrich_tokens(self, tokens: List[Dict]) -> List[Dict]:
+        return self.enrich("token", tokens)
+
+
+RECEIPT_FIELDS = [
+    ("cumulative_gas_used", "receipt_cumulative_gas_used"),
+    ("gas_used", "receipt_gas_used"),
+    ("contract_address", "receipt_contract_address"),
+    ("root", "receipt_root"),
+    ("status", "receipt_status"),
+    ("effective_gas_price", "receipt_effective_gas_price"),
+    ("log_count", "receipt_log_count"),
+]
+
+
+def _tx_key(tx: Dict) -> Tuple[int, str]:
+    return tx["block_number"], tx["hash"]
 
-def enrich_logs(blocks, logs):
-    result = list(
-        join(
-            logs,
-            blocks,
-            ("block_number", "number"),
-            [
-                "type",
-                "log_index",
-                "transaction_hash",
-                "transaction_index",
-                "address",
-                "data",
-                "topics",
-                "block_number",
-            ],
-            [
-                ("timestamp", "block_timestamp"),
-                ("hash", "block_hash"),
-            ],
-        )
-    )
 
-    actual, expected = len(result), len(logs)
-    if actual != expected:
-        _handle_not_matched_error(
-            ("block", blocks),
-            ("log", logs),
-            ("result", result),
-            left_on=["block_number"],
-            right_on=["number"],
+def enrich_transactions(transactions, receipts):
+    """Set the receipt fields on the transactions in place"""
+    index, duplicated = _index_by(
+        receipts, lambda e: (e["block_number"], e["transaction_hash"])
+    )
+    result, not_matched = [], []
+    for tx in transactions:
+        key = _tx_key(tx)
+        receipt = index.get(key)
+        if receipt is None or key in duplicated:
+            not_matched.append(tx)
+            continue
+        for src_field, dst_field in RECEIPT_FIELDS:
+            tx[dst_field] = receipt.get(src_field)
+        result.append(tx)
+
+    if len(not_matched) > 0:
+        _handle_not_matched_items(
+            ("receipt", receipts), ("tx", transactions), result, not_matched, _tx_key
         )
-
     return result
 
 
-def enrich_token_transfers(blocks, token_transfers):
-    result = list(
-        join(
-            token_transfers,
-            blocks,
-            ("block_number", "number"),
-            [
-                "type",
-                "token_address",
-                "from_address",
-                "to_address",
-                "value",
-                "transaction_hash",
-                "transaction_index",
-                "log_index",
-                "block_number",
-                "name",
-                "symbol",
-                "decimals",
-            ],
-            [
-                ("timestamp", "block_timestamp"),
-                ("hash", "block_hash"),
-            ],
-        )
-    )
+def enrich_logs(blocks, logs):
+    return EnrichIndex(blocks).enrich_logs(logs)
 
-    actual, expected = len(result), len(token_transfers)
-    if actual != expected:
-        _handle_not_matched_error(
-            ("block", blocks),
-            ("token_xfer", token_transfers),
-            ("result", result),
-            left_on=["block_number"],
-            right_on=["number"],
-        )
 
-    return result
+def enrich_token_transfers(blocks, token_transfers):
+    return EnrichIndex(blocks).enrich_token_transfers(token_transfers)
 
 
 def enrich_erc721_transfers(blocks, erc721_transfers):
-    result = list(
-        join(
-            erc721_transfers,
-            blocks,
-            ("block_number", "number"),
-            [
-                "type",
-                "token_address",
-                "token_name",
-                "from_address",
-                "to_address",
-                "id",
-                "transaction_hash",
-                "transaction_index",
-                "log_index",
-                "block_number",
-            ],
-            [
-                ("timestamp", "block_timestamp"),
-                ("hash", "block_hash"),
-            ],
-        )
-    )
-
-    actual, expected = len(result), len(erc721_transfers)
-    if actual != expected:
-        _handle_not_matched_error(
-            ("block", blocks),
-            ("erc721_xfer", erc721_transfers),
-            ("result", result),
-            left_on=["block_number"],
-            right_on=["number"],
-        )
-
-    return result
+    return EnrichIndex(blocks).enrich_erc721_transfers(erc721_transfers)
 
 
 def enrich_erc1155_transfers(blocks, erc1155_transfers):
-    result = list(
-        join(
-            erc1155_transfers,
-            blocks,
-            ("block_number", "number"),
-            [
-                "type",
-                "token_address",
-                "token_name",
-                "operator",
-                "from_address",
-                "to_address",
-                "id",
-                "value",
-                "id_pos",
-                "id_cnt",
-                "xfer_type",
-                "transaction_hash",
-                "transaction_index",
-                "log_index",
-                "block_number",
-            ],
-            [
-                ("timestamp", "block_timestamp"),
-                ("hash", "block_hash"),
-            ],
-        )
-    )
-
-    actual, expected = len(result), len(erc1155_transfers)
-    if actual != expected:
-        _handle_not_matched_error(
-            ("block", blocks),
-            ("erc1155_xfer", erc1155_transfers),
-            ("result", result),
-            left_on=["block_number"],
-            right_on=["number"],
-        )
-
-    return result
+    return EnrichIndex(blocks).enrich_erc1155_transfers(erc1155_transfers)
 
 
 def enrich_traces(blocks, traces):
-    result = list(
-        join(
-            traces,
-            blocks,
-            ("block_number", "number"),
-            [
-                "type",
-                "transaction_index",
-                "from_address",
-                "to_address",
-                "value",
-                "input",
-                "output",
-                "trace_type",
-                "call_type",
-                "reward_type",
-                "gas",
-                "gas_used",
-                "subtraces",
-                "trace_address",
-                "error",
-                "status",
-                "transaction_hash",
-                "block_number",
-                "trace_id",
-            ],
-            [
-                ("timestamp", "block_timestamp"),
-                ("hash", "block_hash"),
-            ],
-        )
-    )
-
-    actual, expected = len(result), len(traces)
-    if actual != expected:
-        _handle_not_matched_error(
-            ("block", blocks),
-            ("trace", traces),
-            ("result", result),
-            left_on=["block_number"],
-            right_on=["number"],
-        )
-
-    return result
+    return EnrichIndex(blocks).enrich_traces(traces)
 
 
 def enrich_geth_traces(transactions, traces):
@@ -428,81 +332,8 @@ def enrich_geth_traces(transactions, traces):
 
 
 def enrich_contracts(blocks, contracts):
-    result = list(
-        join(
-            contracts,
-            blocks,
-            ("block_number", "number"),
-            [
-                "type",
-                "address",
-                "creater",
-                "initcode",
-                "bytecode",
-                "function_sighashes",
-                "is_erc20",
-                "is_erc721",
-                "block_number",
-                "transaction_hash",
-                "transaction_index",
-                "trace_type",
-                "trace_address",
-            ],
-            [
-                ("timestamp", "block_timestamp"),
-                ("hash", "block_hash"),
-            ],
-        )
-    )
-
-    actual, expected = len(result), len(contracts)
-    if actual != expected:
-        _handle_not_matched_error(
-            ("block", blocks),
-            ("contract", contracts),
-            ("result", result),
-            left_on=["block_number"],
-            right_on=["number"],
-        )
-
-    return result
+    return EnrichIndex(blocks).enrich_contracts(contracts)
 
 
 def enrich_tokens(blocks, tokens):
-    result = list(
-        join(
-            tokens,
-            blocks,
-            ("block_number", "number"),
-            [
-                "type",
-                "address",
-                "symbol",
-                "name",
-                "decimals",
-                "total_supply",
-                "is_erc20",
-                "is_erc721",
-                "block_number",
-                "transaction_hash",
-                "transaction_index",
-                "trace_address",
-            ],
-            [
-                ("timestamp", "block_timestamp"),
-                ("hash", "block_hash"),
-            ],
-        )
-    )
-
-    actual, expected = len(result), len(tokens)
-    if actual != expected:
-        _handle_not_matched_error(
-            ("block", blocks),
-            ("token", tokens),
-            ("result", result),
-            left_on=["block_number"],
-            right_on=["number"],
-        )
-
-    return result
+    return EnrichIndex(blocks).enrich_tokens(tokens)
@@ -0,0 +1,247 @@
+import logging
+from datetime import datetime, timedelta
+from threading import Lock
+from time import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+# the ERC20 tokens(not ERC721), used to tell the ERC20 Transfer with an indexed
+# value from the ERC721 Transfer, as they have the same topics
+ERC20_TOKENS_SQL = """
+SELECT
+    address,
+    is_erc20 IS TRUE AND (is_erc721 IS FALSE OR is_erc721 IS NULL) AS is_erc20,
+    updated_at
+FROM
+    {chain}.tokens
+WHERE
+    {where}
+"""
+
+
+# numpy strips the trailing NUL bytes of the "S" dtype, a non-zero byte is appended
+# to keep the addresses ending with 00 intact, the order is the same
+KEY_DTYPE = "S21"
+
+
+def _address_to_key(address: str) -> bytes:
+    return bytes.fromhex(address[2:] if address.startswith("0x") else address) + b"\x01"
+
+
+def _to_keys(addresses: Iterable) -> Tuple[List[bytes], List]:
+    """Return the keys of the valid addresses, and the malformed addresses"""
+    keys, malformed = [], []
+    for address in addresses:
+        try:
+            key = _address_to_key(address.lower())
+        except (AttributeError, ValueError):
+            malformed.append(address)
+            continue
+        if len(key) != 21:
+            malformed.append(address)
+            continue
+        keys.append(key)
+    return keys, malformed
+
+
+def _log_malformed(chain: str, malformed: List):
+    if len(malformed) > 0:
+        logging.warning(
+            f"skip #{len(malformed)} malformed token addresses of {chain}, "
+            f"eg: {malformed[0]!r}"
+        )
+
+
+class Erc20TokenSet(object):
+    """The ERC20 token addresses of the chain, loaded once into a sorted array of
+    fixed-width keys(instead of a set of strings, ~10x smaller), the tokens created
+    or updated later are polled by the updated_at high-water mark, and the ones
+    extracted in-stream are learned immediately, both kept in small exact sets
+    until merged into the array.
+
+    updated_at is set when the row is written, not when it's committed, a row
+    committed late may be older than the high-water mark, so the last
+    overlap_seconds before it are polled again every time.
+
+    The instance is callable for compatibility with the erc20_token_reader,
+    calling it refreshes the set if due.
+    """
+
+    def __init__(
+        self,
+        chain: str,
+        engine: Engine,
+        refresh_seconds: int = 300,
+        merge_threshold: int = 100_000,
+        chunksize: int = 500_000,
+        overlap_seconds: int = 600,
+    ):
+        self.chain = chain
+        self.engine = engine
+        self.refresh_seconds = refresh_seconds
+        self.merge_threshold = merge_threshold
+        self.chunksize = chunksize
+        self.overlap = timedelta(seconds=overlap_seconds)
+
+        self._keys = np.array([], dtype=KEY_DTYPE)
+        self._added: Set[bytes] = set()
+        self._removed: Set[bytes] = set()
+        self._high_water_mark: Optional[datetime] = None
+        self._loaded = False
+        self._refreshed_at = 0.0
+        self._lock = Lock()
+
+    def __call__(self) -> "Erc20TokenSet":
+        if time() - self._refreshed_at >= self.refresh_seconds:
+            self.refresh()
+        return self
+
+    def __contains__(self, address) -> bool:
+        if not isinstance(address, str):
+            return False
+        try:
+            key = _address_to_key(address.lower())
+        except ValueError:
+            return False
+        if key in self._removed:
+            return False
+        if key in self._added:
+            return True
+        keys = self._keys
+        idx = np.searchsorted(keys, key)
+        return bool(idx < len(keys) and keys[idx] == key)
+
+    def refresh(self):
+        self._refreshed_at = time()
+        try:
+            if self._loaded is False:
+                self._load_all()
+            else:
+                self._load_since()
+        except Exception as e:
+            logging.error(f"failed to read ERC20 tokens from {self.chain}.tokens: {e}")
+
+    def learn(self, tokens: Iterable[Dict]):
+        """Classify the tokens extracted in-stream, without waiting for the poll"""
+        malformed = []
+        with self._lock:
+            for token in tokens:
+                address = token.get("address")
+                if address is None:
+                    continue
+                keys, bad = _to_keys([address])
+                malformed.extend(bad)
+                for key in keys:
+                    self._classify(
+                        key, bool(token.get("is_erc20")) and not token.get("is_erc721")
+                    )
+            self._maybe_merge()
+        _log_malformed(self.chain, malformed)
+
+    def _load_all(self):
+        st0 = time()
+        keys: List[np.ndarray] = []
+        malformed: List = []
+        high_water_mark = None
+        for df in pd.read_sql(
+            text(ERC20_TOKENS_SQL.format(chain=self.chain, where="TRUE")),
+            con=self.engine,
+            chunksize=self.chunksize,
+        ):
+            if df.empty:
+                continue
+            high_water_mark = _max_timestamp(high_water_mark, df["updated_at"].max())
+            df = df[df["is_erc20"] == True]  # noqa: E712
+            chunk, bad = _to_keys(df["address"])
+            keys.append(np.array(chunk, KEY_DTYPE))
+            malformed.extend(bad)
+        _log_malformed(self.chain, malformed)
+
+        merged = np.unique(np.concatenate(keys)) if keys else self._keys
+        with self._lock:
+            self._keys = merged
+            self._added.clear()
+            self._removed.clear()
+            self._high_water_mark = high_water_mark
+            self._loaded = True
+        logging.info(
+            f"loaded #{len(merged)} ERC20 tokens of {self.chain} "
+            f"elapsed: {time() - st0:.2f}s"
+        )
+
+    def _load_since(self):
+        if self._high_water_mark is None:
+            # the table was empty, load it again
+            return self._load_all()
+
+        df = pd.read_sql(
+            text(
+                ERC20_TOKENS_SQL.format(chain=self.chain, where="updated_at >= :since")
+            ),
+            con=self.engine,
+            params={"since": self._high_water_mark - self.overlap},
+        )
+        if df.empty:
+            return
+
+        malformed: List = []
+        with self._lock:
+            for address, is_erc20 in zip(df["address"], df["is_erc20"]):
+                keys, bad = _to_keys([address])
+                malformed.extend(bad)
+                for key in keys:
+                    self._classify(key, bool(is_erc20))
+            self._high_water_mark = _max_timestamp(
+                self._high_water_mark, df["updated_at"].max()
+            )
+            self._maybe_merge()
+        _log_malformed(self.chain, malformed)
+        logging.info(f"polled #{len(df)} updated tokens of {self.chain}")
+
+    def _classify(self, key: bytes, is_erc20: bool):
+        if is_erc20:
+            self._removed.discard(key)
+            self._added.add(key)
+        else:
+            self._added.discard(key)
+            self._removed.add(key)
+
+    def _maybe_merge(self):
+        if len(self._added) + len(self._removed) < self.merge_threshold:
+            return
+        keys = self._keys
+        if len(self._removed) > 0:
+            keys = keys[~np.isin(keys, np.array(list(self._removed), dtype=KEY_DTYPE))]
+        if len(self._added) > 0:
+            keys = np.union1d(keys, np.array(list(self._added), dtype=KEY_DTYPE))
+        self._keys = keys
+        self._added = set()
+        self._removed = set()
+
+
+def _max_timestamp(a, b):
+    if a is None or pd.isnull(a):
+        return None if pd.isnull(b) else b
+    if b is None or pd.isnull(b):
+        return a
+    return max(a, b)
+
+
+def learn_erc20_tokens(
+    erc20_token_reader, tokens: List[Dict], erc721_transfers: List[Dict]
+) -> List[Dict]:
+    """Learn the tokens extracted in the batch, and drop the ERC721 transfers of the
+    new ERC20 tokens, which were unknown when the transfers were extracted"""
+    if isinstance(erc20_token_reader, Erc20TokenSet):
+        erc20_token_reader.learn(tokens)
+
+    erc20s = {
+        e["address"] for e in tokens if e.get("is_erc20") and not e.get("is_erc721")
+    }
+    if len(erc20s) == 0:
+        return erc721_transfers
+    return [e for e in erc721_transfers if e.get("token_address") not in erc20s]
@@ -2,6 +2,7 @@ from typing import Tuple, List, Dict, Optional, Union
 from cachetools import cached, TTLCache
 
 from blockchainetl.enumeration.entity_type import EntityType
+from blockchainetl.env import DISABLE_LOGS_BLOOM
 from blockchainetl.jobs.exporters.console_item_exporter import ConsoleItemExporter
 from blockchainetl.jobs.exporters.in_memory_item_exporter import InMemoryItemExporter
 from ethereumetl.providers.rpc import BatchHTTPProvider
@@ -9,6 +10,7 @@ from ethereumetl.providers.auto import new_web3_provider
 from ethereumetl.jobs.export_blocks_job import ExportBlocksJob
 from ethereumetl.jobs.export_logs_job import ExportLogsJob
 from ethereumetl.jobs.export_receipts_job import ExportReceiptsJob
+from ethereumetl.service.logs_bloom import LogsBloomFilter
 
 
 class EthBaseAdapter:
@@ -91,7 +93,16 @@ class EthBaseAdapter:
         topics: Optional[List[str]] = None,
         address: Optional[Union[str, List[str]]] = None,
         blocks=None,
+        bloom_blocks: Optional[List[Dict]] = None,
     ) -> List[Dict]:
+        # only request the blocks whose logsBloom may match the filter
+        if bloom_blocks is not None and blocks is None and not DISABLE_LOGS_BLOOM:
+            blocks = LogsBloomFilter(topics, address).candidate_blocks(
+                start_block, end_block, bloom_blocks
+            )
+            if len(blocks) == 0:
+                return []
+
         exporter = InMemoryItemExporter(item_types=[EntityType.LOG])
         job = ExportLogsJob(
             start_block,
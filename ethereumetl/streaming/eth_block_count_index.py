@@ -0,0 +1,71 @@
+import os
+import sqlite3
+from collections import Counter
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+COUNT_COLUMNS = ("tx_count", "log_count")
+
+
+class EthBlockCountIndex:
+    """The expected per block tx and log counts, persisted in a sqlite file.
+
+    The counts are taken from the block headers(tx_count) and the receipts or
+    logs(log_count) fetched by the dump streamer, a NULL count is unknown.
+    The consistency checkers compare them with the rows in the warehouse.
+    """
+
+    def __init__(self, path: str):
+        if os.path.dirname(path) != "":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS counts ("
+                "blknum INTEGER PRIMARY KEY, tx_count INTEGER, log_count INTEGER)"
+            )
+
+    def update(self, rows: Iterable[Tuple[int, Optional[int], Optional[int]]]):
+        """Upsert (blknum, tx_count, log_count), a None count keeps the known one"""
+        rows = list(rows)
+        if len(rows) == 0:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO counts VALUES (?, ?, ?) ON CONFLICT(blknum) DO UPDATE SET "
+                "tx_count = COALESCE(excluded.tx_count, tx_count), "
+                "log_count = COALESCE(excluded.log_count, log_count)",
+                rows,
+            )
+
+    def add_blocks(self, blocks: List[Dict], logs: Optional[List[Dict]] = None):
+        """Index the exported blocks, logs is None if they are not fetched"""
+        log_counts = None
+        if logs is not None:
+            log_counts = Counter(e["block_number"] for e in logs)
+        self.update(
+            (
+                e["number"],
+                e.get("transaction_count"),
+                log_counts.get(e["number"], 0) if log_counts is not None else None,
+            )
+            for e in blocks
+        )
+
+    def counts(self, column: str, start_block: int, end_block: int) -> Dict[int, int]:
+        """Return the known counts of blocks in [start_block, end_block]"""
+        if column not in COUNT_COLUMNS:
+            raise ValueError(f"unknown count column: {column}")
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT blknum, {column} FROM counts "
+                f"WHERE blknum >= ? AND blknum <= ? AND {column} IS NOT NULL",
+                (start_block, end_block),
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        self._conn.close()
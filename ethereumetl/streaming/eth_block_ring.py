@@ -0,0 +1,115 @@
+import os
+import sqlite3
+from threading import Lock
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+
+class BlockHeader(NamedTuple):
+    number: int
+    hash: str
+    parent_hash: str
+    timestamp: int
+
+
+class EthBlockRing:
+    """The (number, hash, parent_hash, timestamp) of the last `size` exported blocks,
+    persisted in a sqlite file.
+
+    The dump streamer appends the blocks it exported, so the ring mirrors what is
+    in the warehouse, and the reorg watcher compares the new headers against it
+    instead of re-reading the warehouse. sqlite allows both processes to share
+    the same file.
+    """
+
+    def __init__(self, path: str, size: int = 1024):
+        if os.path.dirname(path) != "":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.size = size
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS blocks ("
+                "number INTEGER PRIMARY KEY, hash TEXT NOT NULL, "
+                "parent_hash TEXT, timestamp INTEGER)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)"
+            )
+
+    def append(self, blocks: Iterable[Dict]):
+        """Add(or replace) the exported blocks, and drop the ones out of the ring"""
+        rows = [
+            (e["number"], e["hash"], e.get("parent_hash"), e.get("timestamp"))
+            for e in blocks
+        ]
+        if len(rows) == 0:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.execute(
+                "DELETE FROM blocks WHERE number <= "
+                "(SELECT MAX(number) FROM blocks) - ?",
+                (self.size,),
+            )
+
+    def get_many(self, start_block: int, end_block: int) -> Dict[int, BlockHeader]:
+        """The headers in [start_block, end_block], clipped to the range of the
+        ring, the blocks out of it are not known even if not dropped yet"""
+        with self._lock:
+            floor, latest = self._bounds()
+            if floor is None:
+                return {}
+            start_block = max(start_block, floor)
+            end_block = min(end_block, latest)
+            if start_block > end_block:
+                return {}
+            rows = self._conn.execute(
+                "SELECT number, hash, parent_hash, timestamp FROM blocks "
+                "WHERE number >= ? AND number <= ?",
+                (start_block, end_block),
+            ).fetchall()
+        return {e[0]: BlockHeader(*e) for e in rows}
+
+    def get(self, number: int) -> Optional[BlockHeader]:
+        return self.get_many(number, number).get(number)
+
+    def floor(self) -> Optional[int]:
+        with self._lock:
+            return self._bounds()[0]
+
+    def latest(self) -> Optional[int]:
+        with self._lock:
+            return self._bounds()[1]
+
+    def _bounds(self) -> Tuple[Optional[int], Optional[int]]:
+        floor, latest = self._conn.execute(
+            "SELECT MIN(number), MAX(number) FROM blocks"
+        ).fetchone()
+        if latest is None:
+            return None, None
+        # the size may be smaller than the one the file was written with
+        return max(floor, latest - self.size + 1), latest
+
+    @property
+    def checked_block(self) -> Optional[int]:
+        """The last block checked by the reorg watcher"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'checked_block'"
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    @checked_block.setter
+    def checked_block(self, value: int):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('checked_block', ?)", (value,)
+            )
+
+    def close(self):
+        self._conn.close()
@@ -1,10 +1,12 @@
 import logging
 from time import time
+from typing import Optional
 from datetime import datetime
 
 from blockchainetl.utils import time_elapsed
 from ethereumetl.providers.rpc import BatchHTTPProvider
 from .eth_base_adapter import EthBaseAdapter
+from .eth_block_count_index import EthBlockCountIndex
 
 
 class EthCheckAutofixAdapter(EthBaseAdapter):
@@ -16,9 +18,11 @@ class EthCheckAutofixAdapter(EthBaseAdapter):
         batch_size: int = 10,
         max_workers: int = 10,
         dryrun: bool = False,
+        block_count_index: Optional[EthBlockCountIndex] = None,
     ):
         self.checkers = checkers
         self.dryrun = dryrun
+        self.block_count_index = block_count_index
         EthBaseAdapter.__init__(
             self,
             chain,
@@ -31,6 +35,9 @@ class EthCheckAutofixAdapter(EthBaseAdapter):
         st0 = time()
         blocks = self.export_blocks(start_block, end_block)
         st1 = time()
+        # the headers give the tx counts, even if the dump streamer doesn't feed
+        if self.block_count_index is not None:
+            self.block_count_index.add_blocks(blocks)
 
         st = min(b["timestamp"] for b in blocks)
         et = max(b["timestamp"] for b in blocks)
@@ -13,7 +13,7 @@ from blockchainetl.jobs.exporters.console_item_exporter import ConsoleItemExport
 from blockchainetl.enumeration.entity_type import EntityType
 from blockchainetl.enumeration.chain import Chain
 from ethereumetl.providers.rpc import BatchHTTPProvider
-from ethereumetl.streaming.enrich import enrich_logs
+from ethereumetl.streaming.enrich import EnrichIndex
 from blockchainetl.service.price_service import PriceService
 from blockchainetl.service.token_service import TokenService
 
@@ -21,10 +21,6 @@ from ethereumetl.streaming.extractor import (
     extract_token_transfers,
     extract_erc1155_transfers,
 )
-from ethereumetl.streaming.enrich import (
-    enrich_token_transfers,
-    enrich_erc1155_transfers,
-)
 from ethereumetl.streaming.utils import (
     convert_token_transfers_to_df,
     convert_transactions_to_df,
@@ -76,23 +72,24 @@ class EthNftOrderbookAdapter(EthBaseAdapter):
         if len(transactions) == 0:
             return
 
-        logs = self.export_logs(start_block, end_block)
+        logs = self.export_logs(start_block, end_block, bloom_blocks=blocks)
         if len(logs) == 0:
             return
 
-        logs = enrich_logs(blocks, logs)
+        index = EnrichIndex(blocks)
+        logs = index.enrich_logs(logs)
 
         token_transfers = extract_token_transfers(
             logs, self.batch_size, self.max_workers, self.chain
         )
 
-        token_transfers = enrich_token_transfers(blocks, token_transfers)
+        token_transfers = index.enrich_token_transfers(token_transfers)
 
         erc1155_transfers = extract_erc1155_transfers(
             logs, self.batch_size, self.max_workers
         )
 
-        erc1155_transfers = enrich_erc1155_transfers(blocks, erc1155_transfers)
+        erc1155_transfers = index.enrich_erc1155_transfers(erc1155_transfers)
 
         if len(token_transfers) + len(erc1155_transfers) == 0:
             return
@@ -162,6 +159,12 @@ class EthNftOrderbookAdapter(EthBaseAdapter):
         if df.empty:
             return []
 
+        if self.token_service is not None:
+            currencies = set(df.currency) | set(df.fee_currency)
+            self.token_service.get_tokens(
+                [e for e in currencies if isinstance(e, str)], self.chain
+            )
+
         df = df.assign(
             type=EntityType.NFT_ORDERBOOK,
             currency_decimals=df.currency.apply(self._get_token_decimals),
@@ -1,16 +1,17 @@
 import logging
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from time import time
+from collections import defaultdict
 from collections.abc import Callable
 from typing import Set
 
-import pandas as pd
 from eth_utils.address import to_checksum_address
+from sqlalchemy import bindparam, text
 
-from blockchainetl.utils import time_elapsed, as_st_day
-from blockchainetl.misc.pandas_extra import partition_rank, vsum
+from blockchainetl.utils import time_elapsed
 from blockchainetl.jobs.exporters.console_item_exporter import ConsoleItemExporter
-from blockchainetl.enumeration.entity_type import EntityType
+from blockchainetl.jobs.exporters.postgres_item_exporter import PostgresItemExporter
+from blockchainetl.enumeration.entity_type import EntityTable, EntityType
 from blockchainetl.enumeration.chain import Chain
 from ethereumetl.mappers.log_mapper import EthLogMapper
 from ethereumetl.streaming.extractor import (
@@ -18,13 +19,14 @@ from ethereumetl.streaming.extractor import (
     extract_erc721_transfers,
     extract_erc1155_transfers,
 )
-from ethereumetl.streaming.enrich import (
-    enrich_logs,
-    enrich_erc721_transfers,
-    enrich_erc1155_transfers,
-)
+from ethereumetl.streaming.enrich import EnrichIndex
 from ethereumetl.service.eth_token_service import EthTokenService
-from ethereumetl.streaming.utils import convert_token_transfers_to_df
+from ethereumetl.streaming.nft_tokenid_store import (
+    EthNftTokenidStore,
+    TokenidKey,
+    fold_tokenid_transfers,
+    tokenid_state_to_item,
+)
 from ethereumetl.service.token_transfer_extractor import TRANSFER_EVENT_TOPIC
 from ethereumetl.service.cryptopunk_extractor import (
     CRYPTOPUNK_TOKEN_ADDRESS,
@@ -34,11 +36,9 @@ from ethereumetl.service.erc1155_transfer_extractor import (
     TRANSFER_BATCH_TOPIC,
     TRANSFER_SINGLE_TOPIC,
 )
-from ethereumetl.misc.constant import ZERO_ADDR
+from .erc20_token_set import Erc20TokenSet
 from .eth_base_adapter import EthBaseAdapter
 
-TOKENID_GROUPBY_KEY = ["token_address", "token_id"]
-
 FILTER_ADDRESS_LIMIT = 1000
 
 
@@ -56,8 +56,9 @@ class EthNftTokenidAdapter(EthBaseAdapter):
         batch_id=None,
         smooth_mode=False,
         smooth_exclude_tokens: Set[str] = None,
-        erc20_token_reader: Callable[[], Set[str]] = None,
+        erc20_token_reader: Callable[[], Erc20TokenSet] = None,
         token_service: Optional[EthTokenService] = None,
+        tokenid_store: Optional[EthNftTokenidStore] = None,
     ):
         if erc721_tokens is None and erc1155_tokens is None and smooth_mode is False:
             raise ValueError(
@@ -65,6 +66,9 @@ class EthNftTokenidAdapter(EthBaseAdapter):
             )
 
         self.token_service = token_service
+        # with the store, the whole states of the changed token ids are exported,
+        # instead of the changes of the batch
+        self.tokenid_store = tokenid_store
         self.erc721_tokens = erc721_tokens or dict()
         self.erc1155_tokens = erc1155_tokens or dict()
         self.erc721_token_addresses = set(self.erc721_tokens.keys())
@@ -123,18 +127,38 @@ class EthNftTokenidAdapter(EthBaseAdapter):
             f" #ERC1155: {len(self.erc1155_token_addresses)}"
         )
 
+    def _close(self):
+        if self.tokenid_store is not None:
+            self.tokenid_store.close()
+
     def export_all(self, start_block, end_block):
         if end_block < self.minimum_blknum:
             return
 
         st0 = time()
 
+        states: Dict[TokenidKey, Dict] = dict()
+        removed: Dict[TokenidKey, Dict] = dict()
+        if self.tokenid_store is not None:
+            start_block = self._continue_from(start_block)
         blocks = self.export_blocks(start_block, end_block)
+        if self.tokenid_store is not None:
+            fork_block = self._find_fork_block(start_block, blocks)
+            if fork_block is not None:
+                states, removed = self.tokenid_store.rollback(fork_block - 1)
+                if fork_block < start_block:
+                    start_block = fork_block
+                    blocks = self.export_blocks(start_block, end_block)
+        index = EnrichIndex(blocks)
         json_logs = self.export_logs(
-            start_block, end_block, self.topics, self.filter_addresses
+            start_block,
+            end_block,
+            self.topics,
+            self.filter_addresses,
+            bloom_blocks=blocks,
         )
         st1 = time()
-        logs = enrich_logs(blocks, json_logs)
+        logs = index.enrich_logs(json_logs)
 
         erc721_transfers = []
 
@@ -150,29 +174,42 @@ class EthNftTokenidAdapter(EthBaseAdapter):
                     chain=self.chain,
                 )
             items = self._keep_by_token_address(items, self.erc721_token_addresses)
-            erc721_transfers = enrich_erc721_transfers(blocks, items)
-
-        erc721_tokenids = (
-            self.calculate_erc721_tokenids(erc721_transfers)
-            if len(erc721_transfers) > 0
-            else []
-        )
+            erc721_transfers = index.enrich_erc721_transfers(items)
 
         erc1155_transfers = []
         if self._should_export(EntityType.ERC1155_TOKENID):
             items = extract_erc1155_transfers(logs, self.batch_size, self.max_workers)
             items = self._keep_by_token_address(items, self.erc1155_token_addresses)
-            erc1155_transfers = enrich_erc1155_transfers(blocks, items)
-
-        erc1155_tokenids = (
-            self.calculate_erc1155_tokenids(erc1155_transfers)
-            if len(erc1155_transfers) > 0
-            else []
+            erc1155_transfers = index.enrich_erc1155_transfers(items)
+
+        # the rolled back states are overwritten by the ones folded again
+        states.update(
+            self.calculate_tokenids(
+                {
+                    EntityType.ERC721_TOKENID: erc721_transfers,
+                    EntityType.ERC1155_TOKENID: erc1155_transfers,
+                },
+                blocks,
+                end_block,
+            )
         )
-
-        all_items = erc721_tokenids + erc1155_tokenids
+        # first seen in the rolled back blocks, and not transferred again
+        removed = {k: v for k, v in removed.items() if k not in states}
+        token_names = {
+            e: self._get_token_name(e) for e in {key[0] for key in states.keys()}
+        }
+        all_items = [
+            tokenid_state_to_item(key, state, token_names[key[0]])
+            for key, state in states.items()
+        ]
+        erc721_tokenids = [
+            e for e in all_items if e["type"] == EntityType.ERC721_TOKENID
+        ]
+        erc1155_tokenids = [
+            e for e in all_items if e["type"] == EntityType.ERC1155_TOKENID
+        ]
         st2 = time()
-        self.item_exporter.export_items(all_items)
+        self.export_tokenids(all_items, removed)
         st3 = time()
         logging.info(
             f"STAT[batch_id: {self.batch_id}] {start_block, end_block} #logs={len(logs)} "
@@ -185,132 +222,120 @@ class EthNftTokenidAdapter(EthBaseAdapter):
     def _should_export(self, entity_type):
         return entity_type in self.entity_types
 
-    def convert_items_into_df(self, items) -> pd.DataFrame:
-        df = convert_token_transfers_to_df(items)
-        df.rename(columns={"id": "token_id"}, inplace=True)
-        # FIXME: pandas can't handle big number very well
-        df = df.astype({"token_id": str})
-        return df
-
-    def calculate_erc721_tokenids(self, token_transfers):
-        df = self.convert_items_into_df(token_transfers)
-
-        df = self.calculate_tokenids(df)
-        df["type"] = EntityType.ERC721_TOKENID
-        return df.to_dict("records")
-
-    def calculate_erc1155_tokenids(self, token_transfers):
-        df = self.convert_items_into_df(token_transfers)
-
-        # those ERC1155 fields are not used
-        df.drop(columns=["operator", "id_pos", "id_cnt", "xfer_type"], inplace=True)
-
-        zero_df = self.calculate_zero_df(df)
-        df = self.calculate_tokenids(df)
-
-        df.drop(
-            columns=["from_address", "to_address", "value_x", "value_y"],
-            inplace=True,
-        )
-
-        df = df.merge(zero_df, how="left", on=TOKENID_GROUPBY_KEY)
-        df.fillna(0, inplace=True)
-        df["type"] = EntityType.ERC1155_TOKENID
-        return df.to_dict("records")
+    def export_tokenids(self, items: List[Dict], removed: Dict[TokenidKey, Dict]):
+        """Export the states, and drop the rows of the removed token ids in the
+        same transaction"""
+        if len(removed) == 0:
+            self.item_exporter.export_items(items)
+            return
 
-    def calculate_zero_df(self, df: pd.DataFrame):
-        def to_stat_df(zero_df: pd.DataFrame, stat_column: str):
-            df: pd.DataFrame = zero_df.groupby(TOKENID_GROUPBY_KEY).agg(
-                {"value": ["count", vsum]}
-            )
-            df.columns = ["_".join(c) for c in df.columns]
-            df.rename(
-                columns={
-                    "value_count": f"{stat_column}_count",
-                    "value_vsum": f"{stat_column}_value",
-                },
-                inplace=True,
+        if not isinstance(self.item_exporter, PostgresItemExporter):
+            logging.warning(
+                f"[{self.batch_id}] #{len(removed)} token ids are gone after the "
+                f"rollback, their rows are left as is"
             )
-            df.reset_index(inplace=True)
-            return df
-
-        zero_df = df[
-            (df["from_address"] == ZERO_ADDR) | (df["to_address"] == ZERO_ADDR)
-        ].copy()  # type: ignore
-
-        minted_df = to_stat_df(
-            zero_df[zero_df["from_address"] == ZERO_ADDR],
-            stat_column="minted",
-        )
-        burned_df = to_stat_df(
-            zero_df[zero_df["to_address"] == ZERO_ADDR],
-            stat_column="burned",
-        )
+            self.item_exporter.export_items(items)
+            return
 
-        stat_df = minted_df.merge(burned_df, how="outer", on=TOKENID_GROUPBY_KEY)
-        stat_df.fillna(0, inplace=True)
-        return stat_df
-
-    def calculate_tokenids(self, df):
-        df = self.df_partition_rank(df)
-        df_first: pd.DataFrame = (
-            df[df["_rank"] == df["_rank_min"]]
-            .rename(  # type: ignore
-                columns={
-                    "_st": "minted_st",
-                    "blknum": "minted_blknum",
-                    "txhash": "minted_txhash",
-                    "txpos": "minted_txpos",
-                    "logpos": "minted_logpos",
-                }
-            )
-            .drop(columns=["_rank", "_rank_min", "_rank_max"])  # type: ignore
+        with self.item_exporter.engine.begin() as conn:
+            deleted = self.delete_tokenids(conn, removed)
+            self.item_exporter.export_items_in(conn, items)
+        logging.info(
+            f"[{self.batch_id}] delete #{deleted}/#{len(removed)} token ids gone "
+            f"after the rollback"
         )
 
-        def select_mint_address(row):
-            return (
-                row["to_address"]
-                if row["from_address"] == ZERO_ADDR
-                else row["from_address"]
+    def delete_tokenids(self, conn, removed: Dict[TokenidKey, Dict]) -> int:
+        token_ids = defaultdict(list)
+        for (token_address, token_id), state in removed.items():
+            token_ids[(state["type"], token_address)].append(token_id)
+
+        et = EntityTable()
+        rowcount = 0
+        for (entity_type, token_address), ids in token_ids.items():
+            sql = text(
+                f"DELETE FROM {self.item_exporter.dbschema}.{et[entity_type]} "
+                f"WHERE token_address = :token_address AND token_id IN :token_ids"
+            ).bindparams(bindparam("token_ids", expanding=True))
+            result = conn.execute(
+                sql, {"token_address": token_address, "token_ids": ids}
             )
+            rowcount += result.rowcount
+        return rowcount
+
+    def calculate_tokenids(
+        self, transfers: Dict[str, List[Dict]], blocks: List[Dict], end_block: int
+    ) -> Dict[TokenidKey, Dict]:
+        """The states of the token ids transferred in the batch, the changes of
+        the batch only, or the whole states with the tokenid store"""
+        if self.tokenid_store is not None:
+            return self.tokenid_store.apply(transfers, blocks, end_block)
+
+        states: Dict[TokenidKey, Dict] = dict()
+        fold_tokenid_transfers(transfers, states)
+        return states
+
+    def _continue_from(self, start_block: int) -> int:
+        """The start of the range to fold, right after the last block of the store,
+        the blocks in between(eg: rolled back before a failed export) are folded
+        again"""
+        store = self.tokenid_store
+        last_block = store.last_block
+        if last_block is None:
+            if start_block > max(self.minimum_blknum, 0):
+                raise ValueError(
+                    f"tokenid store {store.path} is empty, bootstrap it with "
+                    f"eth.nft-tokenid-store before folding from {start_block}"
+                )
+            return start_block
 
-        df_first["from_address"] = df_first.apply(select_mint_address, axis=1)
-        df_first.drop(columns=["to_address"], inplace=True)
-
-        df_last: pd.DataFrame = (
-            df[df["_rank"] == df["_rank_max"]]
-            .rename(  # type: ignore
-                columns={
-                    "_st": "xfered_st",
-                    "blknum": "xfered_blknum",
-                    "txhash": "xfered_txhash",
-                    "txpos": "xfered_txpos",
-                    "logpos": "xfered_logpos",
-                }
+        if start_block > last_block + 1:
+            logging.warning(
+                f"[{self.batch_id}] tokenid store {store.path} is synced to "
+                f"{last_block}, fold from {last_block + 1} instead of {start_block}"
             )
-            .drop(columns=["_rank", "_rank_min", "_rank_max"])  # type: ignore
-        )
-        df_last.drop(columns=["from_address"], inplace=True)
-
-        df = df_first.merge(df_last, on=TOKENID_GROUPBY_KEY + ["turnover_count"])
+            return last_block + 1
+        return start_block
+
+    def _find_fork_block(self, start_block: int, blocks: List[Dict]) -> Optional[int]:
+        """The first block to be folded again: the start of a replayed range(eg:
+        retried after the export failed), or the first reorged block"""
+        store = self.tokenid_store
+        last_block = store.last_block
+        if last_block is None:
+            return None
+
+        floor = store.floor()
+        if start_block <= last_block:
+            if floor is None or floor > start_block:
+                raise ValueError(
+                    f"tokenid store {store.path} is synced to {last_block}, "
+                    f"can't roll back to {start_block - 1}(journaled from {floor})"
+                )
+            return start_block
 
-        df = df.assign(
-            token_name=df.token_address.apply(self._get_token_name),
-            minted_st_day=df.minted_st.apply(as_st_day),
-            xfered_st_day=df.xfered_st.apply(as_st_day),
-        )
-        return df
-
-    def df_partition_rank(self, df):
-        df.sort_values(["blknum", "logpos"], ascending=True, inplace=True)
-        df = partition_rank(df, TOKENID_GROUPBY_KEY)
-        df.rename(
-            columns={
-                "_rank_count": "turnover_count",
-            },
-            inplace=True,
+        first_block = next((e for e in blocks if e["number"] == start_block), None)
+        known_hash = store.block_hashes(start_block - 1, start_block - 1).get(
+            start_block - 1
         )
-        return df
+        if first_block is None or known_hash is None:
+            return None
+        if first_block.get("parent_hash") == known_hash:
+            return None
+
+        canonical = {
+            e["number"]: e["hash"] for e in self.export_blocks(floor, start_block - 1)
+        }
+        for number, block_hash in sorted(
+            store.block_hashes(floor, start_block - 1).items()
+        ):
+            if canonical.get(number) != block_hash:
+                logging.warning(
+                    f"[{self.batch_id}] block {number} is reorged, "
+                    f"roll back the tokenid store to {number - 1}"
+                )
+                return number
+        return None
 
     def _get_token_name(self, token_address: str):
         token_name = None
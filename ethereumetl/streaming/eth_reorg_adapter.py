@@ -3,7 +3,7 @@ from time import time
 from datetime import datetime
 from collections import defaultdict
 from collections.abc import Callable
-from typing import Set, Optional
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy import create_engine, text
 
 from web3 import Web3
@@ -11,6 +11,7 @@ from web3 import Web3
 from blockchainetl.utils import time_elapsed
 from blockchainetl.jobs.exporters.console_item_exporter import ConsoleItemExporter
 from blockchainetl.jobs.exporters.in_memory_item_exporter import InMemoryItemExporter
+from blockchainetl.jobs.exporters.postgres_item_exporter import PostgresItemExporter
 from blockchainetl.enumeration.entity_type import EntityType, EntityTable
 from blockchainetl.enumeration.chain import Chain
 from ethereumetl.domain.receipt import EthReceipt
@@ -18,16 +19,7 @@ from ethereumetl.providers.rpc import BatchHTTPProvider
 from ethereumetl.jobs.export_receipts_job import ExportReceiptsJob
 from ethereumetl.jobs.export_traces_job import ExportTracesJob
 from ethereumetl.service.eth_token_service import EthTokenService
-from ethereumetl.streaming.enrich import (
-    enrich_transactions,
-    enrich_logs,
-    enrich_token_transfers,
-    enrich_erc721_transfers,
-    enrich_erc1155_transfers,
-    enrich_traces,
-    enrich_contracts,
-    enrich_tokens,
-)
+from ethereumetl.streaming.enrich import EnrichIndex, enrich_transactions
 from ethereumetl.streaming.extractor import (
     extract_token_transfers,
     extract_erc721_transfers,
@@ -38,6 +30,8 @@ from ethereumetl.streaming.extractor import (
 )
 from ethereumetl.mappers.receipt_mapper import EthReceiptMapper
 from .eth_base_adapter import EthBaseAdapter
+from .erc20_token_set import Erc20TokenSet, learn_erc20_tokens
+from .eth_block_ring import EthBlockRing
 from .eth_item_id_calculator import EthItemIdCalculator
 from .eth_item_timestamp_calculator import EthItemTimestampCalculator
 
@@ -55,11 +49,12 @@ class EthReorgAdapter(EthBaseAdapter):
         entity_types=tuple(EntityType.ALL_FOR_STREAMING),
         is_geth_provider=True,
         retain_precompiled_calls=True,
-        erc20_token_reader: Callable[[], Set[str]] = None,
+        erc20_token_reader: Callable[[], Erc20TokenSet] = None,
         check_transaction_consistency=False,
         ignore_receipt_missing_error=False,
         enable_enrich=False,
         token_cache_path: Optional[str] = None,
+        block_ring: Optional[EthBlockRing] = None,
     ):
         if EntityType.ERC721_TRANSFER in entity_types and erc20_token_reader is None:
             raise ValueError(
@@ -77,6 +72,7 @@ class EthReorgAdapter(EthBaseAdapter):
         self.check_transaction_consistency = check_transaction_consistency
         self.ignore_receipt_missing_error = ignore_receipt_missing_error
         self.receipt_mapper = EthReceiptMapper()
+        self.block_ring = block_ring
         self.token_service = None
         if enable_enrich:
             self.token_service = EthTokenService(
@@ -100,6 +96,23 @@ class EthReorgAdapter(EthBaseAdapter):
         return {e["blknum"]: e["blkhash"] for e in rows}
 
     def reconcile_blocks(self, start_block: int, end_block: int):
+        headers, diff = self._reconcile(start_block, end_block)
+        start_timestamp = None
+        if len(headers) > 0:
+            start_timestamp = datetime.utcfromtimestamp(
+                min(e["timestamp"] for e in headers) - 3600
+            )
+        return start_timestamp, diff
+
+    def _reconcile(
+        self, start_block: int, end_block: int
+    ) -> Tuple[List[Dict], Dict[int, Tuple[Optional[str], str]]]:
+        """Return the canonical headers fetched and the blocks to be re-exported,
+        blknum -> (old hash, new hash)
+        """
+        if self.block_ring is not None:
+            return self._detect_fork(start_block, end_block)
+
         new_blocks = self.export_blocks(start_block, end_block)
         start_timestamp = datetime.utcfromtimestamp(
             min(e["timestamp"] for e in new_blocks) - 3600
@@ -111,20 +124,92 @@ class EthReorgAdapter(EthBaseAdapter):
             blknum = n["number"]
             if old_blocks.get(blknum) != n["hash"]:
                 diff[blknum] = (old_blocks.get(blknum), n["hash"])
-        return start_timestamp, diff
+        return new_blocks, diff
+
+    def _detect_fork(self, start_block: int, end_block: int):
+        # only the headers after the last checked block are fetched, the ones
+        # before were already compared, a fork below breaks the parent hash chain
+        ring = self.block_ring
+        checked = ring.checked_block
+        if checked is None or checked < start_block - 1:
+            checked = start_block - 1
+        if checked >= end_block:
+            return [], {}
+
+        headers = self.export_blocks(checked + 1, end_block)
+        known = {k: v.hash for k, v in ring.get_many(checked, end_block).items()}
+
+        # the dump streamer doesn't feed the ring(or not yet), ask the warehouse
+        unknown = [e for e in headers if e["number"] not in known]
+        if len(unknown) > 0:
+            start_timestamp = datetime.utcfromtimestamp(
+                min(e["timestamp"] for e in unknown) - 3600
+            )
+            known.update(
+                self.fetch_old_blocks(
+                    min(e["number"] for e in unknown),
+                    max(e["number"] for e in unknown),
+                    start_timestamp,
+                )
+            )
+
+        diff = {}
+        for n in headers:
+            blknum = n["number"]
+            if known.get(blknum) != n["hash"]:
+                diff[blknum] = (known.get(blknum), n["hash"])
 
-    def delete_entity(self, entity_type, start_timestamp, blocks):
+        first = next((e for e in headers if e["number"] == checked + 1), None)
+        if (
+            first is not None
+            and checked in known
+            and first["parent_hash"] != known[checked]
+        ):
+            forked, forked_diff = self._walk_back(checked)
+            headers += forked
+            diff.update(forked_diff)
+        return headers, diff
+
+    def _walk_back(self, block: int):
+        """Walk back from block until the canonical chain joins the block ring"""
+        floor = self.block_ring.floor()
+        headers, diff = [], {}
+        end = block
+        while floor is not None and end >= floor:
+            start = max(floor, end - self.batch_size + 1)
+            known = self.block_ring.get_many(start, end)
+            chunk = self.export_blocks(start, end)
+            for n in sorted(chunk, key=lambda e: e["number"], reverse=True):
+                old = known.get(n["number"])
+                if old is not None and old.hash == n["hash"]:
+                    return headers, diff
+                headers.append(n)
+                diff[n["number"]] = (old.hash if old is not None else None, n["hash"])
+            end = start - 1
+
+        logging.warning(f"Reorg is deeper than the block ring, stop at {end + 1}")
+        return headers, diff
+
+    def delete_entity(
+        self, conn, entity_type, start_timestamp, end_timestamp, blocks
+    ) -> int:
         et = EntityTable()
-        with self.target_engine.begin() as conn:
-            sql = text(
-                f"DELETE FROM {self.target_schema}.{et[entity_type]} "
-                f"WHERE block_timestamp >= '{start_timestamp}' "
-                f"AND blknum IN ({','.join(str(e) for e in blocks)})"
-            )
-            result = conn.execute(sql)
-            return result.rowcount
+        # bound block_timestamp on both sides, to only scan the chunks of the blocks
+        sql = text(
+            f"DELETE FROM {self.target_schema}.{et[entity_type]} "
+            f"WHERE block_timestamp >= :start_timestamp "
+            f"AND block_timestamp <= :end_timestamp "
+            f"AND blknum = ANY(:blocks)"
+        )
+        result = conn.execute(
+            sql,
+            start_timestamp=start_timestamp,
+            end_timestamp=end_timestamp,
+            blocks=list(blocks),
+        )
+        return result.rowcount
 
-    def drop_old_blocks(self, start_timestamp, blocks):
+    def drop_old_blocks(self, conn, start_timestamp, end_timestamp, blocks):
         entities = [
             EntityType.BLOCK,
             EntityType.TRANSACTION,
@@ -138,14 +223,33 @@ class EthReorgAdapter(EthBaseAdapter):
         rowcount = 0
         for entity in entities:
             if self._should_export(entity):
-                rowcount += self.delete_entity(entity, start_timestamp, blocks)
+                rowcount += self.delete_entity(
+                    conn, entity, start_timestamp, end_timestamp, blocks
+                )
         return rowcount
 
+    def replace_blocks(self, new_blocks: List[Dict], all_items: List[Dict]) -> int:
+        """Drop the old rows of the blocks and insert the new ones in one transaction"""
+        timestamps = [e["timestamp"] for e in new_blocks]
+        start_timestamp = datetime.utcfromtimestamp(min(timestamps) - 3600)
+        end_timestamp = datetime.utcfromtimestamp(max(timestamps) + 3600)
+        blocks = [e["number"] for e in new_blocks]
+
+        in_transaction = isinstance(self.item_exporter, PostgresItemExporter)
+        with self.target_engine.begin() as conn:
+            dropped = self.drop_old_blocks(conn, start_timestamp, end_timestamp, blocks)
+            if in_transaction:
+                self.item_exporter.export_items_in(conn, all_items)
+        if not in_transaction:
+            self.item_exporter.export_items(all_items)
+        return dropped
+
     def export_all(self, start_block, end_block):
         st0 = time()
 
-        start_timestamp, diff_blocks = self.reconcile_blocks(start_block, end_block)
+        headers, diff_blocks = self._reconcile(start_block, end_block)
         if len(diff_blocks) == 0:
+            self._mark_checked(headers, end_block)
             logging.info(f"Reorg not detected for blocks: {start_block, end_block}")
             return
 
@@ -154,6 +258,7 @@ class EthReorgAdapter(EthBaseAdapter):
             start_block=None, end_block=None, blocks=diff_blocks.keys()
         )
         enriched_blocks = blocks if EntityType.BLOCK in self.entity_types else []
+        index = EnrichIndex(blocks)
 
         # 1. Export receipts and logs
         receipts, logs = [], []
@@ -182,7 +287,7 @@ class EthReorgAdapter(EthBaseAdapter):
         )
         # 3. Enrich logs with block hash/timestamp
         enriched_logs = (
-            enrich_logs(blocks, logs)
+            index.enrich_logs(logs)
             if EntityType.LOG in self.entity_types and len(logs) > 0
             else []
         )
@@ -200,7 +305,7 @@ class EthReorgAdapter(EthBaseAdapter):
 
         # 5. Enrich token Transfers with block hash/timestamp
         enriched_token_transfers = (
-            enrich_token_transfers(blocks, token_transfers)
+            index.enrich_token_transfers(token_transfers)
             if EntityType.TOKEN_TRANSFER in self.entity_types
             and len(token_transfers) > 0
             else []
@@ -220,7 +325,7 @@ class EthReorgAdapter(EthBaseAdapter):
 
         # 7. Enrich ERC721 Transfers with block hash/timestamp
         enriched_erc721_transfers = (
-            enrich_erc721_transfers(blocks, erc721_transfers)
+            index.enrich_erc721_transfers(erc721_transfers)
             if EntityType.ERC721_TRANSFER in self.entity_types
             and len(erc721_transfers) > 0
             else []
@@ -235,7 +340,7 @@ class EthReorgAdapter(EthBaseAdapter):
 
         # 9. Enrich token Transfers with block hash/timestamp
         enriched_erc1155_transfers = (
-            enrich_erc1155_transfers(blocks, erc1155_transfers)
+            index.enrich_erc1155_transfers(erc1155_transfers)
             if EntityType.ERC1155_TRANSFER in self.entity_types
             and len(erc1155_transfers) > 0
             else []
@@ -249,7 +354,7 @@ class EthReorgAdapter(EthBaseAdapter):
 
         # 11. Enrich traces with block hash/timestamp and txhash(only Geth)
         enriched_traces = (
-            enrich_traces(blocks, traces)
+            index.enrich_traces(traces)
             if EntityType.TRACE in self.entity_types and len(traces) > 0
             else []
         )
@@ -261,7 +366,7 @@ class EthReorgAdapter(EthBaseAdapter):
 
         # 13. Enrich contract with block hash/timestamp
         enriched_contracts = (
-            enrich_contracts(blocks, contracts)
+            index.enrich_contracts(contracts)
             if EntityType.CONTRACT in self.entity_types and len(contracts) > 0
             else []
         )
@@ -272,10 +377,14 @@ class EthReorgAdapter(EthBaseAdapter):
             tokens = extract_tokens(
                 contracts, self.batch_web3_provider, self.max_workers
             )
+            # the new ERC20 tokens are known before the next refresh
+            enriched_erc721_transfers = learn_erc20_tokens(
+                self.erc20_token_reader, tokens, enriched_erc721_transfers
+            )
 
         # 15. Enrich tokens with block hash/timestamp
         enriched_tokens = (
-            enrich_tokens(blocks, tokens)
+            index.enrich_tokens(tokens)
             if EntityType.TOKEN in self.entity_types and len(tokens) > 0
             else []
         )
@@ -298,8 +407,8 @@ class EthReorgAdapter(EthBaseAdapter):
         self.calculate_item_ids(all_items)
         self.calculate_item_timestamps(all_items)
 
-        dropped = self.drop_old_blocks(start_timestamp, diff_blocks.keys())
-        self.item_exporter.export_items(all_items)
+        dropped = self.replace_blocks(blocks, all_items)
+        self._mark_checked(headers, end_block)
         st2 = time()
         logging.info(
             f"Reorg blocks=({start_block}, {end_block}) diff={diff_blocks} "
@@ -307,6 +416,13 @@ class EthReorgAdapter(EthBaseAdapter):
             f"total-elapsed={time_elapsed(st0, st2)} export-elapsed={time_elapsed(st1, st2)}"
         )
 
+    def _mark_checked(self, headers: List[Dict], end_block: int):
+        # the ring holds what the warehouse has, the forked blocks are replaced now
+        if self.block_ring is None:
+            return
+        self.block_ring.append(headers)
+        self.block_ring.checked_block = end_block
+
     def _export_receipts_and_logs(self, transactions):
         exporter = InMemoryItemExporter(item_types=[EntityType.RECEIPT, EntityType.LOG])
 
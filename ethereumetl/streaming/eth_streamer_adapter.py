@@ -2,12 +2,13 @@ import logging
 from time import time
 from collections import defaultdict
 from collections.abc import Callable
-from typing import Set, Optional
+from typing import Optional
 
 from web3 import Web3
 
 from blockchainetl.env import SUPPORT_BLOCK_RECEIPTS
 from blockchainetl.utils import time_elapsed
+from blockchainetl.metrics import StageTimer
 from blockchainetl.jobs.exporters.console_item_exporter import ConsoleItemExporter
 from blockchainetl.jobs.exporters.in_memory_item_exporter import InMemoryItemExporter
 from blockchainetl.enumeration.entity_type import EntityType
@@ -18,16 +19,7 @@ from ethereumetl.jobs.export_receipts_job import ExportReceiptsJob
 from ethereumetl.jobs.export_block_receipts_job import ExportBlockReceiptsJob
 from ethereumetl.jobs.export_traces_job import ExportTracesJob
 from ethereumetl.service.eth_token_service import EthTokenService
-from ethereumetl.streaming.enrich import (
-    enrich_transactions,
-    enrich_logs,
-    enrich_token_transfers,
-    enrich_erc721_transfers,
-    enrich_erc1155_transfers,
-    enrich_traces,
-    enrich_contracts,
-    enrich_tokens,
-)
+from ethereumetl.streaming.enrich import EnrichIndex, enrich_transactions
 from ethereumetl.streaming.extractor import (
     extract_token_transfers,
     extract_erc721_transfers,
@@ -38,6 +30,10 @@ from ethereumetl.streaming.extractor import (
 )
 from ethereumetl.mappers.receipt_mapper import EthReceiptMapper
 from .eth_base_adapter import EthBaseAdapter
+from .erc20_token_set import Erc20TokenSet, learn_erc20_tokens
+from .eth_block_ring import EthBlockRing
+from .eth_block_count_index import EthBlockCountIndex
+from blockchainetl.service.block_timestamp_index import BlockTimestampIndex
 from .eth_item_id_calculator import EthItemIdCalculator
 from .eth_item_timestamp_calculator import EthItemTimestampCalculator
 
@@ -53,12 +49,15 @@ class EthStreamerAdapter(EthBaseAdapter):
         entity_types=tuple(EntityType.ALL_FOR_STREAMING),
         is_geth_provider=True,
         retain_precompiled_calls=True,
-        erc20_token_reader: Callable[[], Set[str]] = None,
+        erc20_token_reader: Callable[[], Erc20TokenSet] = None,
         check_transaction_consistency=False,
         ignore_receipt_missing_error=False,
         enable_enrich=False,
         token_cache_path: Optional[str] = None,
         trace_provider: Optional[BatchHTTPProvider] = None,
+        block_ring: Optional[EthBlockRing] = None,
+        block_count_index: Optional[EthBlockCountIndex] = None,
+        block_timestamp_index: Optional[BlockTimestampIndex] = None,
     ):
         if EntityType.ERC721_TRANSFER in entity_types and erc20_token_reader is None:
             raise ValueError(
@@ -80,6 +79,12 @@ class EthStreamerAdapter(EthBaseAdapter):
                 Web3(batch_web3_provider), cache_path=token_cache_path
             )
         self.trace_provider = trace_provider or batch_web3_provider
+        # feed the reorg watcher with the exported block hashes
+        self.block_ring = block_ring
+        # feed the consistency checkers with the expected tx/log counts
+        self.block_count_index = block_count_index
+        # feed the date/timestamp -> block range queries
+        self.block_timestamp_index = block_timestamp_index
 
         EthBaseAdapter.__init__(
             self, chain, batch_web3_provider, item_exporter, batch_size, max_workers
@@ -87,12 +92,15 @@ class EthStreamerAdapter(EthBaseAdapter):
 
     def export_all(self, start_block, end_block):
         st0 = time()
+        timer = StageTimer()
 
         # 0. Export blocks and transactions
         blocks, transactions = self.export_blocks_and_transactions(
             start_block, end_block
         )
         enriched_blocks = blocks if EntityType.BLOCK in self.entity_types else []
+        index = EnrichIndex(blocks)
+        timer.lap("blocks_and_transactions")
 
         # 1. Export receipts and logs
         receipts, logs = [], []
@@ -115,6 +123,8 @@ class EthStreamerAdapter(EthBaseAdapter):
                     start_block, end_block, transactions
                 )
 
+        timer.lap("receipts_and_logs")
+
         # 2. Enrich transactions with receipt
         enriched_transactions = []
         if EntityType.RECEIPT in self.entity_types:
@@ -124,7 +134,7 @@ class EthStreamerAdapter(EthBaseAdapter):
 
         # 3. Enrich logs with block hash/timestamp
         enriched_logs = (
-            enrich_logs(blocks, logs)
+            index.enrich_logs(logs)
             if EntityType.LOG in self.entity_types and len(logs) > 0
             else []
         )
@@ -142,7 +152,7 @@ class EthStreamerAdapter(EthBaseAdapter):
 
         # 5. Enrich token Transfers with block hash/timestamp
         enriched_token_transfers = (
-            enrich_token_transfers(blocks, token_transfers)
+            index.enrich_token_transfers(token_transfers)
             if EntityType.TOKEN_TRANSFER in self.entity_types
             and len(token_transfers) > 0
             else []
@@ -162,7 +172,7 @@ class EthStreamerAdapter(EthBaseAdapter):
 
         # 7. Enrich ERC721 Transfers with block hash/timestamp
         enriched_erc721_transfers = (
-            enrich_erc721_transfers(blocks, erc721_transfers)
+            index.enrich_erc721_transfers(erc721_transfers)
             if EntityType.ERC721_TRANSFER in self.entity_types
             and len(erc721_transfers) > 0
             else []
@@ -177,21 +187,25 @@ class EthStreamerAdapter(EthBaseAdapter):
 
         # 9. Enrich token Transfers with block hash/timestamp
         enriched_erc1155_transfers = (
-            enrich_erc1155_transfers(blocks, erc1155_transfers)
+            index.enrich_erc1155_transfers(erc1155_transfers)
             if EntityType.ERC1155_TRANSFER in self.entity_types
             and len(erc1155_transfers) > 0
             else []
         )
 
+        timer.lap("token_transfers")
+
         # 10. Export traces
         # Geth's trace missing txhash
         traces = []
         if self._should_export(EntityType.TRACE):
             traces = self._export_traces(start_block, end_block, transactions)
 
+        timer.lap("traces")
+
         # 11. Enrich traces with block hash/timestamp and txhash(only Geth)
         enriched_traces = (
-            enrich_traces(blocks, traces)
+            index.enrich_traces(traces)
             if EntityType.TRACE in self.entity_types and len(traces) > 0
             else []
         )
@@ -203,7 +217,7 @@ class EthStreamerAdapter(EthBaseAdapter):
 
         # 13. Enrich contract with block hash/timestamp
         enriched_contracts = (
-            enrich_contracts(blocks, contracts)
+            index.enrich_contracts(contracts)
             if EntityType.CONTRACT in self.entity_types and len(contracts) > 0
             else []
         )
@@ -214,14 +228,20 @@ class EthStreamerAdapter(EthBaseAdapter):
             tokens = extract_tokens(
                 contracts, self.batch_web3_provider, self.max_workers
             )
+            # the new ERC20 tokens are known before the next refresh
+            enriched_erc721_transfers = learn_erc20_tokens(
+                self.erc20_token_reader, tokens, enriched_erc721_transfers
+            )
 
         # 15. Enrich tokens with block hash/timestamp
         enriched_tokens = (
-            enrich_tokens(blocks, tokens)
+            index.enrich_tokens(tokens)
             if EntityType.TOKEN in self.entity_types and len(tokens) > 0
             else []
         )
 
+        timer.lap("contracts_and_tokens")
+
         logging.debug("Exporting with " + type(self.item_exporter).__name__)
 
         all_items = (
@@ -248,6 +268,15 @@ class EthStreamerAdapter(EthBaseAdapter):
             return
 
         self.item_exporter.export_items(all_items)
+        timer.lap("export")
+        if self.block_ring is not None:
+            self.block_ring.append(blocks)
+        if self.block_count_index is not None:
+            self.block_count_index.add_blocks(
+                blocks, logs if self._should_export(EntityType.LOG) else None
+            )
+        if self.block_timestamp_index is not None:
+            self.block_timestamp_index.add_blocks(blocks)
         if len(all_items) > 1024:
             st2 = time()
             logging.info(
@@ -7,7 +7,6 @@ from time import time
 from datetime import datetime
 from typing import List, Dict, Optional
 import concurrent.futures
-from cachetools import cached, TTLCache
 from multiprocessing.pool import Pool
 
 from sqlalchemy import create_engine
@@ -30,10 +29,7 @@ from ethereumetl.streaming.extractor import (
     extract_token_transfers,
     extract_erc1155_transfers,
 )
-from ethereumetl.streaming.enrich import (
-    enrich_token_transfers,
-    enrich_erc1155_transfers,
-)
+from ethereumetl.streaming.enrich import EnrichIndex
 from ethereumetl.misc.eth_extract_balance import READ_LOG_TEMPLATE
 from ethereumetl.streaming.utils import convert_token_transfers_to_df
 from ethereumetl.service.token_transfer_extractor import (
@@ -187,12 +183,14 @@ class EthTokenBalanceAdapter(EthBaseAdapter):
     def export_all(self, start_block, end_block):
         st0 = time()
 
-        dict_logs = self._get_logs(start_block, end_block)
+        # fetched once, for the logsBloom filter and the enrichment
+        blocks = self._get_blocks(start_block, end_block)
+        st1 = time()
+        dict_logs = self._get_logs(start_block, end_block, blocks)
         if len(dict_logs) == 0:
             return
 
-        st1 = time()
-        blocks = self._get_blocks(start_block, end_block)
+        index = EnrichIndex(blocks)
         st2 = time()
 
         token_transfers = []
@@ -202,7 +200,7 @@ class EthTokenBalanceAdapter(EthBaseAdapter):
             token_transfers = extract_token_transfers(
                 dict_logs, self.batch_size, self.max_workers, self.chain
             )
-            token_transfers = enrich_token_transfers(blocks, token_transfers)
+            token_transfers = index.enrich_token_transfers(token_transfers)
         token_df = convert_token_transfers_to_df(token_transfers, ignore_error=True)
 
         st3 = time()
@@ -231,7 +229,7 @@ class EthTokenBalanceAdapter(EthBaseAdapter):
             erc1155_transfers = extract_erc1155_transfers(
                 dict_logs, self.batch_size, self.max_workers, self.chain
             )
-            erc1155_transfers = enrich_erc1155_transfers(blocks, erc1155_transfers)
+            erc1155_transfers = index.enrich_erc1155_transfers(erc1155_transfers)
         erc1155_df = convert_token_transfers_to_df(erc1155_transfers, ignore_error=True)
         if len(erc1155_df) > 0:
             erc1155_df = self._export_erc1155_balances(erc1155_df)
@@ -261,8 +259,8 @@ class EthTokenBalanceAdapter(EthBaseAdapter):
             f"STAT {start_block, end_block} #logs={len(dict_logs)} #exported={exported} "
             f"#token_balances=(H: {len(token_items)}/ X: {len(token_transfers)}) "
             f"#erc1155_balances=(H: {len(erc1155_items)}/ X: {len(erc1155_transfers)}) "
-            f"elapsed @total={time_elapsed(st0, st9)} @rpc_getLogs={time_elapsed(st0, st1)} "
-            f"@rpc_getBlocks={time_elapsed(st1, st2)} @extract={time_elapsed(st2, st3)} "
+            f"elapsed @total={time_elapsed(st0, st9)} @rpc_getBlocks={time_elapsed(st0, st1)} "
+            f"@rpc_getLogs={time_elapsed(st1, st2)} @extract={time_elapsed(st2, st3)} "
             f"@calculate={time_elapsed(st3, st4)} @get_old={time_elapsed(st4, st5)} "
             f"@cumsum={time_elapsed(st5, st6)} @export={time_elapsed(st7, st8)} "
             f"@async_enrich={time_elapsed(st8, st9)}"
@@ -279,6 +277,7 @@ class EthTokenBalanceAdapter(EthBaseAdapter):
                 df[col + "_day"] = df[col].apply(self._to_st_day)  # type: ignore
 
         df["blknum"] = end_block
+        self.token_service.get_tokens(df.token_address.unique())
         df["decimals"] = df.token_address.apply(self._get_token_decimals)
 
         return df
@@ -376,14 +375,17 @@ class EthTokenBalanceAdapter(EthBaseAdapter):
         task = {"t": item["token_address"], "a": item["address"]}
         self.async_enrich_queue.push(json.dumps(task), priority=priority)
 
-    def _get_logs(self, start_block, end_block):
+    def _get_logs(self, start_block, end_block, blocks: List[Dict]):
         if self.read_log_from == "rpc":
             return self.export_logs(
-                start_block, end_block, self.topics, self.token_addresses
+                start_block,
+                end_block,
+                self.topics,
+                self.token_addresses,
+                bloom_blocks=blocks,
             )
 
         elif self.source_db_engine is not None:
-            blocks = self._get_blocks(start_block, end_block)
             min_st: int = min(b["timestamp"] for b in blocks)
             max_st: int = max(b["timestamp"] for b in blocks)
             min_st = datetime.utcfromtimestamp(min_st).strftime("%Y-%m-%d %H:%M:%S")
@@ -427,7 +429,6 @@ class EthTokenBalanceAdapter(EthBaseAdapter):
                 "get logs only support read from rpc or soruce db"
             )
 
-    @cached(cache=TTLCache(maxsize=4096, ttl=5))
     def _get_blocks(self, start_block, end_block):
         if self.target_db_engine is None:
             blocks = self.export_blocks(start_block, end_block)
@@ -435,7 +436,7 @@ class EthTokenBalanceAdapter(EthBaseAdapter):
             result = self.target_db_engine.execute(
                 f"""
 SELECT
-    blknum AS number, blkhash AS hash, _st AS timestamp
+    blknum AS number, blkhash AS hash, _st AS timestamp, logs_bloom
 FROM
     {self.chain}.blocks
 WHERE
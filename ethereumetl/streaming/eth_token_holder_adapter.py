@@ -15,10 +15,7 @@ from ethereumetl.streaming.extractor import (
     extract_token_transfers,
     extract_erc1155_transfers,
 )
-from ethereumetl.streaming.enrich import (
-    enrich_token_transfers,
-    enrich_erc1155_transfers,
-)
+from ethereumetl.streaming.enrich import EnrichIndex
 from ethereumetl.streaming.utils import convert_token_transfers_to_df
 from ethereumetl.service.token_transfer_extractor import (
     TRANSFER_EVENT_TOPIC,
@@ -69,15 +66,22 @@ class EthTokenHolderAdapter(EthBaseAdapter):
     def export_all(self, start_block, end_block):
         st0 = time()
 
+        # the blocks first, the logs are only requested for the blocks whose
+        # logsBloom may match the filter
+        blocks = self.export_blocks(start_block, end_block)
+        index = EnrichIndex(blocks)
+        st1 = time()
+
         dict_logs = self.export_logs(
-            start_block, end_block, self.topics, self.include_tokens
+            start_block,
+            end_block,
+            self.topics,
+            self.include_tokens,
+            bloom_blocks=blocks,
         )
         dict_logs = [e for e in dict_logs if e["address"] not in self.exclude_tokens]
         if len(dict_logs) == 0:
             return
-
-        st1 = time()
-        blocks = self.export_blocks(start_block, end_block)
         st2 = time()
 
         token_transfers = []
@@ -88,13 +92,13 @@ class EthTokenHolderAdapter(EthBaseAdapter):
                 self.max_workers,
                 self.chain,
             )
-            token_transfers = enrich_token_transfers(blocks, token_transfers)
+            token_transfers = index.enrich_token_transfers(token_transfers)
         erc1155_transfers = []
         if self._should_export(EntityType.ERC1155_HOLDER):
             erc1155_transfers = extract_erc1155_transfers(
                 dict_logs, self.batch_size, self.max_workers
             )
-            erc1155_transfers = enrich_erc1155_transfers(blocks, erc1155_transfers)
+            erc1155_transfers = index.enrich_erc1155_transfers(erc1155_transfers)
 
         st3 = time()
         token_holders = (
@@ -121,8 +125,8 @@ class EthTokenHolderAdapter(EthBaseAdapter):
             f"STAT {start_block, end_block} #logs={len(dict_logs)} #exported={exported} "
             f"#token_holders=(H: {len(token_holders)}/ X: {len(token_transfers)}) "
             f"#erc1155_hodlers=(H: {len(erc1155_holders)}/ X: {len(erc1155_transfers)}) "
-            f"elapsed @total={time_elapsed(st0, st5)} @rpc_getLogs={time_elapsed(st0, st1)} "
-            f"@rpc_getBlocks={time_elapsed(st1, st2)} @extract={time_elapsed(st2, st3)} "
+            f"elapsed @total={time_elapsed(st0, st5)} @rpc_getBlocks={time_elapsed(st0, st1)} "
+            f"@rpc_getLogs={time_elapsed(st1, st2)} @extract={time_elapsed(st2, st3)} "
             f"@calculate={time_elapsed(st3, st4)} @export={time_elapsed(st4, st5)} "
         )
 
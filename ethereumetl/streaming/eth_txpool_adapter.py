@@ -1,15 +1,24 @@
+import json
 import logging
 
 from time import time
 from datetime import datetime
-from blockchainetl.utils import time_elapsed
+from typing import Dict, List, Optional
+from blockchainetl.utils import time_elapsed, rpc_response_batch_to_results
 from blockchainetl.enumeration.chain import Chain
 from blockchainetl.jobs.exporters.console_item_exporter import ConsoleItemExporter
 from blockchainetl.jobs.exporters.in_memory_item_exporter import InMemoryItemExporter
 from blockchainetl.enumeration.entity_type import EntityType
 from ethereumetl.jobs.export_txpool_job import ExportTxpoolJob
+from ethereumetl.json_rpc_requests import (
+    generate_get_filter_changes_json_rpc,
+    generate_get_transaction_by_hash_json_rpc,
+    generate_new_pending_transaction_filter_json_rpc,
+)
+from ethereumetl.mappers.txpool_mapper import EthTxpoolMapper
 from ethereumetl.providers.auto import new_web3_provider
 from .eth_item_id_calculator import EthItemIdCalculator
+from .txpool_tracker import TxpoolTracker
 
 
 class EthTxpoolAdapter:
@@ -20,13 +29,27 @@ class EthTxpoolAdapter:
         item_exporter=ConsoleItemExporter(),
         chain=Chain.ETHEREUM,
         max_workers=5,
+        batch_size=100,
+        pending_filter=False,
+        full_sync_every=30,
     ):
         self.chain = chain
         self.web3 = new_web3_provider(provider_uri, chain)
         self.batch_web3_provider = batch_web3_provider
         self.item_exporter = item_exporter
         self.max_workers = max_workers
+        self.batch_size = batch_size
         self.item_id_calculator = EthItemIdCalculator()
+        self.tx_pool_mapper = EthTxpoolMapper()
+
+        # only the changes since the last poll are exported
+        self.tracker = TxpoolTracker()
+        # poll the new pending transactions by a filter, with the whole pool
+        # diffed every full_sync_every polls(the dropped ones can't be filtered)
+        self.pending_filter = pending_filter
+        self.full_sync_every = max(full_sync_every, 1)
+        self._filter_id: Optional[str] = None
+        self._polls_since_full_sync = 0
 
     def open(self):
         self.item_exporter.open()
@@ -37,28 +60,95 @@ class EthTxpoolAdapter:
     def export_all(self, _, end_block):
         st0 = time()
         now = datetime.utcnow()
-        pools = self._export_tx_pools(end_block, now)
-        self.calculate_item_ids(pools)
+        changes, source = self._poll_changes(now)
+        for item in changes:
+            item["blknum"] = end_block
+            item["block_timestamp"] = now
+        self.calculate_item_ids(changes)
         st1 = time()
-        self.item_exporter.export_items(pools)
+        self.item_exporter.export_items(changes)
         st2 = time()
 
         logging.info(
-            f"Export Txpool #items={len(pools)} "
+            f"Export Txpool #items={len(changes)} #pool={len(self.tracker)} "
+            f"source={source} "
             f"elapsed @total={time_elapsed(st0, st2)} "
-            f"@rpc_txpoolContent={time_elapsed(st0, st1)} "
+            f"@rpc={time_elapsed(st0, st1)} "
             f"@export={time_elapsed(st1, st2)}"
         )
 
-    def _export_tx_pools(self, end_block, block_timestamp):
+    def _poll_changes(self, now: datetime):
+        if (
+            self.pending_filter
+            and self._filter_id is not None
+            and self._polls_since_full_sync < self.full_sync_every
+        ):
+            txs = self._export_pending_txs()
+            if txs is not None:
+                self._polls_since_full_sync += 1
+                return self.tracker.add(txs, now), "pending_filter"
+
+        if self.pending_filter:
+            # installed before the snapshot, nothing is missed in between
+            self._install_pending_filter()
+        self._polls_since_full_sync = 1
+        return self.tracker.diff(self._export_tx_pools(), now), "txpool_content"
+
+    def _export_tx_pools(self) -> List[Dict]:
         exporter = InMemoryItemExporter(item_types=[EntityType.TXPOOL])
         job = ExportTxpoolJob(provider=self.batch_web3_provider, item_exporter=exporter)
         job.run()
-        items = exporter.get_items(EntityType.TXPOOL)
-        for item in items:
-            item["blknum"] = end_block
-            item["block_timestamp"] = block_timestamp
-        return items
+        return exporter.get_items(EntityType.TXPOOL)
+
+    def _install_pending_filter(self):
+        try:
+            response = self.batch_web3_provider.make_batch_request(
+                json.dumps(generate_new_pending_transaction_filter_json_rpc())
+            )
+            self._filter_id = list(rpc_response_batch_to_results(response))[0]
+        except ValueError as e:
+            logging.warning(f"failed to install the pending transaction filter: {e}")
+            self._filter_id = None
+
+    def _export_pending_txs(self) -> Optional[List[Dict]]:
+        """The new pending transactions since the last poll, None if the filter
+        is gone(eg: expired on the node)"""
+        try:
+            response = self.batch_web3_provider.make_batch_request(
+                json.dumps(generate_get_filter_changes_json_rpc(self._filter_id))
+            )
+            hashes = list(rpc_response_batch_to_results(response))[0]
+        except ValueError as e:
+            logging.warning(f"failed to poll the pending transaction filter: {e}")
+            self._filter_id = None
+            return None
+
+        known = self.tracker.known_hashes()
+        hashes = [e for e in dict.fromkeys(hashes) if e not in known]
+        txs = []
+        for idx in range(0, len(hashes), self.batch_size):
+            rpc = list(
+                generate_get_transaction_by_hash_json_rpc(
+                    hashes[idx : idx + self.batch_size]
+                )
+            )
+            response = self.batch_web3_provider.make_batch_request(json.dumps(rpc))
+            if not isinstance(response, list):
+                logging.warning(f"failed to get the pending transactions: {response}")
+                # they are gone from the filter, pick them up by a full sync
+                self._polls_since_full_sync = self.full_sync_every
+                continue
+            for item in response:
+                tx = item.get("result")
+                # evicted or mined already, left to the next full sync
+                if tx is None or tx.get("blockNumber") is not None:
+                    continue
+                txs.append(
+                    self.tx_pool_mapper.txpool_to_dict(
+                        self.tx_pool_mapper.json_dict_to_txpool(tx, "pending")
+                    )
+                )
+        return txs
 
     def calculate_item_ids(self, items):
         for item in items:
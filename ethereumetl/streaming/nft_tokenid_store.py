@@ -0,0 +1,320 @@
+import os
+import json
+import sqlite3
+from threading import Lock
+from typing import Dict, Generator, Iterable, List, Optional, Tuple
+
+from blockchainetl.utils import as_st_day
+from blockchainetl.enumeration.entity_type import EntityType
+from ethereumetl.misc.constant import ZERO_ADDR
+
+# (token_address, token_id)
+TokenidKey = Tuple[str, int]
+
+XFER_FIELDS = ("st", "blknum", "txhash", "txpos", "logpos")
+
+TOKENID_FIELDS = {
+    EntityType.ERC721_TOKENID: (
+        ["turnover_count"]
+        + [f"minted_{e}" for e in XFER_FIELDS]
+        + [f"xfered_{e}" for e in XFER_FIELDS]
+        + ["from_address", "to_address"]
+    ),
+    EntityType.ERC1155_TOKENID: (
+        ["turnover_count", "minted_count", "minted_value"]
+        + ["burned_count", "burned_value"]
+        + [f"minted_{e}" for e in XFER_FIELDS]
+        + [f"xfered_{e}" for e in XFER_FIELDS]
+    ),
+}
+
+
+def apply_tokenid_transfer(
+    state: Optional[Dict], transfer: Dict, entity_type: str
+) -> Dict:
+    """Fold the transfer into the state of its token id, the state is not modified.
+
+    The minted_* and from_address(the mint address: the receiver of a mint, else
+    the sender) are taken from the first transfer, the xfered_* and to_address
+    from the last one.
+    """
+    xfer = {
+        "st": transfer.get("block_timestamp"),
+        "blknum": transfer.get("block_number"),
+        "txhash": transfer.get("transaction_hash"),
+        "txpos": transfer.get("transaction_index"),
+        "logpos": transfer.get("log_index"),
+    }
+    from_address = transfer.get("from_address")
+    to_address = transfer.get("to_address")
+
+    if state is None:
+        state = {
+            "type": entity_type,
+            "turnover_count": 0,
+            "minted_count": 0,
+            "minted_value": 0,
+            "burned_count": 0,
+            "burned_value": 0,
+            "from_address": to_address if from_address == ZERO_ADDR else from_address,
+        }
+        state.update({f"minted_{k}": v for k, v in xfer.items()})
+    else:
+        state = dict(state)
+
+    state["turnover_count"] += 1
+    state.update({f"xfered_{k}": v for k, v in xfer.items()})
+    state["to_address"] = to_address
+
+    value = int(transfer.get("value") or 0)
+    if from_address == ZERO_ADDR:
+        state["minted_count"] += 1
+        state["minted_value"] += value
+    if to_address == ZERO_ADDR:
+        state["burned_count"] += 1
+        state["burned_value"] += value
+    return state
+
+
+def fold_tokenid_transfers(
+    transfers: Dict[str, List[Dict]],
+    states: Dict[TokenidKey, Dict],
+    journal: Optional[Dict[Tuple[int, TokenidKey], Optional[Dict]]] = None,
+) -> List[TokenidKey]:
+    """Fold the transfers(by the token id entity type) into states in block and log
+    order, in place, and return the changed token ids.
+
+    If journal is given, the state of each token id before its first transfer in a
+    block is recorded by (block_number, token id), None if it was unknown.
+    """
+    xfers = [(e, entity_type) for entity_type, v in transfers.items() for e in v]
+    xfers.sort(key=lambda e: (e[0]["block_number"], e[0]["log_index"]))
+
+    changed: Dict[TokenidKey, None] = {}
+    for transfer, entity_type in xfers:
+        key = (transfer["token_address"], int(transfer["id"]))
+        state = states.get(key)
+        if journal is not None:
+            journal.setdefault((transfer["block_number"], key), state)
+        states[key] = apply_tokenid_transfer(state, transfer, entity_type)
+        changed[key] = None
+    return list(changed)
+
+
+def tokenid_state_to_item(
+    key: TokenidKey, state: Dict, token_name: Optional[str] = None
+) -> Dict:
+    entity_type = state["type"]
+    item = {
+        "type": entity_type,
+        "token_address": key[0],
+        "token_id": key[1],
+        "token_name": token_name,
+    }
+    item.update({e: state.get(e) for e in TOKENID_FIELDS[entity_type]})
+    item["minted_st_day"] = _st_day(state.get("minted_st"))
+    item["xfered_st_day"] = _st_day(state.get("xfered_st"))
+    return item
+
+
+def _st_day(st: Optional[int]) -> Optional[str]:
+    return as_st_day(st) if st is not None else None
+
+
+def _to_row(key: TokenidKey, state: Optional[Dict]) -> Tuple:
+    return (key[0], str(key[1]), json.dumps(state) if state is not None else None)
+
+
+class EthNftTokenidStore:
+    """The state of each (token_address, token_id) folded from all its transfers so
+    far, persisted in a sqlite file, one store per tokenid streamer.
+
+    The state holds the owner(to_address), the mint address(from_address), the
+    first(minted_*) and last(xfered_*) transfer, the turnover and the ERC1155
+    minted/burned amounts, a batch only reads and writes the token ids it
+    transfers. The states before each of the last `size` blocks are journaled
+    with the block hashes, to roll back a replayed or reorged range.
+    """
+
+    def __init__(self, path: str, size: int = 1024):
+        if os.path.dirname(path) != "":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.size = size
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tokenids ("
+                "token_address TEXT NOT NULL, token_id TEXT NOT NULL, "
+                "state TEXT NOT NULL, PRIMARY KEY (token_address, token_id))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS journal ("
+                "blknum INTEGER NOT NULL, token_address TEXT NOT NULL, "
+                "token_id TEXT NOT NULL, state TEXT)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS journal_blknum ON journal (blknum)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS blocks ("
+                "number INTEGER PRIMARY KEY, hash TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)"
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tokenids").fetchone()[0]
+
+    @property
+    def last_block(self) -> Optional[int]:
+        """The last block folded into the store"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'last_block'"
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def get_many(self, keys: Iterable[TokenidKey]) -> Dict[TokenidKey, Dict]:
+        states = dict()
+        with self._lock:
+            for key in keys:
+                row = self._conn.execute(
+                    "SELECT state FROM tokenids WHERE token_address = ? AND token_id = ?",
+                    (key[0], str(key[1])),
+                ).fetchone()
+                if row is not None:
+                    states[key] = json.loads(row[0])
+        return states
+
+    def block_hashes(self, start_block: int, end_block: int) -> Dict[int, str]:
+        """The hashes of the journaled blocks in [start_block, end_block]"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT number, hash FROM blocks WHERE number >= ? AND number <= ?",
+                (start_block, end_block),
+            ).fetchall()
+        return dict(rows)
+
+    def floor(self) -> Optional[int]:
+        """The first journaled block, the store can't roll back before it"""
+        with self._lock:
+            return self._conn.execute("SELECT MIN(number) FROM blocks").fetchone()[0]
+
+    def apply(
+        self, transfers: Dict[str, List[Dict]], blocks: List[Dict], end_block: int
+    ) -> Dict[TokenidKey, Dict]:
+        """Fold the transfers(by the token id entity type) of the blocks up to
+        end_block, return the changed states"""
+        keys = {
+            (e["token_address"], int(e["id"])) for v in transfers.values() for e in v
+        }
+        states = self.get_many(keys)
+        journal: Dict[Tuple[int, TokenidKey], Optional[Dict]] = dict()
+        changed = fold_tokenid_transfers(transfers, states, journal)
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tokenids VALUES (?, ?, ?)",
+                [_to_row(key, states[key]) for key in changed],
+            )
+            self._conn.executemany(
+                "INSERT INTO journal VALUES (?, ?, ?, ?)",
+                [
+                    (blknum,) + _to_row(key, state)
+                    for (blknum, key), state in journal.items()
+                ],
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO blocks VALUES (?, ?)",
+                [(e["number"], e["hash"]) for e in blocks],
+            )
+            self._conn.execute(
+                "DELETE FROM journal WHERE blknum <= ?", (end_block - self.size,)
+            )
+            self._conn.execute(
+                "DELETE FROM blocks WHERE number <= ?", (end_block - self.size,)
+            )
+            self._set_last_block(end_block)
+        return {key: states[key] for key in changed}
+
+    def rollback(
+        self, block: int
+    ) -> Tuple[Dict[TokenidKey, Dict], Dict[TokenidKey, Dict]]:
+        """Restore the states as of the end of block, return the restored states
+        and the last states of the token ids unknown before(removed)"""
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT token_address, token_id, state FROM journal "
+                "WHERE blknum > ? ORDER BY blknum DESC",
+                (block,),
+            ).fetchall()
+            # the earliest journaled state of each token id wins
+            restored: Dict[TokenidKey, Optional[str]] = dict()
+            for token_address, token_id, state in rows:
+                restored[(token_address, int(token_id))] = state
+
+            removed: Dict[TokenidKey, Dict] = dict()
+            for key in [k for k, v in restored.items() if v is None]:
+                row = self._conn.execute(
+                    "SELECT state FROM tokenids WHERE token_address = ? AND token_id = ?",
+                    (key[0], str(key[1])),
+                ).fetchone()
+                if row is not None:
+                    removed[key] = json.loads(row[0])
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tokenids VALUES (?, ?, ?)",
+                [
+                    (key[0], str(key[1]), state)
+                    for key, state in restored.items()
+                    if state is not None
+                ],
+            )
+            self._conn.executemany(
+                "DELETE FROM tokenids WHERE token_address = ? AND token_id = ?",
+                [
+                    (key[0], str(key[1]))
+                    for key, state in restored.items()
+                    if state is None
+                ],
+            )
+            self._conn.execute("DELETE FROM journal WHERE blknum > ?", (block,))
+            self._conn.execute("DELETE FROM blocks WHERE number > ?", (block,))
+            self._set_last_block(block)
+
+        return (
+            {k: json.loads(v) for k, v in restored.items() if v is not None},
+            removed,
+        )
+
+    def load(self, states: Iterable[Tuple[TokenidKey, Dict]], last_block: int):
+        """Bootstrap the store with the states as of last_block, the known states
+        and the journal are dropped"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM tokenids")
+            self._conn.execute("DELETE FROM journal")
+            self._conn.execute("DELETE FROM blocks")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tokenids VALUES (?, ?, ?)",
+                (_to_row(key, state) for key, state in states),
+            )
+            self._set_last_block(last_block)
+
+    def iterate(self) -> Generator[Tuple[TokenidKey, Dict], None, None]:
+        """All the states, for the snapshot, not to be mixed with the writes"""
+        rows = self._conn.execute("SELECT token_address, token_id, state FROM tokenids")
+        for token_address, token_id, state in rows:
+            yield (token_address, int(token_id)), json.loads(state)
+
+    def _set_last_block(self, value: int):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta VALUES ('last_block', ?)", (value,)
+        )
+
+    def close(self):
+        self._conn.close()
@@ -7,6 +7,7 @@ from blockchainetl.streaming.postgres_utils import (
     exists_or_excluded,
     cond_upsert_on_blknum,
 )
+from ethereumetl.streaming.nft_tokenid_store import TOKENID_FIELDS
 
 
 def upsert_erc721_token_ids(table: Table, stmt: Insert) -> Dict:
@@ -40,6 +41,16 @@ def upsert_erc1155_token_ids(table: Table, stmt: Insert) -> Dict:
     }
 
 
+def upsert_token_id_states(table: Table, stmt: Insert) -> Dict:
+    # the whole states from the tokenid store, overwrite
+    columns = {"token_name", "minted_st_day", "xfered_st_day"}
+    for fields in TOKENID_FIELDS.values():
+        columns.update(fields)
+    upserted = {c: stmt.excluded[c] for c in table.columns.keys() if c in columns}
+    upserted["updated_at"] = func.current_timestamp()
+    return upserted
+
+
 def upsert_token_holders(table: Table, stmt: Insert) -> Dict:
     # ++
     upserted = {
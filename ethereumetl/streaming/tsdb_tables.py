@@ -257,6 +257,10 @@ TOKENS = Table(
     Column("updated_at", DateTime, server_default=func.current_timestamp()),
 )
 
+# change, first_seen and last_seen are added with the txpool changes, the
+# existing tables need to be altered first:
+#   ALTER TABLE {schema}.txpools ADD COLUMN change TEXT,
+#       ADD COLUMN first_seen TIMESTAMP, ADD COLUMN last_seen TIMESTAMP;
 TXPOOLS = Table(
     "txpools",
     MetaData(),
@@ -276,6 +280,9 @@ TXPOOLS = Table(
     Column("max_priority_fee_per_gas", BigInteger),
     Column("tx_type", Integer),
     Column("pool_type", Text),
+    Column("change", Text),
+    Column("first_seen", TIMESTAMP),
+    Column("last_seen", TIMESTAMP),
     Column("item_id", String, primary_key=True),
     Column("created_at", DateTime, server_default=func.current_timestamp()),
     Column("updated_at", DateTime, server_default=func.current_timestamp()),
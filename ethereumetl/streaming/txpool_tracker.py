@@ -0,0 +1,89 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Set, Tuple
+
+from blockchainetl.metrics import TXPOOL_CHANGES
+
+TXPOOL_ADDED = "added"
+TXPOOL_REPLACED = "replaced"
+TXPOOL_MOVED = "moved"
+TXPOOL_DROPPED = "dropped"
+
+
+def _txpool_key(tx: Dict) -> Tuple[str, int, str]:
+    return (tx["from_address"], tx["nonce"], tx["txhash"])
+
+
+class TxpoolTracker(object):
+    """The txpool as of the last poll, keyed by (from_address, nonce, txhash), to
+    export the changes only instead of the whole pool every time.
+
+    A transaction is added the first time it's seen, replaced if another one with
+    the same (from_address, nonce) was seen before(the replaced one is not
+    exported again), moved once its pool_type changes(queued <-> pending), and
+    dropped once it's not in the pool any more, either mined or evicted. Each
+    change carries the first_seen and last_seen of the
+    transaction, the snapshot is in memory only, after a restart the whole pool
+    is added again.
+    """
+
+    def __init__(self):
+        self._txs: Dict[Tuple[str, int, str], Dict] = {}
+        # (from_address, nonce) -> txhash
+        self._slots: Dict[Tuple[str, int], str] = {}
+
+    def __len__(self) -> int:
+        return len(self._txs)
+
+    def known_hashes(self) -> Set[str]:
+        return set(self._slots.values())
+
+    def add(self, txs: Iterable[Dict], seen_at: datetime) -> List[Dict]:
+        """Track the transactions seen at seen_at, the pool may be partial(eg: the
+        new pending transactions only), no transaction is dropped"""
+        changes: List[Dict] = []
+        for tx in txs:
+            key = _txpool_key(tx)
+            known = self._txs.get(key)
+            if known is not None:
+                known["last_seen"] = seen_at
+                if known.get("pool_type") != tx.get("pool_type"):
+                    known["pool_type"] = tx.get("pool_type")
+                    changes.append(dict(known, change=TXPOOL_MOVED))
+                continue
+
+            slot = key[:2]
+            replaced = self._slots.get(slot)
+            if replaced is not None:
+                self._txs.pop(slot + (replaced,), None)
+
+            item = dict(tx)
+            item["first_seen"] = seen_at
+            item["last_seen"] = seen_at
+            item["change"] = TXPOOL_ADDED if replaced is None else TXPOOL_REPLACED
+            self._txs[key] = item
+            self._slots[slot] = key[2]
+            changes.append(dict(item))
+        return self._count(changes)
+
+    def diff(self, txs: Iterable[Dict], seen_at: datetime) -> List[Dict]:
+        """Track the whole pool seen at seen_at, the transactions not in it any
+        more are dropped"""
+        txs = list(txs)
+        changes = self.add(txs, seen_at)
+
+        current = {_txpool_key(tx) for tx in txs}
+        dropped: List[Dict] = []
+        for key in [e for e in self._txs if e not in current]:
+            item = self._txs.pop(key)
+            if self._slots.get(key[:2]) == key[2]:
+                del self._slots[key[:2]]
+            item = dict(item)
+            item["change"] = TXPOOL_DROPPED
+            dropped.append(item)
+        return changes + self._count(dropped)
+
+    @staticmethod
+    def _count(changes: List[Dict]) -> List[Dict]:
+        for change in changes:
+            TXPOOL_CHANGES.labels(change=change["change"]).inc()
+        return changes
@@ -1,13 +1,12 @@
-import logging
-from typing import Set, List, Union, Optional, Dict, Any
-from collections.abc import Callable
+from typing import List, Union, Optional, Dict, Any
 
 import pandas as pd
-from cachetools import cached, TTLCache
 from web3.types import FilterParams
 from sqlalchemy import create_engine
 from eth_typing.evm import ChecksumAddress
 
+from .erc20_token_set import Erc20TokenSet
+
 
 def convert_token_transfers_to_df(items, ignore_error=False) -> pd.DataFrame:
     # force all data types in objec format,
@@ -77,33 +76,10 @@ def build_log_filter(
 
 def build_erc20_token_reader(
     chain: str, db_url: Optional[str]
-) -> Optional[Callable[[], Set[str]]]:
+) -> Optional[Erc20TokenSet]:
     if db_url is None:
         return None
-    engine = create_engine(db_url)
-
-    # cache for 1hour
-    @cached(cache=TTLCache(maxsize=10, ttl=3600))
-    def cache_read():
-        try:
-            df = pd.read_sql(
-                f"""
-SELECT DISTINCT
-    address
-FROM
-    {chain}.tokens
-WHERE
-    is_erc20 is true
-    AND (is_erc721 is false OR is_erc721 is null)
-""",
-                con=engine,
-            )
-            return set(df["address"])
-        except Exception as e:
-            logging.error(f"failed to read ERC20 tokens from {chain}.tokens: {e}")
-            return set()
-
-    return cache_read
+    return Erc20TokenSet(chain, create_engine(db_url))
 
 
 def fmt_enrich_balance_queue(chain: str, typo: str):
@@ -37,6 +37,7 @@ from .engine import resolve_item
 from .engine import type_resolver_from_dict
 from .engine import Context
 from .engine import Rule
+from .compiler import CompiledRule
 
 from .errors import AttributeResolutionError
 from .errors import EngineError
@@ -45,3 +46,18 @@ from .errors import RuleSyntaxError
 from .errors import SymbolResolutionError
 
 from .types import DataType
+
+__all__ = (
+    "resolve_attribute",
+    "resolve_item",
+    "type_resolver_from_dict",
+    "Context",
+    "Rule",
+    "CompiledRule",
+    "AttributeResolutionError",
+    "EngineError",
+    "EvaluationError",
+    "RuleSyntaxError",
+    "SymbolResolutionError",
+    "DataType",
+)
@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#  rule_engine/compiler.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Compile a parsed rule AST into nested Python closures.
+
+Each AST node is translated once into a closure which does the same work as its
+:py:meth:`~rule_engine.ast.ASTNodeBase.evaluate` method, with the children,
+operators, literal values and resolver decisions bound up front. Nodes without a
+specialized translation (comprehensions, bitwise and slice expressions, scoped or
+typed symbols, ...) fall back to their own ``evaluate`` so the semantics, error
+types and ``default_value`` behaviour stay the same as the interpreter.
+
+The main saving comes from symbol and attribute access: the interpreter coerces
+the whole resolved object (eg: a full transaction dict) before every attribute
+lookup, and tries the typed attribute resolvers first, while a compiled access
+chain only coerces the final value.
+"""
+
+import collections.abc
+import datetime
+import decimal
+import operator
+
+from . import ast
+from . import engine
+from . import errors
+from .suggestions import suggest_symbol
+from .types import DataType, coerce_value, is_integer_number, is_numeric
+
+_UNDEFINED = errors.UNDEFINED
+
+# every attribute name which is handled by the typed attribute resolvers, eg: `length`
+_ATTRIBUTE_NAMES = frozenset(
+    name
+    for resolvers in engine._AttributeResolver.attribute.type_map.values()
+    for name in resolvers
+)
+
+_SCALAR_TYPES = (str, bool, decimal.Decimal, type(None))
+
+_ARITHMETIC_OPS = {
+    "add": operator.add,
+    "sub": operator.sub,
+    "fdiv": operator.floordiv,
+    "tdiv": operator.truediv,
+    "mod": operator.mod,
+    "mul": operator.mul,
+    "pow": operator.pow,
+}
+
+_ARITHMETIC_COMPARISON_OPS = {
+    "ge": operator.ge,
+    "gt": operator.gt,
+    "le": operator.le,
+    "lt": operator.lt,
+}
+
+_FUZZY_OPS = {
+    "eq_fzm": ("match", operator.is_not),
+    "eq_fzs": ("search", operator.is_not),
+    "ne_fzm": ("match", operator.is_),
+    "ne_fzs": ("search", operator.is_),
+}
+
+
+def _context_resolver(context):
+    return getattr(context, "_Context__resolver", None)
+
+
+def _new_value(context, value):
+    # same as ExpressionBase._new_value(value, verify_type=False)
+    if type(value) in _SCALAR_TYPES:
+        return value
+    value = coerce_value(value, verify_type=False)
+    if isinstance(value, datetime.datetime) and value.tzinfo is None:
+        value = value.replace(tzinfo=context.default_timezone)
+    return value
+
+
+def _assert_is_numeric(*values):
+    if not all(map(is_numeric, values)):
+        raise errors.EvaluationError("data type mismatch (not a numeric value)")
+
+
+def _assert_is_integer_number(*values):
+    if not all(map(is_integer_number, values)):
+        raise errors.EvaluationError("data type mismatch (not an integer number)")
+
+
+def _compare_arrays(op, left_value, right_value):
+    for subleft_value, subright_value in zip(left_value, right_value):
+        if _compare_values(operator.ne, subleft_value, subright_value):
+            return _compare_values(op, subleft_value, subright_value)
+    if len(left_value) != len(right_value):
+        return _compare_values(op, len(left_value), len(right_value))
+    return op in (operator.ge, operator.le)
+
+
+def _compare_values(op, left_value, right_value):
+    # same as ArithmeticComparisonExpression.__op_arithmetic_values
+    if left_value is None and right_value is None:
+        return op in (operator.ge, operator.le)
+    elif left_value is None or right_value is None:
+        return False
+    elif isinstance(left_value, tuple) and isinstance(right_value, tuple):
+        return _compare_arrays(op, left_value, right_value)
+    elif type(left_value) is not type(right_value):
+        raise errors.EvaluationError(
+            f"data type mismatch {left_value} @{type(left_value)} != "
+            f"{right_value} @{type(right_value)}"
+        )
+    return op(left_value, right_value)
+
+
+def _compile_fallback(node, raw=False):
+    return node.evaluate
+
+
+def _compile_literal(node, raw=False):
+    if node.is_reduced:
+        value = node.evaluate(None)
+        return lambda thing: value
+    if isinstance(node, (ast.ArrayExpression, ast.SetExpression)):
+        python_type = node.result_type.python_type
+        members = tuple(compile_node(member) for member in node.value)
+        return lambda thing: python_type(member(thing) for member in members)
+    return node.evaluate
+
+
+def _compile_symbol(node, raw=False):
+    context = node.context
+    if (
+        node.scope is not None
+        or node.result_type != DataType.UNDEFINED
+        or _context_resolver(context) is not engine.resolve_item
+    ):
+        return node.evaluate
+
+    name = node.name
+    default_value = context.default_value
+    Mapping = collections.abc.Mapping
+
+    def symbol(thing):
+        if (type(thing) is dict or isinstance(thing, Mapping)) and name in thing:
+            value = thing[name]
+        elif default_value is _UNDEFINED:
+            # raises the same SymbolResolutionError as the interpreter
+            return node.evaluate(thing)
+        else:
+            value = default_value
+        return value if raw else _new_value(context, value)
+
+    return symbol
+
+
+def _compile_get_attribute(node, raw=False):
+    context = node.context
+    name = node.name
+    safe = node.safe
+    get_object = compile_node(node.object, raw=True)
+
+    def get_attribute_slow(resolved_obj, thing):
+        # same as GetAttributeExpression.evaluate, with the object already resolved
+        resolved_obj = _new_value(context, resolved_obj)
+        if resolved_obj is None and safe:
+            return resolved_obj
+
+        attribute_error = None
+        try:
+            value = context.resolve_attribute(thing, resolved_obj, name)
+        except errors.AttributeResolutionError as error:
+            attribute_error = error
+        else:
+            return _new_value(context, value)
+
+        try:
+            value = context.resolve(resolved_obj, name)
+        except errors.SymbolResolutionError as symbol_error:
+            default_value = context.default_value
+            if default_value is _UNDEFINED:
+                suggestion = attribute_error.suggestion or symbol_error.suggestion
+                if attribute_error.suggestion and symbol_error.suggestion:
+                    suggestion = suggest_symbol(
+                        name, (attribute_error.suggestion, symbol_error.suggestion)
+                    )
+                attribute_error.suggestion = suggestion
+                raise attribute_error from None
+            value = default_value
+        return _new_value(context, value)
+
+    if (
+        name in _ATTRIBUTE_NAMES
+        or _context_resolver(context) is not engine.resolve_item
+    ):
+        return lambda thing: get_attribute_slow(get_object(thing), thing)
+
+    # the name is not a typed attribute of any data type, so the attribute resolver
+    # always fails and the value is the mapping item, or the default value
+    default_value = context.default_value
+    Mapping = collections.abc.Mapping
+
+    def get_attribute(thing):
+        resolved_obj = get_object(thing)
+        if resolved_obj is None and safe:
+            return None
+        if (
+            type(resolved_obj) is dict or isinstance(resolved_obj, Mapping)
+        ) and name in resolved_obj:
+            value = resolved_obj[name]
+        elif default_value is _UNDEFINED:
+            return get_attribute_slow(resolved_obj, thing)
+        else:
+            value = default_value
+        return value if raw else _new_value(context, value)
+
+    return get_attribute
+
+
+def _compile_get_item(node, raw=False):
+    context = node.context
+    safe = node.safe
+    get_container = compile_node(node.container, raw=True)
+    get_item = compile_node(node.item)
+
+    def get_item_(thing):
+        resolved_obj = get_container(thing)
+        if resolved_obj is None:
+            if safe:
+                return resolved_obj
+            raise errors.EvaluationError("data type mismatch (container is null)")
+
+        resolved_item = get_item(thing)
+        # the container may not be coerced yet, so lists and ranges are arrays too
+        if isinstance(resolved_obj, (str, tuple, list, range)):
+            _assert_is_integer_number(resolved_item)
+            resolved_item = int(resolved_item)
+        try:
+            value = operator.getitem(resolved_obj, resolved_item)
+        except (IndexError, KeyError):
+            if safe:
+                return None
+            raise errors.LookupError(_new_value(context, resolved_obj), resolved_item)
+        return value if raw else _new_value(context, value)
+
+    return get_item_
+
+
+def _compile_logic(node, raw=False):
+    left = compile_node(node.left)
+    right = compile_node(node.right)
+    if node.type == "and":
+        return lambda thing: bool(left(thing) and right(thing))
+    elif node.type == "or":
+        return lambda thing: bool(left(thing) or right(thing))
+    return node.evaluate
+
+
+def _compile_comparison(node, raw=False):
+    left = compile_node(node.left)
+    right = compile_node(node.right)
+
+    if node.type == "eq":
+
+        def eq(thing):
+            left_value = left(thing)
+            right_value = right(thing)
+            if type(left_value) is not type(right_value):
+                return False
+            return operator.eq(left_value, right_value)
+
+        return eq
+
+    elif node.type == "ne":
+
+        def ne(thing):
+            left_value = left(thing)
+            right_value = right(thing)
+            if type(left_value) is not type(right_value):
+                return True
+            return operator.ne(left_value, right_value)
+
+        return ne
+
+    return node.evaluate
+
+
+def _compile_arithmetic_comparison(node, raw=False):
+    op = _ARITHMETIC_COMPARISON_OPS.get(node.type)
+    if op is None:
+        return _compile_comparison(node)
+    left = compile_node(node.left)
+    right = compile_node(node.right)
+    return lambda thing: _compare_values(op, left(thing), right(thing))
+
+
+def _compile_fuzzy_comparison(node, raw=False):
+    if node.type not in _FUZZY_OPS:
+        return _compile_comparison(node)
+    regex_function, modifier = _FUZZY_OPS[node.type]
+    context = node.context
+    left = compile_node(node.left)
+    right = compile_node(node.right)
+    static_regex = node._right if isinstance(node.right, ast.StringExpression) else None
+
+    def fuzzy(thing):
+        left_value = left(thing)
+        if not isinstance(left_value, str) and left_value is not None:
+            raise errors.EvaluationError("data type mismatch")
+        if static_regex is not None:
+            regex = static_regex
+        else:
+            regex = right(thing)
+            if isinstance(regex, str):
+                regex = node._compile_regex(regex)
+            elif regex is not None:
+                raise errors.EvaluationError("data type mismatch")
+        if left_value is None or regex is None:
+            return not modifier(left_value, regex)
+        match = getattr(regex, regex_function)(left_value)
+        if match is not None:
+            context._tls.regex_groups = coerce_value(match.groups())
+        return modifier(match, None)
+
+    return fuzzy
+
+
+def _compile_arithmetic(node, raw=False):
+    op = _ARITHMETIC_OPS.get(node.type)
+    if op is None:
+        return node.evaluate
+    left = compile_node(node.left)
+    right = compile_node(node.right)
+
+    def arithmetic(thing):
+        left_value = left(thing)
+        _assert_is_numeric(left_value)
+        right_value = right(thing)
+        _assert_is_numeric(right_value)
+        return op(left_value, right_value)
+
+    return arithmetic
+
+
+def _compile_contains(node, raw=False):
+    container = compile_node(node.container)
+    member = compile_node(node.member)
+
+    # `x in ['0x..', '0x..']`: a string member of a string-only literal array
+    # can be looked up in a frozenset with the same result
+    string_members = None
+    if (
+        isinstance(node.container, ast.LiteralExpressionBase)
+        and node.container.is_reduced
+    ):
+        container_value = node.container.evaluate(None)
+        if isinstance(container_value, (tuple, set)) and all(
+            type(v) is str for v in container_value
+        ):
+            string_members = frozenset(container_value)
+
+    def contains(thing):
+        container_value = container(thing)
+        member_value = member(thing)
+        if isinstance(container_value, str):
+            if not isinstance(member_value, str):
+                raise errors.EvaluationError("data type mismatch")
+        elif string_members is not None and type(member_value) is str:
+            return member_value in string_members
+        return bool(member_value in container_value)
+
+    return contains
+
+
+def _compile_ternary(node, raw=False):
+    condition = compile_node(node.condition)
+    case_true = compile_node(node.case_true)
+    case_false = compile_node(node.case_false)
+    return lambda thing: case_true(thing) if condition(thing) else case_false(thing)
+
+
+def _compile_unary(node, raw=False):
+    right = compile_node(node.right)
+    if node.type == "not":
+        return lambda thing: operator.not_(right(thing))
+    elif node.type == "uminus":
+
+        def uminus(thing):
+            right_value = right(thing)
+            _assert_is_numeric(right_value)
+            return operator.neg(right_value)
+
+        return uminus
+    return node.evaluate
+
+
+def _compile_statement(node, raw=False):
+    return compile_node(node.expression)
+
+
+_COMPILERS = {
+    ast.Statement: _compile_statement,
+    ast.ArrayExpression: _compile_literal,
+    ast.BooleanExpression: _compile_literal,
+    ast.DatetimeExpression: _compile_literal,
+    ast.FloatExpression: _compile_literal,
+    ast.MappingExpression: _compile_literal,
+    ast.NullExpression: _compile_literal,
+    ast.SetExpression: _compile_literal,
+    ast.StringExpression: _compile_literal,
+    ast.SymbolExpression: _compile_symbol,
+    ast.GetAttributeExpression: _compile_get_attribute,
+    ast.GetItemExpression: _compile_get_item,
+    ast.LogicExpression: _compile_logic,
+    ast.ComparisonExpression: _compile_comparison,
+    ast.ArithmeticComparisonExpression: _compile_arithmetic_comparison,
+    ast.FuzzyComparisonExpression: _compile_fuzzy_comparison,
+    ast.ArithmeticExpression: _compile_arithmetic,
+    ast.ContainsExpression: _compile_contains,
+    ast.TernaryExpression: _compile_ternary,
+    ast.UnaryExpression: _compile_unary,
+}
+
+
+def compile_node(node, raw=False):
+    """
+    Compile an AST node into a function of *thing* which returns the same value as
+    ``node.evaluate(thing)``.
+
+    :param node: The AST node to compile.
+    :param bool raw: Whether the returned value may be left uncoerced, this is only used for the
+            object of an attribute or item access, which coerces its own result.
+    :return: The compiled function.
+    """
+    return _COMPILERS.get(type(node), _compile_fallback)(node, raw=raw)
+
+
+class CompiledRule(engine.Rule):
+    """
+    A :py:class:`~rule_engine.engine.Rule` whose statement is compiled into Python closures once at
+    creation, instead of walking the AST for every evaluation.
+    """
+
+    def __init__(self, text, context=None):
+        super(CompiledRule, self).__init__(text, context=context)
+        self._compiled = compile_node(self.statement)
+
+    def evaluate(self, thing):
+        self.context._tls.reset()
+        with decimal.localcontext(self.context.decimal_context):
+            return self._compiled(thing)
+
+    def filter(self, things):
+        compiled = self._compiled
+        tls = self.context._tls
+        matched = []
+        # enter the decimal context once, the results are yielded outside of it
+        with decimal.localcontext(self.context.decimal_context):
+            for thing in things:
+                tls.reset()
+                if compiled(thing):
+                    matched.append(thing)
+        yield from matched
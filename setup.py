@@ -48,7 +48,6 @@ setup(
         "psycopg2-binary",
         "eth-abi",
         "redis",
-        "ethereum-dasm",
         "base58",
         "ecdsa",
         "chainside-btcpy",
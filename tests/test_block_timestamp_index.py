@@ -0,0 +1,43 @@
+import multiprocessing
+
+from blockchainetl.service.block_timestamp_index import BlockTimestampIndex
+
+
+def test_update_and_high_water_mark(tmp_path):
+    index = BlockTimestampIndex(str(tmp_path / "timestamps"))
+    index.update([(0, 100), (1, 112), (3, 136)])
+    assert index.high_water_mark == 1
+    assert index.get(2) is None
+    assert index.get(3) == 136
+
+    index.add_blocks([{"number": 2, "timestamp": 124}])
+    assert index.high_water_mark == 3
+    assert BlockTimestampIndex(index.path).high_water_mark == 3
+
+
+def _write(path: str, offset: int, writers: int, count: int):
+    index = BlockTimestampIndex(path)
+    # each writer grows the file in turn with its own heights
+    for height in range(offset, count, writers):
+        index.update([(height, 1_600_000_000 + height)])
+
+
+def test_concurrent_writers(tmp_path):
+    path = str(tmp_path / "timestamps")
+    writers, count = 4, 2000
+    ctx = multiprocessing.get_context("fork")
+    processes = [
+        ctx.Process(target=_write, args=(path, i, writers, count))
+        for i in range(writers)
+    ]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+        assert p.exitcode == 0
+
+    index = BlockTimestampIndex(path)
+    assert index.high_water_mark == count - 1
+    assert [index.get(i) for i in range(count)] == [
+        1_600_000_000 + i for i in range(count)
+    ]
@@ -0,0 +1,209 @@
+import json
+import threading
+from datetime import date
+
+from blockchainetl.enumeration.chain import Chain
+from ethereumetl.jobs.checkers.scheduler import AutofixPool, CheckScheduler
+
+
+class FakeChecker(object):
+    def __init__(self, entity_type, state):
+        self.entity_type = entity_type
+        self.state = state
+
+    def check(self, st_day, et_day, st, et, st_blk, et_blk):
+        with self.state["lock"]:
+            self.state["checked"].append(self.entity_type)
+        # the transactions are joined with the blocks, they pass against the gaps
+        # of the blocks
+        if self.entity_type == "transactions":
+            return True
+        return self.state["blocks_fixed"]
+
+    def autofix(self, st_day, et_day, st_blk=None, et_blk=None):
+        with self.state["lock"]:
+            self.state["fixed"].append(self.entity_type)
+        if self.entity_type == "blocks":
+            self.state["blocks_fixed"] = True
+        return et_blk - st_blk + 1
+
+    def close(self):
+        pass
+
+
+def new_state(blocks_fixed):
+    return {
+        "blocks_fixed": blocks_fixed,
+        "checked": [],
+        "fixed": [],
+        "lock": threading.Lock(),
+    }
+
+
+def new_scheduler(state, checkpoint_file, dryrun=False):
+    return CheckScheduler(
+        lambda entity_type: FakeChecker(entity_type, state),
+        ["blocks", "transactions"],
+        lambda day: (100, 109),
+        autofix_pool=None,
+        concurrency=2,
+        checkpoint_file=checkpoint_file,
+        dryrun=dryrun,
+    )
+
+
+def test_child_checked_again_after_parent_fixed(tmp_path):
+    state = new_state(False)
+    checkpoint_file = str(tmp_path / "checkpoint.json")
+    new_scheduler(state, checkpoint_file).run([date(2023, 1, 1)])
+
+    assert sorted(state["checked"][:2]) == ["blocks", "transactions"]
+    assert state["checked"][2:] == ["transactions"]
+    assert state["fixed"] == ["blocks"]
+    with open(checkpoint_file) as fr:
+        checkpoint = json.load(fr)
+    assert checkpoint == {
+        "2023-01-01/blocks": {"passed": False, "fixed": 10},
+        "2023-01-01/transactions": {"passed": True, "fixed": None},
+    }
+
+
+def test_resume_from_checkpoint(tmp_path):
+    state = new_state(True)
+    checkpoint_file = str(tmp_path / "checkpoint.json")
+    with open(checkpoint_file, "w") as fw:
+        json.dump({"2023-01-01/blocks": {"passed": True, "fixed": None}}, fw)
+
+    new_scheduler(state, checkpoint_file).run([date(2023, 1, 1), date(2023, 1, 2)])
+    assert sorted(state["checked"]) == ["blocks", "transactions", "transactions"]
+
+
+def test_dryrun_fixes_nothing(tmp_path):
+    state = new_state(False)
+    checkpoint_file = str(tmp_path / "checkpoint.json")
+    new_scheduler(state, checkpoint_file, dryrun=True).run([date(2023, 1, 1)])
+
+    assert sorted(state["checked"]) == ["blocks", "transactions"]
+    assert state["fixed"] == []
+
+
+class StaleFixChecker(FakeChecker):
+    """The transactions fixed before the blocks miss the txs of the missing blocks"""
+
+    def check(self, st_day, et_day, st, et, st_blk, et_blk):
+        with self.state["lock"]:
+            self.state["checked"].append(self.entity_type)
+        if self.entity_type == "transactions":
+            # the missing list is computed against the blocks at check time
+            self.blocks_seen = self.state["blocks_fixed"]
+            return self.state["txs_fixed"]
+        return self.state["blocks_fixed"]
+
+    def autofix(self, st_day, et_day, st_blk=None, et_blk=None):
+        if self.entity_type == "transactions":
+            with self.state["lock"]:
+                self.state["fixed"].append(self.entity_type)
+            self.state["txs_fixed"] = self.blocks_seen
+            return et_blk - st_blk + 1
+        return super().autofix(st_day, et_day, st_blk, et_blk)
+
+
+def test_parent_and_child_failed_together(tmp_path):
+    state = new_state(False)
+    state["txs_fixed"] = False
+    checkpoint_file = str(tmp_path / "checkpoint.json")
+    scheduler = CheckScheduler(
+        lambda entity_type: StaleFixChecker(entity_type, state),
+        ["blocks", "transactions"],
+        lambda day: (100, 109),
+        autofix_pool=None,
+        checkpoint_file=checkpoint_file,
+    )
+    scheduler.run([date(2023, 1, 1)])
+
+    # round 1: both failed and fixed, round 2: transactions failed again(fixed
+    # against the missing blocks) and fixed, now against all the blocks
+    assert sorted(state["checked"][:2]) == ["blocks", "transactions"]
+    assert state["checked"][2:] == ["transactions"]
+    assert sorted(state["fixed"]) == ["blocks", "transactions", "transactions"]
+    assert state["txs_fixed"]
+    with open(checkpoint_file) as fr:
+        checkpoint = json.load(fr)
+    assert checkpoint == {
+        "2023-01-01/blocks": {"passed": False, "fixed": 10},
+        "2023-01-01/transactions": {"passed": False, "fixed": 10},
+    }
+
+
+def test_rounds_are_bounded(tmp_path):
+    state = new_state(False)
+    state["txs_fixed"] = False
+    scheduler = CheckScheduler(
+        lambda entity_type: StaleFixChecker(entity_type, state),
+        ["blocks", "transactions"],
+        lambda day: (100, 109),
+        autofix_pool=None,
+        checkpoint_file=str(tmp_path / "checkpoint.json"),
+        max_rounds=1,
+    )
+    scheduler.run([date(2023, 1, 1)])
+
+    assert sorted(state["checked"]) == ["blocks", "transactions"]
+    assert sorted(state["fixed"]) == ["blocks", "transactions"]
+    assert scheduler.checkpoint.done("2023-01-01", "transactions")
+
+
+class FakeAutofixPool(AutofixPool):
+    def __init__(self):
+        super().__init__(Chain.ETHEREUM, "", "", "", batch_size=100, workers=2)
+        self.etl = []
+
+    def _etl(self, entity_types, start_block, end_block):
+        with self._cond:
+            self.etl.append((entity_types, start_block, end_block))
+
+
+class GappedChecker(object):
+    """Both entity types miss the blocks 100-104, the logs miss 105 as well"""
+
+    autofix_pool = None
+
+    def __init__(self, entity_type, state):
+        self.entity_type = entity_type
+        self.state = state
+
+    def check(self, st_day, et_day, st, et, st_blk, et_blk):
+        return self.entity_type in self.state["fixed"]
+
+    def autofix(self, st_day, et_day, st_blk=None, et_blk=None):
+        blocks = set(range(100, 105))
+        if self.entity_type == "logs":
+            blocks.add(105)
+        fixed = self.autofix_pool.submit(st_day, self.entity_type, blocks)
+        with self.state["lock"]:
+            self.state["fixed"].append(self.entity_type)
+        return fixed
+
+    def close(self):
+        pass
+
+
+def test_shared_blocks_fixed_once(tmp_path):
+    state = new_state(False)
+    pool = FakeAutofixPool()
+    scheduler = CheckScheduler(
+        lambda entity_type: GappedChecker(entity_type, state),
+        ["transactions", "logs"],
+        lambda day: (100, 109),
+        autofix_pool=pool,
+        checkpoint_file=str(tmp_path / "checkpoint.json"),
+    )
+    scheduler.run([date(2023, 1, 1)])
+    pool.close()
+
+    assert sorted(pool.etl) == [
+        (("logs",), 105, 105),
+        (("logs", "transactions"), 100, 104),
+    ]
+    assert scheduler.checkpoint.done("2023-01-01", "transactions")
+    assert scheduler.checkpoint.done("2023-01-01", "logs")
@@ -0,0 +1,200 @@
+from collections import defaultdict
+
+from blockchainetl.enumeration.entity_type import EntityType
+from ethereumetl.jobs.checkers.digest_checker import DigestChecker, TRACE_COUNT_EXPR
+
+ZERO_HASH = "0x" + "0" * 64
+
+
+def _count_rows(rows):
+    return len(rows)
+
+
+def _count_traces(rows):
+    rows = [e for e in rows if e["txhash"] is not None and e["txhash"] != ZERO_HASH]
+    distinct_txs = len({e["txhash"] for e in rows})
+    distinct_traces = len({(e["txhash"], e["trace_address"]) for e in rows})
+    return distinct_txs + len(rows) - distinct_traces
+
+
+# the per block count expressions, as the DB evaluates them
+COUNT_FUNCS = {
+    "count(*)": _count_rows,
+    TRACE_COUNT_EXPR: _count_traces,
+}
+
+
+class FakeResult(object):
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeChecker(object):
+    """Run the SQL_RANGE_DIGEST against the in memory rows of each block"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def execute(self, template, st_day, et_day, st, et, st_blk, et_blk, **kwargs):
+        self.queries.append((kwargs["width"], kwargs["parents"]))
+        count_func = COUNT_FUNCS[kwargs["count_expr"]]
+        width = kwargs["width"]
+        parents = kwargs["parents"]
+        parent_width = kwargs["parent_width"]
+
+        by_block = defaultdict(list)
+        for row in self.rows:
+            by_block[row["blknum"]].append(row)
+
+        digests = {}
+        for blknum, rows in by_block.items():
+            if blknum < st_blk or blknum > et_blk:
+                continue
+            if parents is not None and blknum // parent_width not in parents:
+                continue
+            cnt = count_func(rows)
+            if cnt == 0:
+                continue
+            digest = digests.setdefault(blknum // width, [0, 0, 0])
+            digest[0] += cnt
+            digest[1] += blknum * cnt
+            digest[2] += blknum * blknum * cnt
+        return FakeResult(
+            [
+                {"bucket": bucket, "cnt": cnt, "s1": s1, "s2": s2}
+                for bucket, (cnt, s1, s2) in digests.items()
+            ]
+        )
+
+
+class FakeCountIndex(object):
+    def __init__(self, counts):
+        self._counts = counts
+
+    def counts(self, column, start_block, end_block):
+        return {k: v for k, v in self._counts.items() if start_block <= k <= end_block}
+
+
+def _check(entity_type, rows, count_index=None, st_blk=0, et_blk=999, fanout=4):
+    checker = FakeChecker(rows)
+    digest_checker = DigestChecker(checker, entity_type, count_index, fanout=fanout)
+    passed = digest_checker.check("2023-01-01", "2023-01-01", 0, 0, st_blk, et_blk)
+    return passed, digest_checker.faulty_blocks, checker.queries
+
+
+def _blocks(st_blk=0, et_blk=999):
+    return [{"blknum": e} for e in range(st_blk, et_blk + 1)]
+
+
+def test_all_blocks_passed():
+    passed, faulty, queries = _check(EntityType.BLOCK, _blocks())
+    assert passed
+    assert faulty == []
+    assert len(queries) == 1
+
+
+def test_missing_block():
+    rows = [e for e in _blocks() if e["blknum"] != 777]
+    passed, faulty, _ = _check(EntityType.BLOCK, rows)
+    assert not passed
+    assert faulty == [777]
+
+
+def test_duplicated_block():
+    rows = _blocks() + [{"blknum": 123}]
+    passed, faulty, _ = _check(EntityType.BLOCK, rows)
+    assert not passed
+    assert faulty == [123]
+
+
+def test_bisect_down_to_the_bad_blocks():
+    # a missing row in one block and a duplicated one in another don't cancel out
+    rows = [e for e in _blocks() if e["blknum"] != 500] + [{"blknum": 501}]
+    passed, faulty, queries = _check(EntityType.BLOCK, rows)
+    assert not passed
+    assert faulty == [500, 501]
+
+    # 1000 blocks, fanout 4: the widths are 256, 64, 16, 4 and 1
+    assert [width for width, _ in queries] == [256, 64, 16, 4, 1]
+    assert queries[0][1] is None
+    # only the faulty bucket is split again
+    assert queries[1][1] == [500 // 256]
+    assert queries[-1][1] == [500 // 4]
+
+
+def test_missing_transaction():
+    counts = {blknum: 2 for blknum in range(100)}
+    rows = [
+        {"blknum": blknum, "txhash": f"0x{blknum}-{i}"}
+        for blknum in range(100)
+        for i in range(2)
+        if (blknum, i) != (42, 1)
+    ]
+    passed, faulty, _ = _check(
+        EntityType.TRANSACTION, rows, FakeCountIndex(counts), et_blk=99
+    )
+    assert not passed
+    assert faulty == [42]
+
+
+def _traces(blknum, txs=2, traces_per_tx=3):
+    return [
+        {"blknum": blknum, "txhash": f"0x{blknum}-{i}", "trace_address": str(j)}
+        for i in range(txs)
+        for j in range(traces_per_tx)
+    ]
+
+
+def test_traces():
+    counts = {blknum: 2 for blknum in range(100)}
+    rows = [e for blknum in range(100) for e in _traces(blknum)]
+    # the block rewards don't count
+    rows.append({"blknum": 7, "txhash": None, "trace_address": None})
+    passed, faulty, _ = _check(
+        EntityType.TRACE, rows, FakeCountIndex(counts), et_blk=99
+    )
+    assert passed
+    assert faulty == []
+
+
+def test_duplicated_trace():
+    counts = {blknum: 2 for blknum in range(100)}
+    rows = [e for blknum in range(100) for e in _traces(blknum)]
+    rows.append(_traces(63)[4])
+    passed, faulty, _ = _check(
+        EntityType.TRACE, rows, FakeCountIndex(counts), et_blk=99
+    )
+    assert not passed
+    assert faulty == [63]
+
+
+def test_missing_trace_tx():
+    counts = {blknum: 2 for blknum in range(100)}
+    rows = [
+        e for blknum in range(100) for e in _traces(blknum, txs=1 if blknum == 9 else 2)
+    ]
+    passed, faulty, _ = _check(
+        EntityType.TRACE, rows, FakeCountIndex(counts), et_blk=99
+    )
+    assert not passed
+    assert faulty == [9]
+
+
+def test_fallback_without_full_count_index():
+    class Fallback(FakeChecker):
+        def check(self, *args):
+            self.checked = True
+            return True
+
+    checker = Fallback([])
+    counts = {blknum: 2 for blknum in range(50)}
+    digest_checker = DigestChecker(
+        checker, EntityType.TRANSACTION, FakeCountIndex(counts)
+    )
+    assert digest_checker.check("2023-01-01", "2023-01-01", 0, 0, 0, 99)
+    assert checker.checked
+    assert checker.queries == []
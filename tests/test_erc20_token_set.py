@@ -0,0 +1,124 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from ethereumetl.streaming import erc20_token_set
+from ethereumetl.streaming.erc20_token_set import Erc20TokenSet, learn_erc20_tokens
+
+USDT = "0xdac17f958d2ee523a2206206994597c13d831ec7"
+USDC = "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48"
+BAYC = "0xbc4ca0eda7647a8ab7c2061c2e118a18a936f13d"
+# ends with 00, kept intact in the fixed-width keys
+ZERO_ENDING = "0x1111111111111111111111111111111111111100"
+
+
+class FakeTokens(object):
+    """The rows of the tokens table, read_sql filters them by updated_at"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def read_sql(self, sql, con, chunksize=None, params=None):
+        self.queries.append(params)
+        rows = self.rows
+        if params is not None:
+            rows = [e for e in rows if e["updated_at"] >= params["since"]]
+        df = pd.DataFrame(rows, columns=["address", "is_erc20", "updated_at"])
+        if chunksize is None:
+            return df
+        return [df[i : i + chunksize] for i in range(0, max(len(df), 1), chunksize)]
+
+
+def _row(address, is_erc20, updated_at):
+    return {"address": address, "is_erc20": is_erc20, "updated_at": updated_at}
+
+
+@pytest.fixture
+def tokens(monkeypatch):
+    fake = FakeTokens(
+        [
+            _row(USDT, True, datetime(2023, 1, 1)),
+            _row(BAYC, False, datetime(2023, 1, 2)),
+            _row(ZERO_ENDING, True, datetime(2023, 1, 3)),
+        ]
+    )
+    monkeypatch.setattr(erc20_token_set.pd, "read_sql", fake.read_sql)
+    return fake
+
+
+def new_token_set(**kwargs):
+    return Erc20TokenSet("ethereum", engine=None, chunksize=2, **kwargs)
+
+
+def test_load_all(tokens):
+    token_set = new_token_set()()
+    assert USDT in token_set
+    assert USDT.upper().replace("0X", "0x") in token_set
+    assert ZERO_ENDING in token_set
+    assert BAYC not in token_set
+    assert USDC not in token_set
+    assert None not in token_set
+    assert "0xzz" not in token_set
+    assert len(token_set._keys) == 2
+
+
+def test_load_all_skips_malformed_rows(tokens, caplog):
+    tokens.rows += [
+        _row("0x123", True, datetime(2023, 1, 4)),
+        _row("not an address", True, datetime(2023, 1, 4)),
+        _row(None, True, datetime(2023, 1, 4)),
+    ]
+    token_set = new_token_set()()
+    assert token_set._loaded
+    assert USDT in token_set
+    assert ZERO_ENDING in token_set
+    assert "skip #3 malformed token addresses" in caplog.text
+
+
+def test_incremental_refresh(tokens):
+    token_set = new_token_set(refresh_seconds=0, overlap_seconds=86400)()
+    assert USDC not in token_set
+
+    tokens.rows += [
+        _row(USDC, True, datetime(2023, 1, 5)),
+        # became an ERC721
+        _row(USDT, False, datetime(2023, 1, 5)),
+        _row("0x123", True, datetime(2023, 1, 5)),
+    ]
+    token_set()
+    # polled since the high-water mark, minus the overlap
+    assert tokens.queries[-1] == {"since": datetime(2023, 1, 2)}
+    assert USDC in token_set
+    assert USDT not in token_set
+    assert ZERO_ENDING in token_set
+    assert token_set._high_water_mark == datetime(2023, 1, 5)
+
+
+def test_merge(tokens):
+    token_set = new_token_set(refresh_seconds=0, merge_threshold=2)()
+    tokens.rows += [
+        _row(USDC, True, datetime(2023, 1, 5)),
+        _row(USDT, False, datetime(2023, 1, 5)),
+    ]
+    token_set()
+    assert token_set._added == set() and token_set._removed == set()
+    assert USDC in token_set
+    assert USDT not in token_set
+    assert ZERO_ENDING in token_set
+
+
+def test_learn(tokens):
+    token_set = new_token_set()()
+    transfers = [{"token_address": USDC}, {"token_address": BAYC}]
+    kept = learn_erc20_tokens(
+        token_set,
+        [
+            {"address": USDC, "is_erc20": True, "is_erc721": False},
+            {"address": "0x123", "is_erc20": True, "is_erc721": False},
+        ],
+        transfers,
+    )
+    assert kept == [{"token_address": BAYC}]
+    assert USDC in token_set
@@ -0,0 +1,190 @@
+from datetime import datetime
+
+from blockchainetl.enumeration.entity_type import EntityType
+from blockchainetl.jobs.exporters.in_memory_item_exporter import InMemoryItemExporter
+from ethereumetl.streaming.eth_block_ring import EthBlockRing
+from ethereumetl.streaming.eth_reorg_adapter import EthReorgAdapter
+
+
+def _blocks(start: int, end: int):
+    return [
+        {"number": e, "hash": f"0x{e:x}", "parent_hash": f"0x{e - 1:x}"}
+        for e in range(start, end + 1)
+    ]
+
+
+def test_get_many_in_ring(tmp_path):
+    ring = EthBlockRing(str(tmp_path / "ring"), size=4)
+    assert ring.get(1) is None
+    assert ring.get_many(0, 10) == {}
+
+    ring.append(_blocks(1, 10))
+    assert (ring.floor(), ring.latest()) == (7, 10)
+    assert sorted(ring.get_many(0, 100)) == [7, 8, 9, 10]
+    assert ring.get(6) is None
+    assert ring.get(11) is None
+    assert ring.get(7).hash == "0x7"
+
+
+def test_get_many_out_of_ring(tmp_path):
+    path = str(tmp_path / "ring")
+    EthBlockRing(path, size=8).append(_blocks(1, 8))
+
+    # reopened with a smaller ring, the blocks out of it are left until the next
+    # append but not known
+    ring = EthBlockRing(path, size=4)
+    assert (ring.floor(), ring.latest()) == (5, 8)
+    assert ring.get(4) is None
+    assert sorted(ring.get_many(1, 8)) == [5, 6, 7, 8]
+
+
+def _chain(start: int, end: int, forked=(), prefix="0xold"):
+    """The blocks with the hashes of a fork for the forked ones"""
+    blocks = []
+    for e in range(start, end + 1):
+        parent = f"{prefix}{e - 1:x}" if e - 1 in forked else f"0x{e - 1:x}"
+        blkhash = f"{prefix}{e:x}" if e in forked else f"0x{e:x}"
+        blocks.append(
+            {"number": e, "hash": blkhash, "parent_hash": parent, "timestamp": e}
+        )
+    return blocks
+
+
+class FakeReorgAdapter(EthReorgAdapter):
+    """The canonical chain is _chain(0, tip), the warehouse holds `warehouse`"""
+
+    def __init__(self, ring, tip, warehouse=None, batch_size=3):
+        self.block_ring = ring
+        self.batch_size = batch_size
+        self.canonical = {e["number"]: e for e in _chain(0, tip)}
+        self.warehouse = warehouse or {}
+        self.exported = []
+        self.fetched_old = []
+
+    def export_blocks(self, start_block, end_block):
+        self.exported.append((start_block, end_block))
+        return [dict(self.canonical[e]) for e in range(start_block, end_block + 1)]
+
+    def fetch_old_blocks(self, start_block, end_block, start_timestamp):
+        self.fetched_old.append((start_block, end_block))
+        return {
+            k: v for k, v in self.warehouse.items() if start_block <= k <= end_block
+        }
+
+
+def test_detect_fork_on_parent_hash_mismatch(tmp_path):
+    ring = EthBlockRing(str(tmp_path / "ring"), size=16)
+    # 8-10 were replaced by a fork since they were checked
+    ring.append(_chain(1, 10, forked={8, 9, 10}))
+    ring.checked_block = 10
+
+    adapter = FakeReorgAdapter(ring, tip=12)
+    headers, diff = adapter._reconcile(11, 12)
+
+    assert diff == {
+        8: ("0xold8", "0x8"),
+        9: ("0xold9", "0x9"),
+        10: ("0xolda", "0xa"),
+        11: (None, "0xb"),
+        12: (None, "0xc"),
+    }
+    assert sorted(e["number"] for e in headers) == [8, 9, 10, 11, 12]
+    # the new blocks, then walk back batch_size blocks at a time until 7 joins
+    assert adapter.exported == [(11, 12), (8, 10), (5, 7)]
+
+
+def test_detect_fork_none(tmp_path):
+    ring = EthBlockRing(str(tmp_path / "ring"), size=16)
+    ring.append(_chain(1, 10))
+    ring.checked_block = 10
+
+    adapter = FakeReorgAdapter(ring, tip=12, warehouse={11: "0xb", 12: "0xc"})
+    headers, diff = adapter._reconcile(11, 12)
+    assert diff == {}
+    assert [e["number"] for e in headers] == [11, 12]
+    assert adapter.exported == [(11, 12)]
+
+    # already checked
+    ring.checked_block = 12
+    assert adapter._reconcile(11, 12) == ([], {})
+
+
+def test_detect_fork_falls_back_to_warehouse(tmp_path):
+    ring = EthBlockRing(str(tmp_path / "ring"), size=16)
+    ring.append(_chain(1, 5))
+    ring.checked_block = 5
+
+    # the ring doesn't have 6-8, the warehouse has 8 of a fork
+    warehouse = {6: "0x6", 7: "0x7", 8: "0xold8"}
+    adapter = FakeReorgAdapter(ring, tip=8, warehouse=warehouse)
+    headers, diff = adapter._reconcile(6, 8)
+
+    assert adapter.fetched_old == [(6, 8)]
+    assert diff == {8: ("0xold8", "0x8")}
+    assert adapter.exported == [(6, 8)]
+
+    # the ring wasn't fed at all, nor checked
+    ring = EthBlockRing(str(tmp_path / "empty"), size=16)
+    adapter = FakeReorgAdapter(ring, tip=8, warehouse=warehouse)
+    headers, diff = adapter._reconcile(6, 8)
+    assert adapter.fetched_old == [(6, 8)]
+    assert diff == {8: ("0xold8", "0x8")}
+
+
+def test_walk_back_is_bounded_by_the_ring(tmp_path, caplog):
+    ring = EthBlockRing(str(tmp_path / "ring"), size=4)
+    # the whole ring is on a fork
+    ring.append(_chain(1, 10, forked=set(range(1, 11))))
+    ring.checked_block = 10
+
+    adapter = FakeReorgAdapter(ring, tip=11)
+    headers, diff = adapter._reconcile(11, 11)
+
+    assert sorted(diff) == [7, 8, 9, 10, 11]
+    assert adapter.exported == [(11, 11), (8, 10), (7, 7)]
+    assert "deeper than the block ring" in caplog.text
+
+
+class FakeConn(object):
+    def __init__(self, engine):
+        self.engine = engine
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.engine.committed = True
+
+
+class FakeEngine(object):
+    committed = False
+
+    def begin(self):
+        return FakeConn(self)
+
+
+def test_replace_blocks():
+    adapter = FakeReorgAdapter(None, tip=0)
+    adapter.target_engine = FakeEngine()
+    adapter.item_exporter = InMemoryItemExporter(item_types=[EntityType.BLOCK])
+    adapter.item_exporter.open()
+    deleted = []
+
+    def drop_old_blocks(conn, start_timestamp, end_timestamp, blocks):
+        deleted.append((start_timestamp, end_timestamp, blocks))
+        return len(blocks)
+
+    adapter.drop_old_blocks = drop_old_blocks
+    blocks = [{**e, "type": EntityType.BLOCK} for e in _chain(7200, 7201)]
+    assert adapter.replace_blocks(blocks, blocks) == 2
+
+    assert adapter.target_engine.committed
+    assert deleted == [
+        (
+            datetime.utcfromtimestamp(3600),
+            datetime.utcfromtimestamp(10801),
+            [7200, 7201],
+        )
+    ]
+    # not a PostgresItemExporter, exported after the rows are dropped
+    assert adapter.item_exporter.get_items(EntityType.BLOCK) == blocks
@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from ethereumetl.service.eth_contract_service import (
+    ContractWrapper,
+    EthContractService,
+    scan_function_sighashes,
+)
+
+# bytecode -> the sighashes given by the former ethereum-dasm disassembler
+BYTECODES = [
+    # a solidity dispatcher: totalSupply() and transfer(address,uint256)
+    (
+        "6080604052348015600f57600080fd5b506004361060325760003560e01c806318160ddd1460"
+        "37578063a9059cbb14604f575b600080fd5b600054604051908152602001604051809103"
+        "90f35b00",
+        ["0x18160ddd", "0xa9059cbb"],
+    ),
+    # the PUSH4 inside the PUSH32 data is not an instruction
+    (
+        "7f63deadbeef63cafebabe00000000000000000000000000000000000000000000"
+        "6312345678",
+        ["0x12345678"],
+    ),
+    # the truncated PUSH4 at the end is invalid
+    ("631122334463aabbcc", ["0x11223344"]),
+    ("5b63010203045b6305060708", ["0x01020304", "0x05060708"]),
+    ("63a9059cbb63a9059cbb6306fdde03", ["0x06fdde03", "0xa9059cbb"]),
+    # EIP-1167 minimal proxy
+    (
+        "363d3d373d3d3d363d73bebebebebebebebebebebebebebebebebebebebe"
+        "5af43d82803e903d91602b57fd5bf3",
+        [],
+    ),
+]
+
+
+@pytest.mark.parametrize("bytecode, sighashes", BYTECODES)
+def test_scan_function_sighashes(bytecode, sighashes):
+    assert list(scan_function_sighashes(bytecode)) == sighashes
+
+    service = EthContractService()
+    assert service.get_function_sighashes("0x" + bytecode) == sighashes
+    # memoized
+    assert service.get_function_sighashes("0x" + bytecode) == sighashes
+
+
+def test_malformed_bytecode():
+    assert scan_function_sighashes("6311223344a") == ()
+    assert scan_function_sighashes("63zz223344") == ()
+    assert EthContractService().get_function_sighashes("0x") == []
+
+
+def _random_bytecodes(n):
+    rand = random.Random(7)
+    opcodes = [0x5B, 0x60, 0x63, 0x7F, 0x00]
+    for _ in range(n):
+        size = rand.randint(1, 300)
+        yield bytes(
+            rand.choice(opcodes + [rand.randint(0, 255)]) for _ in range(size)
+        ).hex()
+
+
+def test_same_as_ethereum_dasm():
+    evmdasm = pytest.importorskip("ethereum_dasm.evmdasm")
+
+    for bytecode in _random_bytecodes(200):
+        evm_code = evmdasm.EvmCode(
+            contract=evmdasm.Contract(bytecode=bytecode),
+            static_analysis=False,
+            dynamic_analysis=False,
+        )
+        evm_code.disassemble(bytecode)
+        expected = sorted(
+            {
+                "0x" + inst.operand
+                for block in evm_code.basicblocks
+                for inst in block.instructions
+                if inst.name == "PUSH4"
+            }
+        )
+        assert list(scan_function_sighashes(bytecode)) == expected, bytecode
+
+
+def test_is_erc20_contract():
+    service = EthContractService()
+    sighashes = [
+        "0x18160ddd",  # totalSupply()
+        "0x313ce567",  # decimals()
+        "0x70a08231",  # balanceOf(address)
+        "0xa9059cbb",  # transfer(address,uint256)
+        "0x23b872dd",  # transferFrom(address,address,uint256)
+        "0x095ea7b3",  # approve(address,uint256)
+        "0xdd62ed3e",  # allowance(address,address)
+    ]
+    wrapper = ContractWrapper(sighashes)
+    assert service.is_erc20_contract(sighashes)
+    assert service.is_erc20_contract(wrapper)
+    assert not service.is_erc721_contract(wrapper)
+    assert ContractWrapper.of(wrapper) is wrapper
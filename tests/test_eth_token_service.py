@@ -0,0 +1,69 @@
+import json
+from types import SimpleNamespace
+
+from eth_abi import encode
+from web3 import Web3
+
+from ethereumetl.service.eth_token_service import CALLS_PER_TOKEN, EthTokenService
+
+SYMBOL = "0x95d89b41"
+DECIMALS = "0x313ce567"
+
+
+class FakeBatchProvider(object):
+    def __init__(self, max_batch_calls=None):
+        self.max_batch_calls = max_batch_calls
+        self.batches = []
+
+    def make_batch_request(self, text):
+        rpc = json.loads(text)
+        self.batches.append(len(rpc))
+        if self.max_batch_calls is not None and len(rpc) > self.max_batch_calls:
+            return {"jsonrpc": "2.0", "error": {"code": -32600, "message": "too big"}}
+        return [{"id": e["id"], "result": self._call(e["params"][0])} for e in rpc]
+
+    def _call(self, tx):
+        if tx["data"] == SYMBOL:
+            return "0x" + encode(["string"], [tx["to"][-4:]]).hex()
+        if tx["data"] == DECIMALS:
+            return "0x" + encode(["uint8"], [18]).hex()
+        return "0x"
+
+
+class FakeTokenService(EthTokenService):
+    def __init__(self, provider, **kwargs):
+        web3 = SimpleNamespace(provider=provider, codec=Web3().codec)
+        super().__init__(web3, **kwargs)
+        self.resolved_one_by_one = []
+
+    def _resolve_token(self, token_address, block_number="latest"):
+        self.resolved_one_by_one.append(token_address)
+        return self._build_token(token_address, "ONE", None, 0, None)
+
+
+ADDRESSES = ["0x%040x" % i for i in range(1, 30)]
+
+
+def test_batch_capped_by_calls():
+    provider = FakeBatchProvider()
+    service = FakeTokenService(provider, max_batch_calls=100)
+    tokens = service.get_tokens(ADDRESSES, block_number=100)
+
+    assert max(provider.batches) <= 100
+    assert sum(provider.batches) == len(ADDRESSES) * CALLS_PER_TOKEN
+    token = tokens[ADDRESSES[0]]
+    assert token.symbol == Web3.to_checksum_address(ADDRESSES[0])[-4:]
+    assert token.decimals == 18
+    assert token.name is None
+    assert service.resolved_one_by_one == []
+
+
+def test_failed_batch_falls_back_to_sequential():
+    provider = FakeBatchProvider(max_batch_calls=50)
+    service = FakeTokenService(provider, max_batch_calls=100)
+    tokens = service.get_tokens(ADDRESSES[:10])
+
+    assert service.resolved_one_by_one == ADDRESSES[:9]
+    assert tokens[ADDRESSES[0]].symbol == "ONE"
+    # the last batch fits
+    assert tokens[ADDRESSES[9]].decimals == 18
@@ -0,0 +1,134 @@
+import json
+
+from blockchainetl.jobs.exporters.in_memory_item_exporter import InMemoryItemExporter
+from ethereumetl.jobs.export_traces_job import ExportTracesJob
+from ethereumetl.mappers.trace_mapper import EthTraceMapper
+from ethereumetl.service.eth_special_trace_service import EthSpecialTraceService
+from ethereumetl.service.trace_id_calculator import calculate_trace_ids
+from ethereumetl.service.trace_status_calculator import calculate_trace_statuses
+
+ADDR = "0x" + "ab" * 20
+
+
+def _call(type="CALL", error=None, calls=None, to=ADDR, value="0x1"):
+    call = {
+        "type": type,
+        "from": ADDR,
+        "to": to,
+        "value": value,
+        "gas": "0x5208",
+        "gasUsed": "0x5208",
+        "input": "0x",
+        "output": "0x",
+    }
+    if error is not None:
+        call["error"] = error
+    if calls is not None:
+        call["calls"] = calls
+    return call
+
+
+# block -> the call trees of its transactions
+BLOCK_TRACES = {
+    0: [
+        _call(
+            calls=[
+                _call(error="execution reverted", calls=[_call(), _call("STATICCALL")]),
+                _call("DELEGATECALL", calls=[_call()]),
+                _call(to="0x0000000000000000000000000000000000000001"),
+            ]
+        ),
+        # no transaction hash, block scoped
+        _call(value="0x2"),
+        _call(value="0x1", calls=[_call("CREATE")]),
+    ],
+    1: [_call(calls=[_call(error="out of gas", calls=[_call()])])],
+}
+TX_HASHES = {
+    0: {0: "0x" + "01" * 32},
+    1: {0: "0x" + "02" * 32},
+}
+
+
+class FakeProvider:
+    def make_batch_request(self, text):
+        request = json.loads(text)
+        blknum = request["id"]
+        return {
+            "jsonrpc": "2.0",
+            "id": blknum,
+            "result": [{"result": e} for e in BLOCK_TRACES[blknum]],
+        }
+
+
+def _old_flatten(mapper, blknum, tx_index, call, trace_address, parent, tx_hashes):
+    """The recursive flattener before the explicit stack"""
+    trace = mapper._geth_call_to_trace(
+        blknum, tx_index, tx_hashes.get(tx_index), call, parent
+    )
+    calls = call.get("calls", [])
+    trace.subtraces = len(calls)
+    trace.trace_address = trace_address
+    trace.logs = call.get("logs")
+    result = [trace]
+    for idx, sub in enumerate(calls):
+        result.extend(
+            _old_flatten(
+                mapper, blknum, tx_index, sub, trace_address + [idx], trace, tx_hashes
+            )
+        )
+    return result
+
+
+def _old_traces(block_numbers, include_genesis_traces):
+    mapper = EthTraceMapper()
+    all_traces = []
+    if include_genesis_traces and 0 in block_numbers:
+        all_traces.extend(EthSpecialTraceService().get_genesis_traces())
+    for blknum in block_numbers:
+        for tx_index, call in enumerate(BLOCK_TRACES[blknum]):
+            all_traces.extend(
+                _old_flatten(
+                    mapper, blknum, tx_index, call, [], None, TX_HASHES[blknum]
+                )
+            )
+    calculate_trace_statuses(all_traces)
+    calculate_trace_ids(all_traces)
+    return [mapper.trace_to_dict(e) for e in all_traces]
+
+
+def _export(block_numbers, include_genesis_traces):
+    exporter = InMemoryItemExporter(item_types=["trace"])
+    job = ExportTracesJob(
+        start_block=None,
+        end_block=None,
+        blocks=block_numbers,
+        batch_size=1,
+        batch_web3_provider=FakeProvider(),
+        item_exporter=exporter,
+        max_workers=1,
+        include_genesis_traces=include_genesis_traces,
+        is_geth_provider=True,
+        txhash_iterable=TX_HASHES,
+    )
+    job.run()
+    return exporter.get_items("trace")
+
+
+def _sort_key(item):
+    return (item["block_number"], item["trace_id"])
+
+
+def test_geth_traces_as_the_old_path():
+    for include_genesis_traces in (False, True):
+        items = _export([0, 1], include_genesis_traces)
+        expected = _old_traces([0, 1], include_genesis_traces)
+        assert all(e["trace_id"] is not None for e in items)
+        assert sorted(items, key=_sort_key) == sorted(expected, key=_sort_key)
+
+
+def test_genesis_trace_ids():
+    items = _export([0], True)
+    genesis = [e for e in items if e["trace_type"] == "genesis"]
+    assert len(genesis) > 0
+    assert all(e["trace_id"].startswith("genesis_0x") for e in genesis)
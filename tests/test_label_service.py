@@ -0,0 +1,56 @@
+from blockchainetl.service.label_service import LabelService
+from blockchainetl.service.service_cache import ServiceCache
+
+LABELS = [
+    {"address": "0x01", "label": "Exchange,Binance"},
+    {"address": "0x01", "label": "Exchange,Binance 14"},
+    {"address": "0x02", "label": "Dex,Uniswap"},
+]
+
+
+class FakeResult(object):
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeEngine(object):
+    def __init__(self):
+        self.queries = 0
+
+    def execute(self, sql, params):
+        self.queries += 1
+        addresses = params[0] if isinstance(params, tuple) else [params]
+        return FakeResult([e for e in LABELS if e["address"] in addresses])
+
+
+def new_label_service():
+    labeler = LabelService("sqlite://", "addr_labels", None, cache=ServiceCache())
+    labeler._engine = FakeEngine()
+    return labeler
+
+
+def test_labels_of_same_as_label_of():
+    labeler = new_label_service()
+    labels = labeler.labels_of(["0x01", "0X02", "0x03", None])
+    assert labels == {
+        "0x01": {"Exchange,Binance", "Exchange,Binance 14"},
+        "0x02": {"Dex,Uniswap"},
+        "0x03": None,
+    }
+    assert labeler._engine.queries == 1
+    assert {e: labeler.label_of(e) for e in ["0x01", "0x02", "0x03"]} == labels
+    assert labeler._engine.queries == 1
+
+
+def test_cached_labels_are_not_shared():
+    labeler = new_label_service()
+    labeler.label_of("0x01").add("Hacker,Ronin")
+    labeler.labels_of(["0x01"])["0x01"].clear()
+    labeler.labels_of(["0x02"])["0x02"].add("Hacker,Ronin")
+
+    assert labeler.label_of("0x01") == {"Exchange,Binance", "Exchange,Binance 14"}
+    assert labeler.labels_of(["0x02"]) == {"0x02": {"Dex,Uniswap"}}
+    assert labeler.category_of("0x01") == {"Exchange"}
@@ -0,0 +1,66 @@
+import pytest
+
+from blockchainetl.utils import to_contiguous_ranges
+from ethereumetl.service.logs_bloom import LogsBloomFilter, bloom_mask, logs_bloom
+from ethereumetl.service.token_transfer_extractor import TRANSFER_EVENT_TOPIC
+
+TOKEN = "0xdac17f958d2ee523a2206206994597c13d831ec7"
+OTHER_TOKEN = "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48"
+APPROVAL_TOPIC = "0x8c5be1e5ebec7d5bd14f71427d1e84f3dd0314c0f7b2291e5b200ac8c7c3b925"
+
+
+def _transfer_log(address=TOKEN, topic=TRANSFER_EVENT_TOPIC):
+    return {"address": address, "topics": [topic, "0x" + "00" * 32]}
+
+
+def test_bloom_mask():
+    mask = bloom_mask(TOKEN)
+    assert 1 <= bin(mask).count("1") <= 3
+    assert mask < 1 << 2048
+    # with or without the 0x prefix
+    assert bloom_mask(TOKEN[2:]) == mask
+
+
+def test_may_match_without_false_negatives():
+    bloom = logs_bloom([_transfer_log()])
+    assert LogsBloomFilter([TRANSFER_EVENT_TOPIC], TOKEN).may_match(bloom)
+    assert LogsBloomFilter([TRANSFER_EVENT_TOPIC]).may_match(bloom)
+    assert LogsBloomFilter(address=[OTHER_TOKEN, TOKEN]).may_match(bloom)
+    assert LogsBloomFilter([APPROVAL_TOPIC, TRANSFER_EVENT_TOPIC]).may_match(bloom)
+    assert LogsBloomFilter().may_match(bloom)
+
+
+def test_may_match_filters_out():
+    bloom = logs_bloom([_transfer_log()])
+    assert not LogsBloomFilter([APPROVAL_TOPIC]).may_match(bloom)
+    assert not LogsBloomFilter(address=OTHER_TOKEN).may_match(bloom)
+    # no logs at all
+    assert not LogsBloomFilter().may_match("0x" + "0" * 512)
+    # unknown bloom
+    assert LogsBloomFilter([APPROVAL_TOPIC]).may_match(None)
+    assert LogsBloomFilter([APPROVAL_TOPIC]).may_match("0x")
+
+
+def test_candidate_blocks():
+    blocks = [
+        {"number": 10, "logs_bloom": logs_bloom([_transfer_log()])},
+        {"number": 11, "logs_bloom": logs_bloom([_transfer_log(OTHER_TOKEN)])},
+        {"number": 12, "logs_bloom": "0x" + "0" * 512},
+        {"number": 14, "logs_bloom": None},
+    ]
+    bloom_filter = LogsBloomFilter([TRANSFER_EVENT_TOPIC], TOKEN)
+    # 13 is not in the blocks, kept
+    assert bloom_filter.candidate_blocks(10, 14, blocks) == [10, 13, 14]
+
+
+@pytest.mark.parametrize(
+    "numbers, ranges",
+    [
+        ([], []),
+        ([7], [(7, 7)]),
+        ([1, 2, 3, 5, 7, 8], [(1, 3), (5, 5), (7, 8)]),
+        (range(10, 20), [(10, 19)]),
+    ],
+)
+def test_to_contiguous_ranges(numbers, ranges):
+    assert to_contiguous_ranges(numbers) == ranges
@@ -0,0 +1,200 @@
+from types import SimpleNamespace
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine
+
+from blockchainetl.enumeration.entity_type import EntityType
+from blockchainetl.jobs.exporters.postgres_item_exporter import PostgresItemExporter
+from ethereumetl.misc.constant import ZERO_ADDR
+from ethereumetl.streaming import eth_nft_tokenid_adapter
+from ethereumetl.streaming.eth_nft_tokenid_adapter import EthNftTokenidAdapter
+from ethereumetl.streaming.nft_tokenid_store import EthNftTokenidStore
+
+TOKEN = "0x00000000000000000000000000000000000000aa"
+ALICE = "0x0000000000000000000000000000000000000001"
+BOB = "0x0000000000000000000000000000000000000002"
+
+
+class SqliteTokenidExporter(PostgresItemExporter):
+    """Keeps the exported token ids in a sqlite table of the same name"""
+
+    def __init__(self):
+        self.dbschema = "main"
+        self.engine = create_engine("sqlite://")
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(
+                "CREATE TABLE erc721_token_ids (token_address TEXT, token_id INTEGER, "
+                "to_address TEXT, PRIMARY KEY (token_address, token_id))"
+            )
+
+    def export_items(self, items):
+        with self.engine.begin() as conn:
+            return self.export_items_in(conn, items)
+
+    def export_items_in(self, conn, items):
+        for e in items:
+            conn.exec_driver_sql(
+                "INSERT OR REPLACE INTO erc721_token_ids VALUES (?, ?, ?)",
+                (e["token_address"], e["token_id"], e["to_address"]),
+            )
+        return len(items)
+
+    def rows(self):
+        with self.engine.connect() as conn:
+            return dict(
+                ((a, i), to)
+                for a, i, to in conn.exec_driver_sql("SELECT * FROM erc721_token_ids")
+            )
+
+
+class FakeChain(object):
+    def __init__(self):
+        self.forked_from = None
+        self.transfers = {}
+
+    def block_hash(self, number):
+        if self.forked_from is not None and number >= self.forked_from:
+            return f"0x{number}f"
+        return f"0x{number}"
+
+    def blocks(self, start_block, end_block):
+        return [
+            {
+                "number": n,
+                "hash": self.block_hash(n),
+                "parent_hash": self.block_hash(n - 1),
+                "timestamp": 1_600_000_000 + n * 12,
+            }
+            for n in range(start_block, end_block + 1)
+        ]
+
+    def transfer(self, number, token_id, from_address, to_address):
+        self.transfers.setdefault(self.block_hash(number), []).append(
+            {
+                "token_address": TOKEN,
+                "id": token_id,
+                "from_address": from_address,
+                "to_address": to_address,
+                "block_number": number,
+                "block_timestamp": 1_600_000_000 + number * 12,
+                "transaction_hash": f"0x{number}{token_id}",
+                "transaction_index": 0,
+                "log_index": token_id,
+            }
+        )
+
+    def logs(self, start_block, end_block):
+        return [
+            e
+            for n in range(start_block, end_block + 1)
+            for e in self.transfers.get(self.block_hash(n), [])
+        ]
+
+
+@pytest.fixture
+def adapter(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        eth_nft_tokenid_adapter,
+        "extract_erc721_transfers",
+        lambda logs, *args, **kwargs: logs,
+    )
+    monkeypatch.setattr(
+        eth_nft_tokenid_adapter,
+        "EnrichIndex",
+        lambda blocks: SimpleNamespace(
+            enrich_logs=lambda e: e, enrich_erc721_transfers=lambda e: e
+        ),
+    )
+
+    chain = FakeChain()
+    adapter = EthNftTokenidAdapter(
+        None,
+        erc721_tokens={TOKEN: {"name": "TOKEN", "created_blknum": 0}},
+        item_exporter=SqliteTokenidExporter(),
+        tokenid_store=EthNftTokenidStore(str(tmp_path / "tokenids.db"), size=100),
+    )
+    adapter.export_blocks = chain.blocks
+    adapter.export_logs = lambda start_block, end_block, *args, **kwargs: chain.logs(
+        start_block, end_block
+    )
+    adapter.open()
+    return adapter, chain
+
+
+def test_reorg_removes_tokenids_of_rolled_back_blocks(adapter):
+    adapter, chain = adapter
+    chain.transfer(2, 1, ZERO_ADDR, ALICE)
+    chain.transfer(6, 2, ZERO_ADDR, ALICE)
+    adapter.export_all(0, 4)
+    adapter.export_all(5, 9)
+    exporter = adapter.item_exporter
+    assert exporter.rows() == {(TOKEN, 1): ALICE, (TOKEN, 2): ALICE}
+
+    # token id 2 is only minted in the reorged blocks, token id 1 moves instead
+    chain.forked_from = 5
+    chain.transfer(7, 1, ALICE, BOB)
+    chain.transfer(11, 3, ZERO_ADDR, BOB)
+    adapter.export_all(10, 14)
+
+    assert exporter.rows() == {(TOKEN, 1): BOB, (TOKEN, 3): BOB}
+    assert dict(adapter.tokenid_store.iterate()).keys() == {(TOKEN, 1), (TOKEN, 3)}
+    assert adapter.tokenid_store.last_block == 14
+
+
+def test_replay_keeps_tokenids_transferred_again(adapter):
+    adapter, chain = adapter
+    chain.transfer(6, 2, ZERO_ADDR, ALICE)
+    adapter.export_all(0, 9)
+    # retried after a failed export
+    adapter.export_all(5, 9)
+
+    assert adapter.item_exporter.rows() == {(TOKEN, 2): ALICE}
+    state = dict(adapter.tokenid_store.iterate())[(TOKEN, 2)]
+    assert state["type"] == EntityType.ERC721_TOKENID
+    assert state["turnover_count"] == 1
+
+
+def test_retry_after_rollback_folds_the_rolled_back_blocks(adapter):
+    adapter, chain = adapter
+    chain.transfer(2, 1, ZERO_ADDR, ALICE)
+    adapter.export_all(0, 4)
+    adapter.export_all(5, 9)
+
+    chain.forked_from = 5
+    chain.transfer(6, 1, ALICE, BOB)
+    chain.transfer(8, 1, BOB, ALICE)
+    export_logs = adapter.export_logs
+
+    def failed_export_logs(*args, **kwargs):
+        adapter.export_logs = export_logs
+        raise ValueError("getLogs timeout")
+
+    # rolled back to 4, then failed
+    adapter.export_logs = failed_export_logs
+    with pytest.raises(ValueError):
+        adapter.export_all(10, 14)
+    assert adapter.tokenid_store.last_block == 4
+
+    # retried, the blocks 5-9 are folded again
+    adapter.export_all(10, 14)
+    state = dict(adapter.tokenid_store.iterate())[(TOKEN, 1)]
+    assert state["turnover_count"] == 3
+    assert state["xfered_blknum"] == 8
+    assert adapter.item_exporter.rows() == {(TOKEN, 1): ALICE}
+    assert adapter.tokenid_store.last_block == 14
+
+
+def test_empty_store_is_bootstrapped_first(adapter):
+    adapter, _ = adapter
+    with pytest.raises(ValueError, match="bootstrap"):
+        adapter.export_all(5, 9)
+    assert adapter.tokenid_store.last_block is None
+
+
+def test_close_closes_the_store(adapter):
+    adapter, _ = adapter
+    adapter.item_exporter.close = lambda: None
+    adapter.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        len(adapter.tokenid_store)
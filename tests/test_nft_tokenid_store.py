@@ -0,0 +1,45 @@
+from sqlalchemy import create_engine
+
+from blockchainetl.enumeration.entity_type import EntityTable, EntityType
+from ethereumetl.cli.nft_tokenid_store import read_tokenid_states
+from ethereumetl.streaming.nft_tokenid_store import TOKENID_FIELDS
+
+TOKEN = "0x00000000000000000000000000000000000000aa"
+OTHER = "0x00000000000000000000000000000000000000bb"
+
+
+def _create_tables(pg_url):
+    engine = create_engine(pg_url)
+    with engine.begin() as conn:
+        for entity_type, fields in TOKENID_FIELDS.items():
+            table = EntityTable()[entity_type]
+            columns = ", ".join(f"{e} NUMERIC" for e in fields)
+            conn.exec_driver_sql(
+                f"CREATE TABLE {table} (token_address TEXT, token_id NUMERIC, {columns})"
+            )
+            for token_address in (TOKEN, OTHER, "0x'"):
+                conn.exec_driver_sql(
+                    f"INSERT INTO {table} (token_address, token_id, turnover_count) "
+                    "VALUES (?, 1, 2)",
+                    (token_address,),
+                )
+
+
+def test_read_tokenid_states(tmp_path):
+    pg_url = f"sqlite:///{tmp_path / 'tokenids.db'}"
+    _create_tables(pg_url)
+
+    states = list(read_tokenid_states(pg_url, "main", (), chunksize=2))
+    assert len(states) == 6
+
+    states = list(read_tokenid_states(pg_url, "main", (TOKEN, "0x'"), chunksize=2))
+    assert sorted((key, e["type"]) for key, e in states) == [
+        (("0x'", 1), EntityType.ERC1155_TOKENID),
+        (("0x'", 1), EntityType.ERC721_TOKENID),
+        ((TOKEN, 1), EntityType.ERC1155_TOKENID),
+        ((TOKEN, 1), EntityType.ERC721_TOKENID),
+    ]
+    state = dict((e["type"], e) for _, e in states)[EntityType.ERC1155_TOKENID]
+    assert state["turnover_count"] == 2
+    assert state["minted_count"] == 0
+    assert state["minted_blknum"] is None
@@ -0,0 +1,114 @@
+import pytest
+
+from blockchainetl.service.price_series import PriceSeries, PriceSeriesCache
+from blockchainetl.service.price_service import PriceService
+from blockchainetl.service.service_cache import MISSING, ServiceCache
+
+START = 1_700_000_000 - 1_700_000_000 % 3600
+
+
+def test_lookup():
+    series = PriceSeries(START, START + 7200, [(START, 1.0), (START + 3600, 2.0)])
+    assert series.lookup(START, 3600) == 1.0
+    assert series.lookup(START + 1800, 3600) == 1.5
+    assert series.lookup(START + 3600 + 600, 3600) == 2.0
+    assert series.lookup(START + 3 * 3600, 3600) is MISSING
+
+
+def test_lookup_empty_series():
+    series = PriceSeries(START, START + 7200, [])
+    assert series.lookup(START + 1800, 3600) is MISSING
+
+    cache = PriceSeriesCache(lambda *_: [(START, None)], refresh_interval=0)
+    assert cache.get("ethereum", "0x01", START + 1800) is MISSING
+
+
+class FakePriceService(PriceService):
+    def __init__(self, historical_prices):
+        super().__init__("http://localhost", cache=ServiceCache(), refresh_interval=0)
+        self.historical_prices = historical_prices
+        self.fetched = []
+
+    def get_historical_prices(self, *args, **kwargs):
+        return self.historical_prices
+
+    def _fetch_price(self, chain, token_address, time=None):
+        self.fetched.append((chain, token_address, time))
+        return 42.0
+
+
+def test_empty_series_falls_back_to_point_query():
+    service = FakePriceService([])
+    assert service.get_price("ethereum", "0x01", START + 1800) == 42.0
+    assert service.fetched == [("ethereum", "0x01", START)]
+
+
+def test_series_answers_from_memory():
+    service = FakePriceService(
+        [{"timestamp": START, "price": 1.0}, {"timestamp": START + 3600, "price": 2.0}]
+    )
+    assert service.get_price("ethereum", "0x01", START + 900) == 1.25
+    assert service.fetched == []
+
+
+@pytest.mark.parametrize(
+    "historical_prices",
+    [[{"time": START, "price": 1.0}], [{"timestamp": START}], [[START, 1.0]]],
+)
+def test_load_series_unexpected_shape(historical_prices, caplog):
+    service = FakePriceService(historical_prices)
+    assert service._load_series("ethereum", "0x01", START, START + 3600) == []
+    assert "unexpected historical prices" in caplog.text
+    # the lookup falls back to the point query
+    assert service.get_price("ethereum", "0x01", START + 1800) == 42.0
+
+
+def test_load_series_skips_unexpected_points(caplog):
+    service = FakePriceService(
+        [
+            {"timestamp": START, "price": 1.0},
+            {"time": START + 1800, "price": 9.0},
+            {"timestamp": START + 3600, "price": 2.0},
+        ]
+    )
+    assert service.get_price("ethereum", "0x01", START + 900) == 1.25
+    assert service.fetched == []
+    assert "skip #1 unexpected historical prices" in caplog.text
+
+
+def test_close_stops_the_refresher():
+    cache = PriceSeriesCache(lambda *_: [(START, 1.0)], refresh_interval=60)
+    assert cache.get("ethereum", "0x01", START) == 1.0
+    refresher = cache._refresher
+    assert refresher is not None and refresher.is_alive()
+    cache.close()
+    assert not refresher.is_alive()
+
+
+def test_failed_load_is_cached():
+    calls = []
+
+    def loader(chain, token_address, start, end):
+        calls.append(token_address)
+        raise ConnectionError("timeout")
+
+    cache = PriceSeriesCache(loader, refresh_interval=0, failure_ttl=60)
+    with pytest.raises(ConnectionError):
+        cache.get("ethereum", "0x01", START)
+    assert cache.get("ethereum", "0x01", START + 1800) is MISSING
+    assert calls == ["0x01"]
+    assert cache._key_locks == {}
+
+    # not cached at all without the ttl
+    cache = PriceSeriesCache(loader, refresh_interval=0, failure_ttl=0)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            cache.get("ethereum", "0x02", START)
+    assert calls == ["0x01", "0x02", "0x02"]
+
+
+def test_key_locks_are_dropped():
+    cache = PriceSeriesCache(lambda *_: [(START, 1.0)], refresh_interval=0)
+    for token in ("0x01", "0x02", "0x03"):
+        assert cache.get("ethereum", token, START) == 1.0
+    assert cache._key_locks == {}
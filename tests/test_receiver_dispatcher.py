@@ -0,0 +1,136 @@
+import time
+import threading
+from types import SimpleNamespace
+
+from blockchainetl.alert.rule import Rule
+from blockchainetl.alert.receivers import BaseReceiver
+from blockchainetl.alert.receiver_dispatcher import (
+    ReceiverDispatcher,
+    TokenBucket,
+    retry_after,
+)
+
+RULE = Rule(
+    id="large-transfer",
+    chain="ethereum",
+    where="tx.value > 0",
+    description="a large transfer",
+)
+
+
+class FakeReceiver(BaseReceiver):
+    """Coalesce all the hits into one message, the first send waits for `gate`"""
+
+    def __init__(self, failures=0, rate_limit=None):
+        self.failures = failures
+        self.rate_limit = rate_limit
+        self.gate = threading.Event()
+        self.sending = threading.Event()
+        self.attempts = 0
+        self.sent = []
+
+    def batch(self, results):
+        return [[result[0]["n"] for _, result in results]]
+
+    def send(self, message):
+        self.sending.set()
+        self.gate.wait(5)
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise Exception("503 Service Unavailable")
+        self.sent.append(message)
+
+
+def _hit(n):
+    return [{"n": n}]
+
+
+def test_coalesce_the_queued_hits():
+    receiver = FakeReceiver()
+    dispatcher = ReceiverDispatcher({"fake": receiver}, batch_size=3)
+    dispatcher.open()
+
+    assert dispatcher.post("fake", RULE, _hit(1))
+    # the worker is blocked in sending the first hit, the others are queued
+    assert receiver.sending.wait(5)
+    for n in range(2, 6):
+        assert dispatcher.post("fake", RULE, _hit(n))
+    receiver.gate.set()
+    dispatcher.close(5)
+
+    assert receiver.sent == [[1], [2, 3, 4], [5]]
+
+
+def test_drop_when_the_queue_is_full():
+    receiver = FakeReceiver()
+    dispatcher = ReceiverDispatcher({"fake": receiver}, queue_size=1)
+    dispatcher.open()
+
+    assert dispatcher.post("fake", RULE, _hit(1))
+    assert receiver.sending.wait(5)
+    assert dispatcher.post("fake", RULE, _hit(2))
+    assert not dispatcher.post("fake", RULE, _hit(3))
+    receiver.gate.set()
+    dispatcher.close(5)
+
+    assert receiver.sent == [[1], [2]]
+
+
+def test_retry_until_sent():
+    receiver = FakeReceiver(failures=2)
+    receiver.gate.set()
+    dispatcher = ReceiverDispatcher({"fake": receiver}, backoff=0.01)
+    dispatcher.open()
+    dispatcher.post("fake", RULE, _hit(1))
+    dispatcher.close(5)
+
+    assert receiver.attempts == 3
+    assert receiver.sent == [[1]]
+
+
+def test_give_up_after_max_retries():
+    receiver = FakeReceiver(failures=3)
+    receiver.gate.set()
+    dispatcher = ReceiverDispatcher({"fake": receiver}, max_retries=2, backoff=0.01)
+    dispatcher.open()
+    dispatcher.post("fake", RULE, _hit(1))
+    dispatcher.close(5)
+    assert receiver.attempts == 3
+    assert receiver.sent == []
+
+    # the next hits are still delivered
+    dispatcher = ReceiverDispatcher({"fake": receiver}, max_retries=2, backoff=0.01)
+    dispatcher.open()
+    dispatcher.post("fake", RULE, _hit(2))
+    dispatcher.close(5)
+    assert receiver.sent == [[2]]
+
+
+def test_retry_after():
+    response = SimpleNamespace(headers={"Retry-After": "3"})
+    assert retry_after(SimpleNamespace(response=response)) == 3
+    assert retry_after(SimpleNamespace(response=SimpleNamespace(headers={}))) is None
+    assert retry_after(Exception("timeout")) is None
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=20, burst=2)
+    st = time.monotonic()
+    # the burst is free, the next 2 wait for 1/20s each
+    for _ in range(4):
+        bucket.acquire()
+    assert time.monotonic() - st >= 0.09
+
+
+def test_rate_limited_receiver():
+    receiver = FakeReceiver(rate_limit=(20, 1))
+    receiver.gate.set()
+    dispatcher = ReceiverDispatcher({"fake": receiver}, batch_size=1)
+    dispatcher.open()
+    st = time.monotonic()
+    for n in range(3):
+        dispatcher.post("fake", RULE, _hit(n))
+    dispatcher.close(5)
+
+    assert len(receiver.sent) == 3
+    assert time.monotonic() - st >= 0.09
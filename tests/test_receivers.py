@@ -0,0 +1,78 @@
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from blockchainetl.alert.rule import Rule
+from blockchainetl.alert.receivers.slack_receiver import SlackReceiver
+from blockchainetl.alert.receivers.wechat_receiver import WechatReceiver
+
+RULE = Rule(
+    id="large-transfer",
+    chain="ethereum",
+    where="tx.value > 0",
+    description="a large transfer",
+)
+RESULT = [{"tx": {"hash": "0x01", "value": 1}}]
+
+
+class FakeSession(object):
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body or {}
+        self.payloads = []
+
+    def post(self, url, json=None, timeout=None):
+        self.payloads.append(json)
+
+        def raise_for_status():
+            if self.status_code // 100 != 2:
+                raise Exception(f"{self.status_code} error")
+
+        return SimpleNamespace(
+            status_code=self.status_code,
+            text=str(self.body),
+            json=lambda: self.body,
+            raise_for_status=raise_for_status,
+        )
+
+
+def new_receivers(session):
+    slack = SlackReceiver("http://localhost/slack", "alert")
+    wechat = WechatReceiver("key", "http://localhost/wechat", "alert")
+    for receiver in (slack, wechat):
+        receiver._session = session
+    return slack, wechat
+
+
+def test_post_logs_failures(caplog):
+    session = FakeSession(500)
+    for receiver in new_receivers(session):
+        with caplog.at_level(logging.ERROR):
+            receiver.post(RULE, RESULT)
+        # the dispatcher retries on the raised errors
+        with pytest.raises(Exception):
+            receiver.send(session.payloads[-1])
+
+    errors = [e.getMessage() for e in caplog.records if e.levelno == logging.ERROR]
+    assert len(errors) == 2
+    assert "failed to push large-transfer to slack" in errors[0]
+
+
+def test_wechat_error_code(caplog):
+    session = FakeSession(200, {"errcode": 45009, "errmsg": "api freq out of limit"})
+    _, wechat = new_receivers(session)
+    with caplog.at_level(logging.ERROR):
+        wechat.post(RULE, RESULT)
+    assert "api freq out of limit" in caplog.text
+    with pytest.raises(Exception):
+        wechat.send(session.payloads[-1])
+
+
+def test_post():
+    session = FakeSession(200)
+    for receiver in new_receivers(session):
+        receiver.post(RULE, RESULT)
+    assert len(session.payloads) == 2
+    assert "large-transfer" in session.payloads[0]["attachments"][0]["pretext"]
+    assert "large-transfer" in session.payloads[1]["markdown"]["content"]
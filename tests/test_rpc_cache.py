@@ -0,0 +1,69 @@
+import json
+from decimal import Decimal
+
+from bitcoinetl.rpc import bitcoin_rpc
+from bitcoinetl.rpc.bitcoin_rpc import BitcoinRpc
+from bitcoinetl.rpc.rpc_cache import RpcCache, get_rpc_cache
+
+TX = {"txid": "aa" * 32, "vout": [{"n": 0, "value": Decimal("0.5")}]}
+
+
+def test_memory_hit_returns_a_copy():
+    cache = RpcCache(maxsize=10)
+    key = ("getrawtransaction", TX["txid"], 1)
+    val = json.loads(json.dumps(TX, default=str))
+    cache.set(key, val)
+    # the stored value is not the caller's
+    val["vout"].clear()
+
+    first = cache.get(key)
+    assert first["vout"][0]["n"] == 0
+    first["vout"][0]["n"] = 1
+    first["txid"] = None
+    assert cache.get(key)["vout"][0]["n"] == 0
+    assert cache.get(key)["txid"] == TX["txid"]
+    assert cache.stats()["memory_hits"] == 3
+
+
+def test_memory_cache_disabled():
+    cache = RpcCache(maxsize=0)
+    cache.set(("getrawtransaction", TX["txid"], 1), TX)
+    assert cache.get(("getrawtransaction", TX["txid"], 1)) is None
+
+
+def test_bitcoin_rpc_cached_result_mutated(monkeypatch):
+    requests = []
+
+    def make_jsonrpc_request(provider_uri, calls, timeout):
+        requests.append(calls)
+        tx = {"txid": TX["txid"], "vout": [{"n": 0, "value": 0.5}]}
+        return json.dumps([{"id": e["id"], "result": tx} for e in calls]).encode()
+
+    monkeypatch.setattr(bitcoin_rpc, "make_jsonrpc_request", make_jsonrpc_request)
+    monkeypatch.setattr(bitcoin_rpc, "get_rpc_cache", lambda *_: RpcCache(None, 10))
+
+    # off by default
+    assert BitcoinRpc("http://localhost").cache is None
+
+    rpc = BitcoinRpc("http://localhost", memory_cache_size=10)
+    tx = rpc.batch([["getrawtransaction", TX["txid"], 1]])[0]
+    tx["vout"][0]["value"] = Decimal(0)
+    tx.pop("txid")
+
+    cached = rpc.batch([["getrawtransaction", TX["txid"], 1]])[0]
+    assert len(requests) == 1
+    assert cached["txid"] == TX["txid"]
+    assert cached["vout"][0]["value"] == Decimal("0.5")
+
+
+def test_get_rpc_cache_by_path_and_size(tmp_path):
+    path = str(tmp_path / "cache")
+    cache = get_rpc_cache(path, 10)
+    assert get_rpc_cache(path, 10) is cache
+
+    # a different memory tier, over the same disk cache
+    other = get_rpc_cache(path, 0)
+    assert other is not cache
+    cache.set(("getrawtransaction", TX["txid"], 1), TX)
+    assert other.get(("getrawtransaction", TX["txid"], 1)) == TX
+    assert get_rpc_cache(str(tmp_path / "other"), 10) is not cache
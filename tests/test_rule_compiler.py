@@ -0,0 +1,98 @@
+import pytest
+import rule_engine
+
+from blockchainetl.alert.full_items import FULL_ITEMS
+
+
+def _filter_or_error(rule, items):
+    try:
+        return list(rule.filter(items))
+    except rule_engine.EngineError as e:
+        return type(e)
+
+
+RULES = {
+    "block": [
+        "block.number > 15835999",
+        "block.gas_used / block.gas_limit > 0.2",
+        "block.miner == '0x354fc7d605edc972b49fe4dc7ce39678dc882075'",
+        "block.uncle0_hash == null and block.extra_data =~ '^0x'",
+    ],
+    "tx": [
+        "tx.value > 0",
+        "tx.value > 10 ** 18 or tx.gas_price * tx.receipt_gas_used > 10 ** 15",
+        "tx.to_address in ['0x37861ccddb1e36a9dc732eb12ea570438173f0b6', '0x0']",
+        "tx.from_address not in {'0x0'}",
+        "tx.input =~ '^0xa9059cbb' or tx.input.length < 11",
+        "tx.input[:10] == '0x5b2370ee'",
+        "tx.receipt_status != 1",
+        "tx.receipt_contract_address != null",
+        "tx.transaction_index % 2 == 0 ? tx.nonce > 100 : tx.nonce < 100",
+        "not tx.value and -tx.nonce < 0",
+        "block.number == tx.block_number and block.hash == tx.block_hash",
+        "logs.length > 3",
+        "traces.length > 0 and traces[0].trace_type == 'call'",
+        "token_xfers.length > 0 and token_xfers[-1].value > 0",
+        "logs[0].address == tx.to_address",
+        "tx.input.as_lower =~ '^0x'",
+        "tx.receipt_contract_address.length > 0",
+        "tx.unknown_field.length > 0",
+        "tx.unknown_field == null",
+        "tx.block_timestamp.to_str == '1666832579'",
+    ],
+    "log": [
+        "log.topics.length == 3",
+        "log.topics[0] == '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'",
+        "log.data.length > 66",
+        "log.address =~~ '^0xa0'",
+    ],
+    "token_xfer": [
+        "token_xfer.value > 10 ** 20",
+        "token_xfer.from_address == token_xfer.to_address",
+        "token_xfer.token_address in ['0xdac17f958d2ee523a2206206994597c13d831ec7']",
+    ],
+    "trace": [
+        "trace.error != null",
+        "trace.trace_type == 'create' or trace.call_type == 'delegatecall'",
+        "trace.value > 0 and trace.gas_used > 21000",
+        "trace.trace_address.length > 2",
+        "trace.input =~ '^0x(a9059cbb|23b872dd)'",
+    ],
+}
+
+# the rules raising on some items, the compiled rule must raise the same error
+ERROR_RULES = {
+    "tx": [
+        "tx.value + tx.input == 1",
+        "tx.input.length > tx.from_address",
+        "logs[1000].address == null",
+        "tx.input =~ tx.value",
+    ],
+    "trace": [
+        "trace.trace_address[5] > 0",
+        "trace.value > trace.input",
+    ],
+}
+
+
+def _cases(rules):
+    return [(scope, text) for scope, texts in rules.items() for text in texts]
+
+
+@pytest.mark.parametrize("default_value", [None, rule_engine.errors.UNDEFINED])
+@pytest.mark.parametrize("scope,text", _cases(RULES) + _cases(ERROR_RULES))
+def test_compiled_rule_matches_interpreted(scope, text, default_value):
+    context = rule_engine.Context(default_value=default_value)
+    items = FULL_ITEMS[scope]
+    compiled = _filter_or_error(rule_engine.CompiledRule(text, context=context), items)
+    interpreted = _filter_or_error(rule_engine.Rule(text, context=context), items)
+    assert compiled == interpreted
+
+
+@pytest.mark.parametrize("scope,text", _cases(ERROR_RULES))
+def test_error_rule_raises(scope, text):
+    context = rule_engine.Context(default_value=None)
+    result = _filter_or_error(
+        rule_engine.Rule(text, context=context), FULL_ITEMS[scope]
+    )
+    assert isinstance(result, type) and issubclass(result, rule_engine.EngineError)
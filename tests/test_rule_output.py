@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from blockchainetl.alert import rule_udf as ru
+from blockchainetl.alert.full_items import FULL_ITEMS
+from blockchainetl.alert.rule_label import RuleLabel
+from blockchainetl.alert.rule_output import EncodeDecimal, RuleOutput
+
+TEMPLATES = [
+    None,
+    "{tx.hash} from {tx.from_address} to {tx.to_address}",
+    "{block.number}/{tx.transaction_index}: {wei2eth(tx.value)} ETH",
+    "{toDateTime(tx.block_timestamp)} {tx.receipt_status == 1}",
+    "{len(logs or [])} logs, first by {logs[0].address if logs else None}",
+    "{[e.token_address for e in token_xfers or []]}",
+    "{sum(e.value or 0 for e in traces or [])} {tx.input[:10]}",
+    "{safe_round(tx.gas_price / 1e9, 2)} gwei {tag_value_usd(tx.value, 10, 100)}",
+]
+
+
+class dict2obj(object):
+    """The former item view of the templates, converted eagerly"""
+
+    def __init__(self, d):
+        for a, b in d.items():
+            if isinstance(b, (list, tuple)):
+                setattr(self, a, [dict2obj(x) if isinstance(x, dict) else x for x in b])
+            else:
+                setattr(self, a, dict2obj(b) if isinstance(b, dict) else b)
+
+
+def former_format(template, s):
+    if template is None:
+        return json.dumps(s, default=EncodeDecimal)
+    kwargs = dict2obj(s).__dict__
+    kwargs.update(ru.ALL)
+    return eval(f"f'{template}'", kwargs)
+
+
+@pytest.mark.parametrize("template", TEMPLATES)
+def test_output_same_as_former(template):
+    output = RuleOutput(template)
+    for item in FULL_ITEMS["tx"]:
+        assert output.format(item) == former_format(template, item)
+
+
+def test_label_same_as_former():
+    templates = {f"label{i}": e for i, e in enumerate(TEMPLATES)}
+    labels = RuleLabel(templates)
+    for item in FULL_ITEMS["tx"]:
+        assert labels.format(item) == {
+            k: former_format(v, item) for k, v in templates.items()
+        }
+
+
+def test_missing_attribute():
+    with pytest.raises(AttributeError):
+        former_format("{tx.missing}", FULL_ITEMS["tx"][0])
+    with pytest.raises(AttributeError):
+        RuleOutput("{tx.missing}").format(FULL_ITEMS["tx"][0])
@@ -0,0 +1,83 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from blockchainetl.alert.full_items import FULL_ITEMS
+from blockchainetl.alert.rule_set import RuleSet
+
+from test_rule_compiler import ERROR_RULES, RULES
+
+USDT = "0xdac17f958d2ee523a2206206994597c13d831ec7"
+WETH = "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"
+TRANSFER = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+APPROVAL = "0x8c5be1e5ebec7d5bd14f71427d1e84f3dd0314c0f7b2291e5b200ac8c7c3b925"
+
+# the rules with a leading guard, indexed by the planner
+GUARDED_RULES = {
+    "tx": [
+        "tx.to_address == '0x37861ccddb1e36a9dc732eb12ea570438173f0b6'",
+        "tx.to_address == '0x98c3d3183c4b8a650614ad179a1a98be0a8d6b8e' and tx.value > 0",
+        f"'{USDT}' == tx.to_address",
+        f"(tx.to_address == '{USDT}' or tx.to_address == '{WETH}') and tx.nonce > 0",
+        "tx.to_address == '0x98c3d3183c4b8a650614ad179a1a98be0a8d6b8e' and "
+        "tx.input + tx.value == 1",
+        "logs[0].address == '0x0' and logs.length > 1",
+        "traces[1000].trace_type == 'call'",
+        "tx.block_number == 15836000",
+        "tx.value == 0.5",
+    ],
+    "log": [
+        f"log.topics[0] == '{TRANSFER}'",
+        f"log.topics[0] in ['{TRANSFER}', '{APPROVAL}'] and log.topics.length == 3",
+        f"log.topics[3] == '{TRANSFER}'",
+        f"log.address == '{WETH}' and log.topics[0] == '{APPROVAL}'",
+    ],
+    "token_xfer": [
+        f"token_xfer.token_address in ['{USDT}', '{WETH}']",
+        f"token_xfer.token_address == '{WETH}' and token_xfer.value > 10 ** 18",
+    ],
+    "trace": [
+        "trace.trace_type == 'call' and trace.value > 0",
+        "trace.trace_address[0] == 0",
+    ],
+}
+
+
+def _rulesets():
+    rules = []
+    for cases in (RULES, ERROR_RULES, GUARDED_RULES):
+        for scope, texts in cases.items():
+            for text in texts:
+                rules.append(
+                    {
+                        "id": f"rule-{len(rules)}",
+                        "description": text,
+                        "scope": scope,
+                        "where": text,
+                        "receivers": ["print"],
+                    }
+                )
+    # disabled, or without receivers, never matches
+    rules.append({**rules[-1], "id": "disabled", "enabled": False})
+    rules.append({**rules[-1], "id": "no-receiver", "receivers": None})
+    return rules
+
+
+def _execute(rule_set):
+    results = {}
+    for rule_id, result in rule_set.execute(ThreadPoolExecutor, FULL_ITEMS):
+        results[rule_id] = type(result) if isinstance(result, Exception) else result
+    return results
+
+
+def test_planned_same_as_unplanned():
+    rule_set = RuleSet.load("ethereum", None, _rulesets())
+    planner = rule_set.planner
+    # most of the guarded rules are indexed
+    assert sum(len(planner.indexed_rules(e)) for e in planner.guarded) >= 14
+
+    planned = _execute(rule_set)
+    unplanned = _execute(rule_set._replace(planner=None))
+    assert planned == unplanned
+    assert planned.keys() == rule_set.rules.keys()
+    # not trivially equal
+    assert any(isinstance(e, list) and len(e) > 0 for e in planned.values())
+    assert ValueError in planned.values()
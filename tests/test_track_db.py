@@ -0,0 +1,108 @@
+import pandas as pd
+from sqlalchemy.dialects import postgresql
+
+from blockchainetl.track.track_db import TRACK_INDEX_COLUMNS, TrackDB, _track_key
+
+
+class FakeTrackDB(TrackDB):
+    """The tracks table in memory, with the same ON CONFLICT DO NOTHING"""
+
+    def __init__(self):
+        super().__init__("postgresql://postgres@127.0.0.1:5432/postgres", "track")
+        self.rows = {}
+
+    def _insert(self, items):
+        inserted = []
+        for e in items:
+            if _track_key(e) not in self.rows:
+                self.rows[_track_key(e)] = e
+                inserted.append(e)
+        return inserted
+
+    def all_items_df(self):
+        # the lowest hop of (address, label, track_id), the earliest if equals
+        best = {}
+        for e in self.rows.values():
+            if e.get("stop") is True:
+                continue
+            key = (e["address"], e.get("label"), e.get("track_id"))
+            if key not in best or e["hop"] < best[key]["hop"]:
+                best[key] = e
+        return pd.DataFrame(
+            [[e[c] for c in TRACK_INDEX_COLUMNS] for e in best.values()],
+            columns=TRACK_INDEX_COLUMNS,
+        )
+
+
+def _track(address, txhash, hop, original="0xorig", label="hacker", stop=False):
+    return {
+        "address": address,
+        "txhash": txhash,
+        "logpos": 0,
+        "trace_address": "",
+        "original": original,
+        "label": label,
+        "track_id": "t1",
+        "hop": hop,
+        "stop": stop,
+    }
+
+
+def _sorted(df):
+    return df.sort_values(TRACK_INDEX_COLUMNS).reset_index(drop=True)
+
+
+def test_index_follows_the_inserted_rows():
+    db = FakeTrackDB()
+    db.open()
+    assert db.is_empty()
+
+    db.upsert(pd.DataFrame([_track("0xa", "0x1", 2), _track("0xb", "0x1", 1)]))
+    # ignored by the table: the same key as a row inserted already
+    db.upsert(pd.DataFrame([_track("0xa", "0x1", 0, original="0xother")]))
+    # ignored as well: the same key as an earlier row of the batch
+    db.upsert(
+        pd.DataFrame(
+            [_track("0xc", "0x2", 3), _track("0xc", "0x2", 0, original="0xother")]
+        )
+    )
+    db.upsert(pd.DataFrame([_track("0xb", "0x3", 1, stop=True)]))
+
+    df = db.items_df_of(["0xa", "0xb", "0xc", "0xd"])
+    assert df.set_index("address")["hop"].to_dict() == {"0xa": 2, "0xb": 1, "0xc": 3}
+    assert set(df["original"]) == {"0xorig"}
+
+    # the same as reloaded from the table
+    index = db._index
+    db.reconcile()
+    assert db._index == index
+    assert _sorted(df).equals(_sorted(db.all_items_df()))
+
+
+def test_lower_hop_wins():
+    db = FakeTrackDB()
+    db.open()
+    db.upsert(pd.DataFrame([_track("0xa", "0x1", 2)]))
+    db.upsert(pd.DataFrame([_track("0xa", "0x2", 1, original="0xnear")]))
+    db.upsert(pd.DataFrame([_track("0xa", "0x3", 1, original="0xlater")]))
+    assert db.items_df_of(["0xa"]).to_dict("records") == [
+        {
+            "address": "0xa",
+            "original": "0xnear",
+            "label": "hacker",
+            "track_id": "t1",
+            "hop": 1,
+        }
+    ]
+
+
+def test_insert_statement_returns_the_inserted_keys():
+    db = TrackDB("postgresql://postgres@127.0.0.1:5432/postgres", "track")
+    stmt = db._exporter.item_type_to_insert_stmt_mapping["track"]
+    sql = str(
+        stmt.values([_track("0xa", "0x1", 0)])
+        .returning(stmt.table.columns["address"])
+        .compile(dialect=postgresql.dialect())
+    )
+    assert "ON CONFLICT (address, txhash, logpos, trace_address) DO NOTHING" in sql
+    assert "RETURNING" in sql
@@ -0,0 +1,137 @@
+import pandas as pd
+import pytest
+
+from blockchainetl.enumeration.chain import Chain
+from blockchainetl.service.label_service import LabelService
+from blockchainetl.service.profile_service import ProfileService
+from blockchainetl.track.track_oracle import (
+    OUT_TXS,
+    STOP_CATEGORIES,
+    VIN_TXS,
+    TrackOracle,
+)
+
+LABELS = {
+    "0x01": {"Exchange,Binance", "Exchange,Binance 14"},
+    "0x02": {"Dex,Uniswap"},
+    "0x03": {"Hacker,Ronin"},
+    "bc1qexchange": {"Exchange,Huobi"},
+}
+
+
+def _profile(vin_txs, out_txs):
+    return [
+        {"typo": "erc20", "vin_txs": vin_txs, "out_txs": 0},
+        {"typo": "ether", "vin_txs": 0, "out_txs": out_txs},
+    ]
+
+
+PROFILES = {
+    "0x04": _profile(VIN_TXS + 1, OUT_TXS + 1),
+    "0x05": _profile(VIN_TXS + 1, OUT_TXS),
+    "0x06": _profile(1, 1),
+}
+
+
+class FakeLabeler(LabelService):
+    def __init__(self):
+        pass
+
+    def label_of(self, address):
+        return LABELS.get(address.lower())
+
+    def labels_of(self, addresses, chunk_size=5000):
+        return {e.lower(): LABELS.get(e.lower()) for e in addresses}
+
+
+class FakeProfiler(ProfileService):
+    def __init__(self):
+        pass
+
+    def get_profile(self, address):
+        return PROFILES.get(address.lower(), _profile(0, 0))
+
+    def get_profiles(self, addresses, chunk_size=5000):
+        return {e.lower(): self.get_profile(e) for e in addresses}
+
+
+def per_row_stops(oracle: TrackOracle, tracked: pd.DataFrame) -> pd.DataFrame:
+    """The former per row shold_stop and stop_of"""
+
+    def should_stop(row):
+        address = row["address"]
+        categories = oracle.labeler.category_of(address)
+        for category in STOP_CATEGORIES:
+            if category in categories:
+                return True
+        if oracle.chain in Chain.ALL_BITCOIN_FORKS:
+            return row["n_tx_in_addr"] >= 5 and row["n_tx_out_addr"] >= 5
+        if oracle.profiler is not None:
+            profile = oracle.profiler.get_profile(address)
+            vin_txs = sum(e["vin_txs"] for e in profile)
+            out_txs = sum(e["out_txs"] for e in profile)
+            return vin_txs > VIN_TXS and out_txs > OUT_TXS
+        return False
+
+    def stop_of(address):
+        labels = oracle.labeler.label_of(address)
+        if labels is not None:
+            return ";".join(labels)
+        if oracle.profiler is not None:
+            profile = oracle.profiler.get_profile(address)
+            return "Profile,HighInOutTxs;" + ";".join(
+                f"{e['typo']}:vin-{e['vin_txs']},out-{e['out_txs']}" for e in profile
+            )
+        return "Coinjoin"
+
+    stop = tracked.apply(should_stop, axis=1).astype(bool)
+    reason = pd.Series(None, index=tracked.index, dtype=object)
+    for idx in tracked.index[stop]:
+        reason[idx] = stop_of(tracked.at[idx, "address"])
+    return pd.DataFrame({"stop": stop, "reason": reason}, index=tracked.index)
+
+
+@pytest.mark.parametrize("with_profiler", [True, False])
+def test_same_as_per_row_on_ethereum(with_profiler):
+    oracle = TrackOracle(
+        Chain.ETHEREUM, FakeLabeler(), FakeProfiler() if with_profiler else None
+    )
+    tracked = pd.DataFrame(
+        {
+            "address": ["0x01", "0x02", "0x03", "0x04", "0x05", "0x06", "0x07"]
+            + ["0X01", "0x04"],
+        },
+        # not a RangeIndex, as the TrackExporter's filtered frames
+        index=[10, 11, 12, 13, 14, 15, 16, 20, 21],
+    )
+
+    actual = oracle.stops_of(tracked)
+    expected = per_row_stops(oracle, tracked)
+    pd.testing.assert_frame_equal(actual, expected)
+    assert list(actual["stop"]) == [
+        True,
+        True,
+        False,
+        with_profiler,
+        False,
+        False,
+        False,
+        True,
+        with_profiler,
+    ]
+
+
+def test_same_as_per_row_on_bitcoin():
+    oracle = TrackOracle(Chain.BITCOIN, FakeLabeler())
+    tracked = pd.DataFrame(
+        {
+            "address": ["bc1qexchange", "bc1qmixer", "bc1qpeel", "bc1qother"],
+            "n_tx_in_addr": [1, 5, 5, 1],
+            "n_tx_out_addr": [1, 5, 4, 9],
+        }
+    )
+
+    actual = oracle.stops_of(tracked)
+    pd.testing.assert_frame_equal(actual, per_row_stops(oracle, tracked))
+    assert list(actual["stop"]) == [True, True, False, False]
+    assert list(actual["reason"]) == ["Exchange,Huobi", "Coinjoin", None, None]
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+from ethereumetl.streaming.eth_txpool_adapter import EthTxpoolAdapter
+from ethereumetl.streaming.txpool_tracker import TxpoolTracker
+
+T0 = datetime(2024, 1, 1)
+
+
+def tx(txhash, nonce, pool_type="pending", from_address="0x01"):
+    return {
+        "txhash": txhash,
+        "nonce": nonce,
+        "from_address": from_address,
+        "pool_type": pool_type,
+    }
+
+
+def changes_of(changes):
+    return [(e["txhash"], e["change"], e["pool_type"]) for e in changes]
+
+
+def test_diff():
+    tracker = TxpoolTracker()
+    changes = tracker.diff([tx("0xa", 1), tx("0xb", 2, "queued")], T0)
+    assert changes_of(changes) == [
+        ("0xa", "added", "pending"),
+        ("0xb", "added", "queued"),
+    ]
+
+    t1 = T0 + timedelta(seconds=1)
+    changes = tracker.diff([tx("0xc", 1), tx("0xb", 2, "pending")], t1)
+    assert changes_of(changes) == [
+        ("0xc", "replaced", "pending"),
+        ("0xb", "moved", "pending"),
+    ]
+    assert changes[1]["first_seen"] == T0
+    assert changes[1]["last_seen"] == t1
+
+    # unchanged
+    assert tracker.diff([tx("0xc", 1), tx("0xb", 2)], t1) == []
+
+    changes = tracker.diff([tx("0xc", 1)], t1)
+    assert changes_of(changes) == [("0xb", "dropped", "pending")]
+    assert tracker.known_hashes() == {"0xc"}
+
+
+class FakeBatchProvider(object):
+    def __init__(self, responses):
+        self.responses = responses
+
+    def make_batch_request(self, text):
+        return self.responses.pop(0)
+
+
+def test_pending_filter_failed_batch():
+    adapter = EthTxpoolAdapter.__new__(EthTxpoolAdapter)
+    adapter.tracker = TxpoolTracker()
+    adapter.batch_size = 100
+    adapter.full_sync_every = 30
+    adapter._polls_since_full_sync = 1
+    adapter._filter_id = "0x1"
+    adapter.batch_web3_provider = FakeBatchProvider(
+        [
+            [{"jsonrpc": "2.0", "id": 0, "result": ["0xa", "0xb"]}],
+            {"jsonrpc": "2.0", "error": {"code": -32000, "message": "busy"}},
+        ]
+    )
+
+    assert adapter._export_pending_txs() == []
+    # the next poll is a full sync
+    assert adapter._polls_since_full_sync == adapter.full_sync_every
+    assert adapter.batch_web3_provider.responses == []